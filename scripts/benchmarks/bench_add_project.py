@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+bench_add_project.py
+--------------------
+Times opening one more project while a few others are already open (5 by default),
+using the synthetic projects from ``bench_project_load.py``.
+
+Three ways of getting the new project into the tree are timed:
+
+  1. Before 2.0.4: ``add_project`` loads the project to read its name, then
+     ``reload_tree`` builds a new ``Project`` for every open project (the new one
+     included) and ``_get_project_by_name`` scans the tree for it.
+  2. Cached ``reload_tree``: the project is loaded once and ``reload_tree`` takes the
+     other projects from the ``ProjectCache``, but still takes every row out of the
+     model, remembers and restores what was expanded and puts every row back.
+  3. Incremental: the project is loaded once and only its row is inserted
+     (``QRAVEDockWidget._on_project_added``).
+
+Zooming to the project and adding its default view cost the same every way so they
+aren't included.
+
+Needs the QGIS Python environment (see DEVELOPER.md), same as the plugin itself.
+
+Usage:
+    python3 scripts/benchmarks/bench_add_project.py
+    python3 scripts/benchmarks/bench_add_project.py --open 10 --repeaters 5000 --eager
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# Import the plugin the same way the tests do
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# The tree view doesn't need a screen
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+def project_name_row(model, name):
+    """``_get_project_by_name``: look through the top level rows for the project"""
+    for row in range(model.rowCount()):
+        if model.item(row).text() == name:
+            return row
+    return None
+
+
+def legacy_add(model, open_paths, new_path):
+    from src.classes.project import Project
+
+    test_project = Project(new_path)
+    test_project.load()
+    name = test_project.qproject.text()
+
+    # reload_tree before the ProjectCache: a new Project for every open project
+    model.clear()
+    for path in [new_path, *open_paths]:
+        project = Project(path)
+        project.load()
+        model.appendRow(project.qproject)
+    return project_name_row(model, name)
+
+
+def cached_reload_add(model, view, open_paths, new_path):
+    from src.classes.project import Project
+    from src.classes.project_cache import ProjectCache
+    from src.classes.tree_index import get_expanded_paths
+
+    new_project = Project(new_path)
+    new_project.load_data()
+    new_project.build_items()
+    ProjectCache().put(new_project)
+    name = new_project.qproject.text()
+
+    # reload_tree with every other project already in the ProjectCache
+    expanded = {model.item(row).text(): get_expanded_paths(view, model, model.index(row, 0)) for row in range(model.rowCount())}
+    while model.rowCount() > 0:
+        model.takeRow(0)
+    model.clear()
+    for path in [new_path, *open_paths]:
+        project = ProjectCache().lookup(path)
+        model.appendRow(project.qproject)
+        paths = expanded.get(project.qproject.text())
+        if paths:
+            view.setExpanded(model.indexFromItem(project.qproject), True)
+    return project_name_row(model, name)
+
+
+def incremental_add(model, view, new_path):
+    from src.classes.project import Project
+    from src.classes.project_cache import ProjectCache
+
+    new_project = Project(new_path)
+    new_project.load_data()
+    new_project.build_items()
+    ProjectCache().put(new_project)
+    model.insertRow(0, new_project.qproject)
+    view.setExpanded(model.indexFromItem(new_project.qproject), True)
+    return 0
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def bench(folder: str, num_open: int, repeaters: int) -> None:
+    from bench_project_load import write_project
+    from qgis.PyQt.QtGui import QStandardItemModel
+    from qgis.PyQt.QtWidgets import QTreeView
+
+    from src.classes.project_cache import ProjectCache
+
+    paths = []
+    for idx in range(num_open + 1):
+        project_folder = os.path.join(folder, f"project_{idx}")
+        os.makedirs(project_folder)
+        paths.append(write_project(project_folder, repeaters))
+    open_paths, new_path = paths[:-1], paths[-1]
+    print(f"{num_open} projects open, adding one more. {repeaters:,} repeater instances each")
+
+    def open_model():
+        """The tree with the other projects in it (and in the cache), expanded"""
+        ProjectCache().invalidate()
+        model = QStandardItemModel()
+        view = QTreeView()
+        view.setModel(model)
+        for path in open_paths:
+            model.appendRow(ProjectCache().get(path).qproject)
+            view.setExpanded(model.index(model.rowCount() - 1, 0), True)
+        return model, view
+
+    model = QStandardItemModel()
+    legacy_secs, legacy_row = timed(lambda: legacy_add(model, open_paths, new_path))
+
+    model, view = open_model()
+    cached_secs, cached_row = timed(lambda: cached_reload_add(model, view, open_paths, new_path))
+    model.clear()
+
+    model, view = open_model()
+    new_secs, new_row = timed(lambda: incremental_add(model, view, new_path))
+    if None in (legacy_row, cached_row, new_row) or model.rowCount() != num_open + 1:
+        raise Exception("The new project didn't end up in the tree")
+
+    print(f"    before 2.0.4 (load + reload every project): {legacy_secs:8.3f}s")
+    print(f"    load + cached reload_tree:                  {cached_secs:8.3f}s  ({legacy_secs / max(cached_secs, 1e-9):.1f}x)")
+    print(f"    load + insert one row:                      {new_secs:8.3f}s  ({legacy_secs / max(new_secs, 1e-9):.1f}x)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--open", type=int, default=5, help="Number of projects already open")
+    parser.add_argument("--repeaters", type=int, default=2000, help="Number of repeated <Realization> elements in each project")
+    parser.add_argument("--eager", action="store_true", help="Build the whole tree up front instead of the lazy (build-on-expand) tree")
+    args = parser.parse_args()
+
+    from qgis.core import QgsApplication
+
+    qgs = QgsApplication([], True)
+    qgs.initQgis()
+
+    from src.classes.settings import Settings
+
+    settings = Settings()
+    lazy_setting = settings.getValue("lazyProjectTree")
+    settings.setValue("lazyProjectTree", not args.eager)
+    folder = tempfile.mkdtemp(prefix="qrave_bench_")
+    try:
+        bench(folder, args.open, args.repeaters)
+    finally:
+        settings.setValue("lazyProjectTree", lazy_setting)
+        shutil.rmtree(folder, ignore_errors=True)
+        qgs.exitQgis()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+bench_http_session.py
+---------------------
+Sends 500 GraphQL-style POSTs one after the other to a local HTTP server and reports
+the latency of each request, the way ``RunGQLQueryTask`` sends queries to the Data
+Exchange API.
+
+Two ways of sending them are timed:
+
+  1. Before 2.0.4: ``requests.post`` for every query, so every query opens (and
+     closes) its own connection.
+  2. Now: ``HttpSession().post``, which keeps the connection open and reuses it.
+
+The server runs in its own process and answers straight away, so all that's measured
+is the client. Setting up a connection to a local server is nearly free, where a real
+one costs a TCP and a TLS handshake (a few round trips). ``--connect-ms`` makes the
+server wait that long before it answers the first request on each new connection to
+stand in for that.
+
+Needs the QGIS Python environment (see DEVELOPER.md), same as the plugin itself.
+
+Usage:
+    python3 scripts/benchmarks/bench_http_session.py
+    python3 scripts/benchmarks/bench_http_session.py --queries 1000 --connect-ms 60
+"""
+
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Import the plugin the same way the tests do
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+QUERY = "query getProject($id: ID!) { project(id: $id) { id name tags projectType { id name } } }"
+
+
+class GraphQLHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Like any real server. Otherwise the body waits on the client's delayed ACK of the headers
+    disable_nagle_algorithm = True
+    connect_delay = 0.0
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        GraphQLHandler.connections += 1
+        self.new_connection = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.new_connection:
+            time.sleep(self.connect_delay)
+            self.new_connection = False
+        body = json.dumps({"data": {"project": {"id": "1234", "name": "Bench", "tags": [], "projectType": {"id": "vbet", "name": "VBET"}}}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        # So the client can count the connections that were opened
+        self.send_header("X-Connections", str(GraphQLHandler.connections))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(connect_ms: int) -> None:
+    """Runs in the server process. Tells the parent which port it got on stdout"""
+    GraphQLHandler.connect_delay = connect_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), GraphQLHandler)
+    server.daemon_threads = True
+    print(server.server_address[1], flush=True)
+    server.serve_forever()
+
+
+def run_queries(post, url: str, queries: int) -> tuple[list[float], int]:
+    """Per-query latencies in milliseconds and how many connections the server has seen so far"""
+    latencies = []
+    connections = 0
+    for idx in range(queries):
+        start = time.perf_counter()
+        response = post(url, json={"query": QUERY, "variables": {"id": str(idx)}}, timeout=30)
+        response.json()
+        latencies.append((time.perf_counter() - start) * 1000)
+        connections = int(response.headers["X-Connections"])
+    return latencies, connections
+
+
+def bench(queries: int, connect_ms: int) -> None:
+    import requests
+
+    from src.classes.http_session import HttpSession
+
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", "--connect-ms", str(connect_ms)], stdout=subprocess.PIPE, text=True)
+    try:
+        port = int(server.stdout.readline())
+        url = f"http://127.0.0.1:{port}/graphql"
+        print(f"{queries:,} sequential queries to {url} ({connect_ms} ms to set up a connection)")
+        print(f"    {'':14s} {'mean':>8s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'total':>9s}  connections")
+        results = {}
+        seen = 0
+        for name, post in [("before 2.0.4", requests.post), ("now", HttpSession().post)]:
+            latencies, connections = run_queries(post, url, queries)
+            connections, seen = connections - seen, connections
+            quantiles = statistics.quantiles(latencies, n=100)
+            results[name] = sum(latencies)
+            print(f"    {name:14s} {statistics.mean(latencies):6.2f}ms {quantiles[49]:6.2f}ms {quantiles[94]:6.2f}ms {quantiles[98]:6.2f}ms {sum(latencies) / 1000:8.2f}s  {connections:,}")
+        print(f"    {results['before 2.0.4'] / max(results['now'], 1e-9):.1f}x faster")
+    finally:
+        HttpSession().close()
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=500, help="Number of queries to send")
+    parser.add_argument("--connect-ms", type=int, default=0, help="Extra time the server takes over each new connection, in ms")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.connect_ms)
+        return
+
+    from qgis.core import QgsApplication
+
+    qgs = QgsApplication([], False)
+    qgs.initQgis()
+    try:
+        bench(args.queries, args.connect_ms)
+    finally:
+        qgs.exitQgis()
+
+
+if __name__ == "__main__":
+    main()
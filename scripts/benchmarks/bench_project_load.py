@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+bench_project_load.py
+---------------------
+Times building the project tree for a synthetic Riverscapes project with lots of
+repeated realizations (5,000 by default), each of which has an input that is a
+``ref="..."`` to a top-level ``<Inputs>`` element.
+
+Two numbers are reported:
+
+  1. Ref resolution only: the pre-2.0.4 approach (string XPath per element plus an
+     ``Inputs/*[@id=...]`` scan per ref) vs. ``xpathone_withref`` with precompiled
+     XPaths and the ``Inputs`` index built at load time.
+  2. A full ``Project.load()`` (business logic lookup, tree build, views) with the
+     tree built up front and with the lazy (build-on-expand) tree.
+
+Needs the QGIS Python environment (see DEVELOPER.md), same as the plugin itself.
+
+Usage:
+    python3 scripts/benchmarks/bench_project_load.py
+    python3 scripts/benchmarks/bench_project_load.py --repeaters 20000
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import lxml.etree
+
+# Import the plugin the same way the tests do
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+PROJECT_TYPE = "BenchType"
+SCHEMA = "https://xml.riverscapes.net/Projects/XSD/V2/RiverscapesProject.xsd"
+XSI = "http://www.w3.org/2001/XMLSchema-instance"
+
+BUSINESS_LOGIC = """<?xml version="1.0" encoding="utf-8"?>
+<Project>
+  <Node label="Benchmark">
+    <Children>
+      <Repeater label="Realizations" xpath="Realizations/Realization">
+        <Node xpathlabel="Name">
+          <Children>
+            <Node label="DEM" xpath="Inputs/Raster" type="raster" />
+            <Node label="Hillshade" xpath="Inputs/Raster[@id='HILLSHADE']" type="raster" />
+            <Node label="Output" xpath="Outputs/Vector" type="line" />
+          </Children>
+        </Node>
+      </Repeater>
+    </Children>
+  </Node>
+  <Views default="Default">
+    <View name="Default" id="Default">
+      <Layers />
+    </View>
+  </Views>
+</Project>
+"""
+
+NODE_XPATHS = ["Inputs/Raster", "Inputs/Raster[@id='HILLSHADE']", "Outputs/Vector"]
+
+
+def write_project(folder: str, repeaters: int) -> str:
+    """Write a synthetic project.rs.xml (and its business logic next to it)"""
+    root = lxml.etree.Element("Project", nsmap={"xsi": XSI})
+    root.set(f"{{{XSI}}}noNamespaceSchemaLocation", SCHEMA)
+    lxml.etree.SubElement(root, "Name").text = "Benchmark Project"
+    lxml.etree.SubElement(root, "ProjectType").text = PROJECT_TYPE
+
+    inputs = lxml.etree.SubElement(root, "Inputs")
+    for idx in range(repeaters):
+        raster = lxml.etree.SubElement(inputs, "Raster", id=f"DEM_{idx}")
+        lxml.etree.SubElement(raster, "Path").text = f"inputs/dem_{idx}.tif"
+    hillshade = lxml.etree.SubElement(inputs, "Raster", id="HILLSHADE")
+    lxml.etree.SubElement(hillshade, "Path").text = "inputs/hillshade.tif"
+
+    realizations = lxml.etree.SubElement(root, "Realizations")
+    for idx in range(repeaters):
+        realization = lxml.etree.SubElement(realizations, "Realization", id=f"REALIZATION{idx}")
+        lxml.etree.SubElement(realization, "Name").text = f"Realization {idx}"
+        r_inputs = lxml.etree.SubElement(realization, "Inputs")
+        lxml.etree.SubElement(r_inputs, "Raster", ref=f"DEM_{idx}")
+        lxml.etree.SubElement(r_inputs, "Raster", ref="HILLSHADE")
+        outputs = lxml.etree.SubElement(realization, "Outputs")
+        vector = lxml.etree.SubElement(outputs, "Vector", id="OUTPUT")
+        lxml.etree.SubElement(vector, "Path").text = f"outputs/output_{idx}.shp"
+
+    project_path = os.path.join(folder, "project.rs.xml")
+    lxml.etree.ElementTree(root).write(project_path, pretty_print=True, xml_declaration=True, encoding="utf-8")
+    with open(os.path.join(folder, f"{PROJECT_TYPE}.xml"), "w", encoding="utf-8") as f:
+        f.write(BUSINESS_LOGIC)
+    return project_path
+
+
+def legacy_xpathone_withref(root_el, el, xpath_str):
+    """The pre-2.0.4 lookup: string XPaths every time and a scan of Inputs/* for every ref"""
+    found = el.xpath(xpath_str)
+    if found is None or len(found) < 1:
+        if "@id=" in xpath_str:
+            ref_found = el.xpath(xpath_str.replace("@id=", "@ref="))
+            if ref_found is not None and len(ref_found) > 0:
+                origin = root_el.xpath(f'Inputs/*[@id="{ref_found[0].attrib["ref"]}"]')
+                return origin[0] if len(origin) > 0 else None
+        return None
+    if "ref" in found[0].attrib:
+        origin = root_el.xpath(f'Inputs/*[@id="{found[0].attrib["ref"]}"]')
+        return origin[0] if len(origin) > 0 else None
+    return found[0]
+
+
+def bench_ref_resolution(project_path: str) -> None:
+    from src.classes.business_logic import build_inputs_index
+    from src.classes.project import xpathone_withref
+
+    root = lxml.etree.parse(project_path).getroot()
+    realizations = root.findall("Realizations/Realization")
+
+    start = time.perf_counter()
+    legacy = [legacy_xpathone_withref(root, el, xpath_str) for el in realizations for xpath_str in NODE_XPATHS]
+    legacy_secs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    inputs_index = build_inputs_index(root)
+    indexed = [xpathone_withref(root, el, xpath_str, inputs_index) for el in realizations for xpath_str in NODE_XPATHS]
+    indexed_secs = time.perf_counter() - start
+
+    if legacy != indexed:
+        raise Exception("Indexed lookup returned different elements than the legacy lookup")
+
+    print(f"Ref resolution ({len(legacy):,} lookups)")
+    print(f"    legacy string xpaths + Inputs scan: {legacy_secs:8.3f}s")
+    print(f"    compiled xpaths + Inputs index:     {indexed_secs:8.3f}s  ({legacy_secs / max(indexed_secs, 1e-9):.1f}x)")
+
+
+def bench_project_load(project_path: str) -> None:
+    from src.classes.project import Project
+    from src.classes.settings import Settings
+
+    settings = Settings()
+    lazy_setting = settings.getValue("lazyProjectTree")
+    try:
+        for lazy in (False, True):
+            settings.setValue("lazyProjectTree", lazy)
+            start = time.perf_counter()
+            project = Project(project_path)
+            project.load()
+            load_secs = time.perf_counter() - start
+
+            if not project.loadable:
+                raise Exception(f"Synthetic project failed to load: {project.load_error}")
+            print(f"Full Project.load() ({'lazy' if lazy else 'eager'} tree): {load_secs:8.3f}s")
+    finally:
+        settings.setValue("lazyProjectTree", lazy_setting)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeaters", type=int, default=5000, help="Number of repeated <Realization> elements")
+    args = parser.parse_args()
+
+    from qgis.core import QgsApplication
+
+    qgs = QgsApplication([], False)
+    qgs.initQgis()
+
+    folder = tempfile.mkdtemp(prefix="qrave_bench_")
+    try:
+        project_path = write_project(folder, args.repeaters)
+        print(f"Synthetic project with {args.repeaters:,} repeater instances: {project_path}")
+        bench_ref_resolution(project_path)
+        bench_project_load(project_path)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+        qgs.exitQgis()
+
+
+if __name__ == "__main__":
+    main()
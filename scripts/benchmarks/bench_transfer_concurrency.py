@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+bench_transfer_concurrency.py
+-----------------------------
+Downloads a batch of files from a local HTTP server that behaves like a slow
+link: every connection is capped (``--per-stream`` KB/s, like per-connection TCP
+limits on a long fat pipe) and so is the link as a whole (``--link`` KB/s).
+
+The same files are fetched with a fixed number of simultaneous downloads (the
+pre-2.0.4 behaviour was 4) and with ``AdaptiveConcurrency`` deciding how many
+run at once, the same way ``DownloadQueue`` and ``UploadQueue`` use it. Aggregate
+throughput and the final number of streams are reported for each.
+
+The sample interval is shortened so the adaptive run settles in a few seconds.
+
+Needs the QGIS Python environment (see DEVELOPER.md), same as the plugin itself.
+
+Usage:
+    python3 scripts/benchmarks/bench_transfer_concurrency.py
+    python3 scripts/benchmarks/bench_transfer_concurrency.py --per-stream 256 --link 4096 --files 60
+"""
+
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+import sys
+import threading
+import time
+from urllib.request import urlopen
+
+# Import the plugin the same way the tests do
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from src.classes.data_exchange.transfer_scheduler import AdaptiveConcurrency
+
+BLOCK = 16 * 1024
+
+
+class LinkThrottle:
+    """Hands out send slots so the whole server never goes faster than ``rate`` bytes/sec"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.next_free = time.monotonic()
+
+    def wait(self, nbytes):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_free)
+            self.next_free = start + nbytes / self.rate
+        if start > now:
+            time.sleep(start - now)
+
+
+def make_handler(file_size, per_stream, link):
+    payload = os.urandom(BLOCK)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", str(file_size))
+            self.end_headers()
+            sent = 0
+            started = time.monotonic()
+            while sent < file_size:
+                nbytes = min(BLOCK, file_size - sent)
+                link.wait(nbytes)
+                self.wfile.write(payload[:nbytes])
+                sent += nbytes
+                # Per-connection cap
+                ahead = sent / per_stream - (time.monotonic() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def download_all(url, n_files, controller):
+    """Download ``n_files`` files, never running more than ``controller.update()`` allows"""
+    cond = threading.Condition()
+    state = {"remaining": n_files, "active": 0, "bytes": 0, "limit": controller.limit, "peak": controller.limit}
+
+    def fetch():
+        with urlopen(url) as resp:
+            while True:
+                chunk = resp.read(BLOCK)
+                if not chunk:
+                    break
+                with cond:
+                    state["bytes"] += len(chunk)
+        with cond:
+            state["active"] -= 1
+            cond.notify_all()
+
+    started = time.monotonic()
+    with cond:
+        while state["remaining"] > 0 or state["active"] > 0:
+            state["limit"] = controller.update(state["bytes"], state["active"])
+            state["peak"] = max(state["peak"], state["limit"])
+            while state["remaining"] > 0 and state["active"] < state["limit"]:
+                state["remaining"] -= 1
+                state["active"] += 1
+                threading.Thread(target=fetch, daemon=True).start()
+            cond.wait(0.05)
+    elapsed = time.monotonic() - started
+    return state["bytes"] / elapsed, elapsed, state["limit"], state["peak"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=40, help="Number of files to download")
+    parser.add_argument("--size", type=int, default=1024, help="File size in KB")
+    parser.add_argument("--per-stream", type=int, default=256, help="Per-connection cap in KB/s")
+    parser.add_argument("--link", type=int, default=2048, help="Whole-link cap in KB/s")
+    parser.add_argument("--fixed", type=int, default=4, help="Streams for the fixed run")
+    parser.add_argument("--max-streams", type=int, default=16, help="Upper limit for the adaptive run")
+    parser.add_argument("--sample", type=float, default=0.5, help="Adaptive sample interval in seconds")
+    args = parser.parse_args()
+
+    link = LinkThrottle(args.link * 1024)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.size * 1024, args.per_stream * 1024, link))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/file.bin"
+
+    print(f"{args.files} x {args.size} KB, {args.per_stream} KB/s per stream, {args.link} KB/s link")
+    runs = [
+        (f"fixed {args.fixed}", AdaptiveConcurrency(args.fixed, args.fixed, sample_interval=args.sample)),
+        (f"adaptive 2-{args.max_streams}", AdaptiveConcurrency(2, args.max_streams, initial=args.fixed, sample_interval=args.sample)),
+    ]
+    for label, controller in runs:
+        rate, elapsed, final, peak = download_all(url, args.files, controller)
+        print(f"  {label:<16} {rate / 1024:8.0f} KB/s  {elapsed:6.2f}s  streams at end {final}, peak {peak}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
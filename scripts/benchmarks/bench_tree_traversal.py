@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+bench_tree_traversal.py
+-----------------------
+Micro-benchmarks for the project tree walks that "Add all layers to map" and reloading
+the tree spend their time in, on synthetic trees of 1k, 10k and 100k items.
+
+The tree looks like a big repeater: a project root with a "Realizations" folder holding
+one folder per realization, each with a few layers and a sub folder of layers.
+
+For each size three things are timed, old vs. new:
+
+  1. Walking every item under the root (``QRAVEDockWidget._get_children``): a list used
+     as a queue (``pop(0)``) vs. ``tree_index.iter_descendants``.
+  2. Working out the group position of every ancestor of every layer, which is what
+     ``QRaveMapLayer._prepare_parent_group`` does for each layer added: a scan of the
+     siblings every time vs. the project's ``TreeIndex``. The old way is quadratic so on
+     big trees it's timed on a sample of layers and scaled up (marked "est.").
+  3. Remembering which folders are expanded before a reload: a recursive walk of every
+     item building "a///b" strings vs. ``tree_index.get_expanded_paths``, with every
+     tenth realization expanded.
+
+Needs the QGIS Python environment (see DEVELOPER.md), same as the plugin itself.
+
+Usage:
+    python3 scripts/benchmarks/bench_tree_traversal.py
+    python3 scripts/benchmarks/bench_tree_traversal.py --sizes 1000 10000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import types
+
+# Import the plugin the same way the tests do
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+# The expanded-state benchmark needs a tree view but not a screen
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+LAYERS_PER_REALIZATION = 4
+SUB_LAYERS = 4
+# Items per realization: the folder, its layers, the sub folder and its layers
+ITEMS_PER_REALIZATION = 1 + LAYERS_PER_REALIZATION + 1 + SUB_LAYERS
+# Largest number of layers to time the quadratic legacy position lookup on
+LEGACY_SAMPLE = 2000
+
+
+def build_tree(num_items: int):
+    """A synthetic project tree with about ``num_items`` items. Returns (root item, project, layer items)"""
+    from qgis.PyQt.QtGui import QStandardItem
+
+    from src.classes.qrave_map_layer import ProjectTreeData, QRaveMapLayer, QRaveTreeTypes
+    from src.classes.tree_index import TreeIndex
+    from src.compat import USER_ROLE
+
+    project = types.SimpleNamespace(tree_index=TreeIndex())
+
+    def folder(label, tree_type=QRaveTreeTypes.PROJECT_FOLDER):
+        item = QStandardItem(label)
+        item.setData(ProjectTreeData(tree_type, project=project), USER_ROLE)
+        return item
+
+    def layer(label, layer_type):
+        map_layer = QRaveMapLayer.__new__(QRaveMapLayer)
+        map_layer.label = label
+        map_layer.layer_type = layer_type
+        item = QStandardItem(label)
+        item.setData(ProjectTreeData(QRaveTreeTypes.LEAF, project=project, data=map_layer), USER_ROLE)
+        return item
+
+    root = folder("Benchmark Project", QRaveTreeTypes.PROJECT_ROOT)
+    realizations = folder("Realizations", QRaveTreeTypes.PROJECT_REPEATER_FOLDER)
+    root.appendRow(realizations)
+    layers = []
+    for r in range(max(1, num_items // ITEMS_PER_REALIZATION)):
+        realization = folder(f"Realization {r}")
+        realizations.appendRow(realization)
+        for idx in range(LAYERS_PER_REALIZATION):
+            item = layer(f"Layer {idx}", "raster" if idx % 2 == 0 else "polygon")
+            realization.appendRow(item)
+            layers.append(item)
+        sub = folder("Intermediates")
+        realization.appendRow(sub)
+        for idx in range(SUB_LAYERS):
+            item = layer(f"Intermediate {idx}", "line")
+            sub.appendRow(item)
+            layers.append(item)
+    return root, project, layers
+
+
+def legacy_get_children(root_item):
+    stack = [root_item]
+    while stack:
+        parent = stack.pop(0)
+        for row in range(parent.rowCount()):
+            for column in range(parent.columnCount()):
+                child = parent.child(row, column)
+                yield child
+                if child.hasChildren():
+                    stack.append(child)
+
+
+def legacy_getlayerposition(item):
+    from src.classes.qrave_map_layer import QRaveMapLayer, QRaveTreeTypes
+    from src.compat import USER_ROLE
+
+    name = item.text()
+    order = [name]
+    absolute_position = 0
+    parent = item.parent()
+    if parent is not None:
+        child_idx = 0
+        child = parent.child(child_idx)
+        child_data = child.data(USER_ROLE)
+        while child_data is not None:
+            if child.text() == name:
+                return absolute_position, order
+            if isinstance(child_data.data, QRaveMapLayer):
+                if child_data.data.layer_type in ["line", "point", "polygon", "raster"]:
+                    absolute_position += 1
+            elif child_data.type == QRaveTreeTypes.PROJECT_FOLDER:
+                absolute_position += 1
+            order.append(child.text())
+            child_idx += 1
+            child = parent.child(child_idx)
+            child_data = child.data(USER_ROLE) if child is not None else None
+    return absolute_position, order
+
+
+def legacy_get_expanded_paths(tree_view, model, idx, parent_path=""):
+    paths = set()
+    if tree_view.isExpanded(idx):
+        paths.add(parent_path)
+    for idy in range(model.rowCount(idx)):
+        child_idx = model.index(idy, 0, idx)
+        item = model.itemFromIndex(child_idx)
+        if item:
+            item_name = item.text()
+            child_path = f"{parent_path}///{item_name}" if parent_path else item_name
+            paths.update(legacy_get_expanded_paths(tree_view, model, child_idx, child_path))
+    return paths
+
+
+def ancestors(item):
+    parent = item.parent()
+    while parent is not None:
+        yield parent
+        parent = parent.parent()
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def report(label, legacy_secs, new_secs, estimated=False):
+    est = " (est.)" if estimated else ""
+    print(f"    {label}")
+    print(f"        legacy: {legacy_secs:9.4f}s{est}")
+    print(f"        new:    {new_secs:9.4f}s  ({legacy_secs / max(new_secs, 1e-9):.1f}x)")
+
+
+def bench_size(num_items: int) -> None:
+    from qgis.PyQt.QtGui import QStandardItemModel
+    from qgis.PyQt.QtWidgets import QTreeView
+
+    from src.classes.qrave_map_layer import QRaveMapLayer
+    from src.classes.tree_index import get_expanded_paths, iter_descendants
+
+    root, project, layers = build_tree(num_items)
+    total = sum(1 for _ in iter_descendants(root)) + 1
+    print(f"{total:,} items, {len(layers):,} layers")
+
+    # 1. Walking the tree
+    legacy_secs, legacy_items = timed(lambda: sum(1 for _ in legacy_get_children(root)))
+    new_secs, new_items = timed(lambda: sum(1 for _ in iter_descendants(root)))
+    if legacy_items != new_items:
+        raise Exception("iter_descendants visited a different number of items")
+    report("Walk every item", legacy_secs, new_secs)
+
+    # 2. Group positions for every ancestor of every layer
+    sample = layers if len(layers) <= LEGACY_SAMPLE else random.Random(0).sample(layers, LEGACY_SAMPLE)
+    legacy_secs, legacy_positions = timed(lambda: [legacy_getlayerposition(parent) for lyr in sample for parent in ancestors(lyr)])
+    legacy_secs *= len(layers) / len(sample)
+    project.tree_index.invalidate()
+    new_secs, _ = timed(lambda: [QRaveMapLayer._getlayerposition(parent) for lyr in layers for parent in ancestors(lyr)])
+    new_positions = [QRaveMapLayer._getlayerposition(parent) for lyr in sample for parent in ancestors(lyr)]
+    if [(pos, list(order)) for pos, order in new_positions] != legacy_positions:
+        raise Exception("TreeIndex positions differ from the legacy positions")
+    report("Group positions for every layer added", legacy_secs, new_secs, estimated=len(sample) < len(layers))
+
+    # 3. Expanded state before a reload
+    model = QStandardItemModel()
+    model.appendRow(root)
+    view = QTreeView()
+    view.setModel(model)
+    root_idx = model.indexFromItem(root)
+    view.setExpanded(root_idx, True)
+    realizations_idx = model.index(0, 0, root_idx)
+    view.setExpanded(realizations_idx, True)
+    for row in range(0, model.rowCount(realizations_idx), 10):
+        view.setExpanded(model.index(row, 0, realizations_idx), True)
+    legacy_secs, legacy_paths = timed(lambda: legacy_get_expanded_paths(view, model, root_idx))
+    new_secs, new_paths = timed(lambda: get_expanded_paths(view, model, root_idx))
+    if len(legacy_paths) != len(new_paths):
+        raise Exception("get_expanded_paths found a different number of expanded items")
+    report(f"Remember {len(new_paths):,} expanded folders", legacy_secs, new_secs)
+    model.takeRow(0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Tree sizes (number of items)")
+    args = parser.parse_args()
+
+    from qgis.core import QgsApplication
+
+    qgs = QgsApplication([], True)
+    qgs.initQgis()
+    try:
+        for size in args.sizes:
+            bench_size(size)
+    finally:
+        qgs.exitQgis()
+
+
+if __name__ == "__main__":
+    main()
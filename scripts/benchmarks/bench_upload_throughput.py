@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+bench_upload_throughput.py
+--------------------------
+Uploads one big file (2 GB by default) to a local HTTP server that accepts PUTs and
+throws the body away, so the only limit is how fast the plugin can hand the bytes to
+Qt. The server runs in its own process so the CPU time reported is just the upload's.
+
+Two upload bodies are timed, both with ``UploadMultiPartFileTask`` uploading the same
+number of parts at once:
+
+  1. Before 2.0.4: ``PartialFile.readData`` reads each piece Qt asks for through
+     ``QFile``, takes it from the rate limiter and calls the progress callback, which
+     calls ``UploadQueue.get_overall_status``.
+  2. Now: the part is memory-mapped, ``readData`` only counts the bytes and the task
+     adds up the progress on a timer.
+
+The file is sparse so the disk isn't what's being measured.
+
+Needs the QGIS Python environment (see DEVELOPER.md), same as the plugin itself.
+
+Usage:
+    python3 scripts/benchmarks/bench_upload_throughput.py
+    python3 scripts/benchmarks/bench_upload_throughput.py --size 4096 --parts-in-flight 2
+"""
+
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Import the plugin the same way the tests do
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+MB = pow(1024, 2)
+
+
+class PutHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_PUT(self):
+        remaining = int(self.headers.get("Content-Length", 0))
+        while remaining > 0:
+            block = self.rfile.read(min(MB, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.send_header("ETag", '"bench"')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def serve() -> None:
+    """Runs in the server process. Tells the parent which port it got on stdout"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PutHandler)
+    print(server.server_address[1], flush=True)
+    server.serve_forever()
+
+
+def make_legacy_partial_file():
+    """``PartialFile`` as it was before 2.0.4"""
+    from qgis.PyQt.QtCore import QByteArray, QFile
+
+    class LegacyPartialFile(QFile):
+        # Set by run_upload: what _progress_callback used to do for every read
+        progress_callback = None
+
+        def __init__(self, filepath, start, end, log_callback=None, rate_limiter=None, should_stop=None):
+            super().__init__(filepath)
+            self.rate_limiter = rate_limiter
+            self.should_stop = should_stop
+            self.start = start
+            self.end = end
+            self.current_pos = start
+            # The task looks for these. Left at 0: the old progress callback below does the counting
+            self.bytes_read = 0
+            self.unmetered = 0
+
+        def open(self, mode):
+            fileopen = super().open(mode)
+            self.seek(self.start)
+            return fileopen
+
+        def readData(self, maxlen):
+            actual_len = maxlen
+            if self.current_pos + maxlen > self.end:
+                actual_len = self.end - self.current_pos
+            if actual_len <= 0:
+                return QByteArray()
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(actual_len, self.should_stop)
+            self.current_pos += actual_len
+            LegacyPartialFile.progress_callback(actual_len)
+            return super().readData(actual_len)
+
+    return LegacyPartialFile
+
+
+def run_upload(file_path: str, port: int, parts_in_flight: int, legacy: bool) -> tuple[float, float, int]:
+    """Returns wall seconds, CPU seconds and the number of times the queue was asked for its status"""
+    from src.classes.data_exchange import uploader
+    from src.classes.data_exchange.uploader import UploadMultiPartFileTask, UploadQueue
+    from src.classes.util import MULTIPART_CHUNK_SIZE
+
+    size = os.path.getsize(file_path)
+    urls = [f"http://127.0.0.1:{port}/dem.tif?partNumber={idx + 1}" for idx in range(math.ceil(size / MULTIPART_CHUNK_SIZE))]
+    queue = UploadQueue()
+    status_calls = 0
+
+    def get_overall_status():
+        nonlocal status_calls
+        status_calls += 1
+        queue.get_overall_status()
+
+    task = UploadMultiPartFileTask("dem.tif", file_path, urls, get_overall_status, parts_in_flight=parts_in_flight)
+    queue.active_tasks.append(task)
+
+    partial_file_class = uploader.PartialFile
+    if legacy:
+        legacy_class = make_legacy_partial_file()
+
+        def legacy_progress(bytes_sent):
+            # The old _progress_callback
+            task.uploaded_size += bytes_sent
+            get_overall_status()
+
+        legacy_class.progress_callback = legacy_progress
+        uploader.PartialFile = legacy_class
+    try:
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        if not task.run():
+            raise Exception(f"Upload failed: {task.error}")
+        return time.perf_counter() - wall_start, time.process_time() - cpu_start, status_calls
+    finally:
+        uploader.PartialFile = partial_file_class
+
+
+def bench(folder: str, size_mb: int, parts_in_flight: int) -> None:
+    file_path = os.path.join(folder, "dem.tif")
+    with open(file_path, "wb") as f:
+        f.truncate(size_mb * MB)
+
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve"], stdout=subprocess.PIPE, text=True)
+    try:
+        port = int(server.stdout.readline())
+        print(f"Uploading {size_mb:,} MB with {parts_in_flight} parts at once to 127.0.0.1:{port}")
+        results = {}
+        for name, legacy in [("before 2.0.4", True), ("now", False)]:
+            wall, cpu, status_calls = run_upload(file_path, port, parts_in_flight, legacy)
+            results[name] = (wall, cpu)
+            print(f"    {name:14s} {size_mb / wall:8.1f} MB/s   CPU {cpu:6.2f}s ({cpu / (size_mb / 1024):5.2f}s per GB)   status updates: {status_calls:,}")
+        (old_wall, old_cpu), (new_wall, new_cpu) = results["before 2.0.4"], results["now"]
+        print(f"    {old_wall / max(new_wall, 1e-9):.1f}x the throughput using {old_cpu / max(new_cpu, 1e-9):.1f}x less CPU")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=2048, help="File size in MB")
+    parser.add_argument("--parts-in-flight", type=int, default=4, help="Parts uploaded at once")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve()
+        return
+
+    from qgis.core import QgsApplication
+
+    qgs = QgsApplication([], False)
+    qgs.initQgis()
+
+    folder = tempfile.mkdtemp(prefix="qrave_bench_")
+    try:
+        bench(folder, args.size, args.parts_in_flight)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+        qgs.exitQgis()
+
+
+if __name__ == "__main__":
+    main()
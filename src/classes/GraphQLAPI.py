@@ -16,9 +16,9 @@ from urllib.parse import urlencode, urlparse, urlunparse
 from qgis.core import Qgis, QgsApplication, QgsMessageLog, QgsTask
 from qgis.PyQt.QtCore import QObject, QUrl, QUrlQuery, pyqtSignal
 from qgis.PyQt.QtGui import QDesktopServices
-import requests
 
 from ..compat import QGSTASK_CAN_CANCEL, QGSTASK_SILENT
+from .http_session import HttpSession
 from .settings import CONSTANTS
 
 # Disable all the weird terminal noise from urllib3
@@ -83,7 +83,7 @@ class RunGQLQueryTask(QgsTask):
         try:
             headers = {"authorization": "Bearer " + self.api.access_token} if self.api.access_token else {}
 
-            request = requests.post(self.api.uri, json={"query": self.query, "variables": self.variables}, headers=headers, timeout=30)
+            request = HttpSession().post(self.api.uri, json={"query": self.query, "variables": self.variables}, headers=headers, timeout=30)
 
             if request.status_code == 200:
                 resp_json = request.json()
@@ -144,7 +144,7 @@ class FetchJsonTask(QgsTask):
 
     def run(self) -> bool:
         try:
-            response = requests.get(self.url, timeout=10)
+            response = HttpSession().get(self.url, timeout=10)
             if response.status_code == 200:
                 self.result = response.json()
                 self.success = True
@@ -377,7 +377,7 @@ class GraphQLAPI(QObject):
                 "redirect_uri": redirect_url,
             }
 
-            response = requests.post(authentication_url, headers={"content-type": "application/x-www-form-urlencoded"}, data=data, timeout=60)
+            response = HttpSession().post(authentication_url, headers={"content-type": "application/x-www-form-urlencoded"}, data=data, timeout=60)
             response.raise_for_status()
             res = response.json()
 
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+from functools import lru_cache
+import os
+import threading
+from typing import ClassVar
+
+import lxml.etree
+
+from .borg import Borg
+
+
+class BusinessLogicNode:
+    """A precompiled ``<Node>`` or ``<Repeater>`` element from a business logic file.
+
+    Everything ``Project._recurse_tree`` needs is pulled out of the XML once so that
+    building the tree for many projects of the same type never touches the business
+    logic XML (or recompiles its XPaths) again.
+    """
+
+    NODE = "Node"
+    REPEATER = "Repeater"
+
+    def __init__(self, el: lxml.etree._Element) -> None:
+        self.tag = el.tag
+        self.sourceline = el.sourceline
+        self.attrib: dict[str, str] = dict(el.attrib)
+
+        self.label = self.attrib.get("label")
+        self.leaf_type = self.attrib.get("type")
+        self.symbology = self.attrib.get("symbology")
+
+        # An empty string is meaningful here: it's a business logic error we report at build time
+        self.xpath_str = self.attrib.get("xpath")
+        self.xpathlabel_str = self.attrib.get("xpathlabel")
+        self.xpath = compile_xpath(self.xpath_str)
+        self.xpathlabel = compile_xpath(self.xpathlabel_str)
+
+        # Branch nodes have a <Children> container. Repeaters have a single <Node> template instead
+        self.children: list[BusinessLogicNode] | None = None
+        self.children_attrib: dict[str, str] = {}
+        self.repeat_node: BusinessLogicNode | None = None
+
+        if self.tag == BusinessLogicNode.REPEATER:
+            repeat_el = el.find("Node")
+            self.repeat_node = BusinessLogicNode(repeat_el) if repeat_el is not None else None
+        else:
+            children_container = el.find("Children")
+            if children_container is not None:
+                self.children_attrib = dict(children_container.attrib)
+                self.children = [BusinessLogicNode(child) for child in children_container.iterchildren(BusinessLogicNode.NODE, BusinessLogicNode.REPEATER)]
+
+        # Every leaf id at or below this node. Lets a lazily built tree skip subtrees a view can't use
+        layer_ids: set[str] = set()
+        if self.repeat_node is not None:
+            layer_ids |= self.repeat_node.layer_ids
+        elif self.children is not None:
+            for child in self.children:
+                layer_ids |= child.layer_ids
+        elif "id" in self.attrib:
+            layer_ids.add(self.attrib["id"])
+        self.layer_ids: frozenset[str] = frozenset(layer_ids)
+
+    @property
+    def is_branch(self) -> bool:
+        return self.children is not None
+
+
+class CompiledBusinessLogic:
+    """One parsed and precompiled business logic file. Shared (read-only) by every project that uses it"""
+
+    def __init__(self, path: str, mtime_ns: int, size: int, root: lxml.etree._Element) -> None:
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.root = root
+
+        root_el = root.find("Node")
+        self.root_node = BusinessLogicNode(root_el) if root_el is not None else None
+
+
+class BusinessLogicRegistryBorg(Borg):
+    """Shared-state base class so every registry instance sees the same compiled files"""
+
+    _shared_state: ClassVar[dict] = {}  # own dict — separate from Borg._shared_state
+
+
+class BusinessLogicRegistry(BusinessLogicRegistryBorg):
+    """Process-wide registry of compiled business logic files keyed on resolved path.
+
+    Ten open projects that all resolve to ``VBET.xml`` cost one parse and one compile.
+    An entry is only reused while the file's mtime and size are unchanged so edits to a
+    local business logic file are picked up on the next load.
+    """
+
+    def __init__(self):
+        BusinessLogicRegistryBorg.__init__(self)
+        if "entries" not in self.__dict__:
+            self.entries: dict[str, CompiledBusinessLogic] = {}
+            self.lock = threading.Lock()
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.normcase(os.path.realpath(path))
+
+    def get(self, path: str) -> CompiledBusinessLogic:
+        """Return the compiled business logic for a file, parsing it only if we haven't seen this version before
+
+        Args:
+            path (str): path to the business logic XML file
+
+        Raises:
+            Exception: If the file cannot be parsed
+
+        Returns:
+            CompiledBusinessLogic: the shared, read-only compiled business logic
+        """
+        key = self._key(path)
+        stat = os.stat(path)
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                return entry
+
+            try:
+                root = lxml.etree.parse(path).getroot()
+            except TypeError as e:
+                raise Exception(f"Error parsing business logic file: {path}, {e}")
+            except lxml.etree.XMLSyntaxError as e:
+                raise Exception(f"XML Syntax error while parsing file: {path}, {e}")
+            except Exception as e:
+                raise Exception(f"Unknown XML File error: {path}, {e}")
+
+            entry = CompiledBusinessLogic(path, stat.st_mtime_ns, stat.st_size, root)
+            self.entries[key] = entry
+            return entry
+
+    def invalidate(self, paths: list[str] | None = None) -> None:
+        """Drop specific business logic files (or everything when no paths are given)
+
+        Args:
+            paths (list[str], optional): Files that changed on disk. Defaults to None.
+        """
+        with self.lock:
+            if paths is None:
+                self.entries = {}
+                return
+            for path in paths:
+                self.entries.pop(self._key(path), None)
+
+
+@lru_cache(maxsize=4096)
+def compile_xpath(xpath_str: str | None) -> lxml.etree.XPath | None:
+    """Compile an XPath string once and hand back the same evaluator every time after that.
+
+    Returns None for missing/empty strings or bad syntax. A bad XPath only breaks the
+    node that uses it, never the whole business logic file. Callers check the original
+    string to tell "no xpath" apart from "invalid xpath".
+    """
+    if not xpath_str:
+        return None
+    try:
+        return lxml.etree.XPath(xpath_str)
+    except lxml.etree.XPathSyntaxError:
+        return None
+
+
+def build_inputs_index(root_el: lxml.etree._Element) -> dict[str, lxml.etree._Element]:
+    """Map every ``id`` under the project's top-level ``<Inputs>`` to its element.
+
+    This is what ``ref="..."`` attributes point at. Building it once per project load turns
+    every ref lookup into a dict lookup instead of a scan of ``Inputs/*``. When an id is
+    duplicated the first one in document order wins, same as ``Inputs/*[@id="..."][1]``.
+    """
+    index: dict[str, lxml.etree._Element] = {}
+    for input_el in root_el.iterfind("Inputs/*"):
+        input_id = input_el.get("id")
+        if input_id is not None and input_id not in index:
+            index[input_id] = input_el
+    return index
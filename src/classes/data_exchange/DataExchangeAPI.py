@@ -1,19 +1,26 @@
 from __future__ import annotations
 
+import base64
 from collections import OrderedDict, namedtuple
+import copy
 from dataclasses import asdict, dataclass
+import hashlib
+import json
 import math
 import os
 import re
 from typing import Callable
 
-from qgis.core import Qgis
-from qgis.PyQt.QtCore import QObject, pyqtSignal
-import requests
-from rsxml.etag import calculate_etag
+from qgis.core import Qgis, QgsTask
+from qgis.PyQt.QtCore import QObject, QTimer, pyqtSignal
 
+from ...compat import QGSTASK_CAN_CANCEL, QGSTASK_SILENT
 from ..GraphQLAPI import GraphQLAPI, GraphQLAPIConfig, RefreshTokenTask, RunGQLQueryTask
+from ..hash_cache import HashCache
+from ..http_session import HttpSession
 from ..settings import CONSTANTS, Settings
+from .etag import EtagCancelledError, ParallelEtagCalculator
+from .query_cache import CachedQueryResult, QueryCache
 
 FILE_EXCLUDE_RE = [
     r"^\.git",
@@ -25,6 +32,8 @@ FILE_EXCLUDE_RE = [
     r".*\.gpkg-[a-z]+$",
     # Any file called 'RiverscapesViewer*.log'
     r"^RiverscapesViewer.*\.log$",
+    # The upload journal (see upload_journal.py)
+    r"^RiverscapesViewer.*\.journal\.json(\.tmp)?$",
     # Ignore Desktop.ini files
     r"^Desktop\.ini$",
 ]
@@ -140,27 +149,51 @@ class UploadFileList:
                 # Since there is nothing to compare against and we can skip that constly step entirely
                 self.add_file(rel_path, file_size, etag="XXXXXXXXXXXXXXXXXXXXXX")
 
-    def calculate_etags(self, project_dir: str, existing_files: dict[str, str] | None = None) -> None:
-        """Calculate the etags for all files in the upload digest
+    def get_etag_jobs(self, project_dir: str, existing_files: dict[str, str] | None = None) -> dict[str, tuple[str, bool]]:
+        """Work out which files need an etag and how it should be calculated
+
+        We only compute the local etag if there is a remote file to compare with. This should
+        save a lot of time when uploading new files.
 
         Args:
             project_dir (str): _description_
             existing_files (Dict[str, str], optional): Dictionary of existing files in the data exchange and their etags. Defaults to None.
+
+        Returns:
+            dict[str, tuple[str, bool]]: rel_path -> (absolute path, force_single_part)
         """
+        jobs = {}
+        if not existing_files:
+            return jobs
         for file in self.files.values():
-            abs_path = os.path.join(project_dir, file.rel_path)
-
-            is_single_part = False
-            if existing_files and file.rel_path in existing_files:
-                existing_etag = existing_files[file.rel_path]
+            if file.rel_path in existing_files:
                 # If the existing etag has a dash, it is multipart, so we should NOT force single part.
-                is_single_part = not re.match(r".*-[0-9]+$", existing_etag)
-                # We only compute the local etag if there is a remote file to compare with. This should
-                # Save a lot of time when uploading new files.
-                self.log("Calculating etag for file: " + file.rel_path, Qgis.Info)
-                etag_obj = calculate_etag(abs_path, force_single_part=is_single_part)
-                self.log(f"Calculated etag: {etag_obj} (single part: {is_single_part})", Qgis.Info)
-                file.etag = etag_obj
+                is_single_part = not re.match(r".*-[0-9]+$", existing_files[file.rel_path])
+                jobs[file.rel_path] = (os.path.join(project_dir, file.rel_path), is_single_part)
+        return jobs
+
+    def set_etags(self, etags: dict[str, str]) -> None:
+        for rel_path, etag in etags.items():
+            if rel_path in self.files:
+                self.files[rel_path].etag = etag
+
+    def calculate_etags(self, project_dir: str, existing_files: dict[str, str] | None = None) -> None:
+        """Calculate the etags for all files in the upload digest. Blocks until every file is hashed.
+        Use CalculateEtagsTask to do this in the background.
+
+        Args:
+            project_dir (str): _description_
+            existing_files (Dict[str, str], optional): Dictionary of existing files in the data exchange and their etags. Defaults to None.
+        """
+        jobs = self.get_etag_jobs(project_dir, existing_files)
+        if len(jobs) == 0:
+            return
+        self.log(f"Calculating etags for {len(jobs):,} files", Qgis.Info)
+        calculator = ParallelEtagCalculator(hash_cache=HashCache(), verify=bool(self.settings.getValue("verifyFileHashes")))
+        self.set_etags(calculator.calculate(jobs))
+        self.log(f"  - {len(calculator.cached):,} of {len(jobs):,} etags came from the hash cache", Qgis.Info)
+        for rel_path in calculator.mismatched:
+            self.log(f"  - Cached etag was wrong for {rel_path}. The hash cache has been updated", Qgis.Warning)
 
     def get_rel_paths(self, filter_to: list[UploadFile.FileOp] | None = None) -> list[str]:
         if filter_to and len(filter_to) > 0:
@@ -174,6 +207,56 @@ class UploadFileList:
         return [file.size for file in self.files.values()]
 
 
+class CalculateEtagsTask(QgsTask):
+    """Hash local files in the background (see ParallelEtagCalculator).
+
+    The *callback* is invoked on the main thread inside ``finished()`` with the task
+    itself so callers can inspect ``task.success``, ``task.etags`` and ``task.error``.
+    Progress is reported through the usual ``progressChanged`` signal and
+    ``bytes_done`` / ``bytes_total``.
+    """
+
+    def __init__(self, jobs: dict[str, tuple[str, bool]], callback: Callable[[CalculateEtagsTask], None]) -> None:
+        super().__init__("CalculateEtagsTask", QGSTASK_CAN_CANCEL | QGSTASK_SILENT)
+        self.jobs = jobs
+        self._callback = callback
+        # Settings are read here on the main thread, not in run()
+        self.calculator = ParallelEtagCalculator(hash_cache=HashCache(), verify=bool(Settings().getValue("verifyFileHashes")))
+        self.etags: dict[str, str] = {}
+        self.error: Exception | None = None
+        self.success = False
+        self.bytes_done = 0
+        self.bytes_total = 0
+        self._last_progress = -1
+
+    def run(self) -> bool:
+        try:
+            self.etags = self.calculator.calculate(self.jobs, self._handle_progress)
+            self.success = True
+            return True
+        except EtagCancelledError:
+            return False
+        except Exception as e:
+            self.error = e
+            return False
+
+    def _handle_progress(self, bytes_done: int, bytes_total: int) -> None:
+        self.bytes_done = bytes_done
+        self.bytes_total = bytes_total
+        # Only emit when the whole-number percentage moves so we don't flood the UI thread
+        progress = int(100 * bytes_done / bytes_total) if bytes_total > 0 else 100
+        if progress != self._last_progress:
+            self._last_progress = progress
+            self.setProgress(progress)
+
+    def cancel(self) -> None:
+        self.calculator.cancel()
+        super().cancel()
+
+    def finished(self, result: bool) -> None:
+        self._callback(self)
+
+
 class MyOrg(namedtuple("MyOrg", ["id", "name", "myRole"])):
     pass
 
@@ -197,6 +280,8 @@ class OwnerInputTuple:
 
 # BASE is the name we want to use inside the settings keys
 MESSAGE_CATEGORY = CONSTANTS["logCategory"]
+# Layers asked for in one getLayerTiles request
+LAYER_TILES_BATCH_SIZE = 50
 
 
 class DataExchangeAPI(QObject):
@@ -215,6 +300,10 @@ class DataExchangeAPI(QObject):
         self.myOrgs = []
         self.initialized = False
         self.on_login = on_login
+        # Cache keys with a background refresh already running
+        self._revalidating: set[str] = set()
+        # Cache key -> callbacks waiting on a query that's running now
+        self._in_flight: dict[str, list[Callable[[RunGQLQueryTask], None]]] = {}
         self.api = GraphQLAPI(apiUrl=CONSTANTS["DE_API_URL"], config=GraphQLAPIConfig(**CONSTANTS["DE_API_AUTH"]))
         # Tie the state change signal to the state change handler inside self.api
         self.api.stateChange.connect(self.stateChange.emit)
@@ -251,6 +340,98 @@ class DataExchangeAPI(QObject):
         with open(os.path.join(os.path.dirname(__file__), "graphql", f"{query_name}.graphql")) as f:
             return f.read()
 
+    def _selection_set(self, query_name: str) -> str:
+        """The fields a query asks for on its root field, e.g. ``localPath etag size`` for downloadFile
+
+        Aliased batches of a query ask for these so they get back exactly what the query itself does.
+        """
+        query = self._load_query(query_name)
+        # The first brace opens the operation, the next one the root field's selection set
+        start = query.index("{", query.index("{") + 1)
+        depth = 0
+        for pos in range(start, len(query)):
+            if query[pos] == "{":
+                depth += 1
+            elif query[pos] == "}":
+                depth -= 1
+                if depth == 0:
+                    return " ".join(query[start + 1 : pos].split())
+        raise ValueError(f"Unbalanced braces in {query_name}.graphql")
+
+    def _cache_scope(self) -> str:
+        """Whose cached responses to use: the API plus the user the access token was issued to"""
+        token = self.api.access_token
+        if not token:
+            return f"{self.api.uri}|anonymous"
+        try:
+            # The subject claim of the JWT. The signature doesn't matter here, the API checks that
+            payload = token.split(".")[1]
+            user = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))["sub"]
+        except (IndexError, KeyError, TypeError, ValueError):
+            user = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        return f"{self.api.uri}|{user}"
+
+    def _cached_response(self, query_name: str, query: str, variables: dict, project_id: str | None = None, use_cache: bool = True) -> dict | None:
+        """A response from the QueryCache, kicking off a background refresh if it's stale. None if the API has to be asked"""
+        if not use_cache:
+            return None
+        scope = self._cache_scope()
+        cached = QueryCache().lookup(scope, query_name, variables)
+        if cached is None:
+            return None
+        if not cached.fresh:
+            key = QueryCache.key(scope, query_name, variables)
+            if key not in self._revalidating:
+                self._revalidating.add(key)
+
+                def _revalidated(task: RunGQLQueryTask):
+                    self._revalidating.discard(key)
+                    self._store_response(task, scope, query_name, project_id)
+
+                self.api.run_query(query, variables, _revalidated)
+        return cached.response
+
+    def _store_response(self, task: RunGQLQueryTask, scope: str, query_name: str, project_id: str | None) -> None:
+        if task.success and task.response and not task.response.get("errors"):
+            QueryCache().store(scope, query_name, task.variables, task.response, project_id)
+
+    def _run_cached_query(self, query_name: str, variables: dict, callback: Callable[[RunGQLQueryTask], None], project_id: str | None = None, use_cache: bool = True) -> RunGQLQueryTask | CachedQueryResult | None:
+        """``api.run_query`` for read-only queries, answered from the QueryCache when it can be.
+
+        Cached answers still reach the callback asynchronously (on the next turn of the event
+        loop) so callers can't tell the difference. The callback gets a ``CachedQueryResult``
+        instead of the task.
+
+        Asking for something that's already being fetched doesn't send the query again. The
+        callback waits for the running query and gets its own copy of the answer.
+        Returns None in that case.
+        """
+        query = self._load_query(query_name)
+        response = self._cached_response(query_name, query, variables, project_id, use_cache)
+        if response is not None:
+            result = CachedQueryResult(query, variables, response)
+            QTimer.singleShot(0, lambda: callback(result))
+            return result
+
+        scope = self._cache_scope()
+        key = QueryCache.key(scope, query_name, variables)
+        if key in self._in_flight:
+            self._in_flight[key].append(callback)
+            return None
+        self._in_flight[key] = [callback]
+
+        def _store_and_callback(task: RunGQLQueryTask):
+            callbacks = self._in_flight.pop(key, [callback])
+            # Before the callbacks get a chance to change the response
+            self._store_response(task, scope, query_name, project_id)
+            # The first caller gets the task, everyone else a copy since callers are free to change what they're given
+            shared = [CachedQueryResult(task.query, task.variables, copy.deepcopy(task.response), task.error, task.success) for _callback in callbacks[1:]]
+            callbacks[0](task)
+            for waiting_callback, result in zip(callbacks[1:], shared):
+                waiting_callback(result)
+
+        return self.api.run_query(query, variables, _store_and_callback)
+
     def get_user_info(self, callback: Callable[[RunGQLQueryTask, DEProfile], None]):
         """Get the organizations that the user is a part of"""
 
@@ -266,13 +447,14 @@ class DataExchangeAPI(QObject):
             return callback(task, profile)
 
         # Returns a RunGQLQueryTask(QgsTask) object in case you want to handle or manage it
-        return self.api.run_query(self._load_query("getProfile"), {}, _parse_orgs)
+        return self._run_cached_query("getProfile", {}, _parse_orgs)
 
-    def get_project(self, project_id: str, callback: Callable[[RunGQLQueryTask, DEProject], None]):
+    def get_project(self, project_id: str, callback: Callable[[RunGQLQueryTask, DEProject], None], use_cache: bool = True):
         """Get the metadata for a project
 
         Args:
             project_id (str): the id of the project to get
+            use_cache (bool): False to always ask the API, e.g. when the answer decides what gets uploaded
         """
         limit = 500
         query = self._load_query("getProject")
@@ -291,10 +473,15 @@ class DataExchangeAPI(QObject):
                     num_pages = math.ceil(total / limit)
                     for page in range(1, num_pages):
                         page_offset = page * limit
-                        page_task = RunGQLQueryTask(self.api, query, {"id": project_id, "fileLimit": limit, "fileOffset": page_offset})
-                        page_task.run()
-                        if page_task.response and not page_task.error:
-                            page_items = page_task.response["data"]["project"].get("projectFiles", {}).get("items", [])
+                        page_variables = {"id": project_id, "fileLimit": limit, "fileOffset": page_offset}
+                        page_response = self._cached_response("getProject", query, page_variables, project_id, use_cache)
+                        if page_response is None:
+                            page_task = RunGQLQueryTask(self.api, query, page_variables)
+                            page_task.run()
+                            self._store_response(page_task, self._cache_scope(), "getProject", project_id)
+                            page_response = page_task.response if not page_task.error else None
+                        if page_response:
+                            page_items = page_response["data"]["project"].get("projectFiles", {}).get("items", [])
                             items.extend(page_items)
 
                 # Replace paginated files structure with flat list for DEProject
@@ -305,7 +492,7 @@ class DataExchangeAPI(QObject):
 
             return callback(task, project)
 
-        return self.api.run_query(query, {"id": project_id, "fileLimit": limit, "fileOffset": 0}, _parse_project)
+        return self._run_cached_query("getProject", {"id": project_id, "fileLimit": limit, "fileOffset": 0}, _parse_project, project_id, use_cache)
 
     def get_dataset_metadata(self, project_id: str, limit: int, offset: int, callback: Callable[[RunGQLQueryTask, dict], None]):
         """Get the metadata and descriptions for datasets"""
@@ -317,7 +504,7 @@ class DataExchangeAPI(QObject):
 
             return callback(task, ret_obj)
 
-        return self.api.run_query(self._load_query("webRaveDatasetMetadata"), {"projectId": project_id, "dsLimit": limit, "dsOffset": offset}, _parse_dataset_metadata)
+        return self._run_cached_query("webRaveDatasetMetadata", {"projectId": project_id, "dsLimit": limit, "dsOffset": offset}, _parse_dataset_metadata, project_id)
 
     def get_remote_project(self, project_id: str, callback: Callable[[RunGQLQueryTask, dict], None]):
         """Get the tree and metadata for a remote project
@@ -330,7 +517,7 @@ class DataExchangeAPI(QObject):
             # We just return the raw response for now and let the RemoteProject handle it
             return callback(task, task.response)
 
-        return self.api.run_query(self._load_query("webRaveProject"), {"id": project_id, "dsLimit": 50, "dsOffset": 0}, _parse_remote_project)
+        return self._run_cached_query("webRaveProject", {"id": project_id, "dsLimit": 50, "dsOffset": 0}, _parse_remote_project, project_id)
 
     def validate_project(self, xml_str: str, owner_obj: OwnerInputTuple, files: UploadFileList, callback: Callable[[RunGQLQueryTask, dict], None]):
         """Validate a project
@@ -415,13 +602,14 @@ class DataExchangeAPI(QObject):
             _request_upload_project,
         )
 
-    def request_upload_project_files_url(self, files: UploadFileList, callback: Callable[[RunGQLQueryTask, dict], None]):
+    def request_upload_project_files_url(self, files: UploadFileList, callback: Callable[[RunGQLQueryTask, dict], None], rel_paths: list[str] | None = None):
         """Request a URL to upload project files to
 
         Args:
             files (List[str]): _description_
             project_upload_token (str): _description_
             callback (Callable[[RunGQLQueryTask, Dict], None]): _description_
+            rel_paths (List[str], optional): Only ask for these files (e.g. when resuming an upload). Defaults to every file being created or updated.
         """
 
         def _request_upload_project_files_url(task: RunGQLQueryTask):
@@ -433,7 +621,9 @@ class DataExchangeAPI(QObject):
 
             return callback(task, ret_obj)
 
-        return self.api.run_query(self._load_query("requestUploadProjectFilesUrl"), {"files": files.get_rel_paths([UploadFile.FileOp.CREATE, UploadFile.FileOp.UPDATE]), "token": files.token}, _request_upload_project_files_url)
+        if rel_paths is None:
+            rel_paths = files.get_rel_paths([UploadFile.FileOp.CREATE, UploadFile.FileOp.UPDATE])
+        return self.api.run_query(self._load_query("requestUploadProjectFilesUrl"), {"files": rel_paths, "token": files.token}, _request_upload_project_files_url)
 
     def finalize_project_upload(self, project_upload_token: str, callback: Callable[[RunGQLQueryTask, dict], None]):
         """Finalize the project upload
@@ -478,6 +668,27 @@ class DataExchangeAPI(QObject):
 
         return self.api.run_query(self._load_query("downloadFile"), {"projectId": project_id, "filePath": remote_path}, _get_download_url)
 
+    def get_download_urls(self, project_id: str, remote_paths: list[str], callback: Callable[[RunGQLQueryTask, dict[str, dict] | None], None]):
+        """Get signed download URLs for several files in a single request
+
+        The downloadFile query is repeated once per file under an alias so a whole batch costs
+        one round trip. The callback gets remote_path -> downloadFile result (or None if the query failed).
+        """
+        fields = self._selection_set("downloadFile")
+        var_defs = " ".join(f"$f{idx}: String!" for idx in range(len(remote_paths)))
+        selections = "\n".join(f"  f{idx}: downloadFile(projectId: $projectId, filePath: $f{idx}) {{ {fields} }}" for idx in range(len(remote_paths)))
+        query = f"query downloadFiles($projectId: ID! {var_defs}) {{\n{selections}\n}}"
+        variables = {"projectId": project_id, **{f"f{idx}": remote_path for idx, remote_path in enumerate(remote_paths)}}
+
+        def _get_download_urls(task: RunGQLQueryTask):
+            ret_obj = None
+            if task.response and not task.error:
+                data = task.response["data"]
+                ret_obj = {remote_path: data.get(f"f{idx}") for idx, remote_path in enumerate(remote_paths)}
+            return callback(task, ret_obj)
+
+        return self.api.run_query(query, variables, _get_download_urls)
+
     def get_layer_tiles(self, project_id: str, project_type_id: str, rs_xpath: str, callback: Callable[[RunGQLQueryTask, dict], None]):
         """Get the tile service metadata for a layer"""
 
@@ -487,7 +698,63 @@ class DataExchangeAPI(QObject):
                 ret_obj = task.response["data"]["getLayerTiles"]
             return callback(task, ret_obj)
 
-        return self.api.run_query(self._load_query("getLayerTiles"), {"projectId": project_id, "projectTypeId": project_type_id, "rsXPath": rs_xpath}, _get_layer_tiles)
+        return self._run_cached_query("getLayerTiles", {"projectId": project_id, "projectTypeId": project_type_id, "rsXPath": rs_xpath}, _get_layer_tiles, project_id)
+
+    def get_layer_tiles_batch(self, project_id: str, project_type_id: str, rs_xpaths: list[str], callback: Callable[[RunGQLQueryTask | CachedQueryResult, dict[str, dict | None]], None]) -> None:
+        """Get the tile service metadata for many layers of a project in a few requests
+
+        Layers already in the QueryCache aren't asked for again. The rest are asked for
+        ``LAYER_TILES_BATCH_SIZE`` at a time with the getLayerTiles query repeated once per
+        layer under an alias (like ``get_download_urls``). Each layer is cached on its own so
+        ``get_layer_tiles`` finds it too. A GraphQL error anywhere fails the whole request, so a
+        batch that fails is asked for again one layer at a time to find the layer that's at fault.
+
+        The callback is called once per batch with rsXPath -> getLayerTiles result (None for
+        layers that failed) until every layer has been answered.
+        """
+        scope = self._cache_scope()
+        single_query = self._load_query("getLayerTiles")
+        fields = self._selection_set("getLayerTiles")
+
+        def _variables(rs_xpath: str) -> dict:
+            return {"projectId": project_id, "projectTypeId": project_type_id, "rsXPath": rs_xpath}
+
+        cached = {}
+        missing = []
+        for rs_xpath in dict.fromkeys(rs_xpaths):
+            response = self._cached_response("getLayerTiles", single_query, _variables(rs_xpath), project_id)
+            if response is not None:
+                cached[rs_xpath] = response["data"]["getLayerTiles"]
+            else:
+                missing.append(rs_xpath)
+
+        if len(cached) > 0:
+            result = CachedQueryResult(single_query, {"projectId": project_id, "projectTypeId": project_type_id, "rsXPaths": list(cached)}, {"data": {}})
+            QTimer.singleShot(0, lambda: callback(result, cached))
+
+        for idx in range(0, len(missing), LAYER_TILES_BATCH_SIZE):
+            batch = missing[idx : idx + LAYER_TILES_BATCH_SIZE]
+            var_defs = " ".join(f"$x{x_idx}: String!" for x_idx in range(len(batch)))
+            selections = "\n".join(f"  x{x_idx}: getLayerTiles(rsXPath: $x{x_idx}, projectId: $projectId, projectTypeId: $projectTypeId) {{ {fields} }}" for x_idx in range(len(batch)))
+            query = f"query getLayerTilesBatch($projectId: ID!, $projectTypeId: String! {var_defs}) {{\n{selections}\n}}"
+            variables = {"projectId": project_id, "projectTypeId": project_type_id, **{f"x{x_idx}": rs_xpath for x_idx, rs_xpath in enumerate(batch)}}
+
+            def _get_layer_tiles_batch(task: RunGQLQueryTask, batch: list[str] = batch):
+                if not task.success or not task.response:
+                    if len(batch) == 1:
+                        return callback(task, {batch[0]: None})
+                    for rs_xpath in batch:
+                        self.get_layer_tiles(project_id, project_type_id, rs_xpath, lambda single_task, tiles, rs_xpath=rs_xpath: callback(single_task, {rs_xpath: tiles}))
+                    return None
+                data = task.response["data"]
+                ret_obj = {}
+                for x_idx, rs_xpath in enumerate(batch):
+                    ret_obj[rs_xpath] = data.get(f"x{x_idx}")
+                    if ret_obj[rs_xpath] is not None:
+                        QueryCache().store(scope, "getLayerTiles", _variables(rs_xpath), {"data": {"getLayerTiles": ret_obj[rs_xpath]}}, project_id)
+                return callback(task, ret_obj)
+
+            self.api.run_query(query, variables, _get_layer_tiles_batch)
 
     def get_web_symbology(self, project_type_id: str, name: str, is_raster: bool, callback: Callable[[RunGQLQueryTask, dict], None]):
         """Get the web symbology for a layer"""
@@ -498,7 +765,7 @@ class DataExchangeAPI(QObject):
                 ret_obj = task.response["data"]["getWebSymbology"]
             return callback(task, ret_obj)
 
-        return self.api.run_query(self._load_query("getWebSymbology"), {"projectTypeId": project_type_id, "name": name, "isRaster": is_raster}, _get_web_symbology)
+        return self._run_cached_query("getWebSymbology", {"projectTypeId": project_type_id, "name": name, "isRaster": is_raster}, _get_web_symbology)
 
     def download_file(self, project_id: str, remote_path: str, local_path: str, callback: Callable[[RunGQLQueryTask, dict], None]):
         """Download the project file
@@ -512,7 +779,7 @@ class DataExchangeAPI(QObject):
                 download_url = ret_obj["downloadUrl"]
                 try:
                     with open(local_path, "wb") as f:
-                        f.write(requests.get(download_url, timeout=30).content)
+                        f.write(HttpSession().get(download_url, timeout=30).content)
                 except Exception as e:
                     self.log(f"Error downloading file: {local_path}", Qgis.Critical)
                     self.log(f"Error: {e}", Qgis.Critical)
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Callable
+import time
+
+from qgis.PyQt.QtCore import QTimer
+
+# Datasets asked for in each page
+DATASET_PAGE_SIZE = 50
+# Pages asked for at the same time once the total is known
+DATASET_PAGE_WINDOW = 4
+# A page that fails is split in two and asked for again, down to this many datasets
+MIN_DATASET_PAGE_SIZE = 5
+# Pages are handed on together, at most every FLUSH_PAGES pages or FLUSH_INTERVAL_MS
+FLUSH_PAGES = 8
+FLUSH_INTERVAL_MS = 250
+
+# (offset, limit, callback(task, datasets)) -> asks the API for one page
+FetchPage = Callable[[int, int, Callable], object]
+
+
+class DatasetMetadataPager:
+    """Fetches the dataset metadata of a remote project a page at a time.
+
+    The first page says how many datasets there are. The rest of the pages are then asked for
+    ``window`` at a time instead of one after the other. They can come back in any order.
+
+    Pages aren't handed on one by one: everything that has arrived goes to ``on_items`` together,
+    once ``flush_pages`` pages have piled up or ``flush_ms`` after the first of them arrived, so
+    the tree and metadata panel are refreshed a few times rather than once per page.
+
+    A page that fails (the API timing out on a big page, say) is asked for again as two halves.
+    Once a page is down to ``min_limit`` datasets and still fails it's given up on. ``on_done`` is
+    called at the end with the number of datasets that couldn't be fetched.
+    """
+
+    def __init__(
+        self,
+        fetch_page: FetchPage,
+        on_items: Callable[[list[dict]], None],
+        on_done: Callable[[int], None] | None = None,
+        limit: int = DATASET_PAGE_SIZE,
+        window: int = DATASET_PAGE_WINDOW,
+        min_limit: int = MIN_DATASET_PAGE_SIZE,
+        flush_pages: int = FLUSH_PAGES,
+        flush_ms: int = FLUSH_INTERVAL_MS,
+    ) -> None:
+        self.fetch_page = fetch_page
+        self.on_items = on_items
+        self.on_done = on_done
+        self.limit = limit
+        self.window = max(1, window)
+        self.min_limit = min_limit
+        self.flush_pages = max(1, flush_pages)
+        self.flush_ms = flush_ms
+
+        self.total: int | None = None
+        # (offset, limit) of the pages still to ask for
+        self.queue: deque[tuple[int, int]] = deque()
+        self.running = 0
+        self.failed = 0
+        self.cancelled = False
+        self.finished = False
+        self.pending_items: list[dict] = []
+        self.pending_pages = 0
+        self.timer_running = False
+        self.started = 0.0
+
+    def start(self) -> None:
+        self.started = time.perf_counter()
+        self._request(0, self.limit)
+
+    def cancel(self) -> None:
+        """Ignore every page that's still on its way"""
+        self.cancelled = True
+        self.queue.clear()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def _request(self, offset: int, limit: int) -> None:
+        self.running += 1
+        self.fetch_page(offset, limit, lambda task, datasets: self._on_page(offset, limit, task, datasets))
+
+    def _fill_window(self) -> None:
+        while self.queue and self.running < self.window:
+            self._request(*self.queue.popleft())
+
+    def _on_page(self, offset: int, limit: int, task, datasets: dict | None) -> None:
+        if self.cancelled:
+            return
+        self.running -= 1
+
+        if task.success and datasets:
+            items = [item for item in datasets.get("items") or [] if item]
+            if self.total is None:
+                # First page: now we know how many more to ask for
+                self.total = datasets.get("total", 0) or 0
+                self.queue.extend((page_offset, self.limit) for page_offset in range(offset + limit, self.total, self.limit))
+            self.pending_items.extend(items)
+            self.pending_pages += 1
+        elif limit > self.min_limit:
+            half = (limit + 1) // 2
+            if self.total is None:
+                # The rest of the pages are worked out from the first one so only try a smaller first page
+                self.queue.appendleft((offset, half))
+            else:
+                # Put the halves at the front so the tree still fills in roughly in order
+                self.queue.extendleft([(offset + half, limit - half), (offset, half)])
+        elif self.total is None:
+            # Couldn't even get the first page so there's no telling how many datasets there are
+            self.failed = limit
+        else:
+            self.failed += min(limit, self.total - offset)
+
+        self._fill_window()
+        if self.running == 0 and not self.queue:
+            self._finish()
+        elif self.pending_pages >= self.flush_pages:
+            self._flush()
+        elif self.pending_pages and not self.timer_running:
+            self.timer_running = True
+            QTimer.singleShot(self.flush_ms, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self.timer_running = False
+        if not self.cancelled and not self.finished:
+            self._flush()
+
+    def _flush(self) -> None:
+        items, self.pending_items = self.pending_items, []
+        self.pending_pages = 0
+        if items:
+            self.on_items(items)
+
+    def _finish(self) -> None:
+        if self.finished:
+            return
+        self.finished = True
+        self._flush()
+        if self.on_done is not None:
+            self.on_done(self.failed)
@@ -1,70 +1,333 @@
 from __future__ import annotations
 
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+import json
+import math
 import os
+import re
+import threading
 import time
 from typing import Callable
 
 from qgis.core import Qgis, QgsApplication, QgsTask
-from qgis.PyQt.QtCore import QObject, pyqtSignal
+from qgis.PyQt.QtCore import QObject, QTimer, pyqtSignal
 import requests
+from rsxml.constants import MULTIPART_CHUNK_SIZE, MULTIPART_THRESHOLD
 
 from ...compat import QGSTASK_CAN_CANCEL, QGSTASK_COMPLETE, QGSTASK_SILENT
+from ..http_session import HttpSession
+from .etag import ParallelEtagCalculator
+from .rate_limiter import TransferLimits
+from .transfer_scheduler import SAMPLE_INTERVAL, AdaptiveConcurrency
 
 MAX_PROGRESS_INTERVAL = 1  # seconds
 
+# Data goes to "<file>.part" and is only renamed into place once it has been verified
+PART_SUFFIX = ".part"
+# Byte ranges still to fetch for a segmented download so it can pick up where it left off
+JOURNAL_SUFFIX = ".part.json"
+DOWNLOAD_CHUNK_SIZE = pow(1024, 2)
+# Files with more than this left to download are split into byte ranges fetched concurrently
+SEGMENT_THRESHOLD = 64 * pow(1024, 2)
+MAX_SEGMENTS = 4
+# Consecutive failures (without any progress in between) before a segment gives up
+MAX_RETRIES = 5
+RETRY_BACKOFF = 2  # seconds, doubled on every consecutive failure
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+
+
+class DownloadVerificationError(Exception):
+    """The downloaded file doesn't match the size or etag the Data Exchange gave us"""
+
+
+class RangeNotSupportedError(Exception):
+    """The server ignored a ``Range`` header so we can't resume or split this download"""
+
+
+class DownloadUrlExpiredError(Exception):
+    """The signed download URL has expired (or been revoked). Asking for a new one should fix it"""
+
+
+class TransientDownloadError(Exception):
+    """A failure worth retrying (dropped connection, short read, 5xx...)"""
+
+
+class DownloadSegment:
+    """A byte range [start, end) of the file and how far into it we've written (pos)"""
+
+    def __init__(self, start: int, end: int, pos: int | None = None):
+        self.start = start
+        self.end = end
+        self.pos = start if pos is None else pos
+
+    @property
+    def remaining(self) -> int:
+        return self.end - self.pos
+
 
 class DownloadFileTask(QgsTask):
     """
     Task to download a single file from a given URL.
+
+    The file is written to ``<abs_path>.part`` and resumed with HTTP ``Range`` requests if
+    the connection drops (or on the next attempt if the task fails or is cancelled). Big
+    files are split into up to ``max_segments`` byte ranges that download concurrently.
+    Nothing is moved to ``abs_path`` until the size (and etag if we have one) check out.
     """
 
-    def __init__(self, rel_path: str, abs_path: str, download_url: str, size: int, log_callback: Callable | None = None, progress_callback: Callable | None = None):
+    def __init__(
+        self,
+        rel_path: str,
+        abs_path: str,
+        download_url: str,
+        size: int,
+        log_callback: Callable | None = None,
+        progress_callback: Callable | None = None,
+        etag: str | None = None,
+        max_segments: int = MAX_SEGMENTS,
+        retry_callback: Callable[[], None] | None = None,
+    ):
         super().__init__(f"Downloading {rel_path}", QGSTASK_CAN_CANCEL | QGSTASK_SILENT)
         self.rel_path = rel_path
         self.abs_path = abs_path
+        self.part_path = abs_path + PART_SUFFIX
+        self.journal_path = abs_path + JOURNAL_SUFFIX
         self.download_url = download_url
         self.total_size = size
+        self.etag = etag
+        self.max_segments = max(1, max_segments)
         self.log_callback = log_callback
         self.progress_callback = progress_callback
+        # Called (from the task thread) every time a connection drops and we have to retry
+        self.retry_callback = retry_callback
         self.exception = None
 
+        self.downloaded = 0
+        self._segments: list[DownloadSegment] = []
+        self._lock = threading.Lock()
+        # Set when one segment fails so the others stop too
+        self._abort = threading.Event()
+        self._last_progress_time = 0.0
+
     def run(self) -> bool:
         try:
             # Ensure directory exists
             os.makedirs(os.path.dirname(self.abs_path), exist_ok=True)
 
-            response = requests.get(self.download_url, stream=True, timeout=60)
-            response.raise_for_status()
-
-            downloaded = 0
-            last_progress_time = time.time()
-
-            with open(self.abs_path, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if self.isCanceled():
-                        return False
-
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
-
-                        # Update progress
-                        curr_time = time.time()
-                        if curr_time - last_progress_time > MAX_PROGRESS_INTERVAL:
-                            if self.progress_callback:
-                                self.progress_callback(self.rel_path, downloaded, self.total_size)
-                            last_progress_time = curr_time
+            self._abort.clear()
+            self._segments = self._plan_segments()
+            try:
+                self._download_segments()
+            except RangeNotSupportedError:
+                self._log(f"Server does not support resuming {self.rel_path}. Starting it again from the beginning", Qgis.Warning)
+                self._discard_partial()
+                open(self.part_path, "wb").close()
+                self._segments = [DownloadSegment(0, self.total_size)]
+                # Set by the segment that hit the error. Left set, the retry would stop before it started
+                self._abort.clear()
+                self._download_segments()
+
+            if self.isCanceled():
+                # Leave the .part file (and journal) where they are so the next attempt can resume
+                self._save_journal()
+                return False
+
+            self._verify()
+            os.replace(self.part_path, self.abs_path)
+            self._remove(self.journal_path)
 
             if self.progress_callback:
-                self.progress_callback(self.rel_path, downloaded, self.total_size)
+                self.progress_callback(self.rel_path, self.downloaded, self.total_size)
 
             return True
         except Exception as e:
             self.exception = e
+            self._save_journal()
             if self.log_callback:
                 self.log_callback(f"Error downloading {self.rel_path}: {e!s}", Qgis.Critical)
             return False
 
+    def _plan_segments(self) -> list[DownloadSegment]:
+        """Work out which byte ranges we still need, using whatever a previous attempt left behind"""
+        segments = self._load_journal()
+        if segments is None:
+            self._remove(self.journal_path)
+            existing = os.path.getsize(self.part_path) if os.path.isfile(self.part_path) else 0
+            if existing > self.total_size:
+                self._discard_partial()
+                existing = 0
+            # Make sure the file exists so every segment can open it for writing
+            open(self.part_path, "ab").close()
+
+            remaining = self.total_size - existing
+            count = self.max_segments if remaining > SEGMENT_THRESHOLD else 1
+            step = -(-remaining // count)
+            segments = [DownloadSegment(start, min(start + step, self.total_size)) for start in range(existing, self.total_size, step)] if remaining > 0 else []
+
+            if len(segments) > 1:
+                # Segments write out of order so the file size no longer says how much we have. The journal does
+                with open(self.part_path, "r+b") as f:
+                    f.truncate(self.total_size)
+                self._segments = segments
+                self._save_journal()
+
+        self.downloaded = self.total_size - sum(segment.remaining for segment in segments)
+        return segments
+
+    def _download_segments(self) -> None:
+        pending = [segment for segment in self._segments if segment.remaining > 0]
+        if len(pending) == 0:
+            return
+        if len(pending) == 1:
+            self._download_segment(pending[0])
+            return
+
+        with ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix="download") as executor:
+            futures = [executor.submit(self._download_segment, segment) for segment in pending]
+            done, _not_done = wait(futures, return_when=FIRST_EXCEPTION)
+            for future in done:
+                error = future.exception()
+                if error is not None:
+                    # The other segments check this and stop. Their progress goes in the journal
+                    self._abort.set()
+                    raise error
+
+    def _download_segment(self, segment: DownloadSegment) -> None:
+        attempts = 0
+        while segment.remaining > 0 and not self._stopping():
+            pos_before = segment.pos
+            try:
+                self._fetch_range(segment)
+                if segment.remaining > 0 and not self._stopping():
+                    raise TransientDownloadError(f"Connection closed after {segment.pos - segment.start:,} of {segment.end - segment.start:,} bytes")
+            except (TransientDownloadError, requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError, requests.exceptions.Timeout) as e:
+                # Any progress means the connection is worth trying again, so only count failures in a row
+                attempts = 1 if segment.pos > pos_before else attempts + 1
+                if attempts > MAX_RETRIES:
+                    raise
+                if self.retry_callback:
+                    self.retry_callback()
+                delay = RETRY_BACKOFF * pow(2, attempts - 1)
+                self._log(f"Download of {self.rel_path} interrupted ({e}). Resuming from byte {segment.pos:,} in {delay}s", Qgis.Warning)
+                self._save_journal()
+                self._sleep(delay)
+
+    def _fetch_range(self, segment: DownloadSegment) -> None:
+        is_whole_file = segment.pos == 0 and segment.end == self.total_size
+        headers = {} if is_whole_file else {"Range": f"bytes={segment.pos}-{segment.end - 1}"}
+
+        with HttpSession().get(self.download_url, headers=headers, stream=True, timeout=60) as response:
+            if response.status_code in RETRY_STATUS_CODES:
+                raise TransientDownloadError(f"HTTP {response.status_code}")
+            # S3 answers an expired signed URL with a 403
+            if response.status_code == 403:
+                raise DownloadUrlExpiredError(f"Download URL was refused (HTTP 403) for {self.rel_path}")
+            response.raise_for_status()
+            if not is_whole_file:
+                content_range = response.headers.get("Content-Range", "")
+                if response.status_code != 206 or not content_range.startswith(f"bytes {segment.pos}-"):
+                    raise RangeNotSupportedError(f"Expected a partial response starting at byte {segment.pos}")
+
+            rate_limiter = TransferLimits().download
+            with open(self.part_path, "r+b", buffering=0) as f:
+                f.seek(segment.pos)
+                for chunk in response.iter_content(chunk_size=rate_limiter.chunk_size(DOWNLOAD_CHUNK_SIZE)):
+                    if self._stopping():
+                        return
+                    if not chunk:
+                        continue
+                    # Not reading from the socket while we wait is what slows the server down
+                    if not rate_limiter.acquire(len(chunk), self._stopping):
+                        return
+                    # Never write past the end of this segment, even if the server sends more than we asked for
+                    chunk = chunk[: segment.remaining]
+                    f.write(chunk)
+                    segment.pos += len(chunk)
+                    self._add_progress(len(chunk))
+                    if segment.remaining == 0:
+                        break
+
+    def _add_progress(self, num_bytes: int) -> None:
+        with self._lock:
+            self.downloaded += num_bytes
+            curr_time = time.time()
+            if curr_time - self._last_progress_time <= MAX_PROGRESS_INTERVAL:
+                return
+            self._last_progress_time = curr_time
+            downloaded = self.downloaded
+        if len(self._segments) > 1:
+            self._save_journal()
+        if self.progress_callback:
+            self.progress_callback(self.rel_path, downloaded, self.total_size)
+
+    def _verify(self) -> None:
+        """Make sure what we downloaded is what the Data Exchange says it should be"""
+        actual_size = os.path.getsize(self.part_path)
+        if actual_size != self.total_size:
+            self._discard_partial()
+            raise DownloadVerificationError(f"Expected {self.total_size:,} bytes but downloaded {actual_size:,}")
+        if self.etag:
+            # S3 Multipart etags end in a dash and the number of parts. If no dash, it's a simple MD5.
+            multipart = re.match(r'^"?[0-9a-fA-F]+-([0-9]+)"?$', self.etag)
+            if multipart is not None:
+                parts = int(multipart.group(1))
+                if self.total_size < MULTIPART_THRESHOLD or parts != math.ceil(self.total_size / MULTIPART_CHUNK_SIZE):
+                    # Uploaded with a part size other than ours (by another client) so the etag can't be worked out here
+                    self._log(f"{self.rel_path} was uploaded in {parts} parts of a different size. Only its size was checked, not its etag {self.etag}", Qgis.Info)
+                    return
+            local_etag = ParallelEtagCalculator().calculate({self.rel_path: (self.part_path, multipart is None)})[self.rel_path]
+            if local_etag.strip('"') != self.etag.strip('"'):
+                self._discard_partial()
+                raise DownloadVerificationError(f"Downloaded file etag {local_etag} does not match {self.etag}")
+
+    def _load_journal(self) -> list[DownloadSegment] | None:
+        if not os.path.isfile(self.journal_path) or not os.path.isfile(self.part_path):
+            return None
+        try:
+            with open(self.journal_path, encoding="utf-8") as f:
+                journal = json.load(f)
+            if journal.get("size") != self.total_size or journal.get("etag") != self.etag or os.path.getsize(self.part_path) != self.total_size:
+                return None
+            return [DownloadSegment(start, end, pos) for start, end, pos in journal["segments"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _save_journal(self) -> None:
+        if len(self._segments) < 2 or not os.path.isfile(self.part_path):
+            return
+        with self._lock:
+            journal = {"size": self.total_size, "etag": self.etag, "segments": [[segment.start, segment.end, segment.pos] for segment in self._segments]}
+            tmp_path = self.journal_path + ".tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(journal, f)
+                os.replace(tmp_path, self.journal_path)
+            except OSError as e:
+                self._log(f"Could not save download progress for {self.rel_path}: {e}", Qgis.Warning)
+
+    def _discard_partial(self) -> None:
+        self._remove(self.part_path)
+        self._remove(self.journal_path)
+        self._segments = []
+        self.downloaded = 0
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        if os.path.isfile(path):
+            os.remove(path)
+
+    def _sleep(self, secs: float) -> None:
+        end_time = time.time() + secs
+        while time.time() < end_time and not self._stopping():
+            time.sleep(0.1)
+
+    def _stopping(self) -> bool:
+        return self.isCanceled() or self._abort.is_set()
+
+    def _log(self, msg: str, level: Qgis.MessageLevel) -> None:
+        if self.log_callback:
+            self.log_callback(msg, level)
+
     def finished(self, result: bool) -> None:
         if result:
             if self.log_callback:
@@ -77,9 +340,72 @@ class DownloadFileTask(QgsTask):
                 self.log_callback(f"Failed to download {self.rel_path}: {self.exception}", Qgis.Critical)
 
 
+class DownloadUrlResolver:
+    """
+    Fetches signed download URLs in batches (one aliased GraphQL query per batch) with a few
+    batches in flight at once. Each batch is handed back as soon as it arrives so downloads
+    can start long before every URL is known.
+    """
+
+    BATCH_SIZE = 50
+    MAX_BATCHES_IN_FLIGHT = 3
+
+    def __init__(self, data_exchange_api, project_id: str, batch_size: int = BATCH_SIZE, max_in_flight: int = MAX_BATCHES_IN_FLIGHT):
+        self.api = data_exchange_api
+        self.project_id = project_id
+        self.batch_size = max(1, batch_size)
+        self.max_in_flight = max(1, max_in_flight)
+        self.pending: list[tuple[list[str], Callable[[dict[str, dict | None]], None]]] = []
+        self.in_flight = 0
+        self.cancelled = False
+
+    def resolve(self, rel_paths: list[str], callback: Callable[[dict[str, dict | None]], None]) -> None:
+        """Look up URLs for these files. *callback* is called once per batch with rel_path -> downloadFile result (None on failure)"""
+        for idx in range(0, len(rel_paths), self.batch_size):
+            self.pending.append((rel_paths[idx : idx + self.batch_size], callback))
+        self._pump()
+
+    def refresh(self, rel_path: str, callback: Callable[[str | None], None]) -> None:
+        """Get a fresh URL for one file (e.g. after the old one expired). Jumps ahead of any queued batches"""
+
+        def _handle_refresh(urls: dict[str, dict | None]) -> None:
+            ret_obj = urls.get(rel_path)
+            callback(ret_obj["downloadUrl"] if ret_obj and ret_obj.get("downloadUrl") else None)
+
+        self.pending.insert(0, ([rel_path], _handle_refresh))
+        self._pump()
+
+    def cancel(self) -> None:
+        self.cancelled = True
+        self.pending = []
+
+    def _pump(self) -> None:
+        while not self.cancelled and self.in_flight < self.max_in_flight and self.pending:
+            batch, callback = self.pending.pop(0)
+            self.in_flight += 1
+            self.api.get_download_urls(self.project_id, batch, lambda task, urls, b=batch, cb=callback: self._handle_batch(b, cb, urls))
+
+    def _handle_batch(self, batch: list[str], callback: Callable[[dict[str, dict | None]], None], urls: dict[str, dict | None] | None) -> None:
+        self.in_flight -= 1
+        if self.cancelled:
+            return
+        if urls is None and len(batch) > 1:
+            # One bad path fails the whole aliased query. Ask for these one at a time so the rest still download
+            self.pending[0:0] = [([rel_path], callback) for rel_path in batch]
+        else:
+            callback(urls if urls is not None else dict.fromkeys(batch))
+        self._pump()
+
+
 class DownloadQueue(QObject):
     """
     Queue to manage multiple file downloads.
+
+    Files can keep being enqueued after ``start()``. Anything passed to ``expect()`` holds off
+    ``complete_signal`` until it has been enqueued or marked as failed.
+
+    How many files download at once is decided by an AdaptiveConcurrency controller
+    (see ``configure()``). The biggest waiting file always goes next so small files fill the tail.
     """
 
     progress_signal = pyqtSignal(str, int, int)  # rel_path, downloaded, total
@@ -88,11 +414,15 @@ class DownloadQueue(QObject):
     cancelled_signal = pyqtSignal()
     all_tasks_done_signal = pyqtSignal(bool)  # success
 
-    MAX_CONCURRENT_DOWNLOADS = 4
+    INITIAL_CONCURRENT_DOWNLOADS = 4
+    # How many times we'll ask for a new URL for one file when the old one is refused
+    MAX_URL_REFRESHES = 2
 
     def __init__(self, log_callback: Callable | None = None):
         super().__init__()
         self.log = log_callback
+        # Called with (rel_path, callback(new_url or None)) when a signed URL has expired
+        self.url_refresher: Callable[[str, Callable[[str | None], None]], None] | None = None
         self.pending_tasks = []
         self.active_tasks = {}
         self.total_size = 0
@@ -100,6 +430,19 @@ class DownloadQueue(QObject):
         self.file_progress = {}  # rel_path -> downloaded
         self.is_cancelled = False
         self.failed_tasks = []
+        self.expected = set()  # rel_paths we know are coming but don't have a URL for yet
+        self.url_refreshes = {}  # rel_path -> count
+        self.started = False
+        self.concurrency = AdaptiveConcurrency(self.INITIAL_CONCURRENT_DOWNLOADS, self.INITIAL_CONCURRENT_DOWNLOADS)
+        # Big files can run for a long time without anything finishing so we also re-check the limit on a timer
+        self.timer = QTimer(self)
+        self.timer.setInterval(int(SAMPLE_INTERVAL * 1000))
+        self.timer.timeout.connect(self._process_queue)
+
+    def configure(self, min_streams: int, max_streams: int) -> None:
+        """Set the range the number of simultaneous downloads can adapt within"""
+        # A broken setting shouldn't stop transfers. Fall back to the old fixed limit
+        self.concurrency = AdaptiveConcurrency(min_streams or self.INITIAL_CONCURRENT_DOWNLOADS, max_streams or self.INITIAL_CONCURRENT_DOWNLOADS, initial=self.INITIAL_CONCURRENT_DOWNLOADS)
 
     def reset(self) -> None:
         self.pending_tasks = []
@@ -109,15 +452,43 @@ class DownloadQueue(QObject):
         self.file_progress = {}
         self.is_cancelled = False
         self.failed_tasks = []
+        self.expected = set()
+        self.url_refreshes = {}
+        self.started = False
+        self.timer.stop()
+        self.concurrency = AdaptiveConcurrency(self.concurrency.min_streams, self.concurrency.max_streams, initial=self.INITIAL_CONCURRENT_DOWNLOADS)
+
+    def expect(self, files: dict[str, int]) -> None:
+        """Declare files (rel_path -> size) that will be enqueued later so overall progress and completion account for them"""
+        for rel_path, size in files.items():
+            if rel_path not in self.file_progress:
+                self.total_size += size
+                self.file_progress[rel_path] = 0
+            self.expected.add(rel_path)
+
+    def enqueue(self, rel_path: str, abs_path: str, download_url: str, size: int, etag: str | None = None) -> None:
+        if rel_path not in self.file_progress:
+            self.total_size += size
+            self.file_progress[rel_path] = 0
+        self.expected.discard(rel_path)
+        self.pending_tasks.append(self._create_task(rel_path, abs_path, download_url, size, etag))
+        if self.started:
+            self._process_queue()
+
+    def mark_failed(self, rel_path: str) -> None:
+        """Record a file that can't be downloaded (e.g. we couldn't get a URL for it)"""
+        self.expected.discard(rel_path)
+        self.failed_tasks.append(rel_path)
+        if self.started:
+            self._process_queue()
 
-    def enqueue(self, rel_path: str, abs_path: str, download_url: str, size: int) -> None:
-        task = DownloadFileTask(rel_path, abs_path, download_url, size, log_callback=self.log, progress_callback=self._on_progress)
-        self.pending_tasks.append(task)
-        self.total_size += size
-        self.file_progress[rel_path] = 0
+    def _create_task(self, rel_path: str, abs_path: str, download_url: str, size: int, etag: str | None) -> DownloadFileTask:
+        return DownloadFileTask(rel_path, abs_path, download_url, size, log_callback=self.log, progress_callback=self._on_progress, etag=etag, retry_callback=lambda: self.concurrency.record_failure())
 
     def start(self) -> None:
         self.is_cancelled = False
+        self.started = True
+        self.timer.start()
         self._process_queue()
 
     def cancel_all(self) -> None:
@@ -125,6 +496,8 @@ class DownloadQueue(QObject):
         for task in self.active_tasks.values():
             task.cancel()
         self.pending_tasks = []
+        self.expected = set()
+        self.timer.stop()
         self.cancelled_signal.emit()
 
     def _on_progress(self, rel_path: str, downloaded: int, total: int) -> None:
@@ -137,22 +510,59 @@ class DownloadQueue(QObject):
         if self.is_cancelled:
             return
 
-        while len(self.active_tasks) < self.MAX_CONCURRENT_DOWNLOADS and self.pending_tasks:
-            task = self.pending_tasks.pop(0)
+        # Follow the time-of-day window for the rate limits
+        TransferLimits().apply()
+
+        limit = self.concurrency.update(self.total_downloaded, len(self.active_tasks))
+        while len(self.active_tasks) < limit and self.pending_tasks:
+            task = self._next_task()
             self.active_tasks[task.rel_path] = task
             # Use a closure to capture the task
             task.taskCompleted.connect(lambda t=task: self._on_task_completed(t))
             task.taskTerminated.connect(lambda t=task: self._on_task_completed(t))
             QgsApplication.taskManager().addTask(task)
 
-        if not self.active_tasks and not self.pending_tasks:
+        if not self.active_tasks and not self.pending_tasks and not self.expected:
+            self.timer.stop()
             self.complete_signal.emit()
 
+    def _next_task(self) -> DownloadFileTask:
+        """project.rs.xml first (so the project can open even if the rest is interrupted) then biggest first"""
+        task = max(self.pending_tasks, key=lambda t: (t.rel_path.lower() == "project.rs.xml", t.total_size))
+        self.pending_tasks.remove(task)
+        return task
+
     def _on_task_completed(self, task: DownloadFileTask) -> None:
         if task.rel_path in self.active_tasks:
             del self.active_tasks[task.rel_path]
 
             if task.status() != QGSTASK_COMPLETE:
-                self.failed_tasks.append(task.rel_path)
+                if not self._refresh_url(task):
+                    self.failed_tasks.append(task.rel_path)
+                    if not self.is_cancelled:
+                        self.concurrency.record_failure()
 
             self._process_queue()
+
+    def _refresh_url(self, task: DownloadFileTask) -> bool:
+        """Ask for a new URL if this one expired. The new task resumes from the .part file the old one left"""
+        refreshes = self.url_refreshes.get(task.rel_path, 0)
+        if self.is_cancelled or self.url_refresher is None or not isinstance(task.exception, DownloadUrlExpiredError) or refreshes >= self.MAX_URL_REFRESHES:
+            return False
+
+        self.url_refreshes[task.rel_path] = refreshes + 1
+        # Hold off completion until the new URL comes back
+        self.expected.add(task.rel_path)
+        if self.log:
+            self.log(f"Download URL for {task.rel_path} has expired. Fetching a new one...", Qgis.Warning)
+
+        def _handle_new_url(download_url: str | None) -> None:
+            if download_url is None:
+                self.mark_failed(task.rel_path)
+                return
+            self.expected.discard(task.rel_path)
+            self.pending_tasks.insert(0, self._create_task(task.rel_path, task.abs_path, download_url, task.total_size, task.etag))
+            self._process_queue()
+
+        self.url_refresher(task.rel_path, _handle_new_url)
+        return True
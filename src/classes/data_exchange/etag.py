@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+import hashlib
+import os
+import threading
+from typing import TYPE_CHECKING, Callable
+
+from rsxml.constants import MULTIPART_CHUNK_SIZE, MULTIPART_THRESHOLD
+
+if TYPE_CHECKING:
+    from ..hash_cache import FileHashRecord, HashCache
+
+# Each worker streams through its file (or 50MB part) with one reusable buffer of this size
+READ_BUFFER_SIZE = 8 * pow(1024, 2)
+# hashlib.md5 and file reads both release the GIL so threads really do hash in parallel.
+# Past a handful of workers we're limited by the disk, not the CPU.
+MAX_ETAG_WORKERS = 8
+
+
+class EtagCancelledError(Exception):
+    """Raised by ``ParallelEtagCalculator.calculate`` when ``cancel()`` is called mid-run"""
+
+
+class ParallelEtagCalculator:
+    """Compute Data Exchange (S3-style) ETags for many files at once.
+
+    Produces exactly what ``rsxml.etag.calculate_etag`` produces: a quoted MD5 for files
+    under the multipart threshold (or when ``force_single_part`` is set) and the MD5 of
+    the concatenated part MD5s plus ``-<parts>`` for everything else.
+
+    The work is split into units: one per single-part file and one per
+    ``MULTIPART_CHUNK_SIZE`` part of a multipart file. Units are hashed on a thread pool,
+    biggest first, so one huge raster doesn't leave the other cores idle.
+
+    With a ``hash_cache`` files that haven't changed since they were last hashed are
+    skipped entirely. In ``verify`` mode everything is hashed anyway and any cached ETag
+    that turns out to be wrong is listed in ``mismatched``.
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        read_buffer_size: int = READ_BUFFER_SIZE,
+        chunk_size_bytes: int = MULTIPART_CHUNK_SIZE,
+        chunk_thresh_bytes: int = MULTIPART_THRESHOLD,
+        hash_cache: HashCache | None = None,
+        verify: bool = False,
+    ) -> None:
+        self.max_workers = max_workers or min(MAX_ETAG_WORKERS, os.cpu_count() or 1)
+        self.read_buffer_size = read_buffer_size
+        self.chunk_size_bytes = chunk_size_bytes
+        self.chunk_thresh_bytes = chunk_thresh_bytes
+        self.hash_cache = hash_cache
+        self.verify = verify
+
+        self._cancel_event = threading.Event()
+        self._progress_lock = threading.Lock()
+        self.bytes_done = 0
+        self.bytes_total = 0
+        # Filled in by calculate(): keys answered from the cache, and cached etags that verify mode found to be wrong
+        self.cached: list[str] = []
+        self.mismatched: list[str] = []
+
+    def cancel(self) -> None:
+        """Stop hashing. Safe to call from any thread. ``calculate`` raises EtagCancelledError"""
+        self._cancel_event.set()
+
+    def is_cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def calculate(self, jobs: dict[str, tuple[str, bool]], progress_callback: Callable[[int, int], None] | None = None) -> dict[str, str]:
+        """Calculate the etags for a set of files
+
+        Args:
+            jobs (dict[str, tuple[str, bool]]): key -> (absolute path, force_single_part)
+            progress_callback (Callable[[int, int], None], optional): called with (bytes hashed, total bytes)
+                from the worker threads as hashing progresses. Defaults to None.
+
+        Raises:
+            EtagCancelledError: if ``cancel()`` was called before every file was hashed
+
+        Returns:
+            dict[str, str]: key -> etag (quoted, same format as rsxml.etag.calculate_etag)
+        """
+        # Stat everything up front: the cache needs it and a file that changes while we hash it must not be cached as clean
+        records: dict[str, FileHashRecord] = {}
+        cached_etags: dict[str, str] = {}
+        if self.hash_cache is not None:
+            records = {key: self.hash_cache.identify(abs_path) for key, (abs_path, _force) in jobs.items()}
+            cached = self.hash_cache.lookup(list(records.values()))
+            for key, (_abs_path, force_single_part) in jobs.items():
+                record = cached.get(records[key].path)
+                etag = record.etag(force_single_part, self.chunk_size_bytes, self.chunk_thresh_bytes) if record is not None else None
+                if etag is not None:
+                    cached_etags[key] = etag
+        self.cached = list(cached_etags.keys())
+        self.mismatched = []
+        if not self.verify:
+            jobs = {key: job for key, job in jobs.items() if key not in cached_etags}
+
+        # (key, part index, offset, length). Part index is None for single-part files
+        units: list[tuple[str, int | None, int, int]] = []
+        parts_count: dict[str, int] = {}
+
+        for key, (abs_path, force_single_part) in jobs.items():
+            filesize_bytes = records[key].size if key in records else os.stat(abs_path).st_size
+            if filesize_bytes < self.chunk_thresh_bytes or force_single_part:
+                units.append((key, None, 0, filesize_bytes))
+            else:
+                parts = filesize_bytes // self.chunk_size_bytes
+                if filesize_bytes % self.chunk_size_bytes > 0:
+                    parts += 1
+                parts_count[key] = parts
+                for part in range(parts):
+                    offset = self.chunk_size_bytes * part
+                    units.append((key, part, offset, min(filesize_bytes - offset, self.chunk_size_bytes)))
+
+        self.bytes_done = 0
+        self.bytes_total = sum(unit[3] for unit in units)
+        if progress_callback is not None:
+            progress_callback(0, self.bytes_total)
+
+        # Biggest first so the long ones aren't left running alone at the end
+        units.sort(key=lambda unit: unit[3], reverse=True)
+
+        def _report(num_bytes: int) -> None:
+            with self._progress_lock:
+                self.bytes_done += num_bytes
+                done = self.bytes_done
+            if progress_callback is not None:
+                progress_callback(done, self.bytes_total)
+
+        single_digests: dict[str, str] = {}
+        part_digests: dict[str, list[bytes | None]] = {key: [None] * parts for key, parts in parts_count.items()}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="etag") as executor:
+            futures = {executor.submit(self._hash_range, jobs[key][0], offset, length, _report): (key, part) for key, part, offset, length in units}
+            done, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+            if not_done:
+                # Something failed (or we were cancelled). Stop everything else as quickly as possible
+                self._cancel_event.set()
+                for future in not_done:
+                    future.cancel()
+
+            for future in done:
+                error = future.exception()
+                if error is not None:
+                    raise error
+                key, part = futures[future]
+                if part is None:
+                    single_digests[key] = future.result().hexdigest()
+                else:
+                    part_digests[key][part] = future.result().digest()
+
+        if self.is_cancelled():
+            raise EtagCancelledError("Etag calculation was cancelled")
+
+        etags = {key: f'"{digest}"' for key, digest in single_digests.items()}
+        for key, digests in part_digests.items():
+            combined_hash = hashlib.md5(b"".join(digests), usedforsecurity=False).hexdigest()
+            etags[key] = f'"{combined_hash}-{len(digests)}"'
+
+        if self.hash_cache is not None:
+            self.mismatched = [key for key, etag in cached_etags.items() if key in etags and etags[key] != etag]
+            if len(self.mismatched) > 0:
+                # If one hash for a file was wrong don't trust the others we have for it either
+                self.hash_cache.invalidate([jobs[key][0] for key in self.mismatched])
+            for key, digest in single_digests.items():
+                records[key].md5 = digest
+            for key in part_digests:
+                records[key].etag_multipart = etags[key]
+                records[key].part_size = self.chunk_size_bytes
+            self.hash_cache.store([records[key] for key in etags])
+
+        return {**cached_etags, **etags}
+
+    def _hash_range(self, abs_path: str, offset: int, length: int, report: Callable[[int], None]):
+        """MD5 ``length`` bytes of a file starting at ``offset`` using one reusable read buffer"""
+        hash_obj = hashlib.md5(usedforsecurity=False)
+        buffer = bytearray(min(self.read_buffer_size, max(length, 1)))
+        view = memoryview(buffer)
+        remaining = length
+        with open(abs_path, "rb", buffering=0) as f:
+            f.seek(offset)
+            while remaining > 0:
+                if self._cancel_event.is_set():
+                    raise EtagCancelledError("Etag calculation was cancelled")
+                num_read = f.readinto(view[: min(remaining, len(buffer))])
+                if not num_read:
+                    raise OSError(f"File changed while calculating etag: {abs_path}")
+                hash_obj.update(view[:num_read])
+                remaining -= num_read
+                report(num_read)
+        return hash_obj
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, ClassVar
+
+from qgis.core import Qgis, QgsMessageLog
+
+from ..borg import Borg
+from ..settings import CONSTANTS
+
+MESSAGE_CATEGORY = CONSTANTS["logCategory"]
+
+DEFAULT_DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "resources", "query_cache.sqlite"))
+# Least recently used responses are dropped once the cache is bigger than this
+MAX_CACHE_BYTES = 64 * pow(1024, 2)
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+# Query name -> (fresh, stale) in seconds. A response younger than ``fresh`` is used without asking
+# the API. One younger than ``stale`` is used straight away while a new copy is fetched in the
+# background for next time. Anything older is fetched again before it's used.
+# Queries not listed here are never cached.
+QUERY_TTLS: dict[str, tuple[int, int]] = {
+    "getProfile": (10 * 60, DAY),
+    "getProject": (2 * 60, HOUR),
+    "webRaveProject": (HOUR, 30 * DAY),
+    "webRaveDatasetMetadata": (HOUR, 30 * DAY),
+    "getLayerTiles": (DAY, 30 * DAY),
+    "getWebSymbology": (DAY, 30 * DAY),
+}
+# A tile service that is still being built (or failed to build) can change at any moment, so
+# only finished ones are cached
+LAYER_TILES_SUCCESS = "SUCCESS"
+
+
+@dataclass
+class CachedResponse:
+    response: dict
+    fetched_at: float
+    fresh: bool
+
+
+class QueryCacheBorg(Borg):
+    """Shared-state base class so every QueryCache instance uses the same connection"""
+
+    _shared_state: ClassVar[dict] = {}  # own dict — separate from Borg._shared_state
+
+
+class QueryCache(QueryCacheBorg):
+    """On-disk (SQLite) cache of read-only GraphQL responses.
+
+    Entries are keyed on a scope (the API and the user, so nobody sees a response meant for
+    someone else), the query name and its variables. Each query has its own lifetimes (see
+    ``QUERY_TTLS``). The cache is kept under ``MAX_CACHE_BYTES`` by dropping whatever was used
+    least recently. Responses that mention a project are tagged with its id so they can all be
+    forgotten when the project is uploaded. If the database can't be opened or written the
+    cache turns itself off for the session and every query goes to the API as before.
+    """
+
+    def __init__(self):
+        QueryCacheBorg.__init__(self)
+        if "lock" not in self.__dict__:
+            self.lock = threading.Lock()
+            self.db_path = DEFAULT_DB_PATH
+            self.max_bytes = MAX_CACHE_BYTES
+            self.conn: sqlite3.Connection | None = None
+            self.disabled = False
+
+    @staticmethod
+    def key(scope: str, query_name: str, variables: dict[str, Any]) -> str:
+        """Variables are normalized so the same query asked in a different order is the same entry"""
+        normalized = json.dumps(variables or {}, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(f"{scope}\n{query_name}\n{normalized}".encode()).hexdigest()
+
+    @staticmethod
+    def cacheable(query_name: str) -> bool:
+        return query_name in QUERY_TTLS
+
+    @staticmethod
+    def final(query_name: str, response: dict) -> bool:
+        """Whether a response can't change until something is uploaded again"""
+        if query_name == "getLayerTiles":
+            tiles = (response.get("data") or {}).get("getLayerTiles") or {}
+            return tiles.get("state") == LAYER_TILES_SUCCESS
+        return True
+
+    def use_database(self, db_path: str) -> None:
+        """Point the cache at a different SQLite file (closes the current one)"""
+        with self.lock:
+            self._close()
+            self.db_path = db_path
+            self.disabled = False
+
+    def close(self) -> None:
+        with self.lock:
+            self._close()
+
+    def lookup(self, scope: str, query_name: str, variables: dict[str, Any], now: float | None = None) -> CachedResponse | None:
+        """The cached response for this query if it's still young enough to use
+
+        Returns:
+            CachedResponse | None: None when there's nothing usable. ``fresh`` is False when the response should be fetched again in the background
+        """
+        if not self.cacheable(query_name):
+            return None
+        fresh_for, stale_for = QUERY_TTLS[query_name]
+        now = now if now is not None else time.time()
+        key = self.key(scope, query_name, variables)
+        with self.lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute("SELECT response, fetched_at FROM query_cache WHERE key = ?", (key,)).fetchone()
+                if row is None or now - row[1] > stale_for:
+                    return None
+                with conn:
+                    conn.execute("UPDATE query_cache SET last_used = ? WHERE key = ?", (now, key))
+                return CachedResponse(json.loads(row[0]), row[1], now - row[1] <= fresh_for)
+            except (sqlite3.Error, ValueError) as e:
+                self._disable(e)
+                return None
+
+    def store(self, scope: str, query_name: str, variables: dict[str, Any], response: dict, project_id: str | None = None, now: float | None = None) -> None:
+        """Save a response. Called straight after the query so nothing has had a chance to change it"""
+        if not self.cacheable(query_name):
+            return
+        if not self.final(query_name, response):
+            # Don't leave an older, now out of date answer behind either
+            self.forget(scope, query_name, variables)
+            return
+        now = now if now is not None else time.time()
+        text = json.dumps(response, separators=(",", ":"))
+        with self.lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO query_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (self.key(scope, query_name, variables), query_name, project_id, text, len(text), now, now),
+                    )
+                    self._prune(conn)
+            except sqlite3.Error as e:
+                self._disable(e)
+
+    def forget(self, scope: str, query_name: str, variables: dict[str, Any]) -> None:
+        """Drop one response"""
+        with self.lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                with conn:
+                    conn.execute("DELETE FROM query_cache WHERE key = ?", (self.key(scope, query_name, variables),))
+            except sqlite3.Error as e:
+                self._disable(e)
+
+    def invalidate(self, project_id: str | None = None) -> None:
+        """Forget every response about a project (or everything when no project is given)"""
+        with self.lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                with conn:
+                    if project_id is None:
+                        conn.execute("DELETE FROM query_cache")
+                    else:
+                        conn.execute("DELETE FROM query_cache WHERE project_id = ?", (project_id,))
+            except sqlite3.Error as e:
+                self._disable(e)
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        """Drop the least recently used responses until the cache fits. Must be called with the lock held"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM query_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM query_cache ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM query_cache WHERE key = ?", doomed)
+
+    def _connect(self) -> sqlite3.Connection | None:
+        """Open the database on first use. Must be called with the lock held"""
+        if self.disabled:
+            return None
+        if self.conn is None:
+            try:
+                os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+                # Responses are stored from the query callbacks and background revalidations. The lock makes sharing one connection safe
+                self.conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+                self.conn.execute(
+                    """CREATE TABLE IF NOT EXISTS query_cache (
+                        key TEXT PRIMARY KEY,
+                        query_name TEXT NOT NULL,
+                        project_id TEXT,
+                        response TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        fetched_at REAL NOT NULL,
+                        last_used REAL NOT NULL
+                    )"""
+                )
+                self.conn.execute("CREATE INDEX IF NOT EXISTS query_cache_project ON query_cache (project_id)")
+            except (OSError, sqlite3.Error) as e:
+                self._disable(e)
+        return self.conn
+
+    def _close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def _disable(self, error: Exception) -> None:
+        QgsMessageLog.logMessage(f"Query cache disabled ({self.db_path}): {error}", MESSAGE_CATEGORY, level=Qgis.Warning)
+        self._close()
+        self.disabled = True
+
+
+class CachedQueryResult:
+    """Stands in for the ``RunGQLQueryTask`` when a query is answered from the cache, or by a
+    query someone else already had running
+    """
+
+    def __init__(self, query: str, variables: dict[str, Any], response: dict | None, error: Exception | None = None, success: bool = True) -> None:
+        self.query = query
+        self.variables = variables
+        self.response = response
+        self.error = error
+        self.success = success
+
+    def debug_log(self) -> str:
+        return json.dumps({"query": self.query, "variables": self.variables, "error": str(self.error), "shared": True}, indent=4, sort_keys=True)
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+from collections import deque
+import datetime
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, ClassVar
+
+from qgis.core import Qgis
+
+from ..borg import Borg
+
+if TYPE_CHECKING:
+    from ..settings import Settings
+
+# How many seconds of traffic a full bucket holds. Keeps bursts short without starving small reads
+BURST_SECS = 0.5
+MIN_BURST_BYTES = 64 * 1024
+# Waits are broken up so a rate change or a cancel is noticed quickly
+MAX_WAIT_SLICE = 0.25
+# Achieved throughput is averaged over this many seconds
+THROUGHPUT_WINDOW = 5.0
+
+
+def parse_hours(text: str | None) -> tuple[int, int] | None:
+    """Parse a "HH:MM-HH:MM" time-of-day window into minutes after midnight
+
+    Args:
+        text (str | None): e.g. "08:00-18:00". Windows that wrap midnight ("22:00-06:00") are fine
+
+    Raises:
+        ValueError: if the text isn't a valid window
+
+    Returns:
+        tuple[int, int] | None: (start, end) minutes or None for an empty string (always)
+    """
+    if text is None or len(text.strip()) == 0:
+        return None
+    window = []
+    for part in text.split("-"):
+        hours, minutes = part.strip().split(":")
+        hours, minutes = int(hours), int(minutes)
+        if not (0 <= hours <= 24 and 0 <= minutes < 60) or hours * 60 + minutes > 24 * 60:
+            raise ValueError(f"Invalid time: {part}")
+        window.append(hours * 60 + minutes)
+    if len(window) != 2:
+        raise ValueError(f"Expected a window like 08:00-18:00, got: {text}")
+    return window[0], window[1]
+
+
+def in_window(window: tuple[int, int] | None, when: datetime.datetime) -> bool:
+    if window is None:
+        return True
+    start, end = window
+    minute = when.hour * 60 + when.minute
+    if start <= end:
+        return start <= minute < end
+    return minute >= start or minute < end
+
+
+class TokenBucket:
+    """Thread-safe token bucket shared by every transfer going one way.
+
+    ``acquire`` takes the bytes straight away and, if that puts the bucket into debt, waits
+    until the debt has been paid back at ``rate``. Every byte is counted so the aggregate
+    rate of all the threads sharing a bucket stays at the limit however they read.
+
+    A rate of 0 means unlimited. ``set_rate`` can be called at any time, threads that are
+    waiting pick up the new rate within ``MAX_WAIT_SLICE`` seconds.
+    """
+
+    def __init__(self, rate: int = 0, clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep) -> None:
+        self.clock = clock
+        self.sleep = sleep
+        self.lock = threading.Lock()
+        self.rate = 0
+        self.tokens = 0.0
+        self.last_refill = clock()
+        self.total_bytes = 0
+        self._history: deque[tuple[float, int]] = deque()
+        self.set_rate(rate)
+
+    @property
+    def limited(self) -> bool:
+        return self.rate > 0
+
+    def set_rate(self, rate: int | None) -> None:
+        """Change the limit (bytes/sec, 0 or None for unlimited)"""
+        with self.lock:
+            self._refill()
+            self.rate = max(0, int(rate or 0))
+            if self.rate == 0:
+                self.tokens = 0.0
+            else:
+                self.tokens = min(self.tokens, self._capacity())
+
+    def chunk_size(self, default: int) -> int:
+        """A read size that lets the limit be applied smoothly (reading 1MB at a time at 100KB/s would be very bursty)"""
+        if not self.limited:
+            return default
+        return min(default, max(16 * 1024, int(self.rate * MAX_WAIT_SLICE)))
+
+    def acquire(self, num_bytes: int, should_stop: Callable[[], bool] | None = None) -> bool:
+        """Take ``num_bytes`` from the bucket, waiting if we're over the limit
+
+        Args:
+            num_bytes (int): bytes about to be (or just) transferred
+            should_stop (Callable[[], bool] | None): stop waiting when this returns True
+
+        Returns:
+            bool: False if we stopped waiting because of ``should_stop``
+        """
+        with self.lock:
+            self._record(num_bytes)
+            if self.rate > 0:
+                self._refill()
+                self.tokens -= num_bytes
+
+        while True:
+            with self.lock:
+                if self.rate == 0:
+                    return True
+                self._refill()
+                # Allow a byte of float rounding so we never spin on a vanishingly small wait
+                if self.tokens > -1:
+                    return True
+                wait = min(-self.tokens / self.rate, MAX_WAIT_SLICE)
+            if should_stop is not None and should_stop():
+                return False
+            self.sleep(wait)
+
+    @property
+    def throughput(self) -> float:
+        """Bytes/sec achieved over the last ``THROUGHPUT_WINDOW`` seconds"""
+        with self.lock:
+            now = self.clock()
+            self._prune(now)
+            if len(self._history) == 0:
+                return 0.0
+            elapsed = max(now - self._history[0][0], 1.0)
+            return sum(num_bytes for _, num_bytes in self._history) / elapsed
+
+    def _capacity(self) -> float:
+        return max(self.rate * BURST_SECS, MIN_BURST_BYTES)
+
+    def _refill(self) -> None:
+        """Must be called with the lock held"""
+        now = self.clock()
+        if self.rate > 0:
+            self.tokens = min(self._capacity(), self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def _record(self, num_bytes: int) -> None:
+        now = self.clock()
+        self.total_bytes += num_bytes
+        self._history.append((now, num_bytes))
+        self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        while len(self._history) > 0 and now - self._history[0][0] > THROUGHPUT_WINDOW:
+            self._history.popleft()
+
+
+class TransferLimitsBorg(Borg):
+    """Shared-state base class so every upload and download uses the same buckets"""
+
+    _shared_state: ClassVar[dict] = {}  # own dict — separate from Borg._shared_state
+
+
+class TransferLimits(TransferLimitsBorg):
+    """The global upload and download rate limits.
+
+    ``upload`` is used by ``PartialFile.readData`` and ``download`` by ``DownloadFileTask``.
+    Limits are in bytes/sec with 0 for unlimited. If ``hours`` is set the limits only
+    apply inside that time-of-day window, outside it transfers run flat out. Call
+    ``apply`` now and then (the queues do on their timers) to follow the window.
+    """
+
+    def __init__(self):
+        TransferLimitsBorg.__init__(self)
+        if "upload" not in self.__dict__:
+            self.upload = TokenBucket()
+            self.download = TokenBucket()
+            self.upload_limit = 0
+            self.download_limit = 0
+            self.window: tuple[int, int] | None = None
+
+    def configure(self, upload_limit: int | None, download_limit: int | None, hours: str | None = None) -> None:
+        """Set the limits (bytes/sec). Takes effect immediately, including for transfers already running
+
+        Raises:
+            ValueError: if ``hours`` isn't a valid window. The limits are still applied (all day)
+        """
+        self.upload_limit = max(0, int(upload_limit or 0))
+        self.download_limit = max(0, int(download_limit or 0))
+        self.window = None
+        try:
+            self.window = parse_hours(hours)
+        finally:
+            self.apply()
+
+    def configure_from_settings(self, settings: Settings) -> None:
+        """Pick up the KB/s limits and the time window from the plugin settings"""
+        try:
+            self.configure(
+                (settings.getValue("uploadRateLimit") or 0) * 1024,
+                (settings.getValue("downloadRateLimit") or 0) * 1024,
+                settings.getValue("rateLimitHours"),
+            )
+        except ValueError as e:
+            settings.log(f"Ignoring the transfer limit hours setting: {e}", Qgis.Warning)
+
+    def apply(self, now: datetime.datetime | None = None) -> None:
+        """Turn the limits on or off depending on the time of day"""
+        active = in_window(self.window, now or datetime.datetime.now())
+        self.upload.set_rate(self.upload_limit if active else 0)
+        self.download.set_rate(self.download_limit if active else 0)
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Callable
+import threading
+import time
+from typing import Any, ClassVar
+
+from qgis.core import QgsApplication
+
+from ..borg import Borg
+from ..GraphQLAPI import FetchJsonTask
+
+# index.json files kept in memory. Each is a few KB so this is plenty for a session
+MAX_INDEX_ENTRIES = 256
+
+# The stages of fetching a remote layer (see RemoteLayerFetch)
+TILES_STAGE = "getLayerTiles"
+INDEX_STAGE = "index.json"
+SYMBOLOGY_STAGE = "getWebSymbology"
+
+
+class TileIndexCacheBorg(Borg):
+    """Shared-state base class so every layer sees the same index.json files"""
+
+    _shared_state: ClassVar[dict] = {}  # own dict — separate from Borg._shared_state
+
+
+class TileIndexCache(TileIndexCacheBorg):
+    """The ``index.json`` of each tile service, fetched once per session.
+
+    A tile service only changes when its project is uploaded again, so the file is kept in memory
+    (keyed on its URL) until then. Layers that ask for a file that's already being fetched wait on
+    that fetch instead of starting another one. Failed fetches aren't remembered.
+    """
+
+    def __init__(self):
+        TileIndexCacheBorg.__init__(self)
+        if "entries" not in self.__dict__:
+            self.lock = threading.Lock()
+            self.max_entries = MAX_INDEX_ENTRIES
+            # url -> (index.json, project id)
+            self.entries: OrderedDict[str, tuple[dict, str | None]] = OrderedDict()
+            # url -> callbacks waiting on the fetch that's running
+            self.in_flight: dict[str, list[Callable[[dict | None, Exception | None], None]]] = {}
+
+    def get(self, url: str) -> dict | None:
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry is None:
+                return None
+            self.entries.move_to_end(url)
+            return entry[0]
+
+    def fetch(self, url: str, callback: Callable[[dict | None, Exception | None], None], project_id: str | None = None) -> None:
+        """Call back (on the main thread) with the index.json at ``url``, or None and the error.
+
+        Callers get their own copy so they can add to it.
+        """
+        cached = self.get(url)
+        if cached is not None:
+            callback(dict(cached), None)
+            return
+        with self.lock:
+            if url in self.in_flight:
+                self.in_flight[url].append(callback)
+                return
+            self.in_flight[url] = [callback]
+
+        def _on_fetched(task: FetchJsonTask) -> None:
+            result = task.result if task.success and isinstance(task.result, dict) else None
+            with self.lock:
+                callbacks = self.in_flight.pop(url, [])
+                if result is not None:
+                    self.entries[url] = (result, project_id)
+                    self.entries.move_to_end(url)
+                    while len(self.entries) > self.max_entries:
+                        self.entries.popitem(last=False)
+            for waiting in callbacks:
+                waiting(dict(result) if result is not None else None, task.error)
+
+        QgsApplication.taskManager().addTask(FetchJsonTask(url, _on_fetched))
+
+    def invalidate(self, project_id: str | None = None) -> None:
+        """Forget the files of a project's tile services (or all of them when no project is given)"""
+        with self.lock:
+            if project_id is None:
+                self.entries.clear()
+                return
+            for url in [url for url, (_index, owner) in self.entries.items() if owner == project_id]:
+                del self.entries[url]
+
+
+class RemoteLayerFetch:
+    """Everything a remote layer needs before it can go on the map, fetched as a small pipeline::
+
+        getLayerTiles ──> index.json ──┐
+        getWebSymbology ───────────────┴──> on_ready
+
+    The caller starts each stage when whatever it depends on has arrived, and reports back with
+    ``done()``. Stages that don't depend on each other run at the same time. ``on_ready`` is
+    called once every stage is done, unless ``fail()`` was called first. How long each stage took
+    is kept so it can be logged.
+    """
+
+    def __init__(self, label: str, stages: list[str], on_ready: Callable[[RemoteLayerFetch], None]) -> None:
+        self.label = label
+        self.on_ready = on_ready
+        self.results: dict[str, Any] = {}
+        self.pending = list(stages)
+        self.started: dict[str, float] = {}
+        self.elapsed: dict[str, float] = {}
+        self.created = time.perf_counter()
+        self.failed = False
+
+    def start(self, stage: str) -> None:
+        self.started[stage] = time.perf_counter()
+
+    def done(self, stage: str, result: Any = None) -> None:
+        if self.failed or stage not in self.pending:
+            return
+        self.elapsed[stage] = time.perf_counter() - self.started.get(stage, self.created)
+        self.results[stage] = result
+        self.pending.remove(stage)
+        if not self.pending:
+            self.on_ready(self)
+
+    def fail(self) -> None:
+        """Stop here. Stages still running are ignored when they come back"""
+        self.failed = True
+
+    def total(self) -> float:
+        return time.perf_counter() - self.created
+
+    def timings(self) -> str:
+        """e.g. ``getLayerTiles 120 ms, index.json 45 ms, getWebSymbology 80 ms, total 170 ms``"""
+        stages = [f"{stage} {elapsed * 1000:.0f} ms" for stage, elapsed in self.elapsed.items()]
+        return ", ".join([*stages, f"total {self.total() * 1000:.0f} ms"])
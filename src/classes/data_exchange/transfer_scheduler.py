@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable
+
+# How often (seconds) aggregate throughput is sampled and the limit reconsidered
+SAMPLE_INTERVAL = 5.0
+# An extra stream has to buy at least this much more aggregate throughput to be kept
+MIN_GAIN = 0.05
+# After a probe that didn't help we sit at the limit for this many samples before probing again
+HOLD_SAMPLES = 6
+
+
+class AdaptiveConcurrency:
+    """AIMD-style controller for how many transfers a queue runs at once.
+
+    The queues feed it the total number of bytes moved so far and it samples aggregate
+    throughput every ``sample_interval`` seconds:
+
+    * Additive increase: while the queue is using every slot, try one more stream. Keep it
+      if aggregate throughput went up by at least ``MIN_GAIN``, otherwise drop back and
+      hold for a while before probing again.
+    * Multiplicative decrease: a failed or retried transfer (dropped connection, 5xx, 429)
+      halves the limit straight away.
+
+    With ``min_streams == max_streams`` it is just a fixed limit.
+    """
+
+    def __init__(
+        self,
+        min_streams: int,
+        max_streams: int,
+        initial: int | None = None,
+        sample_interval: float = SAMPLE_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.min_streams = max(1, min_streams)
+        self.max_streams = max(self.min_streams, max_streams)
+        self.limit = min(max(initial if initial is not None else self.min_streams, self.min_streams), self.max_streams)
+        self.sample_interval = sample_interval
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._sample_start: float | None = None
+        self._sample_bytes = 0
+        self._last_bytes: int | None = None
+        # Throughput (bytes/sec) at the limit before the last probe, and the limit we probed from
+        self._baseline: float | None = None
+        self._probe_from: int | None = None
+        self._hold = 0
+        self.throughput = 0.0
+
+    def update(self, total_bytes: int, active_streams: int) -> int:
+        """Report progress and get the current limit back
+
+        Args:
+            total_bytes (int): bytes transferred so far by the whole queue. Going backwards (a retry) is fine
+            active_streams (int): transfers currently running
+
+        Returns:
+            int: how many transfers should be running
+        """
+        with self._lock:
+            now = self.clock()
+            if self._last_bytes is None or self._sample_start is None:
+                self._last_bytes = total_bytes
+                self._sample_start = now
+                return self.limit
+
+            self._sample_bytes += max(0, total_bytes - self._last_bytes)
+            self._last_bytes = total_bytes
+
+            elapsed = now - self._sample_start
+            if elapsed < self.sample_interval:
+                return self.limit
+
+            self.throughput = self._sample_bytes / elapsed
+            self._sample_bytes = 0
+            self._sample_start = now
+            # Only a queue that is using every slot tells us anything about the limit
+            if active_streams >= self.limit:
+                self._adjust()
+            return self.limit
+
+    def record_failure(self) -> int:
+        """A transfer failed or had to retry: back off hard"""
+        with self._lock:
+            self.limit = max(self.min_streams, self.limit // 2)
+            self._baseline = None
+            self._probe_from = None
+            self._hold = HOLD_SAMPLES
+            return self.limit
+
+    def _adjust(self) -> None:
+        if self._probe_from is not None:
+            # We just added a stream. Was it worth it?
+            if self._baseline is not None and self.throughput < self._baseline * (1 + MIN_GAIN):
+                self.limit = self._probe_from
+                self._hold = HOLD_SAMPLES
+            self._probe_from = None
+            self._baseline = self.throughput
+            return
+
+        if self._hold > 0:
+            self._hold -= 1
+            self._baseline = self.throughput
+            return
+
+        if self.limit < self.max_streams:
+            self._probe_from = self.limit
+            self._baseline = self.throughput
+            self.limit += 1
@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import datetime
+import json
+import os
+import threading
+import time
+from typing import TYPE_CHECKING
+from urllib.parse import parse_qs, urlparse
+
+if TYPE_CHECKING:
+    from .DataExchangeAPI import UploadFile
+
+JOURNAL_FILE = "RiverscapesViewer-Upload.journal.json"
+# Finished parts are appended to this file (next to the journal) instead of rewriting the journal each time
+PARTS_LOG_SUFFIX = ".parts"
+JOURNAL_VERSION = 1
+# Presigned URLs that run out sooner than this are asked for again instead of reused
+URL_EXPIRY_MARGIN = 15 * 60  # seconds
+
+
+def url_expiry(url: str) -> float | None:
+    """When a presigned S3 URL stops working (seconds since the epoch), or None if the URL doesn't say"""
+    query = parse_qs(urlparse(url).query)
+    try:
+        # Signature version 4
+        if "X-Amz-Date" in query and "X-Amz-Expires" in query:
+            signed_on = datetime.datetime.strptime(query["X-Amz-Date"][0], "%Y%m%dT%H%M%SZ").replace(tzinfo=datetime.timezone.utc)
+            return signed_on.timestamp() + int(query["X-Amz-Expires"][0])
+        # Signature version 2
+        if "Expires" in query:
+            return float(query["Expires"][0])
+    except ValueError:
+        return None
+    return None
+
+
+class JournalFile:
+    """One file of a journalled upload"""
+
+    def __init__(self, rel_path: str, size: int, mtime: float, etag: str, op: str, urls: list[str], done_parts: list[int] | None = None, done: bool = False):
+        self.rel_path = rel_path
+        self.size = size
+        # Size and modification time when the upload started. If either changes the upload can't be resumed
+        self.mtime = mtime
+        self.etag = etag
+        self.op = op
+        self.urls = urls
+        self.done_parts: set[int] = set(done_parts or [])
+        self.done = done
+
+    def to_dict(self) -> dict:
+        return {
+            "rel_path": self.rel_path,
+            "size": self.size,
+            "mtime": self.mtime,
+            "etag": self.etag,
+            "op": self.op,
+            "urls": self.urls,
+            "done_parts": sorted(self.done_parts),
+            "done": self.done,
+        }
+
+    @classmethod
+    def from_dict(cls, obj: dict) -> JournalFile:
+        return cls(obj["rel_path"], obj["size"], obj["mtime"], obj["etag"], obj["op"], obj["urls"], obj["done_parts"], obj["done"])
+
+
+class UploadJournal:
+    """A record of an upload in progress so it can be picked up again after the dialog (or QGIS) is closed.
+
+    Saved next to the upload log in the project folder. It has the upload token, every file
+    being uploaded (with its size, modification time, etag and presigned URLs) and which parts
+    and files have finished.
+
+    The journal itself is only written by ``save()`` (when the upload starts or gets new URLs).
+    Parts that finish in between are appended to a small log next to it, one line each, from
+    the upload task threads, so at most the parts that were in flight are lost. ``load()`` plays
+    the log back. Both files are deleted once the Data Exchange has the project.
+    """
+
+    def __init__(self, path: str, token: str, new_project_id: str, api_url: str, files: dict[str, JournalFile], created: str | None = None):
+        self.path = path
+        self.token = token
+        self.new_project_id = new_project_id
+        self.api_url = api_url
+        self.files = files
+        self.created = created or datetime.datetime.now().isoformat()
+        self.parts_log_path = path + PARTS_LOG_SUFFIX
+        self._lock = threading.RLock()
+
+    @classmethod
+    def for_upload(cls, path: str, project_dir: str, token: str, new_project_id: str, api_url: str, upload_files: list[UploadFile]) -> UploadJournal:
+        """A journal for a new upload. Nothing is written until ``save()``"""
+        files = {}
+        for upload_file in upload_files:
+            stat = os.stat(os.path.join(project_dir, upload_file.rel_path))
+            files[upload_file.rel_path] = JournalFile(upload_file.rel_path, stat.st_size, stat.st_mtime, upload_file.etag, upload_file.op, list(upload_file.urls))
+        return cls(path, token, new_project_id, api_url, files)
+
+    @classmethod
+    def load(cls, path: str) -> UploadJournal | None:
+        """The journal saved at this path. None if there isn't one or it can't be read"""
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                obj = json.load(f)
+            if obj.get("version") != JOURNAL_VERSION:
+                return None
+            files = {file_obj["rel_path"]: JournalFile.from_dict(file_obj) for file_obj in obj["files"]}
+            journal = cls(path, obj["token"], obj["new_project_id"], obj["api_url"], files, obj["created"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        journal._replay_parts_log()
+        return journal
+
+    def _replay_parts_log(self) -> None:
+        """Mark the parts in the log as done. A line that didn't get written completely is skipped"""
+        try:
+            with open(self.parts_log_path, encoding="utf-8") as f:
+                lines = f.readlines()
+        except OSError:
+            return
+        for line in lines:
+            try:
+                rel_path, idx = json.loads(line)
+                self._mark_done(self.files[rel_path], idx)
+            except (ValueError, KeyError, TypeError):
+                continue
+
+    @staticmethod
+    def _mark_done(journal_file: JournalFile, idx: int) -> None:
+        journal_file.done_parts.add(idx)
+        journal_file.done = len(journal_file.done_parts) >= len(journal_file.urls)
+
+    def save(self) -> None:
+        with self._lock:
+            obj = {
+                "version": JOURNAL_VERSION,
+                "token": self.token,
+                "new_project_id": self.new_project_id,
+                "api_url": self.api_url,
+                "created": self.created,
+                "files": [journal_file.to_dict() for journal_file in self.files.values()],
+            }
+            # Everything in the log is in the journal now. It goes first: if the journal then
+            # can't be written the old one is still right, it just doesn't know about a few parts
+            if os.path.isfile(self.parts_log_path):
+                os.remove(self.parts_log_path)
+            # Write then rename so a crash part way through never leaves half a journal
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(obj, f)
+            os.replace(tmp_path, self.path)
+
+    def remove(self) -> None:
+        with self._lock:
+            for path in [self.parts_log_path, self.path]:
+                if os.path.isfile(path):
+                    os.remove(path)
+
+    def part_done(self, rel_path: str, idx: int) -> None:
+        """Record a finished part. Called from the upload task threads"""
+        with self._lock:
+            self._mark_done(self.files[rel_path], idx)
+            try:
+                with open(self.parts_log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps([rel_path, idx]) + "\n")
+            except OSError:
+                # Not worth stopping the upload for. A resume would just upload this part again
+                pass
+
+    def set_urls(self, rel_path: str, urls: list[str]) -> None:
+        """New presigned URLs for a file. They may be for a new multipart upload so the file starts over"""
+        with self._lock:
+            journal_file = self.files[rel_path]
+            journal_file.urls = list(urls)
+            journal_file.done_parts = set()
+            journal_file.done = False
+
+    def remaining(self) -> list[JournalFile]:
+        """The files that haven't finished uploading"""
+        return [journal_file for journal_file in self.files.values() if not journal_file.done]
+
+    def remaining_bytes(self) -> int:
+        return sum(journal_file.size for journal_file in self.remaining())
+
+    def changed_files(self, project_dir: str) -> list[str]:
+        """Files that have been changed (or removed) since the upload started. The upload can't be resumed if there are any"""
+        changed = []
+        for journal_file in self.files.values():
+            try:
+                stat = os.stat(os.path.join(project_dir, journal_file.rel_path))
+            except OSError:
+                changed.append(journal_file.rel_path)
+                continue
+            if stat.st_size != journal_file.size or stat.st_mtime != journal_file.mtime:
+                changed.append(journal_file.rel_path)
+        return changed
+
+    def expired_files(self, now: float | None = None) -> list[str]:
+        """Files still to upload whose URLs have run out (or soon will, or we can't tell)"""
+        cutoff = (now if now is not None else time.time()) + URL_EXPIRY_MARGIN
+        expired = []
+        for journal_file in self.remaining():
+            urls = [url for idx, url in enumerate(journal_file.urls) if idx not in journal_file.done_parts]
+            expiries = [url_expiry(url) for url in urls]
+            if len(urls) == 0 or any(expiry is None or expiry < cutoff for expiry in expiries):
+                expired.append(journal_file.rel_path)
+        return expired
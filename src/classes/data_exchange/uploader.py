@@ -2,18 +2,29 @@ from __future__ import annotations
 
 import json
 import math
+import mmap
 import os
 import time
 from typing import Any, Callable
 
 from qgis.core import Qgis, QgsApplication, QgsTask
-from qgis.PyQt.QtCore import QByteArray, QEventLoop, QFile, QIODevice, QObject, QUrl, pyqtSignal
+from qgis.PyQt.QtCore import QByteArray, QEventLoop, QFile, QIODevice, QObject, QTimer, QUrl, pyqtSignal
 from qgis.PyQt.QtNetwork import QNetworkAccessManager, QNetworkRequest
 
 from ...compat import NET_CONTENT_LENGTH_HEADER, NET_NO_ERROR, NET_OP_CANCELED_ERROR, QGSTASK_CAN_CANCEL, QGSTASK_SILENT
 from ..util import MULTIPART_CHUNK_SIZE
+from .rate_limiter import TokenBucket, TransferLimits
+from .transfer_scheduler import SAMPLE_INTERVAL, AdaptiveConcurrency
 
 MAX_PROGRESS_INTERVAL = 1  # seconds
+# Parts of one multipart file uploaded at the same time. A single huge file otherwise goes up over one connection
+MAX_PARTS_IN_FLIGHT = 4
+RETRY_DELAY = 1  # seconds
+CANCEL_CHECK_INTERVAL = 200  # milliseconds
+# How often the bytes sent by the parts are added up and passed on. Not on every read: that's thousands of times a second
+PROGRESS_PUBLISH_INTERVAL = 250  # milliseconds
+# Bytes read from disk at a time for a part that can't be memory-mapped
+READ_BUFFER_SIZE = 4 * pow(1024, 2)
 
 # QT5 -> QT6 compatibility for QIODevice.OpenMode type
 # Qt5 exposes QIODevice.OpenMode/ReadOnly, Qt6 uses OpenModeFlag.ReadOnly.
@@ -26,41 +37,130 @@ else:
 
 
 class PartialFile(QFile):
-    def __init__(self, filepath: str, start: int, end: int, log_callback: Callable | None = None, progress_callback: Callable | None = None):
+    """One part of a file as the body of a ``QNetworkAccessManager.put``.
+
+    Qt asks for the body a few KB at a time and every one of those is a call into Python,
+    so ``readData`` does as little as possible: the part is memory-mapped (or read through
+    a large buffer if it can't be) and the bytes handed to Qt are only added to a counter.
+    ``UploadMultiPartFileTask`` picks the counts up on a timer.
+    """
+
+    def __init__(
+        self,
+        filepath: str,
+        start: int,
+        end: int,
+        log_callback: Callable | None = None,
+        rate_limiter: TokenBucket | None = None,
+        should_stop: Callable[[], bool] | None = None,
+    ):
         super().__init__(filepath)
         self.log = log_callback
-        self.progress_callback = progress_callback
+        self.rate_limiter = rate_limiter
+        self.should_stop = should_stop
         self.start = start
         self.end = end
         self.current_pos = start
         self.part_size = end - start
+        # Bytes of the part handed to Qt so far. Only written by the thread the upload runs on
+        self.bytes_read = 0
+        # Bytes read while the upload wasn't limited that the rate limiter hasn't been told about yet
+        self.unmetered = 0
+        self._source = None
+        self._mmap: mmap.mmap | None = None
+        self._mmap_offset = 0
 
     def open(self, mode: Any) -> bool:
         fileopen = super().open(mode)
         self.seek(self.start)
+        if fileopen:
+            self._open_source()
         return fileopen
 
+    def _open_source(self) -> None:
+        self._source = open(self.fileName(), "rb", buffering=READ_BUFFER_SIZE)
+        try:
+            # Mappings have to start on a multiple of the allocation granularity
+            self._mmap_offset = self.start - self.start % mmap.ALLOCATIONGRANULARITY
+            self._mmap = mmap.mmap(self._source.fileno(), self.end - self._mmap_offset, offset=self._mmap_offset, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            # Some network file systems can't be mapped. The buffered reads are nearly as quick
+            self._mmap = None
+            if self.log:
+                self.log(f"Could not memory-map {self.fileName()}. Reading it instead: {e!s}", Qgis.Info)
+
+    def seek(self, pos: int) -> bool:
+        # Qt seeks back to the start of the part if it has to send the body again
+        self.current_pos = pos
+        self.bytes_read = max(0, pos - self.start)
+        return super().seek(pos)
+
     def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._source is not None:
+            self._source.close()
+            self._source = None
         return super().close()
 
     def readData(self, maxlen: int) -> bytes:
-        actual_len = maxlen
-
-        if self.current_pos + maxlen > self.end:
-            actual_len = self.end - self.current_pos
+        actual_len = min(maxlen, self.end - self.current_pos)
 
         if actual_len <= 0:
             return QByteArray()
 
-        self.current_pos += actual_len
-        self.progress_callback(actual_len)
-        return super().readData(actual_len)  # Call read method of superclass
+        # Blocks while we're over the upload limit. The reply gets aborted if the task is cancelled
+        if self.rate_limiter is not None and self.rate_limiter.limited:
+            self.rate_limiter.acquire(actual_len, self.should_stop)
+        else:
+            self.unmetered += actual_len
+
+        if self._mmap is not None:
+            offset = self.current_pos - self._mmap_offset
+            data = self._mmap[offset : offset + actual_len]
+        else:
+            if self._source.tell() != self.current_pos:
+                self._source.seek(self.current_pos)
+            data = self._source.read(actual_len)
+
+        self.current_pos += len(data)
+        self.bytes_read += len(data)
+        return data
+
+
+class FilePart:
+    """One part of a multipart upload (one presigned URL) and the state of its current attempt"""
+
+    def __init__(self, idx: int, url: str, start: int, end: int):
+        self.idx = idx
+        self.url = url
+        self.start = start
+        self.end = end
+        self.attempts = 0
+        # Bytes of the current attempt already counted in the task's uploaded_size
+        self.sent = 0
+        self.done = False
+        self.reply = None
+        self.partial_file: PartialFile | None = None
 
 
 class UploadMultiPartFileTask(QgsTask):
     cancelled = pyqtSignal()
 
-    def __init__(self, rel_path: str, abs_path: str, urls: list[str], ext_prog_callback: Callable[[int], None] | None = None, log_callback: Callable[[int], None] | None = None, retries=5):
+    def __init__(
+        self,
+        rel_path: str,
+        abs_path: str,
+        urls: list[str],
+        ext_prog_callback: Callable[[int], None] | None = None,
+        log_callback: Callable[[int], None] | None = None,
+        retries=5,
+        retry_callback: Callable[[], None] | None = None,
+        parts_in_flight: int = MAX_PARTS_IN_FLIGHT,
+        done_parts: set[int] | None = None,
+        part_done_callback: Callable[[int], None] | None = None,
+    ):
         super().__init__(f"Upload {rel_path}", QGSTASK_CAN_CANCEL | QGSTASK_SILENT)
         self.rel_path = rel_path
         self.file_path = abs_path
@@ -70,14 +170,30 @@ class UploadMultiPartFileTask(QgsTask):
         self.uploaded_size = 0
         self.allowed_retries = retries
         self.retry_count = 0
-        self.nam = QNetworkAccessManager()
+        # Called (from the task thread) every time a chunk fails and has to be retried
+        self.retry_callback = retry_callback
+        self.parts_in_flight = max(1, parts_in_flight)
+        self.nam: QNetworkAccessManager | None = None
         self.total_size = os.path.getsize(abs_path)
         self.chunk_size = MULTIPART_CHUNK_SIZE
         self.chunks = math.ceil(self.total_size / self.chunk_size)
+        # Parts already uploaded by an earlier (resumed) attempt. They count as uploaded straight away
+        self.done_parts = set(done_parts or [])
+        self.uploaded_size = sum(end - start for start, end in (self._part_range(idx) for idx in self.done_parts if idx < self.chunks))
+        # Called (from the task thread) with the index of every part that finishes
+        self.part_done_callback = part_done_callback
+        self.parts: list[FilePart] = []
+        self._next_part = 0
+        # Parts uploading or waiting to retry
+        self._active_parts = 0
+        self._loop: QEventLoop | None = None
         self.error = None
 
     def cancel(self) -> None:
-        """Implements a really simple cancel method that just emits a signal when the task is cancelled"""
+        """Implements a really simple cancel method that just emits a signal when the task is cancelled
+
+        The upload itself notices ``isCanceled()`` on its own thread (see ``_check_cancelled``)
+        """
         self.file_upload_log(f"Cancelling task: {self.description()}", Qgis.Info)
         super().cancel()
         self.cancelled.emit()
@@ -102,6 +218,8 @@ class UploadMultiPartFileTask(QgsTask):
             "total_size": self.total_size,
             "chunk_size": self.chunk_size,
             "chunks": self.chunks,
+            "parts_in_flight": self.parts_in_flight,
+            "parts_done": sum(1 for part in self.parts if part.done),
             "retry_count": self.retry_count,
             "allowed_retries": self.allowed_retries,
             "errors": str(self.error),
@@ -111,123 +229,155 @@ class UploadMultiPartFileTask(QgsTask):
         json_str = json_str.replace(os.linesep, "\n                ")
         return json_str
 
-    def _progress_callback(self, bytesSent: int) -> None:
-        """When we get a progress update from the task, we update the total uploaded size"""
-        # self.file_upload_log(f"      Progress callback: {bytesSent} of {self.file_path}", Qgis.Info)
-        self.uploaded_size += bytesSent
-        if self.ext_prog_callback:
+    def _collect_progress(self, part: FilePart) -> int:
+        """Move what the part has read since last time into uploaded_size. Returns how much that was"""
+        partial_file = part.partial_file
+        if partial_file is None:
+            return 0
+        sent = partial_file.bytes_read - part.sent
+        part.sent += sent
+        self.uploaded_size += sent
+        # Unlimited reads aren't metered as they happen but they still count towards the speed shown in the dialog
+        if partial_file.unmetered > 0:
+            unmetered = partial_file.unmetered
+            partial_file.unmetered = 0
+            if partial_file.rate_limiter is not None:
+                partial_file.rate_limiter.acquire(unmetered, self.isCanceled)
+        return sent
+
+    def _publish_progress(self) -> None:
+        """Runs on a timer while parts are uploading"""
+        sent = 0
+        for part in self.parts:
+            sent += self._collect_progress(part)
+        if sent != 0 and self.ext_prog_callback:
             self.ext_prog_callback()
 
-    def upload_file_part(self, url: str, start: int, end: int) -> bool:
-        """This is the actual upload code that will physically send all or part of a local file to a single remote URL
-
-        Args:
-            url (str): _description_
-            start (int): 0 for single file or the first chunk of a multipart upload
-            end (int): The last byte of the chunk to upload. End of file for single file or the last byte of the chunk for multipart
-
-        Returns:
-            bool: _description_
-        """
-
-        # Keep track of the original size before upload so we can reset if the upload fails
-        original_size = self.uploaded_size
+    def _part_range(self, idx: int) -> tuple[int, int]:
+        """Start and end bytes of a part"""
+        start = idx * self.chunk_size
+        end = (idx + 1) * self.chunk_size if idx < self.chunks - 1 else self.total_size
+        return start, end
 
-        for _ in range(self.allowed_retries):
-            self.error = None
-            partial_file = None
-            handle_cancelled_fn = None
-            try:
-                loop = QEventLoop()
-                part_size = end - start
-                self.file_upload_log(f"Uploading chunk bytes {start:,} - {end:,} for file: {self.rel_path} Retry: {self.retry_count}", Qgis.Info)
-
-                request = QNetworkRequest(QUrl(url))
-                request.setHeader(NET_CONTENT_LENGTH_HEADER, part_size)
-
-                partial_file = PartialFile(self.file_path, start, end, self.file_upload_log, self._progress_callback)
-                partial_file.open(READ_ONLY_MODE)
-
-                # Start the actual Call
-                self.reply = self.nam.put(request, partial_file)
-
-                def handle_cancelled(pf=partial_file, lp=loop):
-                    """Make sure we clean up and close file handles if the cancel signal has been called"""
-                    self.error = NET_OP_CANCELED_ERROR
-                    self.reply.abort()
-                    # Quit the loop directly as a safety measure — abort() triggering
-                    # finished → handle_done is not guaranteed if the reply is already
-                    # done (abort() on a finished reply is a no-op in Qt).
-                    lp.quit()
-
-                # Handle the network request completion
-                def handle_done(pf=partial_file, lp=loop):
-                    # Detect if the reply was cancelled
-                    if self.reply.error() == NET_OP_CANCELED_ERROR:
-                        self.error = NET_OP_CANCELED_ERROR
-                        lp.quit()
-                    elif self.reply.error() != NET_NO_ERROR:
-                        # Capture the error and quit the loop cleanly.  Do NOT raise
-                        # an exception here: in PyQt6, exceptions raised inside a Qt
-                        # slot called from C++ (i.e. from within loop.exec()) are
-                        # caught by PyQt's trampoline, NOT propagated through exec().
-                        # They are dispatched to sys.excepthook instead, which in QGIS
-                        # shows an error dialog — and because lp.quit() is never
-                        # reached the event loop keeps spinning, causing repeat dialogs.
-                        self.error = self.reply.errorString()
-                        lp.quit()
-                    else:
-                        self.reply.close()
-                        pf.close()
-                        lp.quit()
-
-                # If the task is cancelled, abort the upload
-                handle_cancelled_fn = handle_cancelled
-                self.cancelled.connect(handle_cancelled)
-                self.reply.finished.connect(handle_done)
-
-                # Wait for the upload to complete or for the task to be cancelled
-                loop.exec()
-
-            except Exception as e:
-                self.uploaded_size = original_size
-                self.error = f"Error while uploading chunk {start}-{end} to {url}: {e!s}"
-                self.file_upload_log(f"{self.error}", Qgis.Info)
-            finally:
-                # Always disconnect handle_cancelled to prevent connections accumulating
-                # across retries and chunks.  Without this, every retry adds another
-                # closure to self.cancelled, so a cancel signal would fire N×retries
-                # handler calls, each calling self.reply.abort() on the live reply.
-                if handle_cancelled_fn is not None:
-                    try:
-                        self.cancelled.disconnect(handle_cancelled_fn)
-                    except Exception:
-                        pass
-                # Ensure the partial file is closed even if handle_done didn't run
-                if partial_file is not None and partial_file.isOpen():
-                    partial_file.close()
-
-            # Evaluate outcome after the loop (and after finally cleanup)
-            if self.error == NET_OP_CANCELED_ERROR:
-                # Cancelled — don't retry
-                return False
-            elif self.error:
-                self.uploaded_size = original_size
-                self.file_upload_log(f"ERROR: uploading chunk {start}-{end} to {url}: {self.error}", Qgis.Critical)
-                self.retry_count += 1
-                time.sleep(1)  # Brief pause before retrying
-                # fall through to next iteration
+    def _make_parts(self) -> list[FilePart]:
+        """One part per URL (1 for single file, many for multipart)"""
+        parts = []
+        for idx, url in enumerate(self.urls):
+            part = FilePart(idx, url, *self._part_range(idx))
+            part.done = idx in self.done_parts
+            parts.append(part)
+        return parts
+
+    def _start_parts(self) -> None:
+        """Start the next parts until ``parts_in_flight`` of them are going"""
+        while self.error is None and self._active_parts < self.parts_in_flight and self._next_part < len(self.parts):
+            part = self.parts[self._next_part]
+            self._next_part += 1
+            if part.done:
+                continue
+            self._active_parts += 1
+            self._start_part(part)
+
+    def _start_part(self, part: FilePart) -> None:
+        """Send one part of the file to its URL. ``_part_finished`` is called when it's done"""
+        # Another part failed (or the task was cancelled) while this one was waiting to retry
+        if self.error is not None:
+            return
+        try:
+            self.file_upload_log(f"Uploading part {part.idx + 1} of {self.chunks} (bytes {part.start:,} - {part.end:,}) for file: {self.rel_path} Retry: {part.attempts}", Qgis.Info)
+            request = QNetworkRequest(QUrl(part.url))
+            request.setHeader(NET_CONTENT_LENGTH_HEADER, part.end - part.start)
+
+            part.partial_file = PartialFile(self.file_path, part.start, part.end, self.file_upload_log, TransferLimits().upload, self.isCanceled)
+            part.partial_file.open(READ_ONLY_MODE)
+
+            reply = self.nam.put(request, part.partial_file)
+            part.reply = reply
+            reply.finished.connect(lambda p=part, r=reply: self._part_finished(p, r))
+        except Exception as e:
+            self._close_part(part)
+            self._part_failed(part, f"Error while uploading chunk {part.start}-{part.end} to {part.url}: {e!s}")
+
+    def _part_finished(self, part: FilePart, reply: Any) -> None:
+        # Replies we aborted ourselves have already been dealt with
+        if part.reply is not reply:
+            return
+        # Don't raise in here: in PyQt6, exceptions raised inside a Qt slot called from
+        # C++ (i.e. from within loop.exec()) are NOT propagated through exec(). They go to
+        # sys.excepthook instead, which in QGIS shows an error dialog, and the event loop
+        # keeps spinning.
+        if reply.error() == NET_OP_CANCELED_ERROR:
+            self._close_part(part)
+            self._stop(NET_OP_CANCELED_ERROR)
+        elif reply.error() != NET_NO_ERROR:
+            error = reply.errorString()
+            self._close_part(part)
+            self._part_failed(part, error)
+        else:
+            self._close_part(part)
+            part.done = True
+            self._active_parts -= 1
+            self.file_upload_log(f"SUCCESS: Finished uploading chunk {part.start:,}-{part.end:,}", Qgis.Info)
+            if self.ext_prog_callback:
+                self.ext_prog_callback()
+            if self.part_done_callback:
+                self.part_done_callback(part.idx)
+            self._start_parts()
+            if self._active_parts == 0:
+                self._loop.quit()
+
+    def _part_failed(self, part: FilePart, error: str) -> None:
+        """Take the part's bytes back off the progress and try it again after a pause (unless it has run out of retries)"""
+        self.uploaded_size -= part.sent
+        part.sent = 0
+        part.attempts += 1
+        self.file_upload_log(f"ERROR: uploading chunk {part.start}-{part.end} to {part.url}: {error}", Qgis.Critical)
+        self.retry_count += 1
+        if self.retry_callback:
+            self.retry_callback()
+        if part.attempts >= self.allowed_retries:
+            self._stop(f"Part {part.idx + 1} of {self.chunks} failed after {part.attempts} attempts: {error}")
+            return
+        # The part keeps its slot while it waits so we never have more than parts_in_flight going
+        QTimer.singleShot(int(RETRY_DELAY * 1000), lambda p=part: self._start_part(p))
+
+    def _check_cancelled(self) -> None:
+        """Cancel is called on the main thread but the replies belong to this one so we check for it here"""
+        if self.isCanceled():
+            self._stop(NET_OP_CANCELED_ERROR)
+
+    def _stop(self, error: str | int) -> None:
+        """Abort every part that's still going and end the run"""
+        if self.error is None:
+            self.error = error
+        for part in self.parts:
+            self._close_part(part, abort=True)
+        if self._loop is not None:
+            self._loop.quit()
+
+    def _close_part(self, part: FilePart, abort: bool = False) -> None:
+        # Count what it read before it goes
+        self._collect_progress(part)
+        reply = part.reply
+        # Clear it first: abort() calls _part_finished straight away
+        part.reply = None
+        if reply is not None:
+            if abort:
+                reply.abort()
             else:
-                self.file_upload_log(f"SUCCESS: Finished uploading chunk {start:,}-{end:,}", Qgis.Info)
-                return True
-
-        return False
+                reply.close()
+        if part.partial_file is not None and part.partial_file.isOpen():
+            part.partial_file.close()
+        part.partial_file = None
 
     def run(self) -> bool:
         """Implements the QgsTask run method. This is where the actual work is done
 
+        Up to ``parts_in_flight`` parts are uploaded at once, all from one event loop.
+        A part that fails is retried on its own; the parts already uploaded are kept.
+
         Returns:
-            _type_: _description_
+            bool: True if every part was uploaded
         """
 
         # Quick check to make sure our chunk math is right
@@ -235,29 +385,50 @@ class UploadMultiPartFileTask(QgsTask):
             self.error = f"Number of URLs ({len(self.urls)}) does not match number of chunks ({self.chunks})"
             return False
 
-        # For each URL (1 for single file, many for multipart) upload the chunk
-        for idx, url in enumerate(self.urls):
-            # self.file_upload_log(f"START: Uploading chunk {idx + 1}:{self.chunks} for file: {self.rel_path}", Qgis.Info)
-            start = idx * self.chunk_size
-            end = (idx + 1) * self.chunk_size if idx < len(self.urls) - 1 else self.total_size
-            if not self.upload_file_part(url, start, end):
-                return False  # Stop if the upload fails after retries (or is cancelled)
-            # self.file_upload_log(f"DONE: Uploaded chunk {idx + 1}:{self.chunks} for file: {self.rel_path}", Qgis.Info)
-        return True
+        self.parts = self._make_parts()
+        self._next_part = 0
+        self._active_parts = 0
+        # Made here (not in __init__) so it and its replies belong to the task's thread along with the loop
+        self.nam = QNetworkAccessManager()
+        self._loop = QEventLoop()
+        cancel_timer = QTimer()
+        cancel_timer.setInterval(CANCEL_CHECK_INTERVAL)
+        cancel_timer.timeout.connect(self._check_cancelled)
+        progress_timer = QTimer()
+        progress_timer.setInterval(PROGRESS_PUBLISH_INTERVAL)
+        progress_timer.timeout.connect(self._publish_progress)
+        try:
+            self._start_parts()
+            # Everything may have failed to start already. Then there's nothing to wait for
+            if self.error is None and self._active_parts > 0:
+                cancel_timer.start()
+                progress_timer.start()
+                self._loop.exec()
+        finally:
+            cancel_timer.stop()
+            progress_timer.stop()
+            self._loop = None
+            # Nothing should still be going but make sure no file handles are left open
+            for part in self.parts:
+                self._close_part(part, abort=True)
+
+        if self.error is None and self.isCanceled():
+            self.error = NET_OP_CANCELED_ERROR
+        return self.error is None and all(part.done for part in self.parts)
 
 
 class UploadQueue(QObject):
-    """_summary_
+    """Uploads files a few at a time.
 
-    Returns:
-        _type_: _description_
+    How many run at once is decided by an AdaptiveConcurrency controller (see ``configure()``)
+    and the biggest waiting file always goes next so small files fill the tail.
     """
 
     progress_signal = pyqtSignal(str, int, int, int)
     complete_signal = pyqtSignal()
     cancelled_signal = pyqtSignal()
 
-    MAX_CONCURRENT_UPLOADS = 4
+    INITIAL_CONCURRENT_UPLOADS = 4
 
     def __init__(self, log_callback: Callable | None = None):
         super().__init__()
@@ -272,6 +443,16 @@ class UploadQueue(QObject):
         self.cancelled_tasks: list[UploadMultiPartFileTask] = []
         self._handled_task_ids: set[int] = set()  # guard against double task_finished calls
         self._cancelling: bool = False  # guard against re-entrant cancel_all calls
+        self.concurrency = AdaptiveConcurrency(self.INITIAL_CONCURRENT_UPLOADS, self.INITIAL_CONCURRENT_UPLOADS)
+        # Big files can run for a long time without anything finishing so we also re-check the limit on a timer
+        self.timer = QTimer(self)
+        self.timer.setInterval(int(SAMPLE_INTERVAL * 1000))
+        self.timer.timeout.connect(self.process_queue)
+
+    def configure(self, min_streams: int, max_streams: int) -> None:
+        """Set the range the number of simultaneous uploads can adapt within"""
+        # A broken setting shouldn't stop transfers. Fall back to the old fixed limit
+        self.concurrency = AdaptiveConcurrency(min_streams or self.INITIAL_CONCURRENT_UPLOADS, max_streams or self.INITIAL_CONCURRENT_UPLOADS, initial=self.INITIAL_CONCURRENT_UPLOADS)
 
     def reset(self) -> None:
         self.queue = []
@@ -283,6 +464,8 @@ class UploadQueue(QObject):
         self.active = True
         self._handled_task_ids = set()
         self._cancelling = False
+        self.timer.stop()
+        self.concurrency = AdaptiveConcurrency(self.concurrency.min_streams, self.concurrency.max_streams, initial=self.INITIAL_CONCURRENT_UPLOADS)
 
     def queue_logger(self, message: str, level: int, context_obj=None) -> None:
         if self.log_callback:
@@ -292,7 +475,15 @@ class UploadQueue(QObject):
             log_str = spacer + log_str.replace(os.linesep, "\n" + spacer)
             self.log_callback(log_str, level, context_obj)
 
-    def enqueue(self, rel_path: str, abs_path: str, upload_urls: list[str], retries: int = 5) -> None:
+    def enqueue(
+        self,
+        rel_path: str,
+        abs_path: str,
+        upload_urls: list[str],
+        retries: int = 5,
+        done_parts: set[int] | None = None,
+        part_done_callback: Callable[[int], None] | None = None,
+    ) -> None:
         """Push a file onto the queue for upload
 
         Args:
@@ -300,10 +491,22 @@ class UploadQueue(QObject):
             abs_path(_type_): _description_
             upload_url(_type_): _description_
             retries(int, optional): _description_. Defaults to 5.
+            done_parts(set[int], optional): Parts already uploaded when resuming an upload. These are skipped
+            part_done_callback(Callable[[int], None], optional): Called from the task thread with the index of every part that finishes
         """
         self.queue_logger(f"Enqueued {rel_path} for upload", Qgis.Info)
         # Hook into the task's finished signal
-        task = UploadMultiPartFileTask(rel_path, abs_path, upload_urls, self.get_overall_status, self.log_callback, retries)
+        task = UploadMultiPartFileTask(
+            rel_path,
+            abs_path,
+            upload_urls,
+            self.get_overall_status,
+            self.log_callback,
+            retries,
+            retry_callback=lambda: self.concurrency.record_failure(),
+            done_parts=done_parts,
+            part_done_callback=part_done_callback,
+        )
         task.taskCompleted.connect(lambda: self.task_finished(task))
         task.taskTerminated.connect(lambda: self.task_finished(task))
 
@@ -354,12 +557,21 @@ class UploadQueue(QObject):
         else:
             return None
 
+    def get_uploaded_size(self) -> int:
+        return sum(task.total_size for task in self.completed_tasks) + sum(task.uploaded_size for task in self.active_tasks)
+
     def process_queue(self) -> None:
         """Here we process the queue and start tasks as slots become available"""
-        while self.active and len(self.active_tasks) < self.MAX_CONCURRENT_UPLOADS:
-            # There are things to queue and slots open
+        if self.active and not self.timer.isActive():
+            self.timer.start()
+        # Follow the time-of-day window for the rate limits
+        TransferLimits().apply()
+        limit = self.concurrency.update(self.get_uploaded_size(), len(self.active_tasks))
+        while self.active and len(self.active_tasks) < limit:
+            # There are things to queue and slots open. Biggest first
             if len(self.queue) > 0:
-                task = self.queue.pop(0)
+                task = max(self.queue, key=lambda t: t.total_size)
+                self.queue.remove(task)
                 self.queue_logger(f"Starting upload of {task.rel_path}", Qgis.Info)
                 self.active_tasks.append(task)
                 QgsApplication.taskManager().addTask(task)
@@ -368,6 +580,7 @@ class UploadQueue(QObject):
             elif len(self.queue) == 0 and len(self.active_tasks) == 0:
                 self.queue_logger("Queue is empty, stopping", Qgis.Info)
                 self.active = False
+                self.timer.stop()
                 self.complete_signal.emit()
             else:
                 # There are some active tasks but the queue is empty
@@ -399,6 +612,7 @@ class UploadQueue(QObject):
                 pass  # already removed (e.g. queue was reset)
         elif task.error:
             self.queue_logger(f"Error uploading {task.rel_path}: {task.error}", Qgis.Critical, task)
+            self.concurrency.record_failure()
             try:
                 self.active_tasks.remove(task)
                 self.cancelled_tasks.append(task)
@@ -429,6 +643,7 @@ class UploadQueue(QObject):
         # Shut down the queue processor
         self.active = False
         self.cancelled = True
+        self.timer.stop()
 
         # Tasks sitting in self.queue have never been handed to the QGIS task manager,
         # so taskCompleted / taskTerminated will NEVER fire for them.  Just drop them
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+# Listing folders is waiting on the disk (or the network) so a few threads go a long way
+MAX_WORKERS = 8
+
+
+class DirectorySnapshot:
+    """The files in a project's layer folders, listed once so "does this layer's file exist?" is a set lookup.
+
+    Checking every layer with ``os.path.isfile`` is a ``stat`` per layer, and on an SMB/NFS
+    share every one of those is a round trip. Here each folder is listed with one
+    ``os.scandir`` the first time a file in it is checked. ``prefetch`` lists the folders we
+    already know about (every ``<Path>`` in the project XML) in parallel.
+
+    A snapshot is a point in time. Make a new one when it matters that files may have
+    appeared since (see ``Project.populate``).
+    """
+
+    def __init__(self):
+        # Folder -> names of the files in it. None if the folder couldn't be listed (fall back to isfile)
+        self.listings: dict[str, frozenset[str] | None] = {}
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    @staticmethod
+    def _list(folder: str) -> frozenset[str] | None:
+        try:
+            with os.scandir(folder) as entries:
+                return frozenset(os.path.normcase(entry.name) for entry in entries if entry.is_file())
+        except (FileNotFoundError, NotADirectoryError):
+            return frozenset()
+        except OSError:
+            return None
+
+    def prefetch(self, folders: list[str], max_workers: int = MAX_WORKERS) -> None:
+        """List several folders at once"""
+        keys = list({self._key(folder) for folder in folders} - self.listings.keys())
+        if len(keys) == 0:
+            return
+        if len(keys) == 1:
+            self.listings[keys[0]] = self._list(keys[0])
+            return
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(keys))) as pool:
+            for key, listing in zip(keys, pool.map(self._list, keys)):
+                self.listings[key] = listing
+
+    def exists(self, path: str) -> bool:
+        """``os.path.isfile`` from the snapshot"""
+        folder, name = os.path.split(self._key(path))
+        if folder not in self.listings:
+            self.listings[folder] = self._list(folder)
+        listing = self.listings[folder]
+        if listing is None:
+            return os.path.isfile(path)
+        return name in listing
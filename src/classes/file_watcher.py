@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import os
+
+from qgis.PyQt.QtCore import QFileSystemWatcher
+from qgis.PyQt.QtGui import QStandardItem
+
+from ..compat import FOREGROUND_ROLE, USER_ROLE
+
+
+class MissingFileWatcher:
+    """Watch the folders of layers whose files are missing and show the layers as available when the files appear.
+
+    Layers that aren't on disk are greyed out when the tree is built. Without this they stay
+    that way until the whole tree is refreshed, even though a download may be writing the
+    files right now. Each missing file's folder (or the closest folder above it that exists,
+    if it hasn't been created yet) is watched with a ``QFileSystemWatcher`` and only the
+    missing files in a folder are checked when it changes. Main thread only.
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = os.path.abspath(root_dir)
+        self.watcher = QFileSystemWatcher()
+        self.watcher.directoryChanged.connect(self._on_directory_changed)
+        # watched folder -> layer file path -> items showing that file
+        self.missing: dict[str, dict[str, list[QStandardItem]]] = {}
+
+    def watch(self, items: list[QStandardItem]) -> None:
+        """Start watching for the files of these (greyed out) layer items"""
+        added = []
+        for item in items:
+            layer_uri = item.data(USER_ROLE).data.layer_uri
+            folder = self._closest_folder(layer_uri)
+            if folder is None:
+                continue
+            if folder not in self.missing:
+                self.missing[folder] = {}
+                added.append(folder)
+            self.missing[folder].setdefault(layer_uri, []).append(item)
+        if len(added) > 0:
+            self.watcher.addPaths(added)
+
+    def stop(self) -> None:
+        """Stop watching everything"""
+        if len(self.missing) > 0:
+            self.watcher.removePaths(list(self.missing.keys()))
+        self.missing = {}
+
+    def _closest_folder(self, path: str) -> str | None:
+        """The file's folder or the closest one above it that exists, as long as it's inside the project"""
+        folder = os.path.dirname(path)
+        while not os.path.isdir(folder):
+            parent = os.path.dirname(folder)
+            if parent == folder:
+                return None
+            folder = parent
+        try:
+            inside = os.path.commonpath([os.path.normcase(folder), os.path.normcase(self.root_dir)]) == os.path.normcase(self.root_dir)
+        except ValueError:
+            # Different drives
+            inside = False
+        return folder if inside else None
+
+    def _on_directory_changed(self, folder: str) -> None:
+        waiting = self.missing.pop(folder, None)
+        if waiting is None:
+            return
+        self.watcher.removePath(folder)
+        still_missing = []
+        for layer_uri, items in waiting.items():
+            if os.path.isfile(layer_uri):
+                for item in items:
+                    self._show_available(item)
+            else:
+                # Maybe a sub folder on the way to it appeared. Watch that instead
+                still_missing.extend(items)
+        self.watch(still_missing)
+
+    @staticmethod
+    def _show_available(item: QStandardItem) -> None:
+        """Undo the "File is not available locally" look ``Project`` gives missing layers"""
+        map_layer = item.data(USER_ROLE).data
+        map_layer.exists = True
+        item.setData(None, FOREGROUND_ROLE)
+        item_font = item.font()
+        item_font.setItalic(False)
+        item.setFont(item_font)
+        item.setToolTip(map_layer.layer_uri)
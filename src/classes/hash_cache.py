@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import os
+import sqlite3
+import threading
+import time
+from typing import ClassVar
+
+from qgis.core import Qgis, QgsMessageLog
+
+from .borg import Borg
+from .settings import CONSTANTS
+
+MESSAGE_CATEGORY = CONSTANTS["logCategory"]
+
+DEFAULT_DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "resources", "hash_cache.sqlite"))
+# A file modified this recently could change again without its mtime moving (coarse filesystem
+# timestamps) so we don't trust a hash of it yet. Same idea as git's "racily clean" index entries.
+RACY_WINDOW_NS = 2 * 10**9
+# Stay well under SQLite's host parameter limit
+LOOKUP_BATCH_SIZE = 500
+
+
+@dataclass
+class FileHashRecord:
+    """The identity of a file on disk plus whatever hashes we know for that version of it.
+
+    ``md5`` is the plain MD5 hex digest (the single-part ETag is just this in quotes).
+    ``etag_multipart`` is the quoted S3-style multipart ETag calculated with parts of ``part_size`` bytes.
+    """
+
+    path: str
+    size: int
+    mtime_ns: int
+    inode: int
+    md5: str | None = None
+    etag_multipart: str | None = None
+    part_size: int | None = None
+
+    def same_file(self, other: FileHashRecord) -> bool:
+        return self.size == other.size and self.mtime_ns == other.mtime_ns and self.inode == other.inode
+
+    def etag(self, force_single_part: bool, part_size: int, thresh_bytes: int) -> str | None:
+        """The ETag ``rsxml.etag.calculate_etag`` would give for this file, if we have what we need to know it"""
+        if force_single_part or self.size < thresh_bytes:
+            return f'"{self.md5}"' if self.md5 else None
+        if self.etag_multipart and self.part_size == part_size:
+            return self.etag_multipart
+        return None
+
+
+class HashCacheBorg(Borg):
+    """Shared-state base class so every HashCache instance uses the same connection"""
+
+    _shared_state: ClassVar[dict] = {}  # own dict — separate from Borg._shared_state
+
+
+class HashCache(HashCacheBorg):
+    """On-disk (SQLite) cache of file MD5s and ETags keyed on absolute path.
+
+    A cached hash is only used while the file's size, mtime_ns and inode are unchanged, so
+    unchanged files are never read again. If the database can't be opened or written the
+    cache turns itself off for the session and everything is hashed as before.
+    """
+
+    def __init__(self):
+        HashCacheBorg.__init__(self)
+        if "lock" not in self.__dict__:
+            self.lock = threading.Lock()
+            self.db_path = DEFAULT_DB_PATH
+            self.conn: sqlite3.Connection | None = None
+            self.disabled = False
+
+    @staticmethod
+    def key(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    @staticmethod
+    def identify(path: str) -> FileHashRecord:
+        """Stat a file. Take this BEFORE hashing so a file that changes mid-hash is never cached as clean"""
+        stat = os.stat(path)
+        return FileHashRecord(HashCache.key(path), stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+    def use_database(self, db_path: str) -> None:
+        """Point the cache at a different SQLite file (closes the current one)"""
+        with self.lock:
+            self._close()
+            self.db_path = db_path
+            self.disabled = False
+
+    def close(self) -> None:
+        with self.lock:
+            self._close()
+
+    def lookup(self, records: list[FileHashRecord]) -> dict[str, FileHashRecord]:
+        """Find cached hashes for files that haven't changed since they were hashed
+
+        Args:
+            records (list[FileHashRecord]): current identities (see ``identify``)
+
+        Returns:
+            dict[str, FileHashRecord]: key -> cached record. Only files whose identity still matches are returned
+        """
+        current = {record.path: record for record in records}
+        found = {}
+        with self.lock:
+            conn = self._connect()
+            if conn is None:
+                return found
+            keys = list(current.keys())
+            try:
+                for idx in range(0, len(keys), LOOKUP_BATCH_SIZE):
+                    batch = keys[idx : idx + LOOKUP_BATCH_SIZE]
+                    rows = conn.execute(
+                        f"SELECT path, size, mtime_ns, inode, md5, etag_multipart, part_size FROM file_hashes WHERE path IN ({','.join('?' * len(batch))})",
+                        batch,
+                    ).fetchall()
+                    for row in rows:
+                        cached = FileHashRecord(*row)
+                        if cached.same_file(current[cached.path]):
+                            found[cached.path] = cached
+            except sqlite3.Error as e:
+                self._disable(e)
+        return found
+
+    def get_md5(self, path: str) -> str | None:
+        cached = self.lookup([self.identify(path)])
+        return next((record.md5 for record in cached.values()), None)
+
+    def store(self, records: list[FileHashRecord]) -> None:
+        """Save hashes. Hashes we already had for the same version of a file are kept
+        (so storing an MD5 doesn't throw away a multipart ETag and vice versa)
+        """
+        now_ns = time.time_ns()
+        records = [record for record in records if now_ns - record.mtime_ns > RACY_WINDOW_NS]
+        if len(records) == 0:
+            return
+        existing = self.lookup(records)
+        with self.lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            rows = []
+            for record in records:
+                old = existing.get(record.path)
+                if old is not None:
+                    record.md5 = record.md5 or old.md5
+                    if record.etag_multipart is None:
+                        record.etag_multipart, record.part_size = old.etag_multipart, old.part_size
+                rows.append((record.path, record.size, record.mtime_ns, record.inode, record.md5, record.etag_multipart, record.part_size))
+            try:
+                with conn:
+                    conn.executemany("INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            except sqlite3.Error as e:
+                self._disable(e)
+
+    def invalidate(self, paths: list[str] | None = None) -> None:
+        """Forget specific files (or everything when no paths are given)"""
+        with self.lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                with conn:
+                    if paths is None:
+                        conn.execute("DELETE FROM file_hashes")
+                    else:
+                        conn.executemany("DELETE FROM file_hashes WHERE path = ?", [(self.key(path),) for path in paths])
+            except sqlite3.Error as e:
+                self._disable(e)
+
+    def _connect(self) -> sqlite3.Connection | None:
+        """Open the database on first use. Must be called with the lock held"""
+        if self.disabled:
+            return None
+        if self.conn is None:
+            try:
+                os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+                # Hashing happens on worker threads. The lock makes sharing one connection safe
+                self.conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+                self.conn.execute(
+                    """CREATE TABLE IF NOT EXISTS file_hashes (
+                        path TEXT PRIMARY KEY,
+                        size INTEGER NOT NULL,
+                        mtime_ns INTEGER NOT NULL,
+                        inode INTEGER NOT NULL,
+                        md5 TEXT,
+                        etag_multipart TEXT,
+                        part_size INTEGER
+                    )"""
+                )
+            except (OSError, sqlite3.Error) as e:
+                self._disable(e)
+        return self.conn
+
+    def _close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def _disable(self, error: Exception) -> None:
+        QgsMessageLog.logMessage(f"File hash cache disabled ({self.db_path}): {error}", MESSAGE_CATEGORY, level=Qgis.Warning)
+        self._close()
+        self.disabled = True
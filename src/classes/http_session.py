@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING, ClassVar
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+
+from .borg import Borg
+
+if TYPE_CHECKING:
+    from .settings import Settings
+
+# Connections kept open to each server. Enough for every transfer stream plus the GraphQL queries
+DEFAULT_POOL_SIZE = 16
+# gzip and deflate always, plus br (brotli) and zstd when urllib3 can decode them
+ACCEPT_ENCODING = make_headers(accept_encoding=True)["accept-encoding"]
+
+
+class HttpSessionBorg(Borg):
+    """Shared-state base class so every request goes through the same connection pool"""
+
+    _shared_state: ClassVar[dict] = {}  # own dict — separate from Borg._shared_state
+
+
+class HttpSession(HttpSessionBorg):
+    """The connection pool every HTTP request in the plugin goes through.
+
+    Calling ``requests.get`` opens (and TLS handshakes) a new connection every time.
+    Requests made through here reuse keep-alive connections to the same server instead,
+    which makes back to back GraphQL queries and file fetches a lot quicker.
+
+    ``requests.Session`` isn't safe to share between threads so each thread gets its
+    own, but they all mount the same ``HTTPAdapter`` so the connections are shared.
+    """
+
+    def __init__(self):
+        HttpSessionBorg.__init__(self)
+        if "adapter" not in self.__dict__:
+            self._lock = threading.Lock()
+            self._local = threading.local()
+            self.pool_size = DEFAULT_POOL_SIZE
+            self.adapter = self._make_adapter(self.pool_size)
+
+    @staticmethod
+    def _make_adapter(pool_size: int) -> HTTPAdapter:
+        # One pool per server, each keeping up to pool_size idle connections. Never blocks: past
+        # that, extra connections are opened and closed again after use
+        return HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+
+    def configure(self, pool_size: int | None) -> None:
+        """Change the number of connections kept open per server. Requests already running finish on the old pool"""
+        pool_size = max(1, int(pool_size or DEFAULT_POOL_SIZE))
+        with self._lock:
+            if pool_size == self.pool_size:
+                return
+            old_adapter = self.adapter
+            self.pool_size = pool_size
+            self.adapter = self._make_adapter(pool_size)
+        old_adapter.close()
+
+    def configure_from_settings(self, settings: Settings) -> None:
+        self.configure(settings.getValue("httpPoolSize"))
+
+    def session(self) -> requests.Session:
+        """This thread's session, mounted on the shared pool"""
+        adapter = self.adapter
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+            self._local.session = session
+        if session.get_adapter("https://") is not adapter:
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        return session
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.session().get(url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.session().post(url, **kwargs)
+
+    def close(self) -> None:
+        """Close every idle connection. The pool opens new ones if it's used again"""
+        self.adapter.close()
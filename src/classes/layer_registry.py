@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import os
+from typing import Any, ClassVar
+
+from qgis.core import QgsMapLayer, QgsProject
+
+from .borg import Borg
+from .settings import CONSTANTS
+
+# Custom layer properties that say which project layer a map layer came from.
+# They're saved with the QGIS project so the registry still works after a reload
+PROJECT_KEY_PROP = f"{CONSTANTS['settingsCategory']}/projectKey"
+LAYER_KEY_PROP = f"{CONSTANTS['settingsCategory']}/layerKey"
+
+
+def project_identity(project: Any) -> str | None:
+    """A stable id for a local project (its project.rs.xml path) or a remote one (its Data Exchange id)"""
+    if project is None:
+        return None
+    xml_path = getattr(project, "project_xml_path", None)
+    if xml_path:
+        return os.path.normcase(os.path.abspath(xml_path))
+    project_id = getattr(project, "id", None)
+    if project_id:
+        return f"remote:{project_id}"
+    return None
+
+
+def layer_identity(bl_attr: dict[str, str] | None, layer_name: str | None = None, tiles: bool = False) -> str | None:
+    """The rsXPath of a layer (or its business logic id if it doesn't have one)
+
+    GeoPackage layers share the rsXPath of their GeoPackage so the layer name is added to tell them apart.
+    """
+    if bl_attr is None:
+        return None
+    identity = bl_attr.get("rsXPath") or bl_attr.get("id")
+    if not identity:
+        return None
+    if layer_name:
+        identity = f"{identity}|{layer_name}"
+    return f"tiles:{identity}" if tiles else identity
+
+
+class LayerRegistryBorg(Borg):
+    """Shared-state base class so there is only ever one registry"""
+
+    _shared_state: ClassVar[dict] = {}  # own dict — separate from Borg._shared_state
+
+
+class LayerRegistry(LayerRegistryBorg):
+    """Which Riverscapes layers are on the map, keyed on (project identity, layer identity).
+
+    Layers we add are tagged with ``tag`` before they go into the project and the registry
+    follows ``QgsProject.layersAdded`` / ``layersWillBeRemoved`` so "is this layer already on
+    the map?" is a dictionary lookup instead of a ``mapLayersByName`` search plus a walk up the
+    layer tree for every same-named layer.
+
+    Layers without tags (added by hand, or by an older version of the plugin and saved in a
+    QGIS project) are remembered by name so the old ancestry check can still be used for them.
+    """
+
+    def __init__(self):
+        LayerRegistryBorg.__init__(self)
+        if "layers" not in self.__dict__:
+            self.qproject: QgsProject | None = None
+            # (project key, layer key) -> layer id
+            self.layers: dict[tuple[str, str], str] = {}
+            # layer id -> (project key, layer key)
+            self.keys: dict[str, tuple[str, str]] = {}
+            # name -> ids of the layers that aren't tagged
+            self.untagged: dict[str, set[str]] = {}
+            self.untagged_names: dict[str, str] = {}
+
+    def connect(self, qproject: QgsProject) -> None:
+        """Start following a QGIS project (and pick up the layers already in it)"""
+        self.disconnect()
+        self.qproject = qproject
+        qproject.layersAdded.connect(self._on_layers_added)
+        qproject.layersWillBeRemoved.connect(self._on_layers_removed)
+        qproject.cleared.connect(self._clear)
+        self._clear()
+        self._on_layers_added(list(qproject.mapLayers().values()))
+
+    def disconnect(self) -> None:
+        if self.qproject is None:
+            return
+        for signal, slot in [
+            (self.qproject.layersAdded, self._on_layers_added),
+            (self.qproject.layersWillBeRemoved, self._on_layers_removed),
+            (self.qproject.cleared, self._clear),
+        ]:
+            try:
+                signal.disconnect(slot)
+            except TypeError:
+                pass  # Signal was not connected
+        self.qproject = None
+        self._clear()
+
+    @staticmethod
+    def tag(layer: QgsMapLayer, key: tuple[str, str]) -> None:
+        """Mark a layer as coming from a project. Call this before the layer is added to the project"""
+        layer.setCustomProperty(PROJECT_KEY_PROP, key[0])
+        layer.setCustomProperty(LAYER_KEY_PROP, key[1])
+
+    @staticmethod
+    def key_of(layer: QgsMapLayer) -> tuple[str, str] | None:
+        project_key = layer.customProperty(PROJECT_KEY_PROP)
+        layer_key = layer.customProperty(LAYER_KEY_PROP)
+        if project_key and layer_key:
+            return (project_key, layer_key)
+        return None
+
+    def find(self, key: tuple[str, str] | None) -> QgsMapLayer | None:
+        """The map layer for a project layer, if it is on the map"""
+        if key is None or self.qproject is None:
+            return None
+        layer_id = self.layers.get(key)
+        if layer_id is None:
+            return None
+        layer = self.qproject.mapLayer(layer_id)
+        if layer is None:
+            # We missed the removal somehow
+            self._forget(layer_id)
+        return layer
+
+    def find_untagged(self, name: str) -> list[QgsMapLayer]:
+        """Map layers with this name that didn't come from the plugin (or came from an older version of it)"""
+        if self.qproject is None:
+            return []
+        layers = [self.qproject.mapLayer(layer_id) for layer_id in self.untagged.get(name, ())]
+        return [layer for layer in layers if layer is not None]
+
+    def _on_layers_added(self, layers: list[QgsMapLayer]) -> None:
+        for layer in layers:
+            layer_id = layer.id()
+            key = self.key_of(layer)
+            if key is not None:
+                self.layers[key] = layer_id
+                self.keys[layer_id] = key
+            else:
+                name = layer.name()
+                self.untagged.setdefault(name, set()).add(layer_id)
+                self.untagged_names[layer_id] = name
+
+    def _on_layers_removed(self, layer_ids: list[str]) -> None:
+        for layer_id in layer_ids:
+            self._forget(layer_id)
+
+    def _forget(self, layer_id: str) -> None:
+        key = self.keys.pop(layer_id, None)
+        if key is not None and self.layers.get(key) == layer_id:
+            del self.layers[key]
+        name = self.untagged_names.pop(layer_id, None)
+        if name is not None:
+            self.untagged[name].discard(layer_id)
+            if len(self.untagged[name]) == 0:
+                del self.untagged[name]
+
+    def _clear(self) -> None:
+        self.layers = {}
+        self.keys = {}
+        self.untagged = {}
+        self.untagged_names = {}
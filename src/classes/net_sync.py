@@ -8,8 +8,10 @@ from time import time
 from qgis.core import Qgis, QgsMessageLog, QgsTask
 
 from ..compat import QGSTASK_CAN_CANCEL, QGSTASK_SILENT
+from .business_logic import BusinessLogicRegistry
 from .settings import CONSTANTS, Settings
-from .util import md5, requestDownload
+from .symbology import SymbologyIndex
+from .util import cached_md5, requestDownload
 
 # BASE is the name we want to use inside the settings keys
 MESSAGE_CATEGORY = CONSTANTS["logCategory"]
@@ -23,6 +25,12 @@ class NetSync(QgsTask):
         self.exception = None
         self.progress = 0
         self.downloaded = 0
+        # Business logic files downloaded or removed by this sync. Only these get evicted from the registry
+        self.changed_business_logic: list[str] = []
+        # Same for symbology files and the symbology index
+        self.changed_symbology: list[str] = []
+        # Read here because settings shouldn't be touched from the task thread
+        self.verify_hashes = bool(Settings().getValue("verifyFileHashes"))
 
         self.resource_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "resources"))
         self.business_logic_xml_dir = os.path.abspath(os.path.join(self.resource_dir, CONSTANTS["businessLogicDir"]))
@@ -56,6 +64,11 @@ class NetSync(QgsTask):
             if result is None:
                 settings.log("Completed with no exception and no result (probably manually canceled by the user)", Qgis.Warning)
             else:
+                if self.changed_business_logic:
+                    BusinessLogicRegistry().invalidate(self.changed_business_logic)
+                if self.changed_symbology:
+                    SymbologyIndex().invalidate(self.changed_symbology)
+                    SymbologyIndex().build()
                 settings.setValue("initialized", True)
                 settings.msg_bar("Riverscapes Resources Sync Success", f"{self.total} files checked, {self.downloaded} updated", Qgis.Success)
                 if result:
@@ -106,6 +119,8 @@ class NetSync(QgsTask):
         self.total = len(symbologies) + len(businesslogics) + len(qris) + 1
         self.progress = 0
         self.downloaded = 0
+        self.changed_business_logic = []
+        self.changed_symbology = []
 
         all_local_files = [os.path.abspath(x) for x in glob(os.path.join(self.resource_dir, "**", "*.?ml"), recursive=True)] + [os.path.abspath(x) for x in glob(os.path.join(self.resource_dir, "**", "*.json"), recursive=True)]
 
@@ -116,9 +131,10 @@ class NetSync(QgsTask):
             # There might be subdirs to make here
             os.makedirs(os.path.dirname(local_path), exist_ok=True)
 
-            if not os.path.isfile(local_path) or remote_md5 != md5(local_path):
+            if not os.path.isfile(local_path) or remote_md5 != cached_md5(local_path, self.verify_hashes):
                 requestDownload(CONSTANTS["resourcesUrl"] + remote_path, local_path, remote_md5)
                 QgsMessageLog.logMessage(f"Symobology downloaded: {local_path}", MESSAGE_CATEGORY, level=Qgis.Info)
+                self.changed_symbology.append(local_path)
 
                 self.downloaded += 1
             all_local_files = [x for x in all_local_files if x != local_path]
@@ -127,9 +143,10 @@ class NetSync(QgsTask):
 
         for remote_path, remote_md5 in businesslogics.items():
             local_path = os.path.join(self.business_logic_xml_dir, os.path.relpath(remote_path, "RaveBusinessLogic"))
-            if not os.path.isfile(local_path) or remote_md5 != md5(local_path):
+            if not os.path.isfile(local_path) or remote_md5 != cached_md5(local_path, self.verify_hashes):
                 requestDownload(CONSTANTS["resourcesUrl"] + remote_path, local_path, remote_md5)
                 QgsMessageLog.logMessage(f"BusinessLogic downloaded: {local_path}", MESSAGE_CATEGORY, level=Qgis.Info)
+                self.changed_business_logic.append(local_path)
 
                 self.downloaded += 1
             all_local_files = [x for x in all_local_files if x != local_path]
@@ -138,7 +155,7 @@ class NetSync(QgsTask):
 
         for remote_path, remote_md5 in qris.items():
             local_path = os.path.join(self.qris_dir, os.path.relpath(remote_path, "QRiS"))
-            if not os.path.isfile(local_path) or remote_md5 != md5(local_path):
+            if not os.path.isfile(local_path) or remote_md5 != cached_md5(local_path, self.verify_hashes):
                 requestDownload(CONSTANTS["resourcesUrl"] + remote_path, local_path, remote_md5)
                 QgsMessageLog.logMessage(f"QRiS Resource downloaded: {local_path}", MESSAGE_CATEGORY, level=Qgis.Info)
 
@@ -150,7 +167,7 @@ class NetSync(QgsTask):
         # Basemaps is a special case
         for remote_path, remote_md5 in basemaps.items():
             local_path = os.path.join(self.resource_dir, os.path.basename(remote_path))
-            if not os.path.isfile(local_path) or remote_md5 != md5(local_path):
+            if not os.path.isfile(local_path) or remote_md5 != cached_md5(local_path, self.verify_hashes):
                 requestDownload(CONSTANTS["resourcesUrl"] + remote_path, local_path, remote_md5)
                 QgsMessageLog.logMessage(f"Basemaps downloaded: {local_path}", MESSAGE_CATEGORY, level=Qgis.Info)
 
@@ -173,6 +190,10 @@ class NetSync(QgsTask):
                 # (rel_parts[0] == '..' means the file resolved above the root).
                 if rel_parts and rel_parts[0] != "..":
                     os.remove(dfile)
+                    if dfile.startswith(self.business_logic_xml_dir):
+                        self.changed_business_logic.append(dfile)
+                    elif dfile.startswith(self.symbology_dir):
+                        self.changed_symbology.append(dfile)
                     QgsMessageLog.logMessage(f"Extraneous file removed: {dfile}", MESSAGE_CATEGORY, level=Qgis.Warning)
                 else:
                     QgsMessageLog.logMessage(f"Skipping file outside resources directory: {dfile}", MESSAGE_CATEGORY, level=Qgis.Critical)
@@ -4,16 +4,21 @@ import json
 import os
 import re
 import traceback
+from typing import Callable
 
 import lxml.etree
-from qgis.core import Qgis
+from qgis.core import Qgis, QgsMessageLog
 from qgis.PyQt.QtGui import QBrush, QStandardItem
 
 from ..compat import COLOR_GRAY, FOREGROUND_ROLE, USER_ROLE
 from ..icon_utils import qrave_icon
+from .business_logic import BusinessLogicNode, BusinessLogicRegistry, CompiledBusinessLogic, build_inputs_index, compile_xpath
+from .dir_snapshot import DirectorySnapshot
+from .file_watcher import MissingFileWatcher
 from .qrave_map_layer import ProjectTreeData, QRaveMapLayer, QRaveTreeTypes
 from .rspaths import parse_rel_path
 from .settings import CONSTANTS, Settings
+from .tree_index import TreeIndex
 
 MESSAGE_CATEGORY = CONSTANTS["logCategory"]
 
@@ -25,6 +30,72 @@ VERSIONS = {
 }
 
 
+class ProjectLoadCancelledError(Exception):
+    """Raised inside ``Project.load_data`` when the load was cancelled part way through"""
+
+
+class TreeNode:
+    """A project tree item that hasn't been turned into a ``QStandardItem`` yet.
+
+    ``Project.load_data`` builds the tree out of these so it can run on a worker thread:
+    icons, fonts and brushes are GUI objects and may only be made on the main thread.
+    ``to_item`` makes the real items (on the main thread) once the tree is built.
+    """
+
+    __slots__ = ("children", "data", "gray", "icon", "italic", "missing", "text", "tooltip")
+
+    def __init__(self, text: str = "", icon: str | None = None, data: ProjectTreeData | None = None):
+        self.text = text
+        # File name for qrave_icon
+        self.icon = icon
+        self.data = data
+        self.italic = False
+        self.gray = False
+        self.tooltip: str | None = None
+        # A layer whose file isn't on disk (yet)
+        self.missing = False
+        self.children: list[TreeNode] = []
+
+    def appendRow(self, node: TreeNode) -> None:
+        self.children.append(node)
+
+    def to_item(self, missing: list[QStandardItem] | None = None) -> QStandardItem:
+        """Make the ``QStandardItem`` for this node and everything under it
+
+        Args:
+            missing (list, optional): the items of layers whose files are missing are added to this
+        """
+        root = self._make_item()
+        stack = [(self, root)]
+        while stack:
+            node, item = stack.pop()
+            if node.missing and missing is not None:
+                missing.append(item)
+            for child in node.children:
+                child_item = child._make_item()
+                item.appendRow(child_item)
+                if child.children or child.missing:
+                    stack.append((child, child_item))
+        return root
+
+    def _make_item(self) -> QStandardItem:
+        item = QStandardItem()
+        item.setText(self.text)
+        if self.icon is not None:
+            item.setIcon(qrave_icon(self.icon))
+        if self.data is not None:
+            item.setData(self.data, USER_ROLE)
+        if self.gray:
+            item.setData(QBrush(COLOR_GRAY), FOREGROUND_ROLE)
+        if self.italic:
+            item_font = item.font()
+            item_font.setItalic(True)
+            item.setFont(item_font)
+        if self.tooltip is not None:
+            item.setToolTip(self.tooltip)
+        return item
+
+
 class Project:
     def __init__(self, project_xml_path: str):
         self.meta = None
@@ -36,6 +107,8 @@ class Project:
 
         self.project_xml_path = os.path.abspath(project_xml_path)
         self.project = None
+        # id -> element for everything under <Inputs>. Resolves ref="..." attributes without re-scanning the XML
+        self.inputs_index: dict[str, lxml.etree._Element] = {}
         self.bounds = None
         self.bounds_path: str | None = None
         self.loadable = False
@@ -43,54 +116,113 @@ class Project:
         self.project_type = None
         self.business_logic_path = None
         self.business_logic = None
+        self.compiled_logic: CompiledBusinessLogic | None = None
         self.qproject = None
+        # The tree built by load_data, waiting for build_items to turn it into qproject
+        self.tree: TreeNode | None = None
+        self.tree_index = TreeIndex()
+        # Which layer files exist. Only kept while the tree is being built
+        self.snapshot: DirectorySnapshot | None = None
+        # Greys layers back in when their missing files appear (e.g. during a download)
+        self.file_watcher: MissingFileWatcher | None = None
+        # Lazy trees only build a folder's children the first time it's expanded (see populate)
+        self.lazy = bool(self.settings.getValue("lazyProjectTree"))
+        # Read here (on the main thread) because load_data may run on a worker thread
+        self.local_bl_folder = self.settings.getValue("localBLFolder")
+        self._should_stop: Callable[[], bool] | None = None
         self.project_dir = None
         self.version = None
         self.load_error: str | None = None
+        # Stat signature of the project XML and business logic this instance was built from.
+        # ProjectCache uses it to decide whether a reload can reuse this instance.
+        self.file_signature: tuple | None = None
         self.exists = os.path.isfile(self.project_xml_path)
         if self.exists:
             self.project_dir = os.path.dirname(self.project_xml_path)
 
     def load(self) -> None:
+        """Load the project and build its tree, all on the calling thread"""
+        self.load_data()
+        self.build_items()
+
+    def load_data(self, should_stop: Callable[[], bool] | None = None) -> None:
+        """Parse the project and its business logic and build the tree as ``TreeNode``s.
+
+        This is the slow part of loading a project and it doesn't touch anything GUI so
+        ``ProjectLoader`` runs it on a worker thread. Call ``build_items`` afterwards (on the
+        main thread) to get ``qproject``.
+
+        Args:
+            should_stop (Callable[[], bool], optional): checked as the tree is built. When it
+                returns True the load stops and ``load_error`` says it was cancelled.
+        """
         self.load_errs = False
-        if self.exists:
-            try:
-                self._load_project()
-                # Retrieve schema URL from project XML.  XML attribute order is
-                # not guaranteed across lxml versions, so we must scan all
-                # attributes before raising - not on the first non-match.
-                schema_location_attrib = next((v for k, v in self.project.attrib.items() if "noNamespaceSchemaLocation" in k), None)
-                if schema_location_attrib is None:
-                    raise Exception("Error finding schema location in project")
-
-                if re.search(VERSIONS["V1"], schema_location_attrib):
-                    self.version = "V1"
-                elif re.search(VERSIONS["V2"], schema_location_attrib):
-                    self.version = "V2"
-                else:
-                    raise Exception("Error determining version of Riverscapes Project")
+        self.load_error = None
+        if not self.exists:
+            return
+        self._should_stop = should_stop
+        try:
+            self._load_project()
+            # Retrieve schema URL from project XML.  XML attribute order is
+            # not guaranteed across lxml versions, so we must scan all
+            # attributes before raising - not on the first non-match.
+            schema_location_attrib = next((v for k, v in self.project.attrib.items() if "noNamespaceSchemaLocation" in k), None)
+            if schema_location_attrib is None:
+                raise Exception("Error finding schema location in project")
+
+            if re.search(VERSIONS["V1"], schema_location_attrib):
+                self.version = "V1"
+            elif re.search(VERSIONS["V2"], schema_location_attrib):
+                self.version = "V2"
+            else:
+                raise Exception("Error determining version of Riverscapes Project")
+
+            self._load_businesslogic()
+            # List every folder a layer could be in up front (in parallel) instead of a stat per layer
+            self.snapshot = DirectorySnapshot()
+            self.snapshot.prefetch(self._layer_folders())
+            self._build_tree()
+            self.loadable = True
+            self.file_signature = self.get_file_signature()
+        except ProjectLoadCancelledError:
+            self.tree = None
+            self.load_error = "Loading was cancelled"
+        except Exception as e:
+            self.tree = None
+            self.load_error = str(e)
+            self.settings.log(f"Exception {e}\n\nTrace: {traceback.format_exc()}", Qgis.Critical)
+        finally:
+            self._should_stop = None
+            self.snapshot = None
+
+    def build_items(self) -> None:
+        """Turn the tree built by ``load_data`` into ``qproject`` and tell the user how loading went.
+
+        Must be called on the main thread.
+        """
+        if self.tree is not None:
+            missing = []
+            self.qproject = self.tree.to_item(missing)
+            self.tree = None
+            self._watch_missing(missing)
 
-                self._load_businesslogic()
-                self._build_tree()
-                self.loadable = True
-                if not self.load_errs:
-                    self.settings.msg_bar("Project Loaded", self.project_xml_path, Qgis.Success)
-                else:
-                    self.settings.msg_bar("Project Loaded with errors", "(See Riverscapes Viewer logs for details)", Qgis.Critical)
-            except Exception as e:
-                self.load_error = str(e)
-                self.settings.msg_bar(
-                    "Error loading project",
-                    f"Project: {self.project_xml_path}\n (See Riverscapes Viewer logs for specifics)",
-                    Qgis.Critical,
-                )
-                self.settings.log(f"Exception {e}\n\nTrace: {traceback.format_exc()}", Qgis.Critical)
-        else:
+        if not self.exists:
             self.settings.msg_bar("Project Not Found", self.project_xml_path, Qgis.Critical)
+        elif self.load_error is not None:
+            self.settings.msg_bar(
+                "Error loading project",
+                f"Project: {self.project_xml_path}\n (See Riverscapes Viewer logs for specifics)",
+                Qgis.Critical,
+            )
+        elif not self.load_errs:
+            self.settings.msg_bar("Project Loaded", self.project_xml_path, Qgis.Success)
+        else:
+            self.settings.msg_bar("Project Loaded with errors", "(See Riverscapes Viewer logs for details)", Qgis.Critical)
 
     def _load_project(self) -> None:
         if os.path.isfile(self.project_xml_path):
             self.project = lxml.etree.parse(self.project_xml_path).getroot()
+            self.inputs_index = build_inputs_index(self.project)
 
             self.meta = self.extract_meta(self.project.findall("MetaData/Meta"))
             desc_node = self.project.find("Description")
@@ -132,6 +264,26 @@ class Project:
             if realizations is None:
                 raise Exception(f"Could not find the <Realizations> node. Are you sure the xml file you opened is Riverscapes Project? File: {self.project_xml_path}")
 
+    def _layer_folders(self) -> list[str]:
+        """The folders of every <Path> in the project"""
+        folders = set()
+        for path_el in self.project.iter("Path"):
+            if path_el.text and path_el.text.strip():
+                folders.add(os.path.dirname(parse_rel_path(os.path.join(self.project_dir, path_el.text.strip()))))
+        return list(folders)
+
+    def _watch_missing(self, items: list[QStandardItem]) -> None:
+        if len(items) == 0 or self.project_dir is None:
+            return
+        if self.file_watcher is None:
+            self.file_watcher = MissingFileWatcher(self.project_dir)
+        self.file_watcher.watch(items)
+
+    def stop_watching(self) -> None:
+        """Stop watching for missing layer files (the project is being closed)"""
+        if self.file_watcher is not None:
+            self.file_watcher.stop()
+
     @property
     def has_bounds(self) -> bool:
         """Check if the project has valid bounds"""
@@ -159,12 +311,12 @@ class Project:
             meta["ref"] = (node.attrib["ref"], "string")
         return meta
 
-    def _load_businesslogic(self) -> None:
-        if self.project is None or self.project_type is None:
-            return
-
-        self.business_logic = None
+    def _find_businesslogic(self) -> tuple[str | None, list[str]]:
+        """Walk the business logic search hierarchy for this project type
 
+        Returns:
+            tuple[str | None, list[str]]: The first business logic file that exists (or None) and the search paths
+        """
         # Case-sensitive filename we expect
         bl_filename = f"{self.project_type}.xml"
         if self.version == "V1" or self.version == "V2":
@@ -176,7 +328,7 @@ class Project:
             # 1. first check for a businesslogic file next to the project file
             parse_rel_path(os.path.join(os.path.dirname(self.project_xml_path), bl_filename)),
             # 1.5. Check for a local business logic folder
-            (parse_rel_path(os.path.join(self.settings.getValue("localBLFolder"), bl_filename)) if self.settings.getValue("localBLFolder") else None),
+            (parse_rel_path(os.path.join(self.local_bl_folder, bl_filename)) if self.local_bl_folder else None),
             # 2. Second, check the businesslogic we've got from the web
             parse_rel_path(os.path.join(BL_XML_DIR, web_bl_filename)),
             # 3. Fall back to the default xml file
@@ -187,27 +339,60 @@ class Project:
         hierarchy = [path for path in hierarchy if path is not None]
 
         # Find the first match
-        chosen_qml = next(iter([candidate for candidate in hierarchy if os.path.isfile(candidate)]), None)
+        chosen = next(iter([candidate for candidate in hierarchy if os.path.isfile(candidate)]), None)
+        return chosen, hierarchy
+
+    def get_file_signature(self) -> tuple | None:
+        """Stat the project XML and the business logic file that would be chosen right now.
+
+        Two signatures that compare equal mean neither file has been touched, replaced or
+        swapped for a different business logic file in the search hierarchy.
+
+        Returns:
+            tuple | None: (xml mtime_ns, xml size, business logic path, bl mtime_ns, bl size) or None if the project XML is gone
+        """
+        try:
+            xml_stat = os.stat(self.project_xml_path)
+        except OSError:
+            return None
+
+        bl_path = None
+        bl_mtime = None
+        bl_size = None
+        if self.project_type is not None and self.version is not None:
+            bl_path, _hierarchy = self._find_businesslogic()
+            if bl_path is not None:
+                try:
+                    bl_stat = os.stat(bl_path)
+                    bl_mtime = bl_stat.st_mtime_ns
+                    bl_size = bl_stat.st_size
+                except OSError:
+                    bl_path = None
+
+        return (xml_stat.st_mtime_ns, xml_stat.st_size, bl_path, bl_mtime, bl_size)
+
+    def _load_businesslogic(self) -> None:
+        if self.project is None or self.project_type is None:
+            return
+
+        self.business_logic = None
+        self.compiled_logic = None
+
+        chosen_qml, hierarchy = self._find_businesslogic()
 
         if chosen_qml is not None:
             self.business_logic_path = chosen_qml
-            try:
-                self.business_logic = lxml.etree.parse(self.business_logic_path).getroot()
-                # Let the user know what business logic we're using
-                self.settings.log(f"Using business logic file: {self.business_logic_path}", Qgis.Info)
-            except TypeError as e:
-                raise Exception(f"Error parsing business logic file: {self.business_logic_path}, {e}")
-            except lxml.etree.XMLSyntaxError as e:
-                raise Exception(f"XML Syntax error while parsing file: {self.business_logic_path}, {e}")
-            except Exception as e:
-                raise Exception(f"Unknown XML File error: {self.business_logic_path}, {e}")
+            # Parsed and compiled once per file and shared with every other project of this type
+            self.compiled_logic = BusinessLogicRegistry().get(self.business_logic_path)
+            self.business_logic = self.compiled_logic.root
+            # Let the user know what business logic we're using
+            self.settings.log(f"Using business logic file: {self.business_logic_path}", Qgis.Info)
         else:
             paths_str = json.dumps(hierarchy, indent=2)
             raise Exception(f"Could not find a valid business logic file. Valid paths are: \n{paths_str}")
 
         # Check for a different kind of file
-        root_node = self.business_logic.find("Node")
-        if root_node is None:
+        if self.compiled_logic.root_node is None:
             raise Exception(f"Could not find the root <Node> element. Are you sure the xml file you opened is Riverscapes Business logic XML? File: {self.business_logic_path}")
 
     def _build_tree(self, force: bool = False) -> None:
@@ -217,18 +402,19 @@ class Project:
 
         # Maybe the basemaps file isn't synced yet
         if self.project_xml_path is None or not os.path.isfile(self.project_xml_path):
-            self.qproject = None
+            self.tree = None
             return
 
         # Parse the XML
+        self.tree_index.invalidate()
         if self.business_logic is None:
             self.settings.log("No business logic file for this project could be found.")
         else:
-            self.qproject = self._recurse_tree()
+            self.tree = self._recurse_tree()
             self._build_views()
 
     def _build_views(self) -> None:
-        if self.business_logic is None or self.qproject is None:
+        if self.business_logic is None or self.tree is None:
             return
 
         views = self.business_logic.find("Views")
@@ -239,8 +425,7 @@ class Project:
         self.default_view = views.attrib["default"]
         self.views = {}
 
-        curr_item = QStandardItem(qrave_icon("BrowseFolder.png"), "Project Views")
-        curr_item.setData(ProjectTreeData(QRaveTreeTypes.PROJECT_VIEW_FOLDER, project=self), USER_ROLE)
+        curr_item = TreeNode("Project Views", "BrowseFolder.png", ProjectTreeData(QRaveTreeTypes.PROJECT_VIEW_FOLDER, project=self))
 
         for view in self.business_logic.findall("Views/View"):
             name = view.attrib["name"]
@@ -249,22 +434,20 @@ class Project:
             if name is None or view_id is None:
                 continue
 
-            view_item = QStandardItem(qrave_icon("view.svg"), name)
             view_layer_ids = [layer.attrib["id"] for layer in view.findall("Layers/Layer")]
             self.views[view_id] = view_layer_ids
-            view_item.setData(
-                ProjectTreeData(QRaveTreeTypes.PROJECT_VIEW, project=self, data=view_layer_ids),
-                USER_ROLE,
-            )
-            curr_item.appendRow(view_item)
+            curr_item.appendRow(TreeNode(name, "view.svg", ProjectTreeData(QRaveTreeTypes.PROJECT_VIEW, project=self, data=view_layer_ids)))
 
-        self.qproject.appendRow(curr_item)
+        self.tree.appendRow(curr_item)
 
-    def _recurse_tree(self, bl_el=None, proj_el=None, parent: QStandardItem = None) -> QStandardItem | None:
-        if bl_el is None:
-            bl_el = self.business_logic.find("Node")
+    def _recurse_tree(self, bl_node: BusinessLogicNode | None = None, proj_el=None, parent: TreeNode | None = None) -> TreeNode | None:
+        if self._should_stop is not None and self._should_stop():
+            raise ProjectLoadCancelledError()
 
-        if bl_el is None:
+        if bl_node is None:
+            bl_node = self.compiled_logic.root_node if self.compiled_logic is not None else None
+
+        if bl_node is None:
             self.settings.log(
                 f"No default businesslogic root node could be located in file: {self.business_logic_path}",
                 Qgis.Critical,
@@ -272,123 +455,85 @@ class Project:
             return
 
         is_root = proj_el is None
-        bl_attr = bl_el.attrib
 
         if proj_el is None:
             proj_el = self.project
 
         new_proj_el = proj_el
-        if "xpath" in bl_el.attrib:
-            if len(bl_el.attrib["xpath"]) == 0:
+        if bl_node.xpath_str is not None:
+            if len(bl_node.xpath_str) == 0:
                 self.load_errs = True
                 self.settings.log(
-                    f"Empty Xpath detected on line {bl_el.sourceline} of file: {self.business_logic_path}",
+                    f"Empty Xpath detected on line {bl_node.sourceline} of file: {self.business_logic_path}",
                     Qgis.Critical,
                 )
                 return
-            new_proj_el = xpathone_withref(self.project, proj_el, bl_el.attrib["xpath"])
+            new_proj_el = xpathone_withref(self.project, proj_el, bl_node.xpath_str, self.inputs_index)
             if new_proj_el is None:
                 # We just ignore layers we can't find. Log them though
                 return
 
         # The label is either explicit or it's an xpath lookup
         curr_label = "<unknown>"
-        if "label" in bl_el.attrib:
-            curr_label = bl_el.attrib["label"]
-        elif "xpathlabel" in bl_el.attrib:
-            if len(bl_el.attrib["xpathlabel"]) == 0:
+        if bl_node.label is not None:
+            curr_label = bl_node.label
+        elif bl_node.xpathlabel_str is not None:
+            if bl_node.xpathlabel is None:
                 self.load_errs = True
                 self.settings.log(
-                    f"Empty xpathlabel detected on line {bl_el.sourceline} of file: {self.business_logic_path}",
+                    f"Empty or invalid xpathlabel detected on line {bl_node.sourceline} of file: {self.business_logic_path}",
                     Qgis.Critical,
                 )
                 return
-            found = new_proj_el.xpath(bl_el.attrib["xpathlabel"])
+            found = bl_node.xpathlabel(new_proj_el)
             curr_label = found[0].text if found is not None and len(found) > 0 else "<unknown>"
 
-        curr_item = QStandardItem()
-        curr_item.setText(curr_label)
-
-        children_container = bl_el.find("Children")
+        curr_item = TreeNode(curr_label)
 
         # If there are children then this is a branch
-        if children_container is not None:
+        if bl_node.is_branch:
             if is_root:
-                curr_item.setIcon(qrave_icon("viewer-icon.svg"))
-                (
-                    curr_item.setData(
-                        ProjectTreeData(QRaveTreeTypes.PROJECT_ROOT, project=self, data=dict(children_container.attrib)),
-                        USER_ROLE,
-                    ),
-                )
+                curr_item.icon = "viewer-icon.svg"
+                curr_item.data = ProjectTreeData(QRaveTreeTypes.PROJECT_ROOT, project=self, data=dict(bl_node.children_attrib))
             else:
-                curr_item.setIcon(qrave_icon("BrowseFolder.png"))
-                (
-                    curr_item.setData(
-                        ProjectTreeData(QRaveTreeTypes.PROJECT_FOLDER, project=self, data=dict(children_container.attrib)),
-                        USER_ROLE,
-                    ),
-                )
+                curr_item.icon = "BrowseFolder.png"
+                curr_item.data = ProjectTreeData(QRaveTreeTypes.PROJECT_FOLDER, project=self, data=dict(bl_node.children_attrib))
 
-            for child_node in children_container.xpath("*"):
-                # Handle any explicit <Node> children
-                if child_node.tag == "Node":
-                    self._recurse_tree(child_node, new_proj_el, curr_item)
-
-                # Repeaters are a separate case
-                elif child_node.tag == "Repeater":
-                    qrepeater = QStandardItem(qrave_icon("BrowseFolder.png"), child_node.attrib["label"])
-                    (
-                        qrepeater.setData(
-                            ProjectTreeData(
-                                QRaveTreeTypes.PROJECT_REPEATER_FOLDER,
-                                project=self,
-                                data=dict(child_node.attrib),
-                            ),
-                            USER_ROLE,
-                        ),
-                    )
-                    curr_item.appendRow(qrepeater)
-
-                    if len(child_node.attrib["xpath"]) == 0:
-                        self.load_errs = True
-                        self.settings.log(
-                            f"Empty repeater xpath detected on line {child_node.sourceline} of file: {self.business_logic_path}",
-                            Qgis.Critical,
-                        )
-                        return
-
-                    repeat_xpath = child_node.attrib["xpath"]
-                    repeat_node = child_node.find("Node")
-                    if repeat_node is not None:
-                        for repeater_el in new_proj_el.xpath(repeat_xpath):
-                            self._recurse_tree(repeat_node, repeater_el, qrepeater)
+            # The root's direct children are always built so there is something to look at
+            if self.lazy and not is_root:
+                self._add_placeholder(curr_item, bl_node, new_proj_el)
+            elif not self._build_children(bl_node, new_proj_el, curr_item):
+                return
 
         # Otherwise this is a leaf
         else:
-            bl_type = bl_el.attrib["type"]
+            bl_type = bl_node.leaf_type
             if bl_type == "polygon":
-                curr_item.setIcon(qrave_icon("layers/Polygon.png"))
+                curr_item.icon = "layers/Polygon.png"
             elif bl_type == "line":
-                curr_item.setIcon(qrave_icon("layers/Polyline.png"))
+                curr_item.icon = "layers/Polyline.png"
             elif bl_type == "point":
-                curr_item.setIcon(qrave_icon("layers/MultiDot.png"))
+                curr_item.icon = "layers/MultiDot.png"
             elif bl_type == "raster":
-                curr_item.setIcon(qrave_icon("layers/Raster.png"))
+                curr_item.icon = "layers/Raster.png"
             elif bl_type == "file":
-                curr_item.setIcon(qrave_icon("draft.svg"))
+                curr_item.icon = "draft.svg"
             elif bl_type == "report":
-                curr_item.setIcon(qrave_icon("description.svg"))
+                curr_item.icon = "description.svg"
             elif bl_type == "tin":
-                curr_item.setIcon(qrave_icon("layers/tin.svg"))
+                curr_item.icon = "layers/tin.svg"
             else:
-                curr_item.setIcon(qrave_icon("viewer-icon.svg"))
+                curr_item.icon = "viewer-icon.svg"
 
             # Couldn't find this node. Ignore it.
             meta = self.extract_meta(new_proj_el.findall("MetaData/Meta"))
 
             layer_name = None
 
+            # Every leaf gets its own copy of the attributes. The compiled node is shared
+            # by every repeater instance and every project using this business logic.
+            bl_attr = dict(bl_node.attrib)
+
             # Construct the rsXPath for this element
             rs_xpath = get_xml_xpath(new_proj_el)
             bl_attr["rsXPath"] = rs_xpath
@@ -438,14 +583,13 @@ class Project:
                 meta,
                 layer_name,
                 description=layer_description,
+                file_exists=self.snapshot.exists if self.snapshot is not None else None,
             )
-            curr_item.setData(ProjectTreeData(QRaveTreeTypes.LEAF, project=self, data=map_layer), USER_ROLE)
+            curr_item.data = ProjectTreeData(QRaveTreeTypes.LEAF, project=self, data=map_layer)
 
             if bl_type == "tin":
-                curr_item_font = curr_item.font()
-                curr_item_font.setItalic(True)
-                curr_item.setFont(curr_item_font)
-                curr_item.setToolTip(f"TIN files cannot be loaded in QGIS. File: {layer_uri}")
+                curr_item.italic = True
+                curr_item.tooltip = f"TIN files cannot be loaded in QGIS. File: {layer_uri}"
             elif not map_layer.exists:
                 # We are disabling this for now becuase missing files are now allowed
                 # settings.msg_bar(
@@ -454,54 +598,178 @@ class Project:
                 #     Qgis.Warning)
                 # We will send it to the console as an error though
                 self.settings.log(f"Error finding file with path={map_layer.layer_uri}", Qgis.Warning)
-                curr_item.setData(QBrush(COLOR_GRAY), FOREGROUND_ROLE)
-                curr_item_font = curr_item.font()
-                curr_item_font.setItalic(True)
-                curr_item.setFont(curr_item_font)
-
-                curr_item.setToolTip(f"File is not available locally: {map_layer.layer_uri}")
+                curr_item.gray = True
+                curr_item.italic = True
+                curr_item.missing = True
+                curr_item.tooltip = f"File is not available locally: {map_layer.layer_uri}"
             elif map_layer.layer_uri:
-                curr_item.setToolTip(map_layer.layer_uri)
+                curr_item.tooltip = map_layer.layer_uri
 
         if parent:
             parent.appendRow(curr_item)
 
         return curr_item
 
+    def _build_children(self, bl_node: BusinessLogicNode, proj_el, curr_item: TreeNode) -> bool:
+        """Build the items under a business logic branch node
+
+        Returns:
+            bool: False if the business logic is broken and the branch should be abandoned
+        """
+        for child_node in bl_node.children:
+            # Handle any explicit <Node> children
+            if child_node.tag == BusinessLogicNode.NODE:
+                self._recurse_tree(child_node, proj_el, curr_item)
+
+            # Repeaters are a separate case
+            elif child_node.tag == BusinessLogicNode.REPEATER:
+                qrepeater = TreeNode(
+                    child_node.label,
+                    "BrowseFolder.png",
+                    ProjectTreeData(
+                        QRaveTreeTypes.PROJECT_REPEATER_FOLDER,
+                        project=self,
+                        data=dict(child_node.attrib),
+                    ),
+                )
+                curr_item.appendRow(qrepeater)
 
-def xpathone_withref(root_el, el, xpath_str):
+                if child_node.xpath is None:
+                    self.load_errs = True
+                    self.settings.log(
+                        f"Empty or invalid repeater xpath detected on line {child_node.sourceline} of file: {self.business_logic_path}",
+                        Qgis.Critical,
+                    )
+                    return False
+
+                if child_node.repeat_node is not None:
+                    if self.lazy:
+                        self._add_placeholder(qrepeater, child_node, proj_el)
+                    else:
+                        self._build_repeater(child_node, proj_el, qrepeater)
+        return True
+
+    def _build_repeater(self, repeater_node: BusinessLogicNode, proj_el, qrepeater: TreeNode) -> None:
+        for repeater_el in repeater_node.xpath(proj_el):
+            self._recurse_tree(repeater_node.repeat_node, repeater_el, qrepeater)
+
+    def _add_placeholder(self, item: TreeNode, bl_node: BusinessLogicNode, proj_el) -> None:
+        """Give a folder a single stand-in child so it can be expanded before its real children exist"""
+        placeholder = TreeNode("Loading...", data=ProjectTreeData(QRaveTreeTypes.PROJECT_PLACEHOLDER, project=self, data=(bl_node, proj_el)))
+        placeholder.gray = True
+        item.appendRow(placeholder)
+
+    @staticmethod
+    def _get_placeholder(item: QStandardItem) -> ProjectTreeData | None:
+        if item is None or item.rowCount() != 1:
+            return None
+        item_data = item.child(0).data(USER_ROLE)
+        if item_data is None or item_data.type != QRaveTreeTypes.PROJECT_PLACEHOLDER:
+            return None
+        return item_data
+
+    def populate(self, item: QStandardItem) -> bool:
+        """Build the real children of a lazy folder or repeater. Safe to call on anything.
+
+        Args:
+            item (QStandardItem): a folder or repeater item from this project's tree
+
+        Returns:
+            bool: True if children were built, False if there was nothing to do
+        """
+        placeholder = self._get_placeholder(item)
+        if placeholder is None:
+            return False
+
+        bl_node, proj_el = placeholder.data
+        item.removeRow(0)
+        self.tree_index.invalidate(item)
+        # Files may have appeared since the project was loaded so look again (populate_subtree shares one snapshot)
+        own_snapshot = self.snapshot is None
+        if own_snapshot:
+            self.snapshot = DirectorySnapshot()
+        children = TreeNode()
+        try:
+            if bl_node.tag == BusinessLogicNode.REPEATER:
+                self._build_repeater(bl_node, proj_el, children)
+            else:
+                self._build_children(bl_node, proj_el, children)
+        finally:
+            if own_snapshot:
+                self.snapshot = None
+        missing = []
+        for child in children.children:
+            item.appendRow(child.to_item(missing))
+        self._watch_missing(missing)
+        return True
+
+    def populate_subtree(self, item: QStandardItem, bl_ids: list[str] | None = None) -> None:
+        """Make sure everything under an item has been built (e.g. before adding it all to the map)
+
+        Args:
+            item (QStandardItem): the item to start from
+            bl_ids (list[str], optional): only build the folders that can contain one of these
+                business logic ids (i.e. the layers of a view). Defaults to None (build everything).
+        """
+        stack = [item]
+        self.snapshot = DirectorySnapshot()
+        try:
+            while stack:
+                curr = stack.pop()
+                placeholder = self._get_placeholder(curr)
+                if placeholder is not None:
+                    if bl_ids and placeholder.data[0].layer_ids.isdisjoint(bl_ids):
+                        continue
+                    self.populate(curr)
+                for row in range(curr.rowCount()):
+                    child = curr.child(row)
+                    if child is not None and child.hasChildren():
+                        stack.append(child)
+        finally:
+            self.snapshot = None
+
+
+def xpathone_withref(root_el, el, xpath_str, inputs_index=None):
     """Generic method for looking up an xpath including support for the ref attribute
 
+    XPaths are compiled once (see ``compile_xpath``) so evaluating the same business logic
+    xpath for thousands of repeated elements doesn't recompile it every time.
+
     Args:
         root_el ([type]): [description]
         el ([type]): [description]
         xpath_str ([type]): [description]
+        inputs_index (dict, optional): id -> element index of <Inputs> (see ``build_inputs_index``).
+            Pass the one built at project load time. Defaults to None (built on the fly).
 
     Returns:
         [type]: [description]
     """
-    found = el.xpath(xpath_str)
-    settings = Settings()
+    xpath = compile_xpath(xpath_str)
+    if xpath is None:
+        QgsMessageLog.logMessage(f'Invalid xpath: "{xpath_str}"', MESSAGE_CATEGORY, Qgis.Warning)
+        return
+    found = xpath(el)
     # If the node is not found we need to check if it's a reference
     if found is None or len(found) < 1:
         if "@id=" in xpath_str:
-            ref_found = el.xpath(xpath_str.replace("@id=", "@ref="))
+            ref_found = compile_xpath(xpath_str.replace("@id=", "@ref="))(el)
             # If not even the ref is found then this is not valid
             if ref_found is not None and len(ref_found) > 0:
                 ref_str = ref_found[0].attrib["ref"]
-                return xpath_findref(root_el, ref_str, xpath_str)
+                return xpath_findref(root_el, ref_str, xpath_str, inputs_index)
 
-        settings.log(f'Optional project xml node not found with path="{xpath_str}"', Qgis.Info)
+        QgsMessageLog.logMessage(f'Optional project xml node not found with path="{xpath_str}"', MESSAGE_CATEGORY, Qgis.Info)
     else:
         # If the node is found and is not a reference this is the easy case
         if "ref" in found[0].attrib:
             ref_str = found[0].attrib["ref"]
-            return xpath_findref(root_el, ref_str, xpath_str)
+            return xpath_findref(root_el, ref_str, xpath_str, inputs_index)
         else:
             return found[0]
 
 
-def xpath_findref(root_el, ref_str, xpath_str):
+def xpath_findref(root_el, ref_str, xpath_str, inputs_index=None):
     """If the ref attribute is set then we need to go looking for an <Inputs> node
     that corresponds
 
@@ -509,19 +777,21 @@ def xpath_findref(root_el, ref_str, xpath_str):
         root_el ([type]): [description]
         ref_str ([type]): [description]
         xpath_str ([type]): [description]
+        inputs_index (dict, optional): id -> element index of <Inputs>. Defaults to None (built on the fly).
 
     Returns:
         [type]: [description]
     """
-    settings = Settings()
+    if inputs_index is None:
+        inputs_index = build_inputs_index(root_el)
     # Now we go hunting for the origin of the reference
-    origin = root_el.xpath(f'Inputs/*[@id="{ref_str}"]')
+    origin = inputs_index.get(ref_str)
     # we found the origin but the reference could not be found
-    if origin is None or len(origin) < 1:
-        settings.log("Missing Node", f'Error finding input node with xpath={xpath_str} and ref="{ref_str}"', Qgis.Warning)
+    if origin is None:
+        QgsMessageLog.logMessage(f'Missing Node: Error finding input node with xpath={xpath_str} and ref="{ref_str}"', MESSAGE_CATEGORY, Qgis.Warning)
         return
     else:
-        return origin[0]
+        return origin
 
 
 def get_xml_xpath(el: lxml.etree._Element) -> str:
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import os
+from typing import ClassVar
+
+from qgis.core import Qgis
+
+from .borg import Borg
+from .project import Project
+from .settings import Settings
+
+
+class ProjectCacheBorg(Borg):
+    """Shared-state base class so every ProjectCache instance sees the same projects"""
+
+    _shared_state: ClassVar[dict] = {}  # own dict — separate from Borg._shared_state
+
+
+class ProjectCache(ProjectCacheBorg):
+    """Process-wide cache of loaded local projects.
+
+    ``reload_tree`` rebuilds the whole tree whenever anything changes (opening a project,
+    switching basemap region, a NetSync finishing...). Without this every one of those
+    re-parses every project XML and business logic file and rebuilds every QStandardItem.
+
+    Entries are keyed on the absolute project XML path and are only reused while
+    ``Project.get_file_signature()`` still matches the one recorded at load time, i.e. the
+    project XML and its chosen business logic file have not been modified or swapped.
+    """
+
+    def __init__(self):
+        ProjectCacheBorg.__init__(self)
+        if "projects" not in self.__dict__:
+            self.projects: dict[str, Project] = {}
+            self.settings = Settings()
+
+    @staticmethod
+    def key(project_xml_path: str) -> str:
+        return os.path.normcase(os.path.abspath(project_xml_path))
+
+    def get(self, project_xml_path: str) -> Project:
+        """Return a loaded Project for this path, reusing the cached one if nothing changed on disk
+
+        Args:
+            project_xml_path (str): path to the project.rs.xml file
+
+        Returns:
+            Project: A loaded project. Check ``loadable`` before using it.
+        """
+        cached = self.lookup(project_xml_path)
+        if cached is not None:
+            return cached
+
+        project = Project(project_xml_path)
+        project.load()
+        self.put(project)
+        return project
+
+    def lookup(self, project_xml_path: str) -> Project | None:
+        """The cached Project for this path if it is still good, without loading anything
+
+        Args:
+            project_xml_path (str): path to the project.rs.xml file
+
+        Returns:
+            Project | None: The cached project or None if it needs to be (re)loaded
+        """
+        key = self.key(project_xml_path)
+        cached = self.projects.get(key)
+        if cached is None:
+            return None
+        # A tree built with different settings ("lazyProjectTree" toggled, another local business logic folder) has to be rebuilt too
+        if (
+            cached.qproject is not None
+            and cached.file_signature is not None
+            and cached.file_signature == cached.get_file_signature()
+            and cached.lazy == bool(self.settings.getValue("lazyProjectTree"))
+            and cached.local_bl_folder == self.settings.getValue("localBLFolder")
+        ):
+            return cached
+        self.settings.log(f"Project changed on disk. Reloading: {project_xml_path}", Qgis.Info)
+        self._evict(key)
+        return None
+
+    def put(self, project: Project) -> None:
+        """Seed the cache with a project that has already been loaded"""
+        if project.loadable and project.qproject is not None and project.file_signature is not None:
+            key = self.key(project.project_xml_path)
+            if self.projects.get(key) is not project:
+                self._evict(key)
+            self.projects[key] = project
+
+    def invalidate(self, project_xml_path: str | None = None) -> None:
+        """Drop one project (or all of them when no path is given) so the next ``get`` re-parses it"""
+        if project_xml_path is None:
+            for key in list(self.projects):
+                self._evict(key)
+        else:
+            self._evict(self.key(project_xml_path))
+
+    def prune(self, keep_paths: list[str]) -> None:
+        """Forget any project that is no longer open so we don't hold onto its trees"""
+        keep = {self.key(path) for path in keep_paths}
+        for key in [key for key in self.projects if key not in keep]:
+            self._evict(key)
+
+    def _evict(self, key: str) -> None:
+        """Drop a project. Its tree is never shown again so its file watcher has to go too"""
+        project = self.projects.pop(key, None)
+        if project is not None:
+            project.stop_watching()
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from typing import Callable
+
+from qgis.core import Qgis, QgsApplication, QgsTask
+
+from ..compat import QGSTASK_CAN_CANCEL
+from .project import Project
+from .project_cache import ProjectCache
+from .settings import Settings
+
+
+class LoadProjectTask(QgsTask):
+    """Parse a project and build its tree (``Project.load_data``) on a worker thread"""
+
+    def __init__(self, project: Project, callback: Callable[[LoadProjectTask, bool], None]):
+        super().__init__(f"Loading project {project.project_xml_path}", QGSTASK_CAN_CANCEL)
+        self.project = project
+        self.callback = callback
+
+    def run(self) -> bool:
+        self.project.load_data(should_stop=self.isCanceled)
+        return not self.isCanceled()
+
+    def finished(self, result: bool) -> None:
+        self.callback(self, result)
+
+
+class ProjectLoader:
+    """Load local projects without freezing QGIS.
+
+    ``Project.load`` parses the project XML, resolves every layer against the business logic
+    and checks every layer file exists. For a big project (or one on a network drive) that
+    takes long enough to lock up the whole UI. Here:
+
+    1. ``Project.load_data`` runs in a ``LoadProjectTask``. Several projects load at once.
+    2. Back on the main thread ``Project.build_items`` turns the finished tree into
+       ``QStandardItem``s, the project goes into the ``ProjectCache`` and the callbacks get it.
+
+    Asking for a project that is already loading doesn't start a second load.
+    """
+
+    def __init__(self):
+        self.settings = Settings()
+        # ProjectCache key -> task
+        self.tasks: dict[str, LoadProjectTask] = {}
+        self.callbacks: dict[str, list[Callable[[Project], None]]] = {}
+
+    def load(self, project_xml_path: str, on_loaded: Callable[[Project], None] | None = None) -> None:
+        """Start loading a project. ``on_loaded`` gets the Project when it's done, loadable or not"""
+        key = ProjectCache.key(project_xml_path)
+        if on_loaded is not None:
+            callbacks = self.callbacks.setdefault(key, [])
+            if on_loaded not in callbacks:
+                callbacks.append(on_loaded)
+        if key in self.tasks:
+            return
+
+        task = LoadProjectTask(Project(project_xml_path), self._handle_loaded)
+        self.tasks[key] = task
+        QgsApplication.taskManager().addTask(task)
+
+    def is_loading(self, project_xml_path: str) -> bool:
+        return ProjectCache.key(project_xml_path) in self.tasks
+
+    def cancel(self, project_xml_path: str | None = None) -> None:
+        """Cancel one load (or all of them when no path is given). Its callbacks are never called"""
+        keys = list(self.tasks.keys()) if project_xml_path is None else [ProjectCache.key(project_xml_path)]
+        for key in keys:
+            task = self.tasks.pop(key, None)
+            if task is not None:
+                task.cancel()
+            self.callbacks.pop(key, None)
+
+    def prune(self, keep_paths: list[str]) -> None:
+        """Cancel loading any project that is no longer open"""
+        keep = {ProjectCache.key(path) for path in keep_paths}
+        for key in list(self.tasks.keys()):
+            if key not in keep:
+                self.cancel(key)
+
+    def _handle_loaded(self, task: LoadProjectTask, result: bool) -> None:
+        key = ProjectCache.key(task.project.project_xml_path)
+        if self.tasks.get(key) is not task:
+            # Cancelled
+            return
+        del self.tasks[key]
+        callbacks = self.callbacks.pop(key, [])
+        if not result:
+            self.settings.log(f"Loading project was cancelled: {task.project.project_xml_path}", Qgis.Warning)
+            return
+
+        project = task.project
+        project.build_items()
+        ProjectCache().put(project)
+        for callback in callbacks:
+            callback(project)
@@ -4,7 +4,7 @@ from dataclasses import dataclass
 from enum import Enum
 import json
 import os
-from typing import Any
+from typing import Any, Callable
 import urllib.parse
 
 from qgis.core import (
@@ -38,8 +38,11 @@ except ImportError:
 from qgis.PyQt.QtGui import QStandardItem
 
 from ..compat import MAPBOX_GL_SUCCESS, USER_ROLE
+from .layer_registry import LayerRegistry, layer_identity, project_identity
 from .rspaths import parse_rel_path
 from .settings import CONSTANTS, Settings
+from .symbology import SymbologyIndex
+from .tree_index import PrecedingSiblings, SiblingPositions
 
 SYMBOLOGY_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "resources", "symbology")
 # BASE is the name we want to use inside the settings keys
@@ -59,6 +62,7 @@ class QRaveTreeTypes(str, Enum):
     PROJECT_VIEW = "PROJECT_VIEW"
     LEAF = "LEAF"  # any kind of end node: map-layers and other open-able files
     PROJECT_LOAD_ERROR = "PROJECT_LOAD_ERROR"
+    PROJECT_PLACEHOLDER = "PROJECT_PLACEHOLDER"  # stand-in child of a folder whose children haven't been built yet
     # Basemaps
     BASEMAP_ROOT = "BASEMAP_ROOT"
     BASEMAP_SUPER_FOLDER = "BASEMAP_SUPER_FOLDER"
@@ -95,7 +99,18 @@ class QRaveMapLayer:
         # Tile Types
         WEBTILE = "webtile"
 
-    def __init__(self, label: str, layer_type: str, layer_uri: str, bl_attr: dict[str, str] | None = None, meta: dict[str, str] | None = None, layer_name: str | None = None, tile_type: str | None = None, description: str | None = None):
+    def __init__(
+        self,
+        label: str,
+        layer_type: str,
+        layer_uri: str,
+        bl_attr: dict[str, str] | None = None,
+        meta: dict[str, str] | None = None,
+        layer_name: str | None = None,
+        tile_type: str | None = None,
+        description: str | None = None,
+        file_exists: Callable[[str], bool] | None = None,
+    ):
 
         self.label = label
         self.tiles_label = f"{label} (Tiles)"
@@ -123,39 +138,63 @@ class QRaveMapLayer:
         if self.layer_type == QRaveMapLayer.LayerTypes.WEBTILE:
             self.exists = True
         elif isinstance(self.layer_uri, str) and len(self.layer_uri) > 0:
-            self.exists = os.path.isfile(self.layer_uri)
+            # Projects pass in a DirectorySnapshot's exists so loading doesn't stat every file
+            self.exists = (file_exists or os.path.isfile)(self.layer_uri)
 
     @staticmethod
-    def _getlayerposition(item: QStandardItem) -> tuple[int, list]:
+    def _sibling_positions(parent: QStandardItem) -> SiblingPositions:
+        """One pass over a folder's children working out ``_getlayerposition`` for all of them"""
+        positions = SiblingPositions()
+        child_idx = 0
+        child = parent.child(child_idx)
+        child_data = child.data(USER_ROLE) if child is not None else None
+        while child_data is not None:
+            if isinstance(child_data.data, QRaveMapLayer):
+                takes_position = child_data.data.layer_type in [
+                    QRaveMapLayer.LayerTypes.LINE,
+                    QRaveMapLayer.LayerTypes.POINT,
+                    QRaveMapLayer.LayerTypes.POLYGON,
+                    QRaveMapLayer.LayerTypes.RASTER,
+                ]
+            else:
+                takes_position = child_data.type == QRaveTreeTypes.PROJECT_FOLDER
+            positions.add(child.text(), takes_position)
+            child_idx += 1
+            child = parent.child(child_idx)
+            child_data = child.data(USER_ROLE) if child is not None else None
+
+        return positions
 
+    @staticmethod
+    def _getlayerposition(item: QStandardItem) -> tuple[int, PrecedingSiblings]:
+        """Where an item's group goes among its siblings, and the names of the siblings before it (itself first)
+
+        The sibling positions come from the project's ``TreeIndex`` so each folder is only scanned once.
+        """
         name = item.text()
-        order = [name]
-        absolute_position = 0
         parent = item.parent()
-        if parent is not None:
-            child_idx = 0
-            child = parent.child(child_idx)
-            child_data = child.data(USER_ROLE)
-            while child_data is not None:
-                if child.text() == name:
-                    return absolute_position, order
-                if isinstance(child_data.data, QRaveMapLayer):
-                    if child_data.data.layer_type in [
-                        QRaveMapLayer.LayerTypes.LINE,
-                        QRaveMapLayer.LayerTypes.POINT,
-                        QRaveMapLayer.LayerTypes.POLYGON,
-                        QRaveMapLayer.LayerTypes.RASTER,
-                    ]:
-                        absolute_position += 1
-                else:
-                    if child_data.type == QRaveTreeTypes.PROJECT_FOLDER:
-                        absolute_position += 1
-                order.append(child.text())
-                child_idx += 1
-                child = parent.child(child_idx)
-                child_data = child.data(USER_ROLE) if child is not None else None
+        if parent is None:
+            return 0, PrecedingSiblings(SiblingPositions(), name, 0)
+
+        pt_data = item.data(USER_ROLE)
+        tree_index = getattr(pt_data.project, "tree_index", None) if pt_data is not None else None
+        if tree_index is not None:
+            positions = tree_index.sibling_positions(parent, QRaveMapLayer._sibling_positions)
+        else:
+            positions = QRaveMapLayer._sibling_positions(parent)
+        return positions.position(name)
 
-        return absolute_position, order
+    @staticmethod
+    def _group_names(group: QgsLayerTreeGroup) -> set[str]:
+        """Names of every group under ``group`` (what ``findGroup`` would find)"""
+        names = set()
+        stack = [group]
+        while stack:
+            for child in stack.pop().children():
+                if isinstance(child, QgsLayerTreeGroup):
+                    names.add(child.name())
+                    stack.append(child)
+        return names
 
     @staticmethod
     def _addgrouptomap(sGroupName: str, sGroupOrder: int, parentGroup: QgsLayerTreeGroup | None) -> QgsLayerTreeGroup:
@@ -216,27 +255,11 @@ class QRaveMapLayer:
                     level=Qgis.Warning,
                 )
             else:
-                qml_fname = f"{symbology}.qml"
-                os.path.abspath(os.path.join(project.project_dir, qml_fname))
-
-                # Here are the search paths for QML files in order of precedence
-                hierarchy = [
-                    os.path.abspath(os.path.join(project.project_dir, qml_fname)),
-                    # This is the default one
-                    os.path.abspath(os.path.join(SYMBOLOGY_DIR, project.project_type, qml_fname)),
-                    os.path.abspath(os.path.join(SYMBOLOGY_DIR, "Shared", qml_fname)),
-                ]
-                # Find the first match
-                try:
-                    chosen_qml = next(iter([candidate for candidate in hierarchy if os.path.isfile(candidate)]))
-                    # Report to the terminal if we couldn't find a qml file to use
-                    if chosen_qml is None:
-                        settings.log(
-                            "Missing Symbolog: Could not find a valid .qml symbology file for layer {}. Search paths: \n[\n{}]".format(map_layer.layer_uri, "   ,\n".join(hierarchy)),
-                            level=Qgis.Warning,
-                        )
-
-                except StopIteration:
+                # The index looks in the project folder, then SYMBOLOGY_DIR/<ProjectType>, then SYMBOLOGY_DIR/Shared
+                chosen_qml = SymbologyIndex().resolve(project.project_dir, project.project_type, symbology)
+                if chosen_qml is None:
+                    qml_fname = f"{symbology}.qml"
+                    hierarchy = [os.path.abspath(os.path.join(folder, qml_fname)) for folder in (project.project_dir, os.path.join(SYMBOLOGY_DIR, project.project_type or ""), os.path.join(SYMBOLOGY_DIR, "Shared")) if folder is not None]
                     settings.log(
                         "Could not find valid symbology for layer at any of the following search paths: [ {} ]".format(", ".join(hierarchy)),
                         Qgis.Warning,
@@ -263,12 +286,9 @@ class QRaveMapLayer:
         for agroup, group_order in ancestry_order:
             if parentGroup is None:
                 parentGroup = QgsProject.instance().layerTreeRoot()
-            pos = 0
-            group_order.reverse()
-            for group in group_order:
-                test_group = parentGroup.findGroup(group)
-                if test_group:
-                    pos += 1
+            # How many of the groups that come before this one are already in the map
+            existing_groups = QRaveMapLayer._group_names(parentGroup)
+            pos = group_order.count_in(existing_groups)
             parentGroup = QRaveMapLayer._addgrouptomap(agroup, pos, parentGroup)
 
         if parentGroup is None:
@@ -276,6 +296,128 @@ class QRaveMapLayer:
 
         return parentGroup, ancestry
 
+    @staticmethod
+    def registry_key(item: QStandardItem, tiles: bool = False) -> tuple[str, str] | None:
+        """The ``LayerRegistry`` key for a layer in the tree: (project identity, rsXPath or business logic id)
+
+        Returns:
+            tuple[str, str] | None: None for layers that don't belong to a project (basemaps) or that have no rsXPath/id
+        """
+        pt_data: ProjectTreeData = item.data(USER_ROLE)
+        map_layer: QRaveMapLayer = pt_data.data
+        project_key = project_identity(pt_data.project)
+        layer_key = layer_identity(map_layer.bl_attr, map_layer.layer_name, tiles)
+        if project_key is None or layer_key is None:
+            return None
+        return (project_key, layer_key)
+
+    @staticmethod
+    def find_existing_layer(label: str, ancestry: list, key: tuple[str, str] | None = None, same_project: bool = True) -> QgsMapLayer | None:
+        """Find the map layer for a project layer if it is already in the map
+
+        Layers we added are looked up in the ``LayerRegistry`` by ``key``. Layers that aren't in the registry
+        (basemaps, or layers saved in a QGIS project by an older version of the plugin) fall back to
+        comparing the label and the branch of the layer tree.
+
+        Args:
+            label (str): layer name in the map
+            ancestry (list): (group name, position) pairs from ``_prepare_parent_group``
+            key (tuple[str, str] | None): from ``registry_key``
+            same_project (bool): treat a layer with this label anywhere under the same project group as a match
+
+        Returns:
+            QgsMapLayer | None: the layer already in the map, if there is one
+        """
+        registry = LayerRegistry()
+        existing = registry.find(key)
+        if existing is not None:
+            return existing
+
+        candidates = registry.find_untagged(label) if registry.qproject is not None else QgsProject.instance().mapLayersByName(label)
+        for lyr in candidates:
+            lyr_ancestry = QRaveMapLayer.get_layer_ancestry(lyr)
+            # Now we compare the ancestry group labels to the business logic ancestry branch names
+            # to see if this layer is already in the map
+            if len(lyr_ancestry) == len(ancestry) and all(iter([ancestry[x][0] == lyr_ancestry[x] for x in range(len(ancestry))])):
+                return lyr
+            elif same_project and lyr_ancestry and len(ancestry) > 0 and lyr_ancestry[0] == ancestry[0][0]:  # same-named project check
+                return lyr
+        return None
+
+    @staticmethod
+    def create_qgs_layer(map_layer: QRaveMapLayer) -> QgsMapLayer | None:
+        """Construct the QGIS layer (this is where the data source gets opened). Safe to call off the main thread
+
+        Returns:
+            QgsMapLayer | None: None for layer types that don't go on the map
+        """
+        layer_uri = map_layer.layer_uri
+        # This might be a basemap
+        if map_layer.layer_type == QRaveMapLayer.LayerTypes.WEBTILE:
+            out_uri = layer_uri.replace("%3F", "?").replace("%3A", ":").replace("%2F", "/").replace("%3D", "=")
+            return QgsRasterLayer(out_uri, map_layer.label, "wms")
+
+        elif map_layer.layer_type in [
+            QRaveMapLayer.LayerTypes.LINE,
+            QRaveMapLayer.LayerTypes.POLYGON,
+            QRaveMapLayer.LayerTypes.POINT,
+        ]:
+            if map_layer.layer_name is not None:
+                layer_uri += f"|layername={map_layer.layer_name}"
+            return QgsVectorLayer(layer_uri, map_layer.label, "ogr")
+
+        elif map_layer.layer_type == QRaveMapLayer.LayerTypes.RASTER:
+            # Raster
+            return QgsRasterLayer(layer_uri, map_layer.label)
+
+        return None
+
+    @staticmethod
+    def style_qgs_layer(map_layer: QRaveMapLayer, rOutput: QgsMapLayer, chosen_qml: str | None) -> None:
+        """Apply the QML symbology and the business logic transparency to a new layer"""
+        settings = Settings()
+
+        ##########################################
+        # Symbology
+        ##########################################
+        if chosen_qml:
+            SymbologyIndex().apply(rOutput, chosen_qml)
+
+        ############################################################
+        # Transparency. A few notes:
+        # - QML transparency will prevail for rasters before 3.18
+        # - We set this here so that QML layer transparency will be
+        #   overruled
+        ############################################################
+        transparency = 0
+
+        try:
+            if map_layer.bl_attr is not None:
+                transparency = int(map_layer.bl_attr.get("transparency", 0))
+            else:
+                transparency = map_layer.transparency
+        except Exception as e:
+            settings.log(f"Error interpretting error in business logic: {e}", Qgis.Warning)
+
+        try:
+            if transparency > 0:
+                if rOutput.__class__ is QgsVectorLayer:
+                    rOutput.setOpacity((100 - transparency) / 100.0)
+                elif rOutput.__class__ is QgsRasterLayer:
+                    renderer = rOutput.renderer()
+                    renderer.setOpacity((100 - transparency) / 100.0)
+                    # rOutput.triggerRepaint()
+        except Exception as e:
+            settings.log(f"Error deriving transparency from layer: {e}", Qgis.Warning)
+
+    @staticmethod
+    def apply_filter(map_layer: QRaveMapLayer, rOutput: QgsMapLayer) -> None:
+        """Feature Filter (Definition Query). Has to happen after the layer is in the project"""
+        filter_expr = map_layer.bl_attr["filter"] if map_layer.bl_attr is not None and "filter" in map_layer.bl_attr else None
+
+        if filter_expr is not None:
+            rOutput.setSubsetString(filter_expr)
+
     @staticmethod
     def add_layer_to_map(item: QStandardItem) -> None:
         """
@@ -288,103 +430,34 @@ class QRaveMapLayer:
         pt_data: ProjectTreeData = item.data(USER_ROLE)
         map_layer: QRaveMapLayer = pt_data.data
 
-        settings = Settings()
-
         if not map_layer.exists:
             # Layer does not exist. do not try to put it on the map
             return
 
-        parentGroup, ancestry = QRaveMapLayer._prepare_parent_group(item)
-
         # Loop over all the parent group layers for this raster
         # ensuring they are in the tree in correct, nested order
+        parentGroup, ancestry = QRaveMapLayer._prepare_parent_group(item)
 
         # Only add the layer if it's not already in the registry
-        exists = False
-        existing_layers = QgsProject.instance().mapLayersByName(map_layer.label)
-        layers_ancestry = [QRaveMapLayer.get_layer_ancestry(lyr) for lyr in existing_layers]
-
-        # Now we compare the ancestry group labels to the business logic ancestry branch names
-        # to see if this layer is already in the map
-        for lyr in layers_ancestry:
-            if len(lyr) == len(ancestry) and all(iter([ancestry[x][0] == lyr[x] for x in range(len(ancestry))])):
-                exists = True
-                break
-            elif lyr and lyr[0] == ancestry[0][0]:  # same-named project check
-                exists = True
-                break
+        key = QRaveMapLayer.registry_key(item)
+        existing = QRaveMapLayer.find_existing_layer(map_layer.label, ancestry, key)
 
-        if not exists:
-            layer_uri = map_layer.layer_uri
-            rOutput = None
-            # This might be a basemap
-            if map_layer.layer_type == QRaveMapLayer.LayerTypes.WEBTILE:
-                out_uri = layer_uri.replace("%3F", "?").replace("%3A", ":").replace("%2F", "/").replace("%3D", "=")
-                rOutput = QgsRasterLayer(out_uri, map_layer.label, "wms")
-
-            elif map_layer.layer_type in [
-                QRaveMapLayer.LayerTypes.LINE,
-                QRaveMapLayer.LayerTypes.POLYGON,
-                QRaveMapLayer.LayerTypes.POINT,
-            ]:
-                if map_layer.layer_name is not None:
-                    layer_uri += f"|layername={map_layer.layer_name}"
-                rOutput = QgsVectorLayer(layer_uri, map_layer.label, "ogr")
-
-            elif map_layer.layer_type == QRaveMapLayer.LayerTypes.RASTER:
-                # Raster
-                rOutput = QgsRasterLayer(layer_uri, map_layer.label)
+        if existing is None:
+            rOutput = QRaveMapLayer.create_qgs_layer(map_layer)
 
             if rOutput is not None:
-                ##########################################
-                # Symbology
-                ##########################################
-                chosen_qml = QRaveMapLayer.find_layer_symbology(item)
-                if chosen_qml:
-                    rOutput.loadNamedStyle(chosen_qml)
-
-                ############################################################
-                # Transparency. A few notes:
-                # - QML transparency will prevail for rasters before 3.18
-                # - We set this here so that QML layer transparency will be
-                #   overruled
-                ############################################################
-                transparency = 0
-
-                try:
-                    if map_layer.bl_attr is not None:
-                        transparency = int(map_layer.bl_attr.get("transparency", 0))
-                    else:
-                        transparency = map_layer.transparency
-                except Exception as e:
-                    settings.log(f"Error interpretting error in business logic: {e}", Qgis.Warning)
-
-                try:
-                    if transparency > 0:
-                        if rOutput.__class__ is QgsVectorLayer:
-                            rOutput.setOpacity((100 - transparency) / 100.0)
-                        elif rOutput.__class__ is QgsRasterLayer:
-                            renderer = rOutput.renderer()
-                            renderer.setOpacity((100 - transparency) / 100.0)
-                            # rOutput.triggerRepaint()
-                except Exception as e:
-                    settings.log(f"Error deriving transparency from layer: {e}", Qgis.Warning)
+                QRaveMapLayer.style_qgs_layer(map_layer, rOutput, QRaveMapLayer.find_layer_symbology(item))
 
+                if key is not None:
+                    LayerRegistry.tag(rOutput, key)
                 QgsProject.instance().addMapLayer(rOutput, False)
                 parentGroup.insertChildNode(-1, QgsLayerTreeLayer(rOutput))
 
-                ##########################################
-                # Feature Filter (Definition Query)
-                ##########################################
-
-                filter_expr = map_layer.bl_attr["filter"] if map_layer.bl_attr is not None and "filter" in map_layer.bl_attr else None
-
-                if filter_expr is not None:
-                    rOutput.setSubsetString(filter_expr)
+                QRaveMapLayer.apply_filter(map_layer, rOutput)
 
         # if the layer already exists trigger a refresh
         else:
-            QgsProject.instance().mapLayersByName(map_layer.label)[0].triggerRepaint()
+            existing.triggerRepaint()
 
     @staticmethod
     def add_remote_vector_layer_to_map(item: QStandardItem, tile_service: dict) -> None:
@@ -396,17 +469,10 @@ class QRaveMapLayer:
         parentGroup, ancestry = QRaveMapLayer._prepare_parent_group(item)
 
         # Check if exists
-        existing_layers = QgsProject.instance().mapLayersByName(map_layer.tiles_label)
-        layers_ancestry = [QRaveMapLayer.get_layer_ancestry(lyr) for lyr in existing_layers]
-
-        exists = False
-        for lyr in layers_ancestry:
-            if len(lyr) == len(ancestry) and all(iter([ancestry[x][0] == lyr[x] for x in range(len(ancestry))])):
-                exists = True
-                break
-
-        if exists:
-            QgsProject.instance().mapLayersByName(map_layer.tiles_label)[0].triggerRepaint()
+        key = QRaveMapLayer.registry_key(item, tiles=True)
+        existing = QRaveMapLayer.find_existing_layer(map_layer.tiles_label, ancestry, key, same_project=False)
+        if existing is not None:
+            existing.triggerRepaint()
             return
 
         # Construct Tile URL
@@ -459,6 +525,8 @@ class QRaveMapLayer:
             settings.log(f"Adding remote layer URI: {uri}", Qgis.Info)
 
         if rOutput and rOutput.isValid():
+            if key is not None:
+                LayerRegistry.tag(rOutput, key)
             QgsProject.instance().addMapLayer(rOutput, False)
             parentGroup.insertChildNode(-1, QgsLayerTreeLayer(rOutput))
 
@@ -584,17 +652,10 @@ class QRaveMapLayer:
         parentGroup, ancestry = QRaveMapLayer._prepare_parent_group(item)
 
         # Check if exists
-        existing_layers = QgsProject.instance().mapLayersByName(map_layer.tiles_label)
-        layers_ancestry = [QRaveMapLayer.get_layer_ancestry(lyr) for lyr in existing_layers]
-
-        exists = False
-        for lyr in layers_ancestry:
-            if len(lyr) == len(ancestry) and all(iter([ancestry[x][0] == lyr[x] for x in range(len(ancestry))])):
-                exists = True
-                break
-
-        if exists:
-            QgsProject.instance().mapLayersByName(map_layer.tiles_label)[0].triggerRepaint()
+        key = QRaveMapLayer.registry_key(item, tiles=True)
+        existing = QRaveMapLayer.find_existing_layer(map_layer.tiles_label, ancestry, key, same_project=False)
+        if existing is not None:
+            existing.triggerRepaint()
             return
 
         # Symbology logic provided by user
@@ -641,6 +702,8 @@ class QRaveMapLayer:
         rOutput = QgsRasterLayer(uri, map_layer.tiles_label, provider)
 
         if rOutput and rOutput.isValid():
+            if key is not None:
+                LayerRegistry.tag(rOutput, key)
             QgsProject.instance().addMapLayer(rOutput, False)
             parentGroup.insertChildNode(-1, QgsLayerTreeLayer(rOutput))
 
@@ -698,6 +761,8 @@ class QRaveMapLayer:
                 settings.log("Retrying without explicit 'gdal' provider...", Qgis.Info)
                 rOutput = QgsRasterLayer(uri, map_layer.tiles_label)
                 if rOutput and rOutput.isValid():
+                    if key is not None:
+                        LayerRegistry.tag(rOutput, key)
                     QgsProject.instance().addMapLayer(rOutput, False)
                     parentGroup.insertChildNode(-1, QgsLayerTreeLayer(rOutput))
                     settings.log("Success on retry without provider!", Qgis.Info)
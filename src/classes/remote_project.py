@@ -7,6 +7,7 @@ from ..compat import USER_ROLE
 from ..icon_utils import qrave_icon
 from .qrave_map_layer import ProjectTreeData, QRaveMapLayer, QRaveTreeTypes
 from .settings import CONSTANTS, Settings
+from .tree_index import TreeIndex
 
 
 class RemoteProject:
@@ -31,6 +32,7 @@ class RemoteProject:
         self.views = {}
 
         self.qproject = None
+        self.tree_index = TreeIndex()
         self.exists = True  # Remote project always exists if we have data
         self.loadable = True
         self.project_dir = None  # Remote projects don't have a local dir (yet)
@@ -47,6 +49,7 @@ class RemoteProject:
         return self._icon_cache[alias]
 
     def load(self) -> None:
+        self.tree_index.invalidate()
         self._build_tree()
         self._build_views()
 
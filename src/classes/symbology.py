@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import os
+import threading
+from typing import ClassVar
+
+from qgis.core import Qgis, QgsMapLayer, QgsMessageLog
+from qgis.PyQt.QtXml import QDomDocument
+
+from .borg import Borg
+from .settings import CONSTANTS
+
+MESSAGE_CATEGORY = CONSTANTS["logCategory"]
+
+SYMBOLOGY_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "resources", "symbology"))
+SHARED_DIR = "Shared"
+
+
+class SymbologyIndexBorg(Borg):
+    """Shared-state base class so every index instance sees the same files"""
+
+    _shared_state: ClassVar[dict] = {}  # own dict — separate from Borg._shared_state
+
+
+class SymbologyIndex(SymbologyIndexBorg):
+    """Process-wide index of the QML symbology files so adding a layer never has to probe the disk.
+
+    The resources symbology folder is scanned once (``build``) into
+    ``folder -> symbology -> path`` and each project folder is scanned for its own QML files
+    the first time one of its layers is styled. Resolution follows the same order as before:
+    the project folder, then ``<ProjectType>``, then ``Shared``.
+
+    The contents of each QML file are read once and styles are applied from memory with
+    ``importNamedStyle``. NetSync invalidates the files it downloads or removes.
+    """
+
+    def __init__(self):
+        SymbologyIndexBorg.__init__(self)
+        if "lock" not in self.__dict__:
+            self.lock = threading.Lock()
+            self.symbology_dir = SYMBOLOGY_DIR
+            # None until the resources folder has been scanned
+            self.folders: dict[str, dict[str, str]] | None = None
+            self.projects: dict[str, dict[str, str]] = {}
+            self.documents: dict[str, bytes] = {}
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    @staticmethod
+    def _scan(folder: str) -> dict[str, str]:
+        """symbology name -> QML path for the QML files directly inside a folder"""
+        found = {}
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    name, ext = os.path.splitext(entry.name)
+                    if ext.lower() == ".qml" and entry.is_file():
+                        found[os.path.normcase(name)] = os.path.abspath(entry.path)
+        except OSError:
+            pass
+        return found
+
+    def use_folder(self, symbology_dir: str) -> None:
+        """Point the index at a different resources symbology folder (and forget everything)"""
+        with self.lock:
+            self.symbology_dir = symbology_dir
+            self._clear()
+
+    def build(self) -> None:
+        """Scan the resources symbology folder. Project folders are scanned when they're first needed"""
+        folders = {}
+        try:
+            with os.scandir(self.symbology_dir) as entries:
+                subdirs = [entry for entry in entries if entry.is_dir()]
+        except OSError:
+            subdirs = []
+        for entry in subdirs:
+            folders[os.path.normcase(entry.name)] = self._scan(entry.path)
+        with self.lock:
+            self.folders = folders
+
+    def resolve(self, project_dir: str | None, project_type: str | None, symbology: str) -> str | None:
+        """Find the QML file for a layer
+
+        Args:
+            project_dir (str | None): folder of the project.rs.xml. QML files here win
+            project_type (str | None): e.g. "VBET"
+            symbology (str): the business logic ``symbology`` attribute (file name without .qml)
+
+        Returns:
+            str | None: absolute path to the QML file or None if there isn't one
+        """
+        if self.folders is None:
+            self.build()
+        name = os.path.normcase(symbology)
+        with self.lock:
+            if project_dir is not None:
+                project_key = self._key(project_dir)
+                if project_key not in self.projects:
+                    self.projects[project_key] = self._scan(project_dir)
+                if name in self.projects[project_key]:
+                    return self.projects[project_key][name]
+            for folder in (project_type, SHARED_DIR):
+                if folder is None:
+                    continue
+                path = (self.folders or {}).get(os.path.normcase(folder), {}).get(name)
+                if path is not None:
+                    return path
+        return None
+
+    def get_document(self, qml_path: str) -> bytes | None:
+        """The contents of a QML file, read from disk only the first time"""
+        key = self._key(qml_path)
+        with self.lock:
+            if key in self.documents:
+                return self.documents[key]
+        try:
+            with open(qml_path, "rb") as f:
+                contents = f.read()
+        except OSError as e:
+            QgsMessageLog.logMessage(f"Could not read symbology file {qml_path}: {e}", MESSAGE_CATEGORY, level=Qgis.Warning)
+            return None
+        with self.lock:
+            self.documents[key] = contents
+        return contents
+
+    def apply(self, layer: QgsMapLayer, qml_path: str) -> bool:
+        """Style a layer from the cached QML. Falls back to ``loadNamedStyle`` if QGIS won't take it from memory
+
+        Returns:
+            bool: True if the style was applied from memory
+        """
+        contents = self.get_document(qml_path)
+        if contents is not None:
+            doc = QDomDocument()
+            doc.setContent(contents)
+            result = layer.importNamedStyle(doc)
+            # PyQGIS returns (success, error message)
+            success = result[0] if isinstance(result, tuple) else bool(result)
+            if success:
+                return True
+            QgsMessageLog.logMessage(f"Could not apply symbology {qml_path} from memory, loading it from disk instead: {result}", MESSAGE_CATEGORY, level=Qgis.Warning)
+        layer.loadNamedStyle(qml_path)
+        return False
+
+    def invalidate(self, paths: list[str] | None = None) -> None:
+        """Forget specific QML files that changed on disk (or everything when no paths are given).
+
+        Either way the folders are scanned again the next time they're needed so new and
+        deleted files are picked up.
+        """
+        with self.lock:
+            if paths is None:
+                self._clear()
+                return
+            for path in paths:
+                self.documents.pop(self._key(path), None)
+            self.folders = None
+
+    def forget_project(self, project_dir: str) -> None:
+        """Rescan a project folder for QML files the next time one of its layers is styled"""
+        project_key = self._key(project_dir)
+        with self.lock:
+            self.projects.pop(project_key, None)
+            self.documents = {key: contents for key, contents in self.documents.items() if not key.startswith(project_key + os.sep)}
+
+    def _clear(self) -> None:
+        self.folders = None
+        self.projects = {}
+        self.documents = {}
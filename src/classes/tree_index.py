@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import deque
+from collections.abc import Iterator
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    from qgis.PyQt.QtCore import QModelIndex
+    from qgis.PyQt.QtGui import QStandardItem, QStandardItemModel
+    from qgis.PyQt.QtWidgets import QTreeView
+
+
+class SiblingPositions:
+    """Where each child of a folder goes among its siblings, worked out in one pass over the children
+
+    ``add`` is called for each child in order with the number of siblings before it that
+    take up a position (layers and folders that end up in the QGIS layer tree).
+    """
+
+    def __init__(self):
+        self.names: list[str] = []
+        # name -> (absolute position, row) of the first child with that name
+        self.first: dict[str, tuple[int, int]] = {}
+        # name -> rows of every child with that name
+        self.rows: dict[str, list[int]] = {}
+        self.absolute_position = 0
+
+    def add(self, name: str, takes_position: bool) -> None:
+        row = len(self.names)
+        if name not in self.first:
+            self.first[name] = (self.absolute_position, row)
+        self.rows.setdefault(name, []).append(row)
+        self.names.append(name)
+        if takes_position:
+            self.absolute_position += 1
+
+    def position(self, name: str) -> tuple[int, PrecedingSiblings]:
+        """The absolute position of the first child called ``name`` and the siblings before it"""
+        absolute_position, row = self.first.get(name, (self.absolute_position, len(self.names)))
+        return absolute_position, PrecedingSiblings(self, name, row)
+
+
+class PrecedingSiblings:
+    """An item's name followed by the names of the siblings before it, without copying them out of ``SiblingPositions``"""
+
+    def __init__(self, siblings: SiblingPositions, name: str, row: int):
+        self.siblings = siblings
+        self.name = name
+        self.row = row
+
+    def __len__(self) -> int:
+        return self.row + 1
+
+    def __iter__(self) -> Iterator[str]:
+        yield self.name
+        yield from self.siblings.names[: self.row]
+
+    def count_in(self, names: set[str]) -> int:
+        """How many of these names are in ``names`` (counting repeats)"""
+        count = 1 if self.name in names else 0
+        if len(names) < self.row:
+            # Fewer names to look for than siblings to look at
+            for name in names:
+                count += bisect_left(self.siblings.rows.get(name, ()), self.row)
+        else:
+            count += sum(1 for name in self.siblings.names[: self.row] if name in names)
+        return count
+
+
+class TreeIndex:
+    """Per-project cache of what ``QRaveMapLayer._prepare_parent_group`` needs to know about the tree.
+
+    Working out where a group goes in the QGIS layer tree means looking at all the siblings
+    before it, for every ancestor of every layer added. The sibling positions of a folder's
+    children are worked out in one pass the first time they're asked for and kept until the
+    folder's children change (``Project.populate``) or the tree is rebuilt.
+    """
+
+    def __init__(self):
+        self.siblings: dict[QStandardItem, SiblingPositions] = {}
+
+    def sibling_positions(self, parent: QStandardItem, compute: Callable[[QStandardItem], SiblingPositions]) -> SiblingPositions:
+        positions = self.siblings.get(parent)
+        if positions is None:
+            positions = compute(parent)
+            self.siblings[parent] = positions
+        return positions
+
+    def invalidate(self, parent: QStandardItem | None = None) -> None:
+        """Forget one folder (its children changed) or everything (the tree was rebuilt)"""
+        if parent is None:
+            self.siblings = {}
+        else:
+            self.siblings.pop(parent, None)
+
+
+def iter_descendants(root_item: QStandardItem) -> Iterator[QStandardItem]:
+    """Every item under ``root_item``, breadth first"""
+    queue = deque([root_item])
+    while queue:
+        parent = queue.popleft()
+        for row in range(parent.rowCount()):
+            for column in range(parent.columnCount()):
+                child = parent.child(row, column)
+                yield child
+                if child.hasChildren():
+                    queue.append(child)
+
+
+def get_expanded_paths(tree_view: QTreeView, model: QStandardItemModel, idx: QModelIndex) -> set[tuple[str, ...]]:
+    """Paths (tuples of labels) of the expanded items at and below ``idx``. ``idx`` itself is ``()``.
+
+    Only expanded items are descended into: whatever is under a collapsed item can't be seen
+    so there is nothing to restore there. This keeps the cost down to the visible part of
+    the tree instead of every item in the model.
+    """
+    paths = set()
+    if not idx.isValid() or not tree_view.isExpanded(idx):
+        return paths
+    stack = [(idx, ())]
+    while stack:
+        curr_idx, curr_path = stack.pop()
+        paths.add(curr_path)
+        for row in range(model.rowCount(curr_idx)):
+            child_idx = model.index(row, 0, curr_idx)
+            if tree_view.isExpanded(child_idx):
+                item = model.itemFromIndex(child_idx)
+                if item is not None:
+                    stack.append((child_idx, (*curr_path, item.text())))
+    return paths
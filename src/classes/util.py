@@ -8,6 +8,8 @@ import re
 from qgis.core import Qgis, QgsMessageLog
 import requests
 
+from .hash_cache import HashCache
+from .http_session import HttpSession
 from .settings import CONSTANTS
 
 # BASE is the name we want to use inside the settings keys
@@ -37,6 +39,37 @@ def md5(fname: str) -> str | None:
         return None
 
 
+def cached_md5(fname: str, verify: bool = False) -> str | None:
+    """Same as md5() but files that haven't changed since they were last hashed are looked up
+    in the on-disk hash cache instead of being read again.
+
+    Args:
+        fname (str): path to the file
+        verify (bool, optional): always hash the file and warn if the cached value was wrong. Defaults to False.
+
+    Returns:
+        str: the MD5 hex digest or None if the file could not be read
+    """
+    hash_cache = HashCache()
+    try:
+        record = hash_cache.identify(fname)
+    except OSError:
+        return md5(fname)
+
+    cached = hash_cache.lookup([record]).get(record.path)
+    if cached is not None and cached.md5 is not None and not verify:
+        return cached.md5
+
+    record.md5 = md5(fname)
+    if record.md5 is None:
+        return None
+    if cached is not None and cached.md5 is not None and cached.md5 != record.md5:
+        QgsMessageLog.logMessage(f"Cached MD5 was wrong for {fname}. The hash cache has been updated", MESSAGE_CATEGORY, level=Qgis.Warning)
+        hash_cache.invalidate([fname])
+    hash_cache.store([record])
+    return record.md5
+
+
 def requestFetch(remote_url: str, expected_md5: str | None = None) -> bytes | bool:
     """Request a file from a remote URL and return the content. Optionally check the MD5 hash of the file.
 
@@ -52,7 +85,7 @@ def requestFetch(remote_url: str, expected_md5: str | None = None) -> bytes | bo
     """
     # Get a file and put it somewhere local
     try:
-        resp = requests.get(url=remote_url, timeout=15)
+        resp = HttpSession().get(remote_url, timeout=15)
         return resp.content
 
     except requests.exceptions.Timeout:
@@ -84,7 +117,7 @@ def requestDownload(remote_url: str, local_path: str, expected_md5: str | None =
     """
     # Get a file and put it somewhere local
     try:
-        resp = requests.get(url=remote_url, timeout=15, headers={"Cache-Control": "no-cache"})
+        resp = HttpSession().get(remote_url, timeout=15, headers={"Cache-Control": "no-cache"})
         resp.raise_for_status()  # Raise an HTTPError for bad responses (4xx and 5xx)
         local_dir = os.path.dirname(local_path)  # Excludes file name
         if not os.path.exists(local_dir):
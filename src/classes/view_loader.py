@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import time
+from typing import Any, Callable
+
+from qgis.core import Qgis, QgsApplication, QgsLayerTreeGroup, QgsLayerTreeLayer, QgsMapLayer, QgsProject, QgsTask
+from qgis.PyQt.QtGui import QStandardItem
+
+from ..compat import QGSTASK_CAN_CANCEL, USER_ROLE
+from .layer_registry import LayerRegistry
+from .qrave_map_layer import QRaveMapLayer
+from .settings import Settings
+
+# Opening data sources is mostly waiting on GDAL/OGR and the disk so a few threads go a long way
+MAX_WORKERS = 4
+
+
+@dataclass
+class LayerLoadJob:
+    """One layer on its way to the map, plus how long each step took"""
+
+    item: QStandardItem
+    map_layer: QRaveMapLayer
+    group: QgsLayerTreeGroup
+    key: tuple
+    registry_key: tuple[str, str] | None = None
+    qml: str | None = None
+    layer: QgsMapLayer | None = None
+    error: str | None = None
+    create_ms: float = 0.0
+    style_ms: float = 0.0
+
+
+class CreateLayersTask(QgsTask):
+    """Construct the QGIS layers for a batch of jobs on worker threads.
+
+    Constructing a layer is where the provider opens and validates the data source, which
+    is the slow part. Layers are moved to the main thread before the task finishes so they
+    can be styled and added to the project there.
+    """
+
+    def __init__(
+        self,
+        jobs: list[LayerLoadJob],
+        callback: Callable[[CreateLayersTask, bool], None],
+        max_workers: int = MAX_WORKERS,
+        on_done: Callable[[list[LayerLoadJob]], None] | None = None,
+    ):
+        super().__init__(f"Opening {len(jobs)} layers", QGSTASK_CAN_CANCEL)
+        self.jobs = jobs
+        self.callback = callback
+        self.max_workers = max_workers
+        self.on_done = on_done
+
+    def run(self) -> bool:
+        main_thread = QgsApplication.instance().thread()
+
+        def _create(job: LayerLoadJob) -> None:
+            if self.isCanceled():
+                return
+            started = time.perf_counter()
+            try:
+                job.layer = QRaveMapLayer.create_qgs_layer(job.map_layer)
+                if job.layer is not None:
+                    job.layer.moveToThread(main_thread)
+            except Exception as e:
+                job.error = str(e)
+            job.create_ms = (time.perf_counter() - started) * 1000
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for done, _ in enumerate(pool.map(_create, self.jobs), start=1):
+                self.setProgress(100 * done / len(self.jobs))
+        return not self.isCanceled()
+
+    def finished(self, result: bool) -> None:
+        self.callback(self, result)
+
+
+class ViewLoader:
+    """Add a batch of project layers (a whole view or folder) to the map in one go.
+
+    Adding layers one at a time with ``QRaveMapLayer.add_layer_to_map`` rebuilds the parent
+    groups for every layer, opens every data source on the main thread and redraws the
+    canvas on every ``addMapLayer``. Here:
+
+    1. Parent groups are resolved once per tree folder and the existence checks and QML
+       lookups happen up front on the main thread. The groups are resolved again (still once
+       per folder) when the layers go in, in case the user changed the layer tree meanwhile.
+    2. The layers are constructed on worker threads (``CreateLayersTask``).
+    3. Back on the main thread they are styled and registered with a single
+       ``addMapLayers`` call while the canvas is frozen, then the canvas redraws once.
+
+    Timings for every layer are written to the log.
+    """
+
+    def __init__(self, canvas: Any = None, max_workers: int = MAX_WORKERS):
+        self.canvas = canvas
+        self.max_workers = max_workers
+        self.settings = Settings()
+        self.tasks: list[CreateLayersTask] = []
+        # Layers that are being opened but aren't on the map yet, so a second load doesn't add them again
+        self.pending: set[tuple] = set()
+
+    def load(self, items: list[QStandardItem], on_done: Callable[[list[LayerLoadJob]], None] | None = None) -> None:
+        """Start loading. ``on_done`` gets the jobs once the layers are on the map"""
+        jobs = self.plan(items)
+        if len(jobs) == 0:
+            if on_done:
+                on_done([])
+            return
+        self.pending.update(job.key for job in jobs)
+        task = CreateLayersTask(jobs, self._handle_created, self.max_workers, on_done)
+        self.tasks.append(task)
+        QgsApplication.taskManager().addTask(task)
+
+    def cancel(self) -> None:
+        """Cancel every load in progress. Nothing more gets added to the map"""
+        for task in self.tasks:
+            task.cancel()
+        self.tasks = []
+        self.pending = set()
+
+    def plan(self, items: list[QStandardItem]) -> list[LayerLoadJob]:
+        """Work out which layers actually need adding and where they go. Main thread only"""
+        groups = {}
+        planned = set()
+        jobs = []
+        for item in items:
+            map_layer: QRaveMapLayer = item.data(USER_ROLE).data
+            if not map_layer.exists:
+                continue
+
+            # Siblings share their parent groups so only resolve them once per folder
+            folder_key = self._folder_key(item)
+            if folder_key not in groups:
+                groups[folder_key] = QRaveMapLayer._prepare_parent_group(item)
+            group, ancestry = groups[folder_key]
+
+            registry_key = QRaveMapLayer.registry_key(item)
+            existing = QRaveMapLayer.find_existing_layer(map_layer.label, ancestry, registry_key)
+            if existing is not None:
+                existing.triggerRepaint()
+                continue
+            # Nothing from this batch is on the map yet so it can't be in the registry. Layers without
+            # a registry key follow find_existing_layer's rule: same label in the same project
+            layer_key = registry_key or (ancestry[0][0] if len(ancestry) > 0 else None, map_layer.label)
+            if layer_key in planned or layer_key in self.pending:
+                continue
+            planned.add(layer_key)
+
+            jobs.append(LayerLoadJob(item, map_layer, group, layer_key, registry_key, QRaveMapLayer.find_layer_symbology(item)))
+        return jobs
+
+    @staticmethod
+    def _folder_key(item: QStandardItem) -> tuple:
+        key = []
+        parent = item.parent()
+        while parent is not None:
+            key.append((parent.row(), parent.text()))
+            parent = parent.parent()
+        return tuple(key)
+
+    def _handle_created(self, task: CreateLayersTask, result: bool) -> None:
+        if task not in self.tasks:
+            # Cancelled
+            return
+        self.tasks.remove(task)
+        self.pending.difference_update(job.key for job in task.jobs)
+        if not result:
+            self.settings.log(f"Adding {len(task.jobs)} layers to the map was cancelled", Qgis.Warning)
+            return
+
+        started = time.perf_counter()
+        jobs = [job for job in task.jobs if job.layer is not None]
+        # The groups from plan() may have been removed (or moved) while the layers were being opened
+        groups = {}
+        for job in jobs:
+            folder_key = self._folder_key(job.item)
+            if folder_key not in groups:
+                groups[folder_key] = QRaveMapLayer._prepare_parent_group(job.item)[0]
+            job.group = groups[folder_key]
+
+        if self.canvas is not None:
+            self.canvas.freeze(True)
+        try:
+            for job in jobs:
+                style_start = time.perf_counter()
+                QRaveMapLayer.style_qgs_layer(job.map_layer, job.layer, job.qml)
+                if job.registry_key is not None:
+                    LayerRegistry.tag(job.layer, job.registry_key)
+                job.style_ms = (time.perf_counter() - style_start) * 1000
+
+            QgsProject.instance().addMapLayers([job.layer for job in jobs], False)
+            for job in jobs:
+                job.group.insertChildNode(-1, QgsLayerTreeLayer(job.layer))
+                QRaveMapLayer.apply_filter(job.map_layer, job.layer)
+        finally:
+            if self.canvas is not None:
+                self.canvas.freeze(False)
+                self.canvas.refresh()
+
+        self._log_timings(task.jobs, (time.perf_counter() - started) * 1000)
+        if task.on_done:
+            task.on_done(task.jobs)
+
+    def _log_timings(self, jobs: list[LayerLoadJob], add_ms: float) -> None:
+        lines = [f"Added {len([job for job in jobs if job.layer is not None])} of {len(jobs)} layers to the map. Adding them took {add_ms:.0f} ms:"]
+        for job in jobs:
+            if job.layer is None:
+                lines.append(f"    {job.map_layer.label}: FAILED after {job.create_ms:.0f} ms {job.error or ''}")
+            else:
+                lines.append(f"    {job.map_layer.label}: open {job.create_ms:.0f} ms, style {job.style_ms:.0f} ms")
+        self.settings.log("\n".join(lines), Qgis.Info)
@@ -27,7 +27,7 @@ from collections.abc import Iterator
 import json
 import os
 
-from qgis.core import Qgis, QgsApplication, QgsProject
+from qgis.core import Qgis, QgsProject
 from qgis.PyQt.QtCore import QModelIndex, Qt, QTimer, QUrl, pyqtSignal, pyqtSlot
 from qgis.PyQt.QtGui import QDesktopServices, QStandardItem, QStandardItemModel
 from qgis.PyQt.QtWidgets import QApplication, QDockWidget, QFileDialog, QMessageBox
@@ -35,13 +35,20 @@ from qgis.PyQt.QtWidgets import QApplication, QDockWidget, QFileDialog, QMessage
 from .classes.basemaps import BaseMaps, QRaveBaseMap
 from .classes.context_menu import ContextMenu
 from .classes.data_exchange.DataExchangeAPI import DataExchangeAPI
-from .classes.GraphQLAPI import FetchJsonTask, RefreshTokenTask, RunGQLQueryTask
+from .classes.data_exchange.dataset_pager import DatasetMetadataPager
+from .classes.data_exchange.tile_metadata import INDEX_STAGE, SYMBOLOGY_STAGE, TILES_STAGE, RemoteLayerFetch, TileIndexCache
+from .classes.GraphQLAPI import RefreshTokenTask, RunGQLQueryTask
 from .classes.project import Project, ProjectTreeData
+from .classes.project_cache import ProjectCache
+from .classes.project_loader import ProjectLoader
 from .classes.qrave_map_layer import QRaveMapLayer, QRaveTreeTypes
 from .classes.remote_project import RemoteProject
 from .classes.rspaths import safe_make_abspath, safe_make_relpath
 from .classes.settings import CONSTANTS, MESSAGE_CATEGORY, Settings
+from .classes.symbology import SymbologyIndex
 from .classes.telemetry import Telemetry
+from .classes.tree_index import get_expanded_paths, iter_descendants
+from .classes.view_loader import ViewLoader
 from .compat import MSGBOX_BTN_NO, MSGBOX_BTN_YES, USER_ROLE
 from .icon_utils import qrave_icon
 from .meta_widget import MetaType
@@ -85,10 +92,26 @@ class QRAVEDockWidget(QDockWidget, Ui_QRAVEDockWidgetBase):
         self.failed_loads = []
         self._remote_project_cache = {}
         self._fetching_projects = set()
+        # Dataset metadata still coming in for remote projects: project id -> pager
+        self._dataset_pagers: dict[str, DatasetMetadataPager] = {}
+        # project id -> (cached dataset items, the same items by id)
+        self._dataset_index: dict[str, tuple[list[dict], dict[str, dict]]] = {}
         self.dataExchangeAPI: DataExchangeAPI | None = None
 
         self.model = QStandardItemModel()
 
+        # Adds views and folders full of layers to the map in one batch
+        from qgis.utils import iface
+
+        self.view_loader = ViewLoader(iface.mapCanvas() if iface is not None else None)
+
+        # Parses local projects on worker threads so a big project doesn't freeze QGIS
+        self.project_loader = ProjectLoader()
+        # Expanded folders of projects that are being reloaded, restored once they arrive
+        self._pending_expanded: dict[str, set[tuple[str, ...]]] = {}
+        # Projects being opened with add_project that aren't in the settings yet: path key -> label
+        self._adding: dict[str, str] = {}
+
         # Initialize our classes
         self.basemaps = BaseMaps()
         self.treeView.setModel(self.model)
@@ -102,6 +125,9 @@ class QRAVEDockWidget(QDockWidget, Ui_QRAVEDockWidgetBase):
         item_data = item.data(USER_ROLE)
         if item_data and item_data.data and isinstance(item_data.data, QRaveBaseMap):
             item_data.data.load_layers()
+        # Lazy project trees build a folder's children the first time it's expanded
+        elif item_data and isinstance(item_data.project, Project):
+            item_data.project.populate(item)
 
     def _get_projects(self) -> list:
         """Get the list of loaded projects
@@ -138,31 +164,12 @@ class QRAVEDockWidget(QDockWidget, Ui_QRAVEDockWidgetBase):
         # Store sets of expanded paths keyed by project name
         expanded_paths_by_project = {}
 
-        def get_expanded_paths(idx, parent_path=""):
-            paths = set()
-
-            # If the current item is expanded, add its path
-            if self.treeView.isExpanded(idx):
-                paths.add(parent_path)
-
-            for idy in range(self.model.rowCount(idx)):
-                child_idx = self.model.index(idy, 0, idx)
-                item = self.model.itemFromIndex(child_idx)
-                if item:
-                    # Determine unique path for child
-                    # Use a delimiter (e.g., '///') to avoid collision with folder names
-                    item_name = item.text()
-                    child_path = f"{parent_path}///{item_name}" if parent_path else item_name
-                    paths.update(get_expanded_paths(child_idx, child_path))
-
-            return paths
-
         new_projects = self._get_projects()  # noqa: F841 (used only to warm cache before iterating)
 
         for project in self._get_projects():
             if not isinstance(project, str):
                 project_name = project.qproject.text()
-                paths = get_expanded_paths(self.model.indexFromItem(project.qproject), "")
+                paths = get_expanded_paths(self.treeView, self.model, self.model.indexFromItem(project.qproject))
                 expanded_paths_by_project[project_name] = paths
 
         basemap_paths = None
@@ -173,11 +180,19 @@ class QRAVEDockWidget(QDockWidget, Ui_QRAVEDockWidgetBase):
                 item = self.basemaps.regions[region]
                 idx = self.model.indexFromItem(item)
                 if idx.isValid():
-                    basemap_paths = get_expanded_paths(idx, "")
+                    basemap_paths = get_expanded_paths(self.treeView, self.model, idx)
 
+        # Detach the top-level rows before clearing. clear() deletes every item the model
+        # still owns, which would destroy the trees ProjectCache holds on to for reuse.
+        while self.model.rowCount() > 0:
+            self.model.takeRow(0)
         self.model.clear()
 
         qrave_projects = self.get_project_settings()
+        project_cache = ProjectCache()
+        local_paths = [path for _, _, path in qrave_projects if not path.startswith("remote:")]
+        project_cache.prune(local_paths)
+        self.project_loader.prune(local_paths + list(self._adding.keys()))
 
         for project_name, _basename, project_path in qrave_projects:
             if project_path.startswith("remote:"):
@@ -189,7 +204,7 @@ class QRAVEDockWidget(QDockWidget, Ui_QRAVEDockWidgetBase):
                         project.qproject.setText(project_name)
                         self.model.appendRow(project.qproject)
                         if project_name in expanded_paths_by_project:
-                            self.restore_expanded_state(self.model.indexFromItem(project.qproject), expanded_paths_by_project[project_name], "")
+                            self.restore_expanded_state(self.model.indexFromItem(project.qproject), expanded_paths_by_project[project_name])
                         else:
                             self.expand_children_recursive(self.model.indexFromItem(project.qproject))
                 else:
@@ -197,21 +212,21 @@ class QRAVEDockWidget(QDockWidget, Ui_QRAVEDockWidgetBase):
                     self.fetch_missing_remote_project(project_id)
                 continue
 
-            project = Project(project_path)
-            project.load()
+            # Unchanged projects come back from the cache with their tree already built.
+            # Anything else is loaded in the background and swapped in by _on_project_loaded
+            project = project_cache.lookup(project_path)
 
-            if project is not None and project.exists and project.qproject is not None and project.loadable:
-                project.qproject.setText(project_name)
-                self.model.appendRow(project.qproject)
-                if project_name in expanded_paths_by_project:
-                    self.restore_expanded_state(self.model.indexFromItem(project.qproject), expanded_paths_by_project[project_name], "")
-                else:
-                    self.expand_children_recursive(self.model.indexFromItem(project.qproject))
+            if project is not None:
+                self._insert_project_row(project, project_name, self.model.rowCount(), expanded_paths_by_project.get(project_name))
             else:
-                # Project failed to load: show a placeholder error node so the
-                # user can see what failed and choose to remove or retry it.
-                error_item = self._make_load_error_node(project_name, project_path, project)
-                self.model.appendRow(error_item)
+                if project_name in expanded_paths_by_project:
+                    self._pending_expanded[project_name] = expanded_paths_by_project[project_name]
+                self.model.appendRow(self._make_loading_node(project_name, project_path))
+                self.project_loader.load(project_path, self._on_project_loaded)
+
+        # Projects being opened stay at the top until they're ready
+        for row, (path_key, label) in enumerate(self._adding.items()):
+            self.model.insertRow(row, self._make_loading_node(label, path_key))
 
         # Load the tree objects
         self.basemaps.load()
@@ -221,10 +236,22 @@ class QRAVEDockWidget(QDockWidget, Ui_QRAVEDockWidgetBase):
         if self.settings.getValue("basemapsInclude") and region is not None and len(region) > 0 and region in self.basemaps.regions.keys():
             self.model.appendRow(self.basemaps.regions[region])
             if basemap_paths is not None:
-                self.restore_expanded_state(self.model.indexFromItem(self.basemaps.regions[region]), basemap_paths, "")
+                self.restore_expanded_state(self.model.indexFromItem(self.basemaps.regions[region]), basemap_paths)
             else:
                 self.expand_children_recursive(self.model.indexFromItem(self.basemaps.regions[region]))
 
+    @pyqtSlot()
+    def refresh_tree(self) -> None:
+        """Forget every cached project and rebuild the tree from disk.
+
+        Use this instead of ``reload_tree`` when something the cache can't see has changed,
+        like layer files appearing after a download.
+        """
+        ProjectCache().invalidate()
+        # Also picks up QML files added to (or changed in) project folders
+        SymbologyIndex().invalidate()
+        self.reload_tree()
+
     def get_project_settings(self) -> list:
         """Return the list of projects from settings, no user interaction."""
         try:
@@ -298,31 +325,62 @@ class QRAVEDockWidget(QDockWidget, Ui_QRAVEDockWidgetBase):
             )
             return
 
-        test_project = Project(xml_path)
-        test_project.load()
-        if not test_project.loadable or not test_project.exists or test_project.qproject is None:
+        # Already on its way
+        path_key = ProjectCache.key(xml_path)
+        if path_key in self._adding:
+            return
+
+        # Show something straight away. The rest happens in _on_project_added once it's loaded
+        label = os.path.basename(os.path.dirname(abs_xml_path)) or os.path.basename(abs_xml_path)
+        self._adding[path_key] = label
+        self.model.insertRow(0, self._make_loading_node(label, path_key))
+        self.project_loader.load(xml_path, lambda project: self._on_project_added(xml_path, project))
+
+    def _on_project_added(self, xml_path: str, new_project: Project) -> None:
+        """Second half of ``add_project``: called once ProjectLoader has loaded the new project
+
+        Nothing else in the tree has changed so the new project's tree goes straight in where
+        its loading node was. ``reload_tree`` is only for when the tree really is out of date.
+        """
+        path_key = ProjectCache.key(xml_path)
+        self._adding.pop(path_key, None)
+        row = self._take_loading_row(path_key)
+        if not new_project.loadable or not new_project.exists or new_project.qproject is None:
             self.settings.log(f"Error loading project: {xml_path}", Qgis.Warning)
             return
-        basename = test_project.qproject.text()
+
+        qrave_projects = self.get_project_settings()
+        # Opened some other way while it was loading
+        if any(not p.startswith("remote:") and ProjectCache.key(p) == path_key for _, _, p in qrave_projects):
+            return
+
+        basename = new_project.qproject.text()
         count = [project[1] for project in qrave_projects].count(basename)
         name = f"{basename} Copy {count:02d}" if count > 0 else basename
         qrave_projects.insert(0, (name, basename, xml_path))
         self.set_project_settings(qrave_projects)
-        self.reload_tree()
-
-        new_project = self._get_project_by_name(name)
+        self._insert_project_row(new_project, name, row if row is not None else 0)
 
         # If this is a fresh load and the setting is set we load the default view
         load_default_setting = self.settings.getValue("loadDefaultView")
 
-        if new_project is not None:
-            self.zoom_to_project(new_project)
-            if load_default_setting and new_project.default_view is not None and new_project.default_view in new_project.views:
-                self.add_children_to_map(new_project.qproject, new_project.views[new_project.default_view])
-
-            # Optional telemetry
-            Telemetry(MESSAGE_CATEGORY).send("Load_Project")
-            self._add_to_recent_projects(xml_path)
+        self.zoom_to_project(new_project)
+        if load_default_setting and new_project.default_view is not None and new_project.default_view in new_project.views:
+            self.add_children_to_map(new_project.qproject, new_project.views[new_project.default_view])
+
+        # Optional telemetry
+        Telemetry(MESSAGE_CATEGORY).send("Load_Project")
+        self._add_to_recent_projects(xml_path)
+
+    def _insert_project_row(self, project: Project, project_name: str, row: int, expanded_paths: set[tuple[str, ...]] | None = None) -> None:
+        """Put a loaded project's tree into the model at ``row`` and expand it the way it was (or by default)"""
+        project.qproject.setText(project_name)
+        self.model.insertRow(row, project.qproject)
+        idx = self.model.indexFromItem(project.qproject)
+        if expanded_paths is not None:
+            self.restore_expanded_state(idx, expanded_paths)
+        else:
+            self.expand_children_recursive(idx)
 
     def _add_to_recent_projects(self, xml_path: str, name: str | None = None) -> None:
         """Prepend xml_path to the recent projects list, capped at 5.
@@ -415,6 +473,42 @@ class QRAVEDockWidget(QDockWidget, Ui_QRAVEDockWidgetBase):
         loading_item.setData("LOADING_PLACEHOLDER", USER_ROLE + 10)
         self.model.insertRow(0, loading_item)
 
+    def _make_loading_node(self, label: str, project_path: str) -> QStandardItem:
+        """A top-level stand-in for a local project that ProjectLoader is still loading"""
+        loading_item = QStandardItem(qrave_icon("refresh.png"), f"Loading: {label}...")
+        loading_item.setData("LOADING_PROJECT", USER_ROLE + 10)
+        loading_item.setData(ProjectCache.key(project_path), USER_ROLE + 11)
+        return loading_item
+
+    def _take_loading_row(self, path_key: str) -> int | None:
+        """Remove a project's loading node. Returns the row it was in, or None if it's gone"""
+        root = self.model.invisibleRootItem()
+        for row in range(root.rowCount()):
+            item = root.child(row)
+            if item is not None and item.data(USER_ROLE + 10) == "LOADING_PROJECT" and item.data(USER_ROLE + 11) == path_key:
+                root.removeRow(row)
+                return row
+        return None
+
+    def _on_project_loaded(self, project: Project) -> None:
+        """Swap a project's loading node for its tree (or an error node) once ProjectLoader is done with it"""
+        path_key = ProjectCache.key(project.project_xml_path)
+        entry = next(((name, path) for name, _, path in self.get_project_settings() if not path.startswith("remote:") and ProjectCache.key(path) == path_key), None)
+        if entry is None:
+            # Closed while it was loading
+            return
+        project_name, project_path = entry
+        row = self._take_loading_row(path_key)
+        if row is None:
+            return
+
+        if project.exists and project.qproject is not None and project.loadable:
+            self._insert_project_row(project, project_name, row, self._pending_expanded.pop(project_name, None))
+        else:
+            # Project failed to load: show a placeholder error node so the
+            # user can see what failed and choose to remove or retry it.
+            self.model.insertRow(row, self._make_load_error_node(project_name, project_path, project))
+
     def hide_loading(self) -> None:
         """Remove any loading items from the tree"""
         root = self.model.invisibleRootItem()
@@ -542,28 +636,32 @@ class QRAVEDockWidget(QDockWidget, Ui_QRAVEDockWidgetBase):
         if not self.treeView.isExpanded(idx) and not collapsed:
             self.treeView.setExpanded(idx, True)
 
-    def restore_expanded_state(self, idx: QModelIndex, expanded_paths: set[str], current_path: str = "") -> None:
+    def restore_expanded_state(self, idx: QModelIndex, expanded_paths: set[tuple[str, ...]], current_path: tuple[str, ...] = ()) -> None:
         """Expand all the children of a QTreeView node based on saved paths.
 
+        Only items on an expanded path are visited so this costs about as much as the
+        part of the tree that ends up visible, not the whole tree.
+
         Args:
             idx (QModelIndex): The index to start restoring from
-            expanded_paths (set): Set of path strings (e.g. "Root///Folder A") that should be expanded
-            current_path (str): The path of the current item
+            expanded_paths (set): Paths from ``get_expanded_paths`` (e.g. ("Folder A", "Folder B")) that should be expanded
+            current_path (tuple): The path of the current item
         """
-        if idx is None or not idx.isValid():
+        if idx is None or not idx.isValid() or current_path not in expanded_paths:
             return
 
+        # Lazy folders the user had open need their children built before we can restore below them
+        item = self.model.itemFromIndex(idx)
+        item_data = item.data(USER_ROLE) if item is not None else None
+        if item_data and isinstance(item_data.project, Project):
+            item_data.project.populate(item)
+
         # Recurse first so we can expand straight down
         for idy in range(self.model.rowCount(idx)):
             child_idx = self.model.index(idy, 0, idx)
             child_item = self.model.itemFromIndex(child_idx)
             if child_item:
-                item_name = child_item.text()
-                child_path = f"{current_path}///{item_name}" if current_path else item_name
-                self.restore_expanded_state(child_idx, expanded_paths, child_path)
-
-        item = self.model.itemFromIndex(idx)
-        item_data = item.data(USER_ROLE) if item is not None else None
+                self.restore_expanded_state(child_idx, expanded_paths, (*current_path, child_item.text()))
 
         # Determine if we should forcefully collapse (e.g. BaseMaps to avoid network hits)
         is_basemap = False
@@ -572,7 +670,7 @@ class QRAVEDockWidget(QDockWidget, Ui_QRAVEDockWidgetBase):
                 is_basemap = True
 
         # If the path is in our set, the user had it expanded.
-        if current_path in expanded_paths and not is_basemap:
+        if not is_basemap:
             if not self.treeView.isExpanded(idx):
                 self.treeView.setExpanded(idx, True)
 
@@ -583,7 +681,7 @@ class QRAVEDockWidget(QDockWidget, Ui_QRAVEDockWidgetBase):
         item = self.model.itemFromIndex(idx)
         item_data: ProjectTreeData = item.data(USER_ROLE)
 
-        if item_data is None or item_data.type == QRaveTreeTypes.PROJECT_LOAD_ERROR:
+        if item_data is None or item_data.type in [QRaveTreeTypes.PROJECT_LOAD_ERROR, QRaveTreeTypes.PROJECT_PLACEHOLDER]:
             return
 
         # This is the default action for all add-able layers including basemaps
@@ -638,7 +736,7 @@ class QRAVEDockWidget(QDockWidget, Ui_QRAVEDockWidgetBase):
         item = self.model.itemFromIndex(indexes[0])
         data_item: ProjectTreeData = item.data(USER_ROLE)
 
-        if data_item is None or data_item.type == QRaveTreeTypes.PROJECT_LOAD_ERROR:
+        if data_item is None or data_item.type in [QRaveTreeTypes.PROJECT_LOAD_ERROR, QRaveTreeTypes.PROJECT_PLACEHOLDER]:
             return
 
         if data_item.project is None or not data_item.project.exists:
@@ -703,6 +801,13 @@ class QRAVEDockWidget(QDockWidget, Ui_QRAVEDockWidgetBase):
             QDesktopServices.openUrl(QUrl(url))
 
     def close_all(self) -> None:
+        self.view_loader.cancel()
+        self.project_loader.cancel()
+        for pager in self._dataset_pagers.values():
+            pager.cancel()
+        self._dataset_pagers = {}
+        self._adding = {}
+        self._pending_expanded = {}
         projects = list(self._get_projects())
 
         for project in reversed(projects):
@@ -726,6 +831,7 @@ class QRAVEDockWidget(QDockWidget, Ui_QRAVEDockWidgetBase):
 
         # Clear any remaining settings entries so error nodes don't reappear.
         self.set_project_settings([])
+        ProjectCache().invalidate()
         QTimer.singleShot(0, self.reload_tree)
 
     def close_project(self, project: Project, reload_tree: bool = True) -> None:
@@ -743,6 +849,13 @@ class QRAVEDockWidget(QDockWidget, Ui_QRAVEDockWidgetBase):
         QRaveMapLayer.remove_project_from_map(project_name)
         QApplication.processEvents()
 
+        self._pending_expanded.pop(project_name, None)
+        if isinstance(project, Project):
+            project.stop_watching()
+            ProjectCache().invalidate(project.project_xml_path)
+            if project.project_dir is not None:
+                SymbologyIndex().forget_project(project.project_dir)
+
         # Write the settings back to the project
         self.set_project_settings(qrave_projects)
 
@@ -806,107 +919,21 @@ class QRAVEDockWidget(QDockWidget, Ui_QRAVEDockWidgetBase):
 
     def fetch_and_add_remote_layer(self, item: QStandardItem, item_data: ProjectTreeData) -> None:
         """Fetch tile metadata and add the remote layer to the map"""
+        self.fetch_and_add_remote_layers([(item, item_data)])
 
-        def _handle_tile_metadata(task: RunGQLQueryTask, resp: dict):
-            if task.success and resp:
-                # Check for tiling error
-                if resp.get("state") == "TILING_ERROR":
-                    self.settings.log(f"Tile service is in error state for {item_data.data.label}.", Qgis.Warning)
-                    QMessageBox.warning(self, "Add Layer Failed", "Tile service is in error state on the server. Please check the Riverscapes Data Exchange.")
-                    return
-
-                # Fetch more details from the indexUrl if it exists
-                # This is a workaround because the GQL API doesn't return all metadata yet
-
-                url_val = resp.get("url")
-                if not url_val:
-                    self.settings.log(f"Tile service URL is missing for {item_data.data.label}.", Qgis.Warning)
-                    QMessageBox.warning(self, "Add Layer Failed", f"Tile service URL could not be found for {item_data.data.label}.")
-                    return
-
-                base_url = url_val.rstrip("/")
-                map_layer: QRaveMapLayer = item_data.data
-                layer_name = map_layer.layer_name or map_layer.bl_attr.get("nodeId", "")
-                if not layer_name:
-                    xpath = map_layer.bl_attr.get("rsXPath", "")
-                    if "#" in xpath:
-                        layer_name = xpath.split("/")[-1].split("#")[1]
-                    else:
-                        layer_name = xpath.split("/")[-1]
-
-                index_url = f"{base_url}/{layer_name}/index.json"
-
-                # ── helpers (close over item / item_data / resp) ────────────
-
-                def _finish_with_resp() -> None:
-                    """Continue after index.json has been merged into resp."""
-
-                    # Now fetch symbology
-                    def _handle_symbology(symb_task: RunGQLQueryTask, symb_resp: dict) -> None:
-                        if symb_task.success and symb_resp:
-                            resp["mapboxJson"] = symb_resp.get("mapboxJson")
-                            self.settings.log(
-                                f"Successfully fetched remote symbology for {item_data.data.label}",
-                                Qgis.Info,
-                            )
-                        else:
-                            self.settings.log(
-                                f"No remote symbology found or error for {item_data.data.label}",
-                                Qgis.Info,
-                            )
-
-                        if item_data.data.layer_type == QRaveMapLayer.LayerTypes.RASTER:
-                            QRaveMapLayer.add_remote_raster_layer_to_map(item, resp)
-                        else:
-                            QRaveMapLayer.add_remote_vector_layer_to_map(item, resp)
-
-                    # Inject project bounds if they exist to limit the layer extent
-                    if item_data.project.bounds:
-                        from .classes.remote_project import RemoteProject
-
-                        if isinstance(item_data.project, RemoteProject):
-                            resp["bounds"] = item_data.project.bounds.get("bbox")
-                        else:
-                            b = item_data.project.bounds
-                            resp["bounds"] = [b["minLng"], b["minLat"], b["maxLng"], b["maxLat"]]
-
-                    symbology_name = item_data.data.bl_attr.get("symbology")
-                    if symbology_name:
-                        project_type_id = item_data.project.project_type
-                        is_raster = item_data.data.layer_type == QRaveMapLayer.LayerTypes.RASTER
-                        self.dataExchangeAPI.get_web_symbology(
-                            project_type_id,
-                            symbology_name,
-                            is_raster,
-                            _handle_symbology,
-                        )
-                    else:
-                        if item_data.data.layer_type == QRaveMapLayer.LayerTypes.RASTER:
-                            QRaveMapLayer.add_remote_raster_layer_to_map(item, resp)
-                        else:
-                            QRaveMapLayer.add_remote_vector_layer_to_map(item, resp)
-
-                def _on_index_fetched(fetch_task: FetchJsonTask) -> None:
-                    """Called on the main thread when the background index.json fetch completes."""
-                    if fetch_task.success and fetch_task.result:
-                        self.settings.log(f"Successfully fetched index metadata from {index_url}", Qgis.Info)
-                        resp.update(fetch_task.result)
-                    else:
-                        self.settings.log(
-                            f"Failed to fetch valid JSON from {index_url}",
-                            Qgis.Warning,
-                        )
-                    _finish_with_resp()
-
-                # Dispatch to a background task — keeps the GUI thread free.
-                QgsApplication.taskManager().addTask(FetchJsonTask(index_url, _on_index_fetched))
-            else:
-                self.settings.log(f"Error fetching tile metadata: {task.error}", Qgis.Warning)
-                QMessageBox.warning(self, "Add Layer Failed", f"Could not fetch tile metadata for {item_data.data.label}")
+    def fetch_and_add_remote_layers(self, layers: list[tuple[QStandardItem, ProjectTreeData]]) -> None:
+        """Fetch tile metadata for several remote layers and add them to the map
 
+        The tile metadata for all the layers of a project comes back in one batched request
+        (see ``DataExchangeAPI.get_layer_tiles_batch``) instead of one request per layer.
+        """
         if self.dataExchangeAPI is None:
-            self.dataExchangeAPI = DataExchangeAPI(on_login=lambda task: self._on_add_layer_login(task, item, item_data))
-        else:
+            self.dataExchangeAPI = DataExchangeAPI(on_login=lambda task: self._on_add_layer_login(task, layers))
+            return
+
+        # (project id, project type) -> rsXPath -> the layers that use it
+        by_project: dict[tuple[str, str], dict[str, list[tuple[QStandardItem, ProjectTreeData]]]] = {}
+        for item, item_data in layers:
             if hasattr(item_data.project, "id"):
                 project_id = item_data.project.id
             elif item_data.project.warehouse_meta and "id" in item_data.project.warehouse_meta:
@@ -917,15 +944,121 @@ class QRAVEDockWidget(QDockWidget, Ui_QRAVEDockWidgetBase):
             rs_xpath = item_data.data.bl_attr.get("rsXPath", "")
             if not rs_xpath:
                 self.settings.log("Cannot add layer: rsXPath is missing", Qgis.Warning)
-                return
+                continue
             if not project_id:
                 self.settings.log("Cannot add layer: project_id is missing", Qgis.Warning)
+                continue
+            by_project.setdefault((project_id, project_type_id), {}).setdefault(rs_xpath, []).append((item, item_data))
+
+        for (project_id, project_type_id), by_xpath in by_project.items():
+            # Symbology doesn't depend on the tile service so it's asked for straight away
+            fetches = {rs_xpath: [(item, item_data, self._start_remote_layer_fetch(item, item_data)) for item, item_data in xpath_layers] for rs_xpath, xpath_layers in by_xpath.items()}
+
+            def _handle_tile_batch(task: RunGQLQueryTask, tiles: dict[str, dict | None], fetches=fetches, project_id=project_id) -> None:
+                for rs_xpath, resp in tiles.items():
+                    for item, item_data, fetch in fetches.get(rs_xpath, []):
+                        # Each layer fills in its own copy
+                        self._on_remote_layer_tiles(item, item_data, fetch, task, dict(resp) if resp else resp, project_id)
+
+            self.dataExchangeAPI.get_layer_tiles_batch(project_id, project_type_id, list(by_xpath), _handle_tile_batch)
+
+    def _start_remote_layer_fetch(self, item: QStandardItem, item_data: ProjectTreeData) -> RemoteLayerFetch:
+        """Start fetching what a remote layer needs. The tile service stage is started by the caller"""
+        symbology_name = item_data.data.bl_attr.get("symbology")
+        stages = [TILES_STAGE, INDEX_STAGE] + ([SYMBOLOGY_STAGE] if symbology_name else [])
+        fetch = RemoteLayerFetch(item_data.data.label, stages, lambda fetch: self._add_remote_layer_to_map(item, item_data, fetch))
+        fetch.start(TILES_STAGE)
+        if symbology_name:
+            fetch.start(SYMBOLOGY_STAGE)
+            is_raster = item_data.data.layer_type == QRaveMapLayer.LayerTypes.RASTER
+            self.dataExchangeAPI.get_web_symbology(
+                item_data.project.project_type,
+                symbology_name,
+                is_raster,
+                lambda symb_task, symb_resp: fetch.done(SYMBOLOGY_STAGE, symb_resp if symb_task.success else None),
+            )
+        return fetch
+
+    def _on_remote_layer_tiles(self, item: QStandardItem, item_data: ProjectTreeData, fetch: RemoteLayerFetch, task: RunGQLQueryTask, resp: dict | None, project_id: str) -> None:
+        """The tile service of a remote layer has arrived. Its index.json is next"""
+        if task.success and resp:
+            # Check for tiling error
+            if resp.get("state") == "TILING_ERROR":
+                fetch.fail()
+                self.settings.log(f"Tile service is in error state for {item_data.data.label}.", Qgis.Warning)
+                QMessageBox.warning(self, "Add Layer Failed", "Tile service is in error state on the server. Please check the Riverscapes Data Exchange.")
+                return
+
+            # Fetch more details from the indexUrl if it exists
+            # This is a workaround because the GQL API doesn't return all metadata yet
+
+            url_val = resp.get("url")
+            if not url_val:
+                fetch.fail()
+                self.settings.log(f"Tile service URL is missing for {item_data.data.label}.", Qgis.Warning)
+                QMessageBox.warning(self, "Add Layer Failed", f"Tile service URL could not be found for {item_data.data.label}.")
                 return
-            self.dataExchangeAPI.get_layer_tiles(project_id, project_type_id, rs_xpath, _handle_tile_metadata)
 
-    def _on_add_layer_login(self, task: RefreshTokenTask, item: QStandardItem, item_data: ProjectTreeData) -> None:
+            base_url = url_val.rstrip("/")
+            map_layer: QRaveMapLayer = item_data.data
+            layer_name = map_layer.layer_name or map_layer.bl_attr.get("nodeId", "")
+            if not layer_name:
+                xpath = map_layer.bl_attr.get("rsXPath", "")
+                if "#" in xpath:
+                    layer_name = xpath.split("/")[-1].split("#")[1]
+                else:
+                    layer_name = xpath.split("/")[-1]
+
+            index_url = f"{base_url}/{layer_name}/index.json"
+
+            def _on_index_fetched(index: dict | None, error: Exception | None) -> None:
+                """Called on the main thread once index.json has been fetched (or straight away when it's cached)"""
+                if index:
+                    self.settings.log(f"Successfully fetched index metadata from {index_url}", Qgis.Info)
+                else:
+                    self.settings.log(f"Failed to fetch valid JSON from {index_url}: {error}", Qgis.Warning)
+                fetch.done(INDEX_STAGE, index)
+
+            fetch.done(TILES_STAGE, resp)
+            fetch.start(INDEX_STAGE)
+            # Fetched in a background task so the GUI thread stays free
+            TileIndexCache().fetch(index_url, _on_index_fetched, project_id)
+        else:
+            fetch.fail()
+            self.settings.log(f"Error fetching tile metadata: {task.error}", Qgis.Warning)
+            QMessageBox.warning(self, "Add Layer Failed", f"Could not fetch tile metadata for {item_data.data.label}")
+
+    def _add_remote_layer_to_map(self, item: QStandardItem, item_data: ProjectTreeData, fetch: RemoteLayerFetch) -> None:
+        """Everything a remote layer needs has arrived so it can go on the map"""
+        resp = fetch.results[TILES_STAGE]
+        if fetch.results[INDEX_STAGE]:
+            resp.update(fetch.results[INDEX_STAGE])
+
+        # Inject project bounds if they exist to limit the layer extent
+        if item_data.project.bounds:
+            if isinstance(item_data.project, RemoteProject):
+                resp["bounds"] = item_data.project.bounds.get("bbox")
+            else:
+                b = item_data.project.bounds
+                resp["bounds"] = [b["minLng"], b["minLat"], b["maxLng"], b["maxLat"]]
+
+        if SYMBOLOGY_STAGE in fetch.results:
+            symb_resp = fetch.results[SYMBOLOGY_STAGE]
+            if symb_resp:
+                resp["mapboxJson"] = symb_resp.get("mapboxJson")
+                self.settings.log(f"Successfully fetched remote symbology for {item_data.data.label}", Qgis.Info)
+            else:
+                self.settings.log(f"No remote symbology found or error for {item_data.data.label}", Qgis.Info)
+
+        if item_data.data.layer_type == QRaveMapLayer.LayerTypes.RASTER:
+            QRaveMapLayer.add_remote_raster_layer_to_map(item, resp)
+        else:
+            QRaveMapLayer.add_remote_vector_layer_to_map(item, resp)
+        self.settings.log(f"Remote layer {fetch.label} fetched in: {fetch.timings()}", Qgis.Info)
+
+    def _on_add_layer_login(self, task: RefreshTokenTask, layers: list[tuple[QStandardItem, ProjectTreeData]]) -> None:
         if task.success:
-            self.fetch_and_add_remote_layer(item, item_data)
+            self.fetch_and_add_remote_layers(layers)
         else:
             QMessageBox.critical(self, "Login Failed", "Could not log in to Riverscapes API for layer addition.")
 
@@ -966,66 +1099,77 @@ class QRAVEDockWidget(QDockWidget, Ui_QRAVEDockWidgetBase):
         else:
             self.settings.log(f"Failed to fetch missing remote project: {project_id}", Qgis.Warning)
 
-    def fetch_dataset_metadata(self, project_id: str, offset: int = 0, limit: int = 50) -> None:
-        """Fetch metadata for datasets in chunks"""
-        self.settings.log(f"Fetching dataset metadata for {project_id} (offset={offset}, limit={limit})", Qgis.Info)
-
-        def _handle_metadata(task: RunGQLQueryTask, datasets_data: dict):
-            if task.success and datasets_data:
-                items = datasets_data.get("items", [])
-                total = datasets_data.get("total", 0)
-
-                # 1. Update the cache
-                if project_id in self._remote_project_cache:
-                    cached_proj = self._remote_project_cache[project_id]
-
-                    # Robust lookup of project data in cache
-                    proj_data = None
-                    if "data" in cached_proj and "project" in cached_proj["data"]:
-                        proj_data = cached_proj["data"]["project"]
-                    elif "project" in cached_proj:
-                        proj_data = cached_proj["project"]
-                    else:
-                        proj_data = cached_proj
-
-                    if proj_data:
-                        if "datasets" not in proj_data or proj_data["datasets"] is None:
-                            proj_data["datasets"] = {"items": []}
-
-                        cached_items = proj_data["datasets"]["items"]
-                        # Create a map for easier update
-                        cached_map = {i["id"]: i for i in cached_items if i and "id" in i}
-
-                        for new_item in items:
-                            if not new_item:
-                                continue
-                            if new_item["id"] in cached_map:
-                                cached_map[new_item["id"]].update(new_item)
-                            else:
-                                cached_items.append(new_item)
-
-                # 2. Update the active project object
-                # Find the project in the tree (may appear multiple times if copied,
-                # but usually there is one remote project per ID)
-                projects = self._get_projects()
-                for proj in projects:
-                    if isinstance(proj, RemoteProject) and proj.id == project_id:
-                        proj.update_dataset_metadata(items)
-                        # Also refresh the metadata panel if the user has an item selected from this project
-                        # We can just emit dataChange or verify current selection
-                        self.item_change(None)
-
-                # 3. Fetch next page
-                if len(items) > 0 and offset + len(items) < total:
-                    self.fetch_dataset_metadata(project_id, offset + len(items), limit)
-            else:
-                self.settings.log(f"Failed to fetch dataset metadata for {project_id}: {task.error}", Qgis.Warning)
-
+    def fetch_dataset_metadata(self, project_id: str) -> None:
+        """Fetch metadata for datasets in pages, several at a time (see DatasetMetadataPager)"""
         if self.dataExchangeAPI is None:
             # Should have been initialized by get_remote_project call, but just in case
-            self.dataExchangeAPI = DataExchangeAPI(on_login=lambda task: self.fetch_dataset_metadata(project_id, offset, limit))
-        else:
-            self.dataExchangeAPI.get_dataset_metadata(project_id, limit, offset, _handle_metadata)
+            self.dataExchangeAPI = DataExchangeAPI(on_login=lambda task: self.fetch_dataset_metadata(project_id))
+            return
+
+        self.settings.log(f"Fetching dataset metadata for {project_id}", Qgis.Info)
+        # Start over if the project was reloaded while its metadata was still coming in
+        previous = self._dataset_pagers.pop(project_id, None)
+        if previous is not None:
+            previous.cancel()
+
+        def _on_done(failed: int) -> None:
+            if self._dataset_pagers.get(project_id) is pager:
+                del self._dataset_pagers[project_id]
+            if failed:
+                self.settings.log(f"Failed to fetch dataset metadata for {failed} datasets of {project_id}", Qgis.Warning)
+            self.settings.log(f"Fetched metadata for {pager.total or 0} datasets of {project_id} in {pager.elapsed():.1f}s", Qgis.Info)
+
+        pager = DatasetMetadataPager(
+            lambda offset, limit, callback: self.dataExchangeAPI.get_dataset_metadata(project_id, limit, offset, callback),
+            lambda items: self._merge_dataset_metadata(project_id, items),
+            _on_done,
+        )
+        self._dataset_pagers[project_id] = pager
+        pager.start()
+
+    def _merge_dataset_metadata(self, project_id: str, items: list[dict]) -> None:
+        """Add a batch of dataset metadata to the cached project and the project in the tree"""
+        # 1. Update the cache
+        if project_id in self._remote_project_cache:
+            cached_proj = self._remote_project_cache[project_id]
+
+            # Robust lookup of project data in cache
+            proj_data = None
+            if "data" in cached_proj and "project" in cached_proj["data"]:
+                proj_data = cached_proj["data"]["project"]
+            elif "project" in cached_proj:
+                proj_data = cached_proj["project"]
+            else:
+                proj_data = cached_proj
+
+            if proj_data:
+                if "datasets" not in proj_data or proj_data["datasets"] is None:
+                    proj_data["datasets"] = {"items": []}
+
+                cached_items = proj_data["datasets"]["items"]
+                # id -> cached item. Kept from batch to batch and only rebuilt if the cached project was replaced
+                indexed_items, cached_map = self._dataset_index.get(project_id, (None, None))
+                if indexed_items is not cached_items:
+                    cached_map = {i["id"]: i for i in cached_items if i and "id" in i}
+                    self._dataset_index[project_id] = (cached_items, cached_map)
+
+                for new_item in items:
+                    if new_item["id"] in cached_map:
+                        cached_map[new_item["id"]].update(new_item)
+                    else:
+                        cached_items.append(new_item)
+                        cached_map[new_item["id"]] = new_item
+
+        # 2. Update the active project object
+        # Find the project in the tree (may appear multiple times if copied,
+        # but usually there is one remote project per ID)
+        projects = self._get_projects()
+        for proj in projects:
+            if isinstance(proj, RemoteProject) and proj.id == project_id:
+                proj.update_dataset_metadata(items)
+                # Also refresh the metadata panel if the user has an item selected from this project
+                # We can just emit dataChange or verify current selection
+                self.item_change(None)
 
     def toggleSubtree(self, item: QStandardItem = None, expand: bool = True) -> None:
 
@@ -1062,7 +1206,14 @@ class QRAVEDockWidget(QDockWidget, Ui_QRAVEDockWidgetBase):
             bl_ids (List[str], optional): List of ids to filter by so we don't load
                 everything. This is used for loading views.
         """
+        # Lazy project trees: build whatever hasn't been expanded yet (only the folders that can hold these ids)
+        item_data = item.data(USER_ROLE)
+        if item_data and isinstance(item_data.project, Project):
+            item_data.project.populate_subtree(item, bl_ids)
 
+        # Local layers are collected and added in one batch, remote ones fetched in one batch
+        local_items = []
+        remote_layers = []
         for child in self._get_children(item):
             # Is this something we can add to the map?
             project_tree_data = child.data(USER_ROLE)
@@ -1078,10 +1229,17 @@ class QRAVEDockWidget(QDockWidget, Ui_QRAVEDockWidgetBase):
 
                 if loadme:
                     if isinstance(project_tree_data.project, RemoteProject):
-                        self.fetch_and_add_remote_layer(child, project_tree_data)
+                        remote_layers.append((child, project_tree_data))
+                    elif data.layer_type in ADD_TO_MAP_TYPES:
+                        local_items.append(child)
                     else:
                         data.add_layer_to_map(child)
 
+        if len(local_items) > 0:
+            self.view_loader.load(local_items)
+        if len(remote_layers) > 0:
+            self.fetch_and_add_remote_layers(remote_layers)
+
     def _get_children(self, root_item: QStandardItem) -> Iterator[QStandardItem]:
         """Recursion is going to kill us here so do an iterative solution instead
            https://stackoverflow.com/questions/41949370/collect-all-items-in-qtreeview-recursively
@@ -1089,15 +1247,7 @@ class QRAVEDockWidget(QDockWidget, Ui_QRAVEDockWidgetBase):
         Yields:
             [type]: [description]
         """
-        stack = [root_item]
-        while stack:
-            parent = stack.pop(0)
-            for row in range(parent.rowCount()):
-                for column in range(parent.columnCount()):
-                    child = parent.child(row, column)
-                    yield child
-                    if child.hasChildren():
-                        stack.append(child)
+        yield from iter_descendants(root_item)
 
     def _get_parents(self, start_item: QStandardItem) -> list[QStandardItem]:
         """Return ordered list of parent QStandardItems from root down to the
@@ -1130,6 +1280,8 @@ class QRAVEDockWidget(QDockWidget, Ui_QRAVEDockWidgetBase):
 
         item = self.model.itemFromIndex(indexes[0])
         project_tree_data = item.data(USER_ROLE)  # ProjectTreeData object
+        if project_tree_data is None or project_tree_data.type == QRaveTreeTypes.PROJECT_PLACEHOLDER:
+            return
         # Could be a QRaveBaseMap, a QRaveMapLayer or just some random data
         data = project_tree_data.data
 
@@ -1245,7 +1397,7 @@ class QRAVEDockWidget(QDockWidget, Ui_QRAVEDockWidgetBase):
         else:
             project_path = None
 
-        menu.addAction("RETRY_LOAD", self.reload_tree)
+        menu.addAction("RETRY_LOAD", self.refresh_tree)
         if project_path and not project_path.startswith("remote:"):
             menu.addAction(
                 "BROWSE_PROJECT_FOLDER",
@@ -1298,7 +1450,7 @@ class QRAVEDockWidget(QDockWidget, Ui_QRAVEDockWidgetBase):
         menu.addAction("WAREHOUSE_VIEW", lambda: self.project_warehouse_view(data.project), enabled=bool(self.get_warehouse_url(data.project.warehouse_meta)))
         menu.addAction("ADD_ALL_TO_MAP", lambda: self.add_children_to_map(item))
         menu.addSeparator()
-        menu.addAction("REFRESH_PROJECT_HIERARCHY", self.reload_tree)
+        menu.addAction("REFRESH_PROJECT_HIERARCHY", self.refresh_tree)
         menu.addAction("CUSTOMIZE_PROJECT_HIERARCHY", enabled=False)
         menu.addSeparator()
         menu.addAction("CLOSE_PROJECT", lambda: self.close_project(data.project), enabled=bool(data.project))
@@ -1311,7 +1463,7 @@ class QRAVEDockWidget(QDockWidget, Ui_QRAVEDockWidgetBase):
         dialog = ProjectUploadDialog(None, project)
         dialog.exec()
         # Reload the project after the upload (and even just on upload cancel)
-        self.reload_tree()
+        self.refresh_tree()
 
     def project_download_load(self, project: Project | RemoteProject) -> None:
         """
@@ -1330,4 +1482,5 @@ class QRAVEDockWidget(QDockWidget, Ui_QRAVEDockWidgetBase):
         dialog = ProjectDownloadDialog(None, project_id=project_id, local_path=local_path)
         dialog.projectDownloaded.connect(self.add_project)
         dialog.exec()
-        self.reload_tree()
+        # Downloaded files change which layers exist on disk so don't trust the cache
+        self.refresh_tree()
@@ -1,8 +1,14 @@
+from qgis.core import Qgis
 from qgis.PyQt.QtCore import pyqtSignal
 from qgis.PyQt.QtGui import QIcon
-from qgis.PyQt.QtWidgets import QCheckBox, QComboBox, QDialog, QDialogButtonBox, QGridLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QRadioButton, QSizePolicy, QSpacerItem, QVBoxLayout
+from qgis.PyQt.QtWidgets import QCheckBox, QComboBox, QDialog, QDialogButtonBox, QGridLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QRadioButton, QSizePolicy, QSpacerItem, QSpinBox, QVBoxLayout
 
 from .classes.basemaps import BaseMaps
+from .classes.data_exchange.query_cache import QueryCache
+from .classes.data_exchange.rate_limiter import TransferLimits, parse_hours
+from .classes.data_exchange.tile_metadata import TileIndexCache
+from .classes.hash_cache import HashCache
+from .classes.http_session import HttpSession
 from .classes.settings import Settings
 from .compat import DLGBTN_APPLY, DLGBTN_CANCEL, DLGBTN_RESET, DLGBTN_ROLE_APPLY, DLGBTN_ROLE_RESET, HORIZONTAL, SPSZ_EXPANDING, SPSZ_FIXED, SPSZ_MINIMUM, SPSZ_MINIMUM_EXPANDING
 
@@ -32,6 +38,14 @@ class OptionsDialog(QDialog):
     def setValues(self):
         self.basemapsInclude.setChecked(self.settings.getValue("basemapsInclude"))
         self.loadDefaultView.setChecked(self.settings.getValue("loadDefaultView"))
+        self.lazyProjectTree.setChecked(self.settings.getValue("lazyProjectTree"))
+        self.verifyFileHashes.setChecked(self.settings.getValue("verifyFileHashes"))
+        self.transferMinStreams.setValue(self.settings.getValue("transferMinStreams") or 1)
+        self.transferMaxStreams.setValue(self.settings.getValue("transferMaxStreams") or 1)
+        self.httpPoolSize.setValue(self.settings.getValue("httpPoolSize") or 1)
+        self.uploadRateLimit.setValue(self.settings.getValue("uploadRateLimit") or 0)
+        self.downloadRateLimit.setValue(self.settings.getValue("downloadRateLimit") or 0)
+        self.rateLimitHours.setText(self.settings.getValue("rateLimitHours") or "")
         self.chk_telemetry.setChecked(self.settings.getValue("telemetryEnabled"))
         self.autoUpdate.setChecked(self.settings.getValue("autoUpdate"))
         self.txtBL.setText(self.settings.getValue("localBLFolder"))
@@ -58,6 +72,18 @@ class OptionsDialog(QDialog):
         if role == DLGBTN_ROLE_APPLY:
             self.settings.setValue("basemapsInclude", self.basemapsInclude.isChecked())
             self.settings.setValue("loadDefaultView", self.loadDefaultView.isChecked())
+            self.settings.setValue("lazyProjectTree", self.lazyProjectTree.isChecked())
+            self.settings.setValue("verifyFileHashes", self.verifyFileHashes.isChecked())
+            self.settings.setValue("transferMinStreams", self.transferMinStreams.value())
+            self.settings.setValue("transferMaxStreams", max(self.transferMinStreams.value(), self.transferMaxStreams.value()))
+            self.settings.setValue("httpPoolSize", self.httpPoolSize.value())
+            self.settings.setValue("uploadRateLimit", self.uploadRateLimit.value())
+            self.settings.setValue("downloadRateLimit", self.downloadRateLimit.value())
+            try:
+                parse_hours(self.rateLimitHours.text())
+                self.settings.setValue("rateLimitHours", self.rateLimitHours.text().strip())
+            except ValueError:
+                self.settings.msg_bar("Invalid transfer limit hours", "Use a window like 08:00-18:00 or leave it empty to always limit", Qgis.Warning)
             self.settings.setValue("telemetryEnabled", self.chk_telemetry.isChecked())
             self.settings.setValue("basemapRegion", self.basemapRegion.currentText())
             self.settings.setValue("autoUpdate", self.autoUpdate.isChecked())
@@ -71,9 +97,22 @@ class OptionsDialog(QDialog):
             self.settings.resetAllSettings()
             self.setValues()
 
+        # Running uploads and downloads pick up new limits straight away
+        TransferLimits().configure_from_settings(self.settings)
+        HttpSession().configure_from_settings(self.settings)
+
         # Emit a datachange so we can trigger other parts of this plugin
         self.dataChange.emit()
 
+    def clearHashCache(self):
+        HashCache().invalidate()
+        self.settings.msg_bar("Hash cache cleared", "Every file will be hashed again the next time it is checked")
+
+    def clearQueryCache(self):
+        QueryCache().invalidate()
+        TileIndexCache().invalidate()
+        self.settings.msg_bar("API cache cleared", "Remote projects and layers will be fetched from the Data Exchange again")
+
     def browseBLFolder(self):
         from qgis.PyQt.QtWidgets import QFileDialog
 
@@ -111,6 +150,66 @@ class OptionsDialog(QDialog):
         self.loadDefaultView = QCheckBox(self)
         self.loadDefaultView.setText("Load default project views when opening projects")
         self.verticalLayout.addWidget(self.loadDefaultView)
+        # Lazy Project Tree Checkbox
+        self.lazyProjectTree = QCheckBox(self)
+        self.lazyProjectTree.setText("Only build project folders when they are expanded (faster for large projects)")
+        self.verticalLayout.addWidget(self.lazyProjectTree)
+        # File hash cache
+        self.hlayout_hash = QHBoxLayout()
+        self.verifyFileHashes = QCheckBox(self)
+        self.verifyFileHashes.setText("Always re-hash files and check them against the hash cache (slower)")
+        self.hlayout_hash.addWidget(self.verifyFileHashes)
+        self.btnClearHashCache = QPushButton("Clear Hash Cache")
+        self.btnClearHashCache.clicked.connect(self.clearHashCache)
+        self.hlayout_hash.addWidget(self.btnClearHashCache)
+        self.btnClearQueryCache = QPushButton("Clear API Cache")
+        self.btnClearQueryCache.setToolTip("Forget the remote projects, layers and symbology remembered from the Data Exchange")
+        self.btnClearQueryCache.clicked.connect(self.clearQueryCache)
+        self.hlayout_hash.addWidget(self.btnClearQueryCache)
+        self.verticalLayout.addLayout(self.hlayout_hash)
+        # Simultaneous uploads / downloads. The number adapts to the connection between these limits
+        self.hlayout_transfers = QHBoxLayout()
+        self.labelTransfers = QLabel("Simultaneous uploads/downloads: min")
+        self.hlayout_transfers.addWidget(self.labelTransfers)
+        self.transferMinStreams = QSpinBox(self)
+        self.transferMinStreams.setRange(1, 32)
+        self.hlayout_transfers.addWidget(self.transferMinStreams)
+        self.labelTransfersMax = QLabel("max")
+        self.hlayout_transfers.addWidget(self.labelTransfersMax)
+        self.transferMaxStreams = QSpinBox(self)
+        self.transferMaxStreams.setRange(1, 32)
+        self.transferMaxStreams.setToolTip("The number of simultaneous transfers adapts to your connection speed between these limits. Set them equal for a fixed number.")
+        self.hlayout_transfers.addWidget(self.transferMaxStreams)
+        self.labelPoolSize = QLabel("connections kept open")
+        self.hlayout_transfers.addWidget(self.labelPoolSize)
+        self.httpPoolSize = QSpinBox(self)
+        self.httpPoolSize.setRange(1, 64)
+        self.httpPoolSize.setToolTip("Connections to each server kept open between requests so they don't have to be set up again. Should be at least the maximum number of simultaneous transfers.")
+        self.hlayout_transfers.addWidget(self.httpPoolSize)
+        self.verticalLayout.addLayout(self.hlayout_transfers)
+        # Bandwidth limits so a big upload or download doesn't swamp a shared connection
+        self.hlayout_rate = QHBoxLayout()
+        self.labelRate = QLabel("Limit uploads to")
+        self.hlayout_rate.addWidget(self.labelRate)
+        self.uploadRateLimit = QSpinBox(self)
+        self.uploadRateLimit.setRange(0, 10000000)
+        self.uploadRateLimit.setSuffix(" KB/s")
+        self.uploadRateLimit.setSpecialValueText("No limit")
+        self.hlayout_rate.addWidget(self.uploadRateLimit)
+        self.labelRateDown = QLabel("downloads to")
+        self.hlayout_rate.addWidget(self.labelRateDown)
+        self.downloadRateLimit = QSpinBox(self)
+        self.downloadRateLimit.setRange(0, 10000000)
+        self.downloadRateLimit.setSuffix(" KB/s")
+        self.downloadRateLimit.setSpecialValueText("No limit")
+        self.hlayout_rate.addWidget(self.downloadRateLimit)
+        self.labelRateHours = QLabel("between")
+        self.hlayout_rate.addWidget(self.labelRateHours)
+        self.rateLimitHours = QLineEdit(self)
+        self.rateLimitHours.setPlaceholderText("all day")
+        self.rateLimitHours.setToolTip("Only limit transfers during these hours, e.g. 08:00-18:00. Leave empty to always limit.")
+        self.hlayout_rate.addWidget(self.rateLimitHours)
+        self.verticalLayout.addLayout(self.hlayout_rate)
 
         # Telemetry
         self.chk_telemetry = QCheckBox("Help improve the software by sharing anonymous usage data.")
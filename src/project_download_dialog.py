@@ -9,7 +9,8 @@ from qgis.PyQt.QtGui import QDesktopServices
 from qgis.PyQt.QtWidgets import QDialog, QMessageBox
 
 from .classes.data_exchange.DataExchangeAPI import DataExchangeAPI, DEProject
-from .classes.data_exchange.downloader import DownloadQueue
+from .classes.data_exchange.downloader import DownloadQueue, DownloadUrlResolver
+from .classes.data_exchange.rate_limiter import TransferLimits
 from .classes.GraphQLAPI import RefreshTokenTask, RunGQLQueryTask
 from .classes.settings import CONSTANTS, Settings
 from .classes.util import extract_project_id, get_project_details_html
@@ -37,6 +38,7 @@ class ProjectDownloadDialog(QDialog, Ui_ProjectDownloadDialog):
         self.initial_project_id = project_id if isinstance(project_id, str) else None
         self.initial_local_path = local_path if isinstance(local_path, str) else None
         self.fetching_urls_cancelled = False
+        self.url_resolver: DownloadUrlResolver | None = None
 
         # Connect signals
         self.btnVerifyProject.clicked.connect(self._verify_project)
@@ -138,7 +140,8 @@ class ProjectDownloadDialog(QDialog, Ui_ProjectDownloadDialog):
         self.lblProjectDetails.setText("<i>Verifying project...</i>")
         self.btnVerifyProject.setEnabled(False)
 
-        self.dataExchangeAPI.get_project(project_id, self._handle_project_response)
+        # Never from the cache: the file sizes and etags decide what is downloaded and how it's checked
+        self.dataExchangeAPI.get_project(project_id, self._handle_project_response, use_cache=False)
 
     def _handle_project_response(self, task: RunGQLQueryTask, project: DEProject) -> None:
         self.btnVerifyProject.setEnabled(True)
@@ -331,6 +334,8 @@ class ProjectDownloadDialog(QDialog, Ui_ProjectDownloadDialog):
             return
 
         self.queue.reset()
+        self.queue.configure(self.settings.getValue("transferMinStreams"), self.settings.getValue("transferMaxStreams"))
+        TransferLimits().configure_from_settings(self.settings)
         parent = self.fileWidget.filePath()
         name = self.txtFolderName.text().strip()
         local_root = os.path.join(parent, name)
@@ -340,37 +345,33 @@ class ProjectDownloadDialog(QDialog, Ui_ProjectDownloadDialog):
         self._fetch_urls_and_enqueue(selected_files, local_root)
 
     def _fetch_urls_and_enqueue(self, files: list[str], local_root: str) -> None:
-        # We need to fetch URLs for each file.
-        # For simplicity in this implementation, we'll do them sequentially or batch them.
-        # Ideally, there might be a batch GraphQL query for this, but let's use what we have.
-
-        remaining = list(files)
+        # URLs are fetched in batches with a few requests in flight. Each file is queued as soon as
+        # its batch comes back so downloads start straight away instead of after every URL is known.
         total = len(files)
+        resolved = 0
+
+        self.url_resolver = DownloadUrlResolver(self.dataExchangeAPI, self.project.id)
+        self.queue.url_refresher = self.url_resolver.refresh
+        self.queue.expect({rel_path: self.project.files[rel_path].size for rel_path in files})
 
-        def _get_next_url():
+        def _handle_batch(urls: dict[str, dict | None]) -> None:
+            nonlocal resolved
             if self.fetching_urls_cancelled:
                 return
-            if not remaining:
-                self.lblStatus.setText("Starting downloads...")
-                self.queue.start()
-                return
-
-            rel_path = remaining.pop(0)
-            self.lblStatus.setText(f"Getting URL for {rel_path} ({total - len(remaining)}/{total})")
-
-            def _handle_url(task, ret_obj):
+            for rel_path, ret_obj in urls.items():
+                resolved += 1
                 if ret_obj and "downloadUrl" in ret_obj:
-                    abs_path = os.path.join(local_root, rel_path)
-                    self.queue.enqueue(rel_path, abs_path, ret_obj["downloadUrl"], self.project.files[rel_path].size)
-                    _get_next_url()
+                    file_info = self.project.files[rel_path]
+                    self.queue.enqueue(rel_path, os.path.join(local_root, rel_path), ret_obj["downloadUrl"], file_info.size, etag=file_info.etag)
                 else:
                     self._log_msg(f"Failed to get download URL for {rel_path}", Qgis.Critical)
-                    # Skip for now, or handle error
-                    _get_next_url()
-
-            self.dataExchangeAPI.get_download_url(self.project.id, rel_path, _handle_url)
+                    self.queue.mark_failed(rel_path)
+            if resolved < total:
+                self.lblProgressDetails.setText(f"Got download URLs for {resolved:,} of {total:,} files")
 
-        _get_next_url()
+        self.lblStatus.setText("Starting downloads...")
+        self.queue.start()
+        self.url_resolver.resolve(files, _handle_batch)
 
     def _on_file_progress(self, rel_path: str, downloaded: int, total: int) -> None:
         self.lblProgressDetails.setText(f"Downloading: {rel_path}\n{ProjectFileSelectionWidget.human_size(downloaded)} / {ProjectFileSelectionWidget.human_size(total)}")
@@ -379,7 +380,13 @@ class ProjectDownloadDialog(QDialog, Ui_ProjectDownloadDialog):
         if total > 0:
             percent = int((downloaded / total) * 100)
             self.progressBar.setValue(percent)
-            self.lblStatus.setText(f"Overall Progress: {percent}% ({ProjectFileSelectionWidget.human_size(downloaded)} / {ProjectFileSelectionWidget.human_size(total)})")
+            self.lblStatus.setText(f"Overall Progress: {percent}% ({ProjectFileSelectionWidget.human_size(downloaded)} / {ProjectFileSelectionWidget.human_size(total)}) {self._speed_text()}")
+
+    @staticmethod
+    def _speed_text() -> str:
+        bucket = TransferLimits().download
+        speed = f"{ProjectFileSelectionWidget.human_size(int(bucket.throughput))}/s"
+        return f"{speed} (limited to {ProjectFileSelectionWidget.human_size(bucket.rate)}/s)" if bucket.limited else speed
 
     def _on_download_complete(self) -> None:
         if self.queue.failed_tasks:
@@ -414,6 +421,8 @@ class ProjectDownloadDialog(QDialog, Ui_ProjectDownloadDialog):
         if self.stackedWidget.currentIndex() == 3 and self.btnCancel.text() == "Cancel Download":
             if QMessageBox.question(self, "Cancel Download", "Are you sure you want to cancel the download?", MSGBOX_BTN_YES | MSGBOX_BTN_NO) == MSGBOX_BTN_YES:
                 self.fetching_urls_cancelled = True
+                if self.url_resolver is not None:
+                    self.url_resolver.cancel()
                 self.queue.cancel_all()
                 self.lblStatus.setText("Download Cancelled.")
                 self.btnCancel.setText("Close")
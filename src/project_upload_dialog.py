@@ -5,12 +5,13 @@ import json
 import os
 
 import lxml.etree
-from qgis.core import Qgis
+from qgis.core import Qgis, QgsApplication
 from qgis.PyQt.QtCore import QTimer, QUrl, pyqtSignal, pyqtSlot
 from qgis.PyQt.QtGui import QDesktopServices, QStandardItem, QStandardItemModel
 from qgis.PyQt.QtWidgets import QButtonGroup, QDialog, QErrorMessage, QMessageBox
 
 from .classes.data_exchange.DataExchangeAPI import (
+    CalculateEtagsTask,
     DataExchangeAPI,
     DEProfile,
     DEProject,
@@ -19,6 +20,10 @@ from .classes.data_exchange.DataExchangeAPI import (
     UploadFile,
     UploadFileList,
 )
+from .classes.data_exchange.query_cache import QueryCache
+from .classes.data_exchange.rate_limiter import TransferLimits
+from .classes.data_exchange.tile_metadata import TileIndexCache
+from .classes.data_exchange.upload_journal import JOURNAL_FILE, PARTS_LOG_SUFFIX, UploadJournal
 from .classes.data_exchange.uploader import UploadMultiPartFileTask, UploadQueue
 from .classes.GraphQLAPI import GraphQLAPIPortError, RefreshTokenTask, RunGQLQueryTask
 from .classes.project import Project
@@ -47,6 +52,7 @@ class ProjectUploadDialogStateFlow:
     INITIALIZING = "INITIALIZING"
     LOGGING_IN = "LOGGING_IN"
     FETCHING_CONTEXT = "FETCHING_CONTEXT"
+    CALCULATING_ETAGS = "CALCULATING_ETAGS"
     USER_ACTION = "USER_ACTION"
     VALIDATING = "VALIDATING"
     REQUESTING_UPLOAD = "REQUESTING_UPLOAD"
@@ -64,7 +70,8 @@ class ProjectUploadDialogStateFlow:
 # =================================
 #           handle_login -->
 #           handle_profile_change -->
-#           handle_existing_project
+#           handle_existing_project -->
+#           handle_etags_calculated (only when updating an existing project)
 
 # Workflow When he user clicks start:
 # =================================
@@ -77,6 +84,12 @@ class ProjectUploadDialogStateFlow:
 #           handle_wait_for_upload_completion --> self.dataExchangeAPI.check_upload --> self.dataExchangeAPI.download_file) -->
 #           handle_all_done
 
+# Workflow When the user clicks "Resume Upload" (an earlier upload left its journal behind):
+# =================================
+#           handle_resume_click --> self.dataExchangeAPI.request_upload_project_files_url (only for files whose URLs expired)
+#           handle_request_upload_project_files_url -->
+#           handle_upload_start --> (the rest is the same as above. Straight to finalize if every file was already uploaded)
+
 
 class ProjectUploadDialogError:
     def __init__(self, summary: str, detail: str) -> None:
@@ -95,6 +108,8 @@ class ProjectUploadDialog(QDialog, Ui_Dialog):
         self.setupUi(self)
         self.project_xml = project
         self.upload_log_path = os.path.join(project.project_dir, LOG_FILE)
+        # Lets an upload be resumed after the dialog (or QGIS) is closed. Unlike the log it's kept until the upload succeeds
+        self.upload_journal_path = os.path.join(project.project_dir, JOURNAL_FILE)
         self.flow_state = ProjectUploadDialogStateFlow.INITIALIZING
         warehouse_tag = self.project_xml.warehouse_meta
         self.settings = Settings()
@@ -111,6 +126,8 @@ class ProjectUploadDialog(QDialog, Ui_Dialog):
         self.tags = []
         self.selected_tag = []
         self.upload_digest = UploadFileList()
+        self.etag_task: CalculateEtagsTask | None = None
+        self.journal: UploadJournal | None = None
         self.api_url = None
         self.queue = UploadQueue(log_callback=self.upload_log)
         self.local_ops = {
@@ -164,6 +181,9 @@ class ProjectUploadDialog(QDialog, Ui_Dialog):
         # Add a "View Log" button to the QtWidgets.QDialogButtonBox
         self.viewLogsButton = self.actionBtnBox.addButton("View Log", DLGBTN_ROLE_ACTION)
         self.viewLogsButton.clicked.connect(lambda: QDesktopServices.openUrl(QUrl.fromLocalFile(self.upload_log_path)))
+        self.resumeButton = self.actionBtnBox.addButton("Resume Upload", DLGBTN_ROLE_ACTION)
+        self.resumeButton.setToolTip("Continue an upload of this project that was stopped or interrupted. Files and parts that were already uploaded are skipped.")
+        self.resumeButton.clicked.connect(self.handle_resume_click)
 
         self.mine_group = QButtonGroup(self)
         self.mine_group.addButton(self.optOwnerMe, 1)  # ME === 1
@@ -294,6 +314,10 @@ class ProjectUploadDialog(QDialog, Ui_Dialog):
         # Upload Progress and summary
         ########################################################################
 
+        is_hashing = self.flow_state == ProjectUploadDialogStateFlow.CALCULATING_ETAGS
+        self.etagStatusLabel.setVisible(is_hashing)
+        self.etagProgressBar.setVisible(is_hashing)
+
         if self.flow_state not in [ProjectUploadDialogStateFlow.UPLOADING]:
             self.progressBar.setValue(0)
             self.progressSubLabel.setText("...")
@@ -312,6 +336,8 @@ class ProjectUploadDialog(QDialog, Ui_Dialog):
             todo_text = "Logging in... (check your browser)"
         elif self.flow_state == ProjectUploadDialogStateFlow.FETCHING_CONTEXT:
             todo_text = "Fetching user context..."
+        elif self.flow_state == ProjectUploadDialogStateFlow.CALCULATING_ETAGS:
+            todo_text = "Comparing local files with the existing project..."
         elif self.flow_state == ProjectUploadDialogStateFlow.USER_ACTION:
             todo_text = f"Ready: {self.local_ops[UploadFile.FileOp.CREATE]:,} New {self.local_ops[UploadFile.FileOp.UPDATE]:,} Update {self.local_ops[UploadFile.FileOp.DELETE]:,} delete"
         elif self.flow_state == ProjectUploadDialogStateFlow.VALIDATING:
@@ -377,6 +403,11 @@ class ProjectUploadDialog(QDialog, Ui_Dialog):
         self.viewLogsButton.setEnabled(os.path.isfile(self.upload_log_path))
         self.viewLogsButton.setVisible(curr == 2)
 
+        # An earlier upload of this project didn't finish and we're logged in to pick it up
+        can_resume = allow_user_action and self.profile is not None and os.path.isfile(self.upload_journal_path)
+        self.resumeButton.setVisible(can_resume)
+        self.resumeButton.setEnabled(can_resume)
+
         # Disable the "Cancel" button while uploading. The user MUST click STOP first
         cancel_btn = self.actionBtnBox.button(DLGBTN_CANCEL)
         if cancel_btn:
@@ -403,12 +434,15 @@ class ProjectUploadDialog(QDialog, Ui_Dialog):
         self.last_upload_check = None
         self.progress = 0
         self.upload_start_time = None
+        # The journal stays on disk so the upload can still be resumed
+        self.journal = None
         # Reset the queue and the upload digest
         self.queue.reset()
 
     def handle_login_reset(self) -> None:
         """This is the "reset" button at the top fo the form"""
         self.upload_log("Resetting the upload form...\n\n\n", Qgis.Info)
+        self.cancel_etag_calculation()
         # First reset the opload state completely
         self.reset_upload_state()
         # Now log in using the data exchange API
@@ -642,7 +676,8 @@ class ProjectUploadDialog(QDialog, Ui_Dialog):
         else:
             self.upload_log("Fetching existing project from the warehouse...", Qgis.Info)
             self.existing_project = None
-            self.dataExchangeAPI.get_project(self.warehouse_id, self.handle_existing_project)
+            # Never from the cache: this decides which files get uploaded
+            self.dataExchangeAPI.get_project(self.warehouse_id, self.handle_existing_project, use_cache=False)
 
         self.recalc_state()
 
@@ -1038,14 +1073,74 @@ class ProjectUploadDialog(QDialog, Ui_Dialog):
             self.upload_digest.reset()
             self.upload_digest.scan_local_files(self.project_xml.project_dir, self.project_xml.project_type)
 
-            # Recalculate etags with existing files
+            # Recalculate etags with existing files. This happens in the background and
+            # handle_etags_calculated picks things up from there
             existing_etags = {k: v.etag for k, v in self.existing_project.files.items()}
-            self.upload_log("Recalculating file etags based on existing project files...", Qgis.Info)
-            self.upload_digest.calculate_etags(self.project_xml.project_dir, existing_files=existing_etags)
+            if self.start_etag_calculation(existing_etags):
+                self.recalc_state()
+                return
 
         self.upload_log("Waiting for user input..." + "\n" * 3, Qgis.Info)
         self.recalc_state()
 
+    def start_etag_calculation(self, existing_etags: dict[str, str]) -> bool:
+        """Hash every local file that also exists remotely on a background task
+
+        Returns:
+            bool: True if a task was started, False if there was nothing to hash
+        """
+        self.cancel_etag_calculation()
+        jobs = self.upload_digest.get_etag_jobs(self.project_xml.project_dir, existing_files=existing_etags)
+        if len(jobs) == 0:
+            return False
+
+        self.upload_log(f"Recalculating file etags for {len(jobs):,} files based on existing project files...", Qgis.Info)
+        self.flow_state = ProjectUploadDialogStateFlow.CALCULATING_ETAGS
+        self.etagProgressBar.setValue(0)
+        self.etag_task = CalculateEtagsTask(jobs, self.handle_etags_calculated)
+        self.etag_task.progressChanged.connect(self.etag_progress)
+        QgsApplication.taskManager().addTask(self.etag_task)
+        return True
+
+    def cancel_etag_calculation(self) -> None:
+        if self.etag_task is not None:
+            task = self.etag_task
+            # Clear it first so handle_etags_calculated knows to ignore this one
+            self.etag_task = None
+            task.cancel()
+
+    def etag_progress(self, progress: float) -> None:
+        task = self.etag_task
+        if task is None:
+            return
+        self.etagProgressBar.setValue(int(progress))
+        self.etagProgressBar.setFormat(f"{humane_bytes(task.bytes_done)} of {humane_bytes(task.bytes_total)}")
+
+    def handle_etags_calculated(self, task: CalculateEtagsTask) -> None:
+        # A reset or a newer calculation has already replaced this one
+        if task is not self.etag_task:
+            return
+        self.etag_task = None
+
+        if task.success:
+            self.upload_digest.set_etags(task.etags)
+            self.upload_log(f"  - Calculated etags for {len(task.etags):,} files ({len(task.calculator.cached):,} unchanged files came from the hash cache)", Qgis.Info)
+            for rel_path in task.calculator.mismatched:
+                self.upload_log(f"  - WARNING: Cached etag was wrong for {rel_path}. The hash cache has been updated", Qgis.Warning)
+            self.flow_state = ProjectUploadDialogStateFlow.USER_ACTION
+        else:
+            self.upload_log("  - ERROR: Could not calculate local file etags", Qgis.Critical)
+            self.error = ProjectUploadDialogError("Could not calculate local file etags", str(task.error))
+            self.flow_state = ProjectUploadDialogStateFlow.ERROR
+
+        self.upload_log("Waiting for user input..." + "\n" * 3, Qgis.Info)
+        self.recalc_state()
+
+    def reject(self) -> None:
+        # Don't keep hashing a big project after the dialog is gone
+        self.cancel_etag_calculation()
+        super().reject()
+
     def show_error_message(self) -> None:
         if self.error is None:
             return
@@ -1157,6 +1252,8 @@ class ProjectUploadDialog(QDialog, Ui_Dialog):
 
         response = qm.exec()
         if response == MSGBOX_BTN_YES:
+            # A new upload gets a new token so an unfinished one can't be resumed any more
+            self.discard_journal()
             # Before validation, we need to finalize what we're actually sending
             self._reconcile_selections_with_digest()
             self.flow_state = ProjectUploadDialogStateFlow.VALIDATING
@@ -1187,6 +1284,72 @@ class ProjectUploadDialog(QDialog, Ui_Dialog):
         self.flow_state = ProjectUploadDialogStateFlow.CANCELLED
         self.recalc_state()
 
+    def handle_resume_click(self):
+        """Pick up an upload that was stopped (or that QGIS was closed during) from the upload journal.
+
+        Validation and the upload request already happened the first time so we go straight to
+        uploading whatever is left, then finalize with the same token.
+        """
+        self.error = None
+        journal = UploadJournal.load(self.upload_journal_path)
+        if journal is None:
+            self.error = ProjectUploadDialogError("Could not resume the upload", "The upload journal could not be read. Please start a new upload.")
+        elif journal.api_url != self.dataExchangeAPI.api.uri:
+            self.error = ProjectUploadDialogError("Could not resume the upload", f"The upload was started on a different Data Exchange.\n\nUpload API: {journal.api_url}\nCurrent API: {self.dataExchangeAPI.api.uri}")
+        else:
+            changed = journal.changed_files(self.project_xml.project_dir)
+            if len(changed) > 0:
+                self.error = ProjectUploadDialogError("Could not resume the upload", "These files have changed since the upload started. Please start a new upload:\n\n" + "\n".join(changed))
+        if self.error is not None:
+            self.upload_log(f"ERROR: {self.error.summary}: {self.error.detail}", Qgis.Critical)
+            self.recalc_state()
+            return
+
+        remaining = journal.remaining()
+        qm = QMessageBox()
+        qm.setWindowTitle("Resume Upload?")
+        qm.setDefaultButton(MSGBOX_BTN_NO)
+        qm.setText(
+            f'This will resume uploading the project "{self.project_xml.project.find("Name").text}" to the Riverscapes Data Exchange. '
+            f"{len(remaining):,} of {len(journal.files):,} files ({humane_bytes(journal.remaining_bytes())}) still need to be uploaded. Are you sure?"
+        )
+        qm.setStandardButtons(MSGBOX_BTN_YES | MSGBOX_BTN_NO)
+        if qm.exec() != MSGBOX_BTN_YES:
+            return
+
+        self.reset_upload_state()
+        self.upload_log("User-Initiated project upload resuming", Qgis.Info, is_header=True)
+        self.upload_log(f"  - Upload started: {journal.created} New Project ID: {journal.new_project_id}", Qgis.Info)
+        self.journal = journal
+        self.new_project_id = journal.new_project_id
+
+        # Put the digest back the way it was when the upload was requested
+        self.upload_digest.reset()
+        self.upload_digest.token = journal.token
+        for journal_file in journal.files.values():
+            self.upload_digest.add_file(journal_file.rel_path, journal_file.size, journal_file.etag)
+            self.upload_digest.files[journal_file.rel_path].op = journal_file.op
+            self.upload_digest.files[journal_file.rel_path].urls = journal_file.urls
+
+        self.stackedWidget.setCurrentIndex(2)
+        expired = journal.expired_files()
+        if len(expired) > 0:
+            self.upload_log(f"Requesting new upload URLs for {len(expired):,} files...", Qgis.Info)
+            self.flow_state = ProjectUploadDialogStateFlow.REQUESTING_UPLOAD
+            self.dataExchangeAPI.request_upload_project_files_url(self.upload_digest, self.handle_request_upload_project_files_url, rel_paths=expired)
+        else:
+            self.handle_upload_start()
+        self.recalc_state()
+
+    def discard_journal(self) -> None:
+        """Forget about the unfinished upload (if there is one). It can't be resumed after this"""
+        self.journal = None
+        if os.path.isfile(self.upload_journal_path):
+            self.upload_log("Removing the upload journal. The previous upload can no longer be resumed", Qgis.Info)
+            os.remove(self.upload_journal_path)
+        if os.path.isfile(self.upload_journal_path + PARTS_LOG_SUFFIX):
+            os.remove(self.upload_journal_path + PARTS_LOG_SUFFIX)
+
     def handle_project_validation(self, task: RunGQLQueryTask, validation_obj: DEValidation):
         """Before we can upload a project we need to validate it. This saves a lot of time and effort
         When validation succeeds we can request permission to upload the project
@@ -1312,10 +1475,42 @@ class ProjectUploadDialog(QDialog, Ui_Dialog):
             self.flow_state = ProjectUploadDialogStateFlow.ERROR
         else:
             self.upload_log("  - SUCCESS: Got the file upload URLs", Qgis.Info)
+            if self.journal is None:
+                self.start_journal()
+            else:
+                # Resuming. Only the files whose URLs had expired were asked for
+                for f_resp in project:
+                    self.journal.set_urls(f_resp["relPath"], f_resp["urls"])
+                self.save_journal()
             self.stackedWidget.setCurrentIndex(2)
             self.handle_upload_start()
         self.recalc_state()
 
+    def start_journal(self) -> None:
+        """Record the upload we're about to start so it can be resumed"""
+        selected_files = set(self.fileSelection.get_selected_files())
+        upload_files = [file for file in self.upload_digest.files.values() if file.rel_path in selected_files and file.op in [UploadFile.FileOp.CREATE, UploadFile.FileOp.UPDATE]]
+        try:
+            self.journal = UploadJournal.for_upload(self.upload_journal_path, self.project_xml.project_dir, self.upload_digest.token, self.new_project_id, self.dataExchangeAPI.api.uri, upload_files)
+        except OSError as e:
+            # The journal is optional. If the file really is gone its upload will fail and say so
+            self.upload_log(f"  - WARNING: Could not start the upload journal. This upload can't be resumed: {e!s}", Qgis.Warning)
+            self.journal = None
+            return
+        self.save_journal()
+
+    def save_journal(self) -> None:
+        try:
+            self.journal.save()
+        except OSError as e:
+            # The upload still works. It just can't be resumed
+            self.upload_log(f"  - WARNING: Could not save the upload journal. This upload can't be resumed: {e!s}", Qgis.Warning)
+            # An older journal left behind would list the wrong URLs (and parts)
+            try:
+                self.journal.remove()
+            except OSError:
+                pass
+
     @pyqtSlot(str, int, int, int)
     def upload_progress(
         self,
@@ -1359,7 +1554,12 @@ class ProjectUploadDialog(QDialog, Ui_Dialog):
         uploaded_str = humane_bytes(uploaded_bytes)
         total_str = humane_bytes(total_bytes)
 
-        self.todoLabel.setText(f"Uploading: {uploaded_str} of {total_str} {end_time_str}")
+        bucket = TransferLimits().upload
+        speed_str = f"{humane_bytes(int(bucket.throughput))}/s"
+        if bucket.limited:
+            speed_str += f" (limited to {humane_bytes(bucket.rate)}/s)"
+
+        self.todoLabel.setText(f"Uploading: {uploaded_str} of {total_str} at {speed_str} {end_time_str}")
         self.progressSubLabel.setText(f"Uploading: {biggest_file_relpath}")
 
     def handle_upload_start(self):
@@ -1368,14 +1568,32 @@ class ProjectUploadDialog(QDialog, Ui_Dialog):
         After all files are uploaded we will call the finalize endpoint
         """
         self.upload_log("Starting the ACTUAL file upload process...", Qgis.Info)
+        self.queue.configure(self.settings.getValue("transferMinStreams"), self.settings.getValue("transferMaxStreams"))
+        TransferLimits().configure_from_settings(self.settings)
+
+        if self.journal is not None:
+            remaining = [(journal_file.rel_path, journal_file.size, journal_file.urls, set(journal_file.done_parts)) for journal_file in self.journal.remaining()]
+        else:
+            # No journal to go by (it couldn't be started) so every selected file is uploaded from the start
+            selected_files = set(self.fileSelection.get_selected_files())
+            remaining = [(upFile.rel_path, upFile.size, upFile.urls, set()) for upFile in self.upload_digest.files.values() if upFile.rel_path in selected_files and upFile.op in [UploadFile.FileOp.CREATE, UploadFile.FileOp.UPDATE]]
+        if len(remaining) == 0:
+            self.upload_log("Every file has already been uploaded", Qgis.Info)
+            self.handle_uploads_complete()
+            return
 
-        selected_files = self.fileSelection.get_selected_files()
-        for rel_path in selected_files:
-            if rel_path in self.upload_digest.files:
-                upFile = self.upload_digest.files[rel_path]
-                if upFile.op in [UploadFile.FileOp.CREATE, UploadFile.FileOp.UPDATE]:
-                    abs_path = os.path.join(self.project_xml.project_dir, upFile.rel_path)
-                    self.queue.enqueue(upFile.rel_path, abs_path, upload_urls=upFile.urls)
+        # Biggest first. The queue starts uploading as soon as files arrive so the order matters
+        for rel_path, _size, urls, done_parts in sorted(remaining, key=lambda file: file[1], reverse=True):
+            abs_path = os.path.join(self.project_xml.project_dir, rel_path)
+            if len(done_parts) > 0:
+                self.upload_log(f"  - Resuming {rel_path}: {len(done_parts):,} of {len(urls):,} parts already uploaded", Qgis.Info)
+            self.queue.enqueue(
+                rel_path,
+                abs_path,
+                upload_urls=urls,
+                done_parts=done_parts,
+                part_done_callback=(lambda idx, rel_path=rel_path, journal=self.journal: journal.part_done(rel_path, idx)) if self.journal is not None else None,
+            )
 
         self.flow_state = ProjectUploadDialogStateFlow.UPLOADING
         self.recalc_state()
@@ -1456,6 +1674,8 @@ class ProjectUploadDialog(QDialog, Ui_Dialog):
 
         # Uploader Fail case
         if status == "FAILED":
+            # The upload token is used up so there's nothing left to resume
+            self.discard_journal()
             self.upload_log(
                 "Upload failed: " + json.dumps(job_status_obj, indent=2) + "\n" * 3,
                 Qgis.Critical,
@@ -1470,6 +1690,11 @@ class ProjectUploadDialog(QDialog, Ui_Dialog):
                 f"Upload succeeded and is now present on the Warehouse at {CONSTANTS['warehouseUrl']}/p/{self.new_project_id}",
                 Qgis.Info,
             )
+            self.discard_journal()
+            # Anything we remembered about the project from before the upload is out of date now
+            for project_id in {self.new_project_id, self.warehouse_id} - {None}:
+                QueryCache().invalidate(project_id)
+                TileIndexCache().invalidate(project_id)
             # Downlod the project.rs.xml file back to the local folder
             self.upload_log(
                 "Downloading the project.rs.xml file back to the local project folder...",
@@ -32,6 +32,8 @@ from . import resources  # noqa: F401 — registers Qt icons/images as a side ef
 from .about_dialog import AboutDialog
 from .classes.data_exchange.DataExchangeAPI import DataExchangeAPI
 from .classes.GraphQLAPI import RefreshTokenTask, RunGQLQueryTask
+from .classes.http_session import HttpSession
+from .classes.layer_registry import LayerRegistry
 from .classes.map import get_map_center, get_zoom_level
 from .classes.net_sync import NetSync
 from .classes.settings import CONSTANTS, Settings
@@ -89,6 +91,7 @@ class QRAVE:
 
         self.settings.setValue("DEBUG", os.environ.get("RS_DEBUG", "False").lower() == "true")
         self.settings.setValue("Staging", os.environ.get("RS_STAGING", "False").lower() == "true")
+        HttpSession().configure_from_settings(self.settings)
 
         self.pluginIsActive = False
 
@@ -190,6 +193,7 @@ class QRAVE:
     def initGui(self) -> None:
         """Create the menu entries and toolbar icons inside the QGIS GUI."""
         self.qproject.readProject.connect(self.onProjectLoad)
+        LayerRegistry().connect(self.qproject)
 
         self.openAction = QAction(
             qrave_icon("viewer-icon.svg"),
@@ -435,6 +439,8 @@ class QRAVE:
             self.qproject.readProject.disconnect(self.onProjectLoad)
         except TypeError:
             pass
+        LayerRegistry().disconnect()
+        HttpSession().close()
 
         # remove the toolbar
         if self.toolbar is not None:
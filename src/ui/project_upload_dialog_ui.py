@@ -70,6 +70,13 @@ class Ui_Dialog(object):
         self.loginButtonLayout.addWidget(self.loginResetBtn)
         self.grdGroupProject.addLayout(self.loginButtonLayout, 2, 1)
 
+        # Shown while local files are hashed to compare against an existing project
+        self.etagStatusLabel = QtWidgets.QLabel("Local files")
+        self.grdGroupProject.addWidget(self.etagStatusLabel, 4, 0)
+        self.etagProgressBar = QtWidgets.QProgressBar()
+        self.etagProgressBar.setValue(0)
+        self.grdGroupProject.addWidget(self.etagProgressBar, 4, 1)
+
         # Project Details Card
         self.frameProjectDetails = QtWidgets.QFrame()
         self.frameProjectDetails.setFrameShape(QFRAME_STYLED_PANEL)
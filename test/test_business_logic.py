@@ -0,0 +1,151 @@
+"""Unit tests for src/classes/business_logic.py
+
+The compiled business logic only depends on lxml so real XML files are written
+to a temp folder and parsed. qgis is mocked only so that ``src/__init__.py``
+can be imported.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import types
+import unittest
+from unittest.mock import MagicMock
+
+import lxml.etree
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def mock_module(name, attrs=None):
+    m = types.ModuleType(name)
+    if attrs:
+        for k, v in attrs.items():
+            setattr(m, k, v)
+    sys.modules[name] = m
+    return m
+
+
+if "qgis" not in sys.modules:
+    mock_module("qgis")
+    mock_module("qgis.core", {"Qgis": MagicMock(), "QgsMessageLog": MagicMock()})
+
+from src.classes.business_logic import BusinessLogicNode, BusinessLogicRegistry, build_inputs_index, compile_xpath  # noqa: E402
+
+BL_XML = """<?xml version="1.0" encoding="utf-8"?>
+<Project>
+  <Node label="VBET" xpathlabel="Name">
+    <Children collapsed="false">
+      <Node label="Inputs">
+        <Children>
+          <Node label="DEM" xpath="Realizations/Realization/Inputs/Raster[@id='DEM']" type="raster" symbology="dem" />
+          <Node label="Broken" xpath="Realizations/[[[" type="raster" />
+        </Children>
+      </Node>
+      <Repeater label="Realizations" xpath="Realizations/Realization">
+        <Node xpathlabel="Name">
+          <Children>
+            <Node label="Output" xpath="Outputs/Vector" type="line" />
+          </Children>
+        </Node>
+      </Repeater>
+    </Children>
+  </Node>
+</Project>
+"""
+
+
+class TestBusinessLogic(unittest.TestCase):
+    def setUp(self):
+        BusinessLogicRegistry().invalidate()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.bl_path = os.path.join(self.tmp_dir, "VBET.xml")
+        with open(self.bl_path, "w", encoding="utf-8") as f:
+            f.write(BL_XML)
+
+    def tearDown(self):
+        BusinessLogicRegistry().invalidate()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_structure_is_compiled(self):
+        root = BusinessLogicRegistry().get(self.bl_path).root_node
+        self.assertEqual(root.label, "VBET")
+        self.assertTrue(root.is_branch)
+        self.assertEqual(root.children_attrib, {"collapsed": "false"})
+
+        inputs, repeater = root.children
+        dem = inputs.children[0]
+        self.assertFalse(dem.is_branch)
+        self.assertEqual(dem.leaf_type, "raster")
+        self.assertEqual(dem.symbology, "dem")
+        self.assertIsNotNone(dem.xpath)
+
+        self.assertEqual(repeater.tag, BusinessLogicNode.REPEATER)
+        self.assertIsNotNone(repeater.repeat_node)
+        self.assertEqual(repeater.repeat_node.children[0].label, "Output")
+
+    def test_invalid_xpath_compiles_to_none(self):
+        broken = BusinessLogicRegistry().get(self.bl_path).root_node.children[0].children[1]
+        self.assertEqual(broken.xpath_str, "Realizations/[[[")
+        self.assertIsNone(broken.xpath)
+
+    def test_reused_across_instances(self):
+        first = BusinessLogicRegistry().get(self.bl_path)
+        second = BusinessLogicRegistry().get(self.bl_path)
+        self.assertIs(first, second)
+
+    def test_modified_file_is_recompiled(self):
+        first = BusinessLogicRegistry().get(self.bl_path)
+        stat = os.stat(self.bl_path)
+        os.utime(self.bl_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self.assertIsNot(first, BusinessLogicRegistry().get(self.bl_path))
+
+    def test_invalidate_only_changed_paths(self):
+        other_path = os.path.join(self.tmp_dir, "Other.xml")
+        shutil.copy(self.bl_path, other_path)
+        first = BusinessLogicRegistry().get(self.bl_path)
+        other = BusinessLogicRegistry().get(other_path)
+        BusinessLogicRegistry().invalidate([other_path])
+        self.assertIs(first, BusinessLogicRegistry().get(self.bl_path))
+        self.assertIsNot(other, BusinessLogicRegistry().get(other_path))
+
+    def test_bad_xml_raises(self):
+        with open(self.bl_path, "w", encoding="utf-8") as f:
+            f.write("<Project><Node>")
+        with self.assertRaisesRegex(Exception, "XML Syntax error"):
+            BusinessLogicRegistry().get(self.bl_path)
+
+
+class TestXPathHelpers(unittest.TestCase):
+    def test_compile_xpath_is_cached(self):
+        self.assertIs(compile_xpath("Realizations/Realization"), compile_xpath("Realizations/Realization"))
+
+    def test_compile_xpath_bad_or_empty(self):
+        self.assertIsNone(compile_xpath(""))
+        self.assertIsNone(compile_xpath(None))
+        self.assertIsNone(compile_xpath("Realizations/[[["))
+
+    def test_inputs_index(self):
+        root = lxml.etree.fromstring(
+            """<Project>
+              <Inputs>
+                <!-- comments are skipped -->
+                <Raster id="DEM"><Path>a.tif</Path></Raster>
+                <Vector id="Flowlines" />
+                <Raster id="DEM"><Path>duplicate.tif</Path></Raster>
+                <Raster />
+              </Inputs>
+              <Realizations><Realization><Inputs><Raster id="Nested" /></Inputs></Realization></Realizations>
+            </Project>"""
+        )
+        index = build_inputs_index(root)
+        self.assertEqual(sorted(index.keys()), ["DEM", "Flowlines"])
+        # First one wins, same as the XPath lookup it replaces
+        self.assertEqual(index["DEM"].find("Path").text, "a.tif")
+        self.assertIs(index["DEM"], root.xpath('Inputs/*[@id="DEM"]')[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
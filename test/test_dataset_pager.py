@@ -0,0 +1,168 @@
+"""Unit tests for src/classes/data_exchange/dataset_pager.py
+
+The API is a fake that keeps every page request until the test answers it, and QTimer is a fake
+that keeps its callbacks until the test fires them.
+"""
+
+import os
+import sys
+import types
+from typing import ClassVar
+import unittest
+from unittest.mock import MagicMock
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def mock_module(name, attrs=None):
+    m = types.ModuleType(name)
+    if attrs:
+        for k, v in attrs.items():
+            setattr(m, k, v)
+    sys.modules[name] = m
+    return m
+
+
+class FakeTimer:
+    waiting: ClassVar[list] = []
+
+    @staticmethod
+    def singleShot(_msec, callback):
+        FakeTimer.waiting.append(callback)
+
+
+mock_module("qgis")
+mock_module("qgis.core", {"Qgis": MagicMock(), "QgsMessageLog": MagicMock()})
+mock_module("qgis.PyQt")
+mock_module("qgis.PyQt.QtCore", {"QTimer": FakeTimer})
+
+from src.classes.data_exchange.dataset_pager import DatasetMetadataPager  # noqa: E402
+
+
+class FakeTask:
+    def __init__(self, success):
+        self.success = success
+        self.error = None if success else Exception("timeout")
+
+
+class FakeAPI:
+    def __init__(self, total):
+        self.total = total
+        self.requests = []
+        # (offset, limit) that fail when answered
+        self.failing = set()
+
+    def fetch_page(self, offset, limit, callback):
+        self.requests.append((offset, limit, callback))
+
+    def answer(self, index=0):
+        offset, limit, callback = self.requests.pop(index)
+        if (offset, limit) in self.failing:
+            callback(FakeTask(False), None)
+        else:
+            items = [{"id": f"ds{idx}"} for idx in range(offset, min(offset + limit, self.total))]
+            callback(FakeTask(True), {"items": items, "total": self.total})
+
+    def answer_all(self):
+        while self.requests:
+            self.answer()
+
+
+class TestDatasetMetadataPager(unittest.TestCase):
+    def setUp(self):
+        FakeTimer.waiting = []
+        self.batches = []
+        self.done = []
+
+    def pager(self, api, **kwargs):
+        pager = DatasetMetadataPager(api.fetch_page, self.batches.append, self.done.append, **kwargs)
+        pager.start()
+        return pager
+
+    def ids(self):
+        return sorted(item["id"] for batch in self.batches for item in batch)
+
+    def test_rest_of_the_pages_fetched_concurrently(self):
+        api = FakeAPI(total=500)
+        self.pager(api, limit=50, window=4, flush_pages=100)
+        self.assertEqual([(offset, limit) for offset, limit, _callback in api.requests], [(0, 50)])
+        api.answer()
+        # Once the total is known a whole window goes out at once
+        self.assertEqual([offset for offset, _limit, _callback in api.requests], [50, 100, 150, 200])
+        # Out of order is fine, and a page coming back lets the next one go
+        api.answer(2)
+        self.assertEqual([offset for offset, _limit, _callback in api.requests], [50, 100, 200, 250])
+        api.answer_all()
+        self.assertEqual(self.ids(), sorted(f"ds{idx}" for idx in range(500)))
+        self.assertEqual(self.done, [0])
+
+    def test_window_bounds_requests(self):
+        api = FakeAPI(total=1000)
+        self.pager(api, limit=50, window=3)
+        api.answer()
+        most = 0
+        while api.requests:
+            most = max(most, len(api.requests))
+            api.answer()
+        self.assertEqual(most, 3)
+
+    def test_single_page(self):
+        api = FakeAPI(total=20)
+        self.pager(api, limit=50)
+        api.answer()
+        self.assertEqual(api.requests, [])
+        self.assertEqual(len(self.batches), 1)
+        self.assertEqual(self.done, [0])
+
+    def test_updates_batched_by_pages(self):
+        api = FakeAPI(total=1000)
+        self.pager(api, limit=50, window=4, flush_pages=5)
+        api.answer_all()
+        # 20 pages: one update every 5 pages, the last one when everything has arrived
+        self.assertEqual([len(batch) for batch in self.batches], [250] * 4)
+
+    def test_updates_batched_by_time(self):
+        api = FakeAPI(total=200)
+        self.pager(api, limit=50, window=2, flush_pages=10)
+        api.answer()
+        api.answer()
+        self.assertEqual(self.batches, [])
+        # One timer for all the pages waiting
+        self.assertEqual(len(FakeTimer.waiting), 1)
+        FakeTimer.waiting.pop()()
+        self.assertEqual([len(batch) for batch in self.batches], [100])
+        api.answer_all()
+        self.assertEqual([len(batch) for batch in self.batches], [100, 100])
+
+    def test_failed_pages_split_up(self):
+        api = FakeAPI(total=200)
+        api.failing = {(50, 50), (75, 25), (88, 12), (94, 6), (97, 3)}
+        self.pager(api, limit=50, window=4, min_limit=3, flush_pages=100)
+        api.answer_all()
+        # Everything but the 3 datasets that never came back
+        self.assertEqual(self.ids(), sorted(f"ds{idx}" for idx in range(200) if idx not in (97, 98, 99)))
+        self.assertEqual(self.done, [3])
+
+    def test_first_page_fails(self):
+        api = FakeAPI(total=200)
+        api.failing = {(0, 50)}
+        self.pager(api, limit=50, min_limit=10, flush_pages=100)
+        api.answer()
+        # Tried again with a smaller page, which then decides the rest
+        self.assertEqual([(offset, limit) for offset, limit, _callback in api.requests], [(0, 25)])
+        api.answer_all()
+        self.assertEqual(self.ids(), sorted(f"ds{idx}" for idx in range(200)))
+
+    def test_cancel(self):
+        api = FakeAPI(total=500)
+        pager = self.pager(api, limit=50)
+        api.answer()
+        pager.cancel()
+        api.answer_all()
+        self.assertEqual(self.batches, [])
+        self.assertEqual(self.done, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
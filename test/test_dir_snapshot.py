@@ -0,0 +1,200 @@
+"""Unit tests for src/classes/dir_snapshot.py and src/classes/file_watcher.py
+
+Both work on a real temp folder. QFileSystemWatcher is replaced with a fake so the
+tests can say when a folder changed.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import types
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+USER_ROLE = 1000
+FOREGROUND_ROLE = 1001
+
+
+def mock_module(name, attrs=None):
+    m = types.ModuleType(name)
+    if attrs:
+        for k, v in attrs.items():
+            setattr(m, k, v)
+    sys.modules[name] = m
+    return m
+
+
+class FakeSignal:
+    def __init__(self):
+        self.slots = []
+
+    def connect(self, slot):
+        self.slots.append(slot)
+
+    def emit(self, *args):
+        for slot in list(self.slots):
+            slot(*args)
+
+
+class FakeWatcher:
+    def __init__(self):
+        self.paths = set()
+        self.directoryChanged = FakeSignal()
+
+    def addPaths(self, paths):
+        self.paths.update(paths)
+
+    def removePath(self, path):
+        self.paths.discard(path)
+
+    def removePaths(self, paths):
+        self.paths.difference_update(paths)
+
+
+class FakeItem:
+    def __init__(self, layer_uri):
+        self._data = {USER_ROLE: types.SimpleNamespace(data=types.SimpleNamespace(layer_uri=layer_uri, exists=False)), FOREGROUND_ROLE: "gray"}
+        self._font = MagicMock()
+        self.tooltip = "File is not available locally"
+
+    def data(self, role):
+        return self._data.get(role)
+
+    def setData(self, value, role):
+        self._data[role] = value
+
+    def font(self):
+        return self._font
+
+    def setFont(self, font):
+        self._font = font
+
+    def setToolTip(self, tip):
+        self.tooltip = tip
+
+
+mock_module("qgis")
+mock_module("qgis.PyQt")
+mock_module("qgis.PyQt.QtCore", {"QFileSystemWatcher": FakeWatcher})
+mock_module("qgis.PyQt.QtGui", {"QStandardItem": FakeItem})
+mock_module("qgis.core", {"Qgis": MagicMock(), "QgsMessageLog": MagicMock()})
+mock_module("src.compat", {"USER_ROLE": USER_ROLE, "FOREGROUND_ROLE": FOREGROUND_ROLE})
+
+from src.classes.dir_snapshot import DirectorySnapshot  # noqa: E402
+from src.classes.file_watcher import MissingFileWatcher  # noqa: E402
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("x")
+
+
+class TempFolderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def path(self, *parts):
+        return os.path.join(self.tmp_dir, *parts)
+
+
+class TestDirectorySnapshot(TempFolderTestCase):
+    def test_matches_isfile(self):
+        for rel in [("inputs", "dem.tif"), ("inputs", "hillshade.tif"), ("outputs", "a", "out.shp"), ("project.rs.xml",)]:
+            touch(self.path(*rel))
+        snapshot = DirectorySnapshot()
+        snapshot.prefetch([self.path("inputs"), self.path("outputs", "a"), self.path("missing_folder")])
+        for rel in [("inputs", "dem.tif"), ("inputs", "nope.tif"), ("inputs",), ("outputs", "a", "out.shp"), ("missing_folder", "x.tif"), ("project.rs.xml",), ("outputs", "b", "c.shp")]:
+            self.assertEqual(snapshot.exists(self.path(*rel)), os.path.isfile(self.path(*rel)), rel)
+
+    def test_one_listing_per_folder(self):
+        for idx in range(20):
+            touch(self.path("inputs", f"layer_{idx}.tif"))
+        snapshot = DirectorySnapshot()
+        with patch("src.classes.dir_snapshot.os.scandir", wraps=os.scandir) as scandir, patch("src.classes.dir_snapshot.os.path.isfile") as isfile:
+            snapshot.prefetch([self.path("inputs")] * 3)
+            for idx in range(40):
+                self.assertEqual(snapshot.exists(self.path("inputs", f"layer_{idx}.tif")), idx < 20)
+            self.assertEqual(scandir.call_count, 1)
+            isfile.assert_not_called()
+
+    def test_unreadable_folder_falls_back_to_isfile(self):
+        touch(self.path("inputs", "dem.tif"))
+        snapshot = DirectorySnapshot()
+        with patch("src.classes.dir_snapshot.os.scandir", side_effect=PermissionError):
+            snapshot.prefetch([self.path("inputs"), self.path("outputs")])
+            self.assertTrue(snapshot.exists(self.path("inputs", "dem.tif")))
+            self.assertFalse(snapshot.exists(self.path("inputs", "nope.tif")))
+
+    def test_snapshot_is_a_point_in_time(self):
+        snapshot = DirectorySnapshot()
+        self.assertFalse(snapshot.exists(self.path("inputs", "dem.tif")))
+        touch(self.path("inputs", "dem.tif"))
+        self.assertFalse(snapshot.exists(self.path("inputs", "dem.tif")))
+        self.assertTrue(DirectorySnapshot().exists(self.path("inputs", "dem.tif")))
+
+
+class TestMissingFileWatcher(TempFolderTestCase):
+    def test_file_appears(self):
+        os.makedirs(self.path("inputs"))
+        dem, hillshade = FakeItem(self.path("inputs", "dem.tif")), FakeItem(self.path("inputs", "hillshade.tif"))
+        watcher = MissingFileWatcher(self.tmp_dir)
+        watcher.watch([dem, hillshade])
+        self.assertEqual(watcher.watcher.paths, {self.path("inputs")})
+
+        touch(self.path("inputs", "dem.tif"))
+        watcher.watcher.directoryChanged.emit(self.path("inputs"))
+        self.assertTrue(dem.data(USER_ROLE).data.exists)
+        self.assertIsNone(dem.data(FOREGROUND_ROLE))
+        self.assertEqual(dem.tooltip, self.path("inputs", "dem.tif"))
+        # Still waiting for the hillshade
+        self.assertFalse(hillshade.data(USER_ROLE).data.exists)
+        self.assertEqual(watcher.watcher.paths, {self.path("inputs")})
+
+        touch(self.path("inputs", "hillshade.tif"))
+        watcher.watcher.directoryChanged.emit(self.path("inputs"))
+        self.assertTrue(hillshade.data(USER_ROLE).data.exists)
+        self.assertEqual(watcher.watcher.paths, set())
+        self.assertEqual(watcher.missing, {})
+
+    def test_folder_created_later(self):
+        item = FakeItem(self.path("outputs", "a", "out.shp"))
+        watcher = MissingFileWatcher(self.tmp_dir)
+        watcher.watch([item])
+        # Nothing under the project folder exists yet so the project folder itself is watched
+        self.assertEqual(watcher.watcher.paths, {self.tmp_dir})
+
+        os.makedirs(self.path("outputs", "a"))
+        watcher.watcher.directoryChanged.emit(self.tmp_dir)
+        self.assertEqual(watcher.watcher.paths, {self.path("outputs", "a")})
+
+        touch(self.path("outputs", "a", "out.shp"))
+        watcher.watcher.directoryChanged.emit(self.path("outputs", "a"))
+        self.assertTrue(item.data(USER_ROLE).data.exists)
+
+    def test_outside_the_project_is_not_watched(self):
+        other = tempfile.mkdtemp()
+        try:
+            watcher = MissingFileWatcher(self.tmp_dir)
+            watcher.watch([FakeItem(os.path.join(other, "dem.tif"))])
+            self.assertEqual(watcher.watcher.paths, set())
+        finally:
+            shutil.rmtree(other, ignore_errors=True)
+
+    def test_stop(self):
+        watcher = MissingFileWatcher(self.tmp_dir)
+        watcher.watch([FakeItem(self.path("dem.tif"))])
+        watcher.stop()
+        self.assertEqual(watcher.watcher.paths, set())
+        watcher.watcher.directoryChanged.emit(self.tmp_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
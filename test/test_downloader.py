@@ -0,0 +1,343 @@
+"""Unit tests for the resumable downloads in src/classes/data_exchange/downloader.py
+
+A local HTTP server stands in for S3. It supports ``Range`` requests and can be told
+to drop the connection part way through a response so we can check that downloads
+resume instead of starting over (or leaving a truncated file behind).
+"""
+
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import types
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def mock_module(name, attrs=None):
+    m = types.ModuleType(name)
+    if attrs:
+        for k, v in attrs.items():
+            setattr(m, k, v)
+    sys.modules[name] = m
+    return m
+
+
+class FakeQgsTask:
+    def __init__(self, description, flags=None):
+        self._canceled = False
+        self.taskCompleted = MagicMock()
+        self.taskTerminated = MagicMock()
+
+    def isCanceled(self):
+        return self._canceled
+
+    def cancel(self):
+        self._canceled = True
+
+
+mock_module("qgis")
+mock_module("qgis.core", {"Qgis": MagicMock(), "QgsApplication": MagicMock(), "QgsMessageLog": MagicMock(), "QgsTask": FakeQgsTask})
+mock_module("qgis.PyQt")
+mock_module("qgis.PyQt.QtCore", {"QObject": object, "QTimer": MagicMock(), "pyqtSignal": MagicMock()})
+mock_module("src.compat", {"QGSTASK_CAN_CANCEL": 1, "QGSTASK_COMPLETE": 3, "QGSTASK_SILENT": 2})
+
+from src.classes.data_exchange import downloader, rate_limiter  # noqa: E402
+from src.classes.data_exchange.downloader import DownloadFileTask, DownloadQueue, DownloadUrlExpiredError, DownloadUrlResolver  # noqa: E402
+from src.classes.data_exchange.rate_limiter import TransferLimits  # noqa: E402
+
+CHUNK = 1024
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """Serves ``server.payload`` and cuts off the first ``server.drops`` responses after ``server.drop_after`` bytes"""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        payload = server.payload
+        start, end = 0, len(payload) - 1
+        range_header = self.headers.get("Range")
+        if self.path.startswith("/expired"):
+            self.send_response(403)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        with server.lock:
+            server.requests.append(range_header)
+            drop = server.drops > 0
+            if drop:
+                server.drops -= 1
+
+        if range_header and server.ranges:
+            start, end = (int(x) for x in re.match(r"bytes=(\d+)-(\d+)", range_header).groups())
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(payload)}")
+        else:
+            self.send_response(200)
+        body = payload[start : end + 1]
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+
+        if drop:
+            self.wfile.write(body[: server.drop_after])
+            self.wfile.flush()
+            # Slam the connection shut mid-stream
+            self.connection.shutdown(2)
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+class TestDownloadFileTask(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        downloader.RETRY_BACKOFF = 0
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+        cls.server.lock = threading.Lock()
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/file.bin"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.abs_path = os.path.join(self.tmp_dir, "sub", "file.bin")
+        self.server.payload = os.urandom(10 * CHUNK + 17)
+        self.server.requests = []
+        self.server.drops = 0
+        self.server.drop_after = 3 * CHUNK
+        self.server.ranges = True
+        self.etag = f'"{hashlib.md5(self.server.payload).hexdigest()}"'
+        # Line reads up with where the server drops the connection so resume offsets are predictable
+        self._chunk_size, downloader.DOWNLOAD_CHUNK_SIZE = downloader.DOWNLOAD_CHUNK_SIZE, CHUNK // 2
+        self._threshold = downloader.SEGMENT_THRESHOLD
+
+    def tearDown(self):
+        downloader.SEGMENT_THRESHOLD = self._threshold
+        downloader.DOWNLOAD_CHUNK_SIZE = self._chunk_size
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _task(self, etag=None, **kwargs):
+        return DownloadFileTask("file.bin", self.abs_path, self.url, len(self.server.payload), etag=etag or self.etag, **kwargs)
+
+    def _assert_downloaded(self):
+        with open(self.abs_path, "rb") as f:
+            self.assertEqual(f.read(), self.server.payload)
+        self.assertFalse(os.path.exists(self.abs_path + downloader.PART_SUFFIX))
+        self.assertFalse(os.path.exists(self.abs_path + downloader.JOURNAL_SUFFIX))
+
+    def test_simple_download(self):
+        task = self._task()
+        self.assertTrue(task.run(), task.exception)
+        self._assert_downloaded()
+        self.assertEqual(self.server.requests, [None])
+
+    def test_dropped_connection_resumes(self):
+        self.server.drops = 2
+        task = self._task()
+        self.assertTrue(task.run(), task.exception)
+        self._assert_downloaded()
+        # The retries ask for what's left rather than starting over
+        self.assertEqual(self.server.requests[0], None)
+        self.assertEqual(self.server.requests[1], f"bytes={3 * CHUNK}-{len(self.server.payload) - 1}")
+
+    def test_resumes_existing_part_file(self):
+        os.makedirs(os.path.dirname(self.abs_path))
+        with open(self.abs_path + downloader.PART_SUFFIX, "wb") as f:
+            f.write(self.server.payload[:CHUNK])
+        task = self._task()
+        self.assertTrue(task.run(), task.exception)
+        self._assert_downloaded()
+        self.assertEqual(self.server.requests, [f"bytes={CHUNK}-{len(self.server.payload) - 1}"])
+
+    def test_segmented_download(self):
+        downloader.SEGMENT_THRESHOLD = CHUNK
+        self.server.drops = 3
+        self.server.drop_after = CHUNK // 2
+        task = self._task(max_segments=4)
+        self.assertTrue(task.run(), task.exception)
+        self._assert_downloaded()
+        self.assertTrue(all(header is not None for header in self.server.requests))
+        self.assertGreaterEqual(len(self.server.requests), 7)
+
+    def test_segmented_download_resumes_from_journal(self):
+        downloader.SEGMENT_THRESHOLD = CHUNK
+        self.server.drops = 100
+        self.server.drop_after = CHUNK // 2
+        downloader.MAX_RETRIES, max_retries = 0, downloader.MAX_RETRIES
+        try:
+            failed = self._task(max_segments=4)
+            self.assertFalse(failed.run())
+        finally:
+            downloader.MAX_RETRIES = max_retries
+        self.assertTrue(os.path.isfile(self.abs_path + downloader.JOURNAL_SUFFIX))
+        self.assertFalse(os.path.exists(self.abs_path))
+
+        with open(self.abs_path + downloader.JOURNAL_SUFFIX, encoding="utf-8") as f:
+            remaining = sum(end - pos for _start, end, pos in json.load(f)["segments"])
+        self.assertLess(remaining, len(self.server.payload))
+
+        self.server.drops = 0
+        self.server.requests = []
+        task = self._task(max_segments=4)
+        self.assertTrue(task.run(), task.exception)
+        self._assert_downloaded()
+        # Only what was missing is fetched again
+        requested = 0
+        for header in self.server.requests:
+            start, end = (int(x) for x in re.match(r"bytes=(\d+)-(\d+)", header).groups())
+            requested += end - start + 1
+        self.assertEqual(requested, remaining)
+
+    def test_server_without_ranges_starts_over(self):
+        self.server.ranges = False
+        os.makedirs(os.path.dirname(self.abs_path))
+        with open(self.abs_path + downloader.PART_SUFFIX, "wb") as f:
+            f.write(b"x" * CHUNK)
+        task = self._task()
+        self.assertTrue(task.run(), task.exception)
+        self._assert_downloaded()
+
+    def test_segmented_download_without_ranges_starts_over(self):
+        downloader.SEGMENT_THRESHOLD = CHUNK
+        self.server.ranges = False
+        task = self._task(max_segments=4)
+        self.assertTrue(task.run(), task.exception)
+        self._assert_downloaded()
+        # The whole file in one go after the segments were turned down
+        self.assertIsNone(self.server.requests[-1])
+
+    def test_bad_etag_is_not_renamed(self):
+        task = self._task(etag='"00000000000000000000000000000000"')
+        self.assertFalse(task.run())
+        self.assertIsInstance(task.exception, downloader.DownloadVerificationError)
+        self.assertFalse(os.path.exists(self.abs_path))
+        self.assertFalse(os.path.exists(self.abs_path + downloader.PART_SUFFIX))
+
+    def test_other_part_size_checks_size_only(self):
+        # Uploaded by another client in 3 parts, where we'd have used 1
+        log = MagicMock()
+        task = self._task(etag='"0123456789abcdef0123456789abcdef-3"', log_callback=log)
+        self.assertTrue(task.run(), task.exception)
+        self._assert_downloaded()
+        self.assertIn("Only its size was checked", log.call_args[0][0])
+
+    def test_rate_limited_download(self):
+        limits = TransferLimits()
+        with patch.object(rate_limiter, "MIN_BURST_BYTES", 0):
+            limits.configure(0, 20 * CHUNK)
+            try:
+                started = time.monotonic()
+                self.assertTrue(self._task().run())
+                elapsed = time.monotonic() - started
+            finally:
+                limits.configure(0, 0)
+        self._assert_downloaded()
+        # ~10KB at 20KB/s with an empty bucket to start with
+        self.assertGreater(elapsed, 0.4)
+        self.assertGreater(limits.download.throughput, 0)
+
+    def test_expired_url(self):
+        task = DownloadFileTask("file.bin", self.abs_path, self.url.replace("file.bin", "expired"), len(self.server.payload), etag=self.etag)
+        self.assertFalse(task.run())
+        self.assertIsInstance(task.exception, DownloadUrlExpiredError)
+
+    def test_queue_refreshes_expired_url(self):
+        queue = DownloadQueue()
+        refresh_requests = []
+        queue.url_refresher = lambda rel_path, callback: refresh_requests.append((rel_path, callback))
+        queue.enqueue("file.bin", self.abs_path, self.url.replace("file.bin", "expired"), len(self.server.payload), etag=self.etag)
+        task = queue.pending_tasks.pop(0)
+        self.assertFalse(task.run())
+
+        self.assertTrue(queue._refresh_url(task))
+        self.assertEqual(refresh_requests[0][0], "file.bin")
+        # Completion waits for the new URL
+        self.assertIn("file.bin", queue.expected)
+
+        refresh_requests[0][1](self.url)
+        self.assertNotIn("file.bin", queue.expected)
+        new_task = queue.active_tasks["file.bin"]
+        self.assertEqual(new_task.download_url, self.url)
+        self.assertTrue(new_task.run(), new_task.exception)
+        self._assert_downloaded()
+
+
+class FakeDataExchangeAPI:
+    """Records get_download_urls calls so the test can answer them in any order"""
+
+    def __init__(self):
+        self.calls = []
+
+    def get_download_urls(self, project_id, remote_paths, callback):
+        self.calls.append((list(remote_paths), callback))
+
+    def answer(self, idx, fail=False):
+        paths, callback = self.calls[idx]
+        callback(None, None if fail else {path: {"downloadUrl": f"https://example.com/{path}"} for path in paths})
+
+
+class TestDownloadUrlResolver(unittest.TestCase):
+    def setUp(self):
+        self.api = FakeDataExchangeAPI()
+        self.resolver = DownloadUrlResolver(self.api, "project-id", batch_size=3, max_in_flight=2)
+        self.results = {}
+
+    def test_batches_and_in_flight_limit(self):
+        self.resolver.resolve([f"file_{idx}" for idx in range(8)], self.results.update)
+        self.assertEqual([paths for paths, _cb in self.api.calls], [["file_0", "file_1", "file_2"], ["file_3", "file_4", "file_5"]])
+
+        # The first batch is handed over straight away and frees up a slot for the next one
+        self.api.answer(1)
+        self.assertEqual(sorted(self.results), ["file_3", "file_4", "file_5"])
+        self.assertEqual(self.api.calls[2][0], ["file_6", "file_7"])
+        self.api.answer(0)
+        self.api.answer(2)
+        self.assertEqual(len(self.results), 8)
+
+    def test_failed_batch_is_retried_one_file_at_a_time(self):
+        self.resolver.resolve(["a", "b", "c"], self.results.update)
+        self.api.answer(0, fail=True)
+        self.assertEqual([paths for paths, _cb in self.api.calls[1:]], [["a"], ["b"]])
+        self.api.answer(1)
+        self.api.answer(2, fail=True)
+        self.api.answer(3)
+        self.assertEqual(self.results["a"]["downloadUrl"], "https://example.com/a")
+        self.assertIsNone(self.results["b"])
+        self.assertIsNotNone(self.results["c"])
+
+    def test_refresh_jumps_the_queue(self):
+        self.resolver.resolve([f"file_{idx}" for idx in range(9)], self.results.update)
+        new_urls = []
+        self.resolver.refresh("file_0", new_urls.append)
+        self.api.answer(0)
+        self.assertEqual(self.api.calls[2][0], ["file_0"])
+        self.api.answer(2)
+        self.assertEqual(new_urls, ["https://example.com/file_0"])
+
+    def test_cancel(self):
+        self.resolver.resolve([f"file_{idx}" for idx in range(9)], self.results.update)
+        self.resolver.cancel()
+        self.api.answer(0)
+        self.assertEqual(self.results, {})
+        self.assertEqual(len(self.api.calls), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+"""Unit tests for src/classes/data_exchange/etag.py
+
+The parallel calculator has to produce exactly what ``rsxml.etag.calculate_etag``
+produces so every test compares against it directly. Small chunk sizes are used
+so multipart files don't need to be hundreds of MB.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import types
+import unittest
+from unittest.mock import MagicMock
+
+from rsxml.etag import calculate_etag
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def mock_module(name, attrs=None):
+    m = types.ModuleType(name)
+    if attrs:
+        for k, v in attrs.items():
+            setattr(m, k, v)
+    sys.modules[name] = m
+    return m
+
+
+if "qgis" not in sys.modules:
+    mock_module("qgis")
+    mock_module("qgis.core", {"Qgis": MagicMock(), "QgsMessageLog": MagicMock()})
+
+from src.classes.data_exchange.etag import EtagCancelledError, ParallelEtagCalculator  # noqa: E402
+
+CHUNK = 1024
+THRESH = 4 * CHUNK
+
+
+class TestParallelEtagCalculator(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        # Sizes either side of the threshold and of a part boundary
+        self.sizes = [0, 1, CHUNK - 1, CHUNK, THRESH - 1, THRESH, THRESH + 1, 5 * CHUNK, 7 * CHUNK + 3]
+        self.paths = {}
+        for size in self.sizes:
+            path = os.path.join(self.tmp_dir, f"file_{size}.bin")
+            with open(path, "wb") as f:
+                f.write(os.urandom(size))
+            self.paths[f"file_{size}.bin"] = path
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _calculator(self, **kwargs):
+        # A tiny read buffer makes sure parts are streamed in several reads
+        return ParallelEtagCalculator(max_workers=4, read_buffer_size=100, chunk_size_bytes=CHUNK, chunk_thresh_bytes=THRESH, **kwargs)
+
+    def test_matches_rsxml(self):
+        for force_single_part in (False, True):
+            jobs = {key: (path, force_single_part) for key, path in self.paths.items()}
+            etags = self._calculator().calculate(jobs)
+            for key, path in self.paths.items():
+                expected = calculate_etag(path, chunk_size_bytes=CHUNK, chunk_thresh_bytes=THRESH, force_single_part=force_single_part)
+                self.assertEqual(etags[key], expected, f"{key} force_single_part={force_single_part}")
+
+    def test_multipart_suffix(self):
+        etags = self._calculator().calculate({"big": (self.paths[f"file_{7 * CHUNK + 3}.bin"], False)})
+        self.assertTrue(etags["big"].endswith('-8"'))
+
+    def test_progress_totals(self):
+        calls = []
+        self._calculator().calculate({key: (path, False) for key, path in self.paths.items()}, lambda done, total: calls.append((done, total)))
+        self.assertEqual(calls[0], (0, sum(self.sizes)))
+        self.assertEqual(calls[-1], (sum(self.sizes), sum(self.sizes)))
+
+    def test_cancel(self):
+        calculator = self._calculator()
+        calculator.cancel()
+        with self.assertRaises(EtagCancelledError):
+            calculator.calculate({key: (path, False) for key, path in self.paths.items()})
+
+    def test_cancel_from_progress(self):
+        calculator = self._calculator()
+
+        def progress(done, total):
+            if done > 0:
+                calculator.cancel()
+
+        with self.assertRaises(EtagCancelledError):
+            calculator.calculate({key: (path, False) for key, path in self.paths.items()}, progress)
+
+    def test_missing_file_raises(self):
+        with self.assertRaises(FileNotFoundError):
+            self._calculator().calculate({"missing": (os.path.join(self.tmp_dir, "nope.bin"), False)})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+"""Unit tests for src/classes/hash_cache.py and the cached paths that use it
+
+Each test gets its own SQLite file in a temp folder. File mtimes are pushed into
+the past because files modified in the last couple of seconds are never cached.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import types
+import unittest
+from unittest.mock import MagicMock, patch
+
+from rsxml.etag import calculate_etag
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def mock_module(name, attrs=None):
+    m = types.ModuleType(name)
+    if attrs:
+        for k, v in attrs.items():
+            setattr(m, k, v)
+    sys.modules[name] = m
+    return m
+
+
+if "qgis" not in sys.modules:
+    mock_module("qgis")
+    mock_module("qgis.core", {"Qgis": MagicMock(), "QgsMessageLog": MagicMock(), "QgsProject": MagicMock(), "QgsSettings": MagicMock()})
+
+from src.classes import util  # noqa: E402
+from src.classes.data_exchange.etag import ParallelEtagCalculator  # noqa: E402
+from src.classes.hash_cache import HashCache  # noqa: E402
+
+CHUNK = 1024
+THRESH = 4 * CHUNK
+
+
+class TestHashCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        HashCache().use_database(os.path.join(self.tmp_dir, "cache", "hash_cache.sqlite"))
+        self.small = self._write("small.bin", 100)
+        self.big = self._write("big.bin", 5 * CHUNK + 7)
+
+    def tearDown(self):
+        HashCache().close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _write(self, name, size, age_secs=60):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, "wb") as f:
+            f.write(os.urandom(size))
+        self._age(path, age_secs)
+        return path
+
+    @staticmethod
+    def _age(path, age_secs=60):
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns - age_secs * 10**9))
+
+    def _calculator(self, verify=False):
+        return ParallelEtagCalculator(max_workers=2, chunk_size_bytes=CHUNK, chunk_thresh_bytes=THRESH, hash_cache=HashCache(), verify=verify)
+
+    def _jobs(self, force_single_part=False):
+        return {"small": (self.small, force_single_part), "big": (self.big, force_single_part)}
+
+    def test_md5_is_cached(self):
+        expected = util.md5(self.small)
+        self.assertEqual(util.cached_md5(self.small), expected)
+        with patch.object(util, "md5") as md5_mock:
+            self.assertEqual(util.cached_md5(self.small), expected)
+            md5_mock.assert_not_called()
+
+    def test_changed_file_is_rehashed(self):
+        util.cached_md5(self.small)
+        with open(self.small, "wb") as f:
+            f.write(b"different contents")
+        self._age(self.small, 30)
+        self.assertEqual(util.cached_md5(self.small), util.md5(self.small))
+
+    def test_recently_modified_file_is_not_cached(self):
+        fresh = self._write("fresh.bin", 10, age_secs=0)
+        util.cached_md5(fresh)
+        self.assertIsNone(HashCache().get_md5(fresh))
+
+    def test_etags_skip_unchanged_files(self):
+        first = self._calculator()
+        etags = first.calculate(self._jobs())
+        self.assertEqual(first.cached, [])
+        self.assertEqual(etags["big"], calculate_etag(self.big, chunk_size_bytes=CHUNK, chunk_thresh_bytes=THRESH))
+
+        second = self._calculator()
+        self.assertEqual(second.calculate(self._jobs()), etags)
+        self.assertEqual(sorted(second.cached), ["big", "small"])
+        self.assertEqual(second.bytes_total, 0)
+
+    def test_md5_answers_single_part_etag(self):
+        util.cached_md5(self.big)
+        calculator = self._calculator()
+        etags = calculator.calculate({"big": (self.big, True)})
+        self.assertEqual(calculator.cached, ["big"])
+        self.assertEqual(etags["big"], calculate_etag(self.big, chunk_size_bytes=CHUNK, chunk_thresh_bytes=THRESH, force_single_part=True))
+
+    def test_verify_finds_bad_entries(self):
+        self._calculator().calculate(self._jobs())
+        record = HashCache().identify(self.small)
+        record.md5 = "0" * 32
+        HashCache().store([record])
+
+        calculator = self._calculator(verify=True)
+        etags = calculator.calculate(self._jobs())
+        self.assertEqual(calculator.mismatched, ["small"])
+        self.assertEqual(etags["small"], calculate_etag(self.small))
+        self.assertEqual(HashCache().get_md5(self.small), util.md5(self.small))
+
+    def test_invalidate(self):
+        util.cached_md5(self.small)
+        util.cached_md5(self.big)
+        HashCache().invalidate([self.small])
+        self.assertIsNone(HashCache().get_md5(self.small))
+        self.assertIsNotNone(HashCache().get_md5(self.big))
+        HashCache().invalidate()
+        self.assertIsNone(HashCache().get_md5(self.big))
+
+    def test_unusable_database_falls_back_to_hashing(self):
+        blocker = os.path.join(self.tmp_dir, "not_a_dir")
+        with open(blocker, "w") as f:
+            f.write("")
+        HashCache().use_database(os.path.join(blocker, "hash_cache.sqlite"))
+        self.assertEqual(util.cached_md5(self.small), util.md5(self.small))
+        self.assertTrue(HashCache().disabled)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+"""Unit tests for src/classes/http_session.py
+
+A local keep-alive HTTP server records which client connection every request came in on.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import sys
+import threading
+import types
+import unittest
+from unittest.mock import MagicMock
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def mock_module(name, attrs=None):
+    m = types.ModuleType(name)
+    if attrs:
+        for k, v in attrs.items():
+            setattr(m, k, v)
+    sys.modules[name] = m
+    return m
+
+
+mock_module("qgis")
+mock_module("qgis.core", {"Qgis": MagicMock(), "QgsMessageLog": MagicMock()})
+
+from src.classes.http_session import DEFAULT_POOL_SIZE, HttpSession  # noqa: E402
+
+
+class RecordingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if length:
+            self.rfile.read(length)
+        with self.server.lock:
+            self.server.connections.append(self.client_address)
+            self.server.encodings.append(self.headers.get("Accept-Encoding"))
+        body = json.dumps({"data": {"ok": True}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _reply
+    do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHttpSession(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), RecordingHandler)
+        cls.server.daemon_threads = True
+        cls.server.lock = threading.Lock()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/graphql"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.connections = []
+        self.server.encodings = []
+        HttpSession().configure(DEFAULT_POOL_SIZE)
+        HttpSession().close()
+
+    def test_connection_is_reused(self):
+        for _idx in range(10):
+            self.assertEqual(HttpSession().post(self.url, json={"query": "{ ok }"}, timeout=5).json(), {"data": {"ok": True}})
+            self.assertEqual(HttpSession().get(self.url, timeout=5).status_code, 200)
+        self.assertEqual(len(self.server.connections), 20)
+        self.assertEqual(len(set(self.server.connections)), 1)
+
+    def test_threads_share_the_pool(self):
+        def fetch():
+            for _idx in range(5):
+                HttpSession().get(self.url, timeout=5)
+
+        for _round in range(3):
+            threads = [threading.Thread(target=fetch) for _idx in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(self.server.connections), 60)
+        # Every round starts new threads but their requests go out on the connections the last round opened
+        self.assertLessEqual(len(set(self.server.connections)), 4)
+
+    def test_each_thread_has_its_own_session(self):
+        sessions = []
+        thread = threading.Thread(target=lambda: sessions.append(HttpSession().session()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(sessions[0], HttpSession().session())
+        self.assertIs(sessions[0].get_adapter(self.url), HttpSession().session().get_adapter(self.url))
+
+    def test_compressed_responses_accepted(self):
+        HttpSession().get(self.url, timeout=5)
+        self.assertIn("gzip", self.server.encodings[0])
+
+    def test_configure(self):
+        HttpSession().get(self.url, timeout=5)
+        adapter = HttpSession().adapter
+        HttpSession().configure(DEFAULT_POOL_SIZE)
+        self.assertIs(HttpSession().adapter, adapter)
+
+        HttpSession().configure(2)
+        self.assertIsNot(HttpSession().adapter, adapter)
+        self.assertEqual(HttpSession().pool_size, 2)
+        # Sessions pick up the new pool the next time they're used
+        HttpSession().get(self.url, timeout=5)
+        self.assertIs(HttpSession().session().get_adapter(self.url), HttpSession().adapter)
+        self.assertEqual(len(set(self.server.connections)), 2)
+
+        # Nothing set falls back to the default
+        HttpSession().configure(None)
+        self.assertEqual(HttpSession().pool_size, DEFAULT_POOL_SIZE)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,187 @@
+"""Unit tests for src/classes/layer_registry.py
+
+QgsProject is replaced with a small fake that has the three signals the registry
+listens to, so layers can be added and removed the way QGIS would.
+"""
+
+import os
+import sys
+import types
+import unittest
+from unittest.mock import MagicMock
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def mock_module(name, attrs=None):
+    m = types.ModuleType(name)
+    if attrs:
+        for k, v in attrs.items():
+            setattr(m, k, v)
+    sys.modules[name] = m
+    return m
+
+
+if "qgis" not in sys.modules:
+    mock_module("qgis")
+    mock_module("qgis.core", {"Qgis": MagicMock(), "QgsMapLayer": MagicMock(), "QgsMessageLog": MagicMock(), "QgsProject": MagicMock(), "QgsSettings": MagicMock()})
+
+from src.classes.layer_registry import LayerRegistry, layer_identity, project_identity  # noqa: E402
+
+
+class FakeSignal:
+    def __init__(self):
+        self.slots = []
+
+    def connect(self, slot):
+        self.slots.append(slot)
+
+    def disconnect(self, slot):
+        if slot not in self.slots:
+            raise TypeError("not connected")
+        self.slots.remove(slot)
+
+    def emit(self, *args):
+        for slot in list(self.slots):
+            slot(*args)
+
+
+class FakeLayer:
+    count = 0
+
+    def __init__(self, name):
+        FakeLayer.count += 1
+        self._id = f"{name}_{FakeLayer.count}"
+        self._name = name
+        self.props = {}
+
+    def id(self):
+        return self._id
+
+    def name(self):
+        return self._name
+
+    def setCustomProperty(self, key, value):
+        self.props[key] = value
+
+    def customProperty(self, key):
+        return self.props.get(key)
+
+
+class FakeProject:
+    def __init__(self):
+        self.layers = {}
+        self.layersAdded = FakeSignal()
+        self.layersWillBeRemoved = FakeSignal()
+        self.cleared = FakeSignal()
+
+    def mapLayers(self):
+        return dict(self.layers)
+
+    def mapLayer(self, layer_id):
+        return self.layers.get(layer_id)
+
+    def addMapLayers(self, layers):
+        for layer in layers:
+            self.layers[layer.id()] = layer
+        self.layersAdded.emit(layers)
+
+    def removeMapLayers(self, layer_ids):
+        self.layersWillBeRemoved.emit(layer_ids)
+        for layer_id in layer_ids:
+            del self.layers[layer_id]
+
+    def clear(self):
+        self.layers = {}
+        self.cleared.emit()
+
+
+class TestKeys(unittest.TestCase):
+    def test_project_identity(self):
+        local = types.SimpleNamespace(project_xml_path=os.path.join("data", "project.rs.xml"))
+        self.assertEqual(project_identity(local), os.path.normcase(os.path.abspath(local.project_xml_path)))
+        self.assertEqual(project_identity(types.SimpleNamespace(id="abc-123")), "remote:abc-123")
+        self.assertIsNone(project_identity(None))
+        self.assertIsNone(project_identity(types.SimpleNamespace()))
+
+    def test_layer_identity(self):
+        self.assertEqual(layer_identity({"rsXPath": "Project/Inputs/DEM", "id": "dem"}), "Project/Inputs/DEM")
+        self.assertEqual(layer_identity({"id": "dem"}), "dem")
+        # GeoPackage layers share their GeoPackage's rsXPath
+        self.assertEqual(layer_identity({"rsXPath": "Project/Outputs/Geopackage#GPKG"}, "channels"), "Project/Outputs/Geopackage#GPKG|channels")
+        self.assertEqual(layer_identity({"rsXPath": "Project/Inputs/DEM"}, tiles=True), "tiles:Project/Inputs/DEM")
+        self.assertIsNone(layer_identity(None))
+        self.assertIsNone(layer_identity({"symbology": "dem"}))
+
+
+class TestLayerRegistry(unittest.TestCase):
+    def setUp(self):
+        self.qproject = FakeProject()
+        self.registry = LayerRegistry()
+
+    def tearDown(self):
+        self.registry.disconnect()
+
+    def _tagged(self, name, key):
+        layer = FakeLayer(name)
+        LayerRegistry.tag(layer, key)
+        return layer
+
+    def test_follows_added_and_removed_layers(self):
+        self.registry.connect(self.qproject)
+        dem_a = self._tagged("DEM", ("a.rs.xml", "Project/Inputs/DEM"))
+        dem_b = self._tagged("DEM", ("b.rs.xml", "Project/Inputs/DEM"))
+        self.qproject.addMapLayers([dem_a, dem_b])
+
+        self.assertIs(self.registry.find(("a.rs.xml", "Project/Inputs/DEM")), dem_a)
+        self.assertIs(self.registry.find(("b.rs.xml", "Project/Inputs/DEM")), dem_b)
+        self.assertIsNone(self.registry.find(("c.rs.xml", "Project/Inputs/DEM")))
+        self.assertIsNone(self.registry.find(None))
+
+        self.qproject.removeMapLayers([dem_a.id()])
+        self.assertIsNone(self.registry.find(("a.rs.xml", "Project/Inputs/DEM")))
+        self.assertIs(self.registry.find(("b.rs.xml", "Project/Inputs/DEM")), dem_b)
+        self.assertEqual(len(self.registry.layers), 1)
+        self.assertEqual(len(self.registry.keys), 1)
+
+    def test_picks_up_layers_already_in_the_project(self):
+        # e.g. a saved QGIS project that was opened before the plugin loaded
+        dem = self._tagged("DEM", ("a.rs.xml", "Project/Inputs/DEM"))
+        old = FakeLayer("Hillshade")
+        self.qproject.addMapLayers([dem, old])
+        self.registry.connect(self.qproject)
+        self.assertIs(self.registry.find(("a.rs.xml", "Project/Inputs/DEM")), dem)
+        self.assertEqual(self.registry.find_untagged("Hillshade"), [old])
+
+    def test_untagged_layers_by_name(self):
+        self.registry.connect(self.qproject)
+        first, second = FakeLayer("Hillshade"), FakeLayer("Hillshade")
+        self.qproject.addMapLayers([first, second, self._tagged("Hillshade", ("a.rs.xml", "Project/Inputs/Hillshade"))])
+        self.assertEqual(sorted(layer.id() for layer in self.registry.find_untagged("Hillshade")), sorted([first.id(), second.id()]))
+        self.qproject.removeMapLayers([first.id(), second.id()])
+        self.assertEqual(self.registry.find_untagged("Hillshade"), [])
+        self.assertEqual(self.registry.untagged, {})
+
+    def test_cleared_and_disconnected(self):
+        self.registry.connect(self.qproject)
+        self.qproject.addMapLayers([self._tagged("DEM", ("a.rs.xml", "Project/Inputs/DEM"))])
+        self.qproject.clear()
+        self.assertEqual(self.registry.layers, {})
+
+        self.registry.disconnect()
+        self.assertEqual(self.qproject.layersAdded.slots, [])
+        self.qproject.addMapLayers([self._tagged("DEM", ("a.rs.xml", "Project/Inputs/DEM"))])
+        self.assertIsNone(self.registry.find(("a.rs.xml", "Project/Inputs/DEM")))
+
+    def test_layer_removed_without_signal(self):
+        self.registry.connect(self.qproject)
+        dem = self._tagged("DEM", ("a.rs.xml", "Project/Inputs/DEM"))
+        self.qproject.addMapLayers([dem])
+        del self.qproject.layers[dem.id()]
+        self.assertIsNone(self.registry.find(("a.rs.xml", "Project/Inputs/DEM")))
+        self.assertEqual(self.registry.keys, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
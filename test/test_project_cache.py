@@ -0,0 +1,166 @@
+"""Unit tests for src/classes/project_cache.py
+
+Project itself needs QGIS to build its tree so it is replaced here with a tiny
+stand-in that counts how many times it has been loaded and exposes a file
+signature the tests can change at will.
+"""
+
+import os
+import sys
+import types
+import unittest
+from unittest.mock import MagicMock
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def mock_module(name, attrs=None):
+    m = types.ModuleType(name)
+    if attrs:
+        for k, v in attrs.items():
+            setattr(m, k, v)
+    sys.modules[name] = m
+    return m
+
+
+# Stand-in for the on-disk state of every project, keyed by path
+DISK = {}
+SETTINGS = {}
+
+
+class FakeProject:
+    loads = 0
+
+    def __init__(self, project_xml_path):
+        self.project_xml_path = os.path.abspath(project_xml_path)
+        self.qproject = None
+        self.loadable = False
+        self.file_signature = None
+        self.lazy = True
+        self.local_bl_folder = SETTINGS.get("localBLFolder")
+        self.watching = True
+
+    def stop_watching(self):
+        self.watching = False
+
+    def get_file_signature(self):
+        return DISK.get(self.project_xml_path)
+
+    def load(self):
+        FakeProject.loads += 1
+        if self.project_xml_path in DISK:
+            self.qproject = object()
+            self.loadable = True
+            self.file_signature = self.get_file_signature()
+
+
+mock_module("qgis")
+mock_module("qgis.core", {"Qgis": MagicMock(), "QgsMessageLog": MagicMock()})
+mock_module("src.classes.project", {"Project": FakeProject})
+mock_module("src.classes.settings", {"Settings": MagicMock(return_value=MagicMock(getValue=lambda key: SETTINGS.get(key)))})
+
+from src.classes.project_cache import ProjectCache  # noqa: E402
+
+
+class TestProjectCache(unittest.TestCase):
+    def setUp(self):
+        DISK.clear()
+        SETTINGS.clear()
+        SETTINGS["lazyProjectTree"] = True
+        FakeProject.loads = 0
+        ProjectCache().invalidate()
+        self.path_a = os.path.abspath("/projects/a/project.rs.xml")
+        self.path_b = os.path.abspath("/projects/b/project.rs.xml")
+        DISK[self.path_a] = (1, 100, "/bl/VBET.xml", 1, 10)
+        DISK[self.path_b] = (1, 200, "/bl/VBET.xml", 1, 10)
+
+    def test_unchanged_project_is_reused(self):
+        first = ProjectCache().get(self.path_a)
+        second = ProjectCache().get(self.path_a)
+        self.assertIs(first, second)
+        self.assertEqual(FakeProject.loads, 1)
+
+    def test_shared_between_instances(self):
+        ProjectCache().get(self.path_a)
+        self.assertIn(os.path.normcase(self.path_a), ProjectCache().projects)
+
+    def test_modified_project_xml_is_reloaded(self):
+        first = ProjectCache().get(self.path_a)
+        DISK[self.path_a] = (2, 100, "/bl/VBET.xml", 1, 10)
+        second = ProjectCache().get(self.path_a)
+        self.assertIsNot(first, second)
+        self.assertEqual(FakeProject.loads, 2)
+
+    def test_swapped_business_logic_is_reloaded(self):
+        first = ProjectCache().get(self.path_a)
+        DISK[self.path_a] = (1, 100, "/projects/a/VBET.xml", 5, 10)
+        self.assertIsNot(first, ProjectCache().get(self.path_a))
+
+    def test_new_local_business_logic_folder_is_reloaded(self):
+        first = ProjectCache().get(self.path_a)
+        SETTINGS["localBLFolder"] = "/my/bl"
+        self.assertIsNot(first, ProjectCache().get(self.path_a))
+
+    def test_lookup_does_not_load(self):
+        self.assertIsNone(ProjectCache().lookup(self.path_a))
+        self.assertEqual(FakeProject.loads, 0)
+        first = ProjectCache().get(self.path_a)
+        self.assertIs(ProjectCache().lookup(self.path_a), first)
+        DISK[self.path_a] = (2, 100, "/bl/VBET.xml", 1, 10)
+        self.assertIsNone(ProjectCache().lookup(self.path_a))
+        self.assertEqual(FakeProject.loads, 1)
+
+    def test_failed_load_is_not_cached(self):
+        missing = os.path.abspath("/projects/missing/project.rs.xml")
+        project = ProjectCache().get(missing)
+        self.assertFalse(project.loadable)
+        ProjectCache().get(missing)
+        self.assertEqual(FakeProject.loads, 2)
+
+    def test_invalidate_one(self):
+        ProjectCache().get(self.path_a)
+        ProjectCache().get(self.path_b)
+        ProjectCache().invalidate(self.path_a)
+        ProjectCache().get(self.path_a)
+        ProjectCache().get(self.path_b)
+        self.assertEqual(FakeProject.loads, 3)
+
+    def test_prune_drops_closed_projects(self):
+        ProjectCache().get(self.path_a)
+        ProjectCache().get(self.path_b)
+        ProjectCache().prune([self.path_b])
+        self.assertEqual(list(ProjectCache().projects.keys()), [os.path.normcase(self.path_b)])
+
+    def test_evicted_projects_stop_watching(self):
+        first = ProjectCache().get(self.path_a)
+        DISK[self.path_a] = (2, 100, "/bl/VBET.xml", 1, 10)
+        second = ProjectCache().get(self.path_a)
+        self.assertFalse(first.watching)
+        self.assertTrue(second.watching)
+
+        other = ProjectCache().get(self.path_b)
+        ProjectCache().prune([self.path_a])
+        self.assertFalse(other.watching)
+        self.assertTrue(second.watching)
+
+        ProjectCache().invalidate(self.path_a)
+        self.assertFalse(second.watching)
+
+        third = ProjectCache().get(self.path_a)
+        ProjectCache().invalidate()
+        self.assertFalse(third.watching)
+
+    def test_replaced_project_stops_watching(self):
+        first = ProjectCache().get(self.path_a)
+        second = FakeProject(self.path_a)
+        second.load()
+        ProjectCache().put(second)
+        self.assertFalse(first.watching)
+        # Putting the same project again leaves it alone
+        ProjectCache().put(second)
+        self.assertTrue(second.watching)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,283 @@
+"""Unit tests for the lazy (build-on-expand) project tree in src/classes/project.py
+
+QStandardItem is replaced with a tiny in-memory tree so the real Project code
+can build a tree from a real project XML and business logic file without QGIS.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import types
+from typing import ClassVar
+import unittest
+from unittest.mock import MagicMock
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def mock_module(name, attrs=None):
+    m = types.ModuleType(name)
+    if attrs:
+        for k, v in attrs.items():
+            setattr(m, k, v)
+    sys.modules[name] = m
+    return m
+
+
+class FakeStandardItem:
+    def __init__(self, *args):
+        self._text = args[-1] if args and isinstance(args[-1], str) else ""
+        self._data = {}
+        self._children = []
+        self._parent = None
+
+    def text(self):
+        return self._text
+
+    def setText(self, text):
+        self._text = text
+
+    def setIcon(self, icon):
+        pass
+
+    def setToolTip(self, tip):
+        pass
+
+    def font(self):
+        return MagicMock()
+
+    def setFont(self, font):
+        pass
+
+    def setData(self, value, role):
+        self._data[role] = value
+
+    def data(self, role):
+        return self._data.get(role)
+
+    def appendRow(self, item):
+        item._parent = self
+        self._children.append(item)
+
+    def removeRow(self, row):
+        del self._children[row]
+
+    def rowCount(self):
+        return len(self._children)
+
+    def child(self, row):
+        return self._children[row] if row < len(self._children) else None
+
+    def hasChildren(self):
+        return len(self._children) > 0
+
+
+class ProjectTreeData:
+    def __init__(self, type, project=None, data=None):
+        self.type = type
+        self.project = project
+        self.data = data
+
+
+class QRaveTreeTypes:
+    PROJECT_ROOT = "PROJECT_ROOT"
+    PROJECT_FOLDER = "PROJECT_FOLDER"
+    PROJECT_REPEATER_FOLDER = "PROJECT_REPEATER_FOLDER"
+    PROJECT_VIEW_FOLDER = "PROJECT_VIEW_FOLDER"
+    PROJECT_VIEW = "PROJECT_VIEW"
+    LEAF = "LEAF"
+    PROJECT_PLACEHOLDER = "PROJECT_PLACEHOLDER"
+
+
+class FakeMapLayer:
+    def __init__(self, label, layer_type, layer_uri, bl_attr=None, meta=None, layer_name=None, description=None, file_exists=None):
+        self.label = label
+        self.layer_uri = layer_uri
+        self.bl_attr = bl_attr
+        self.exists = (file_exists or os.path.isfile)(layer_uri)
+
+
+class FakeSettings:
+    values: ClassVar[dict] = {"lazyProjectTree": True, "localBLFolder": None}
+
+    def getValue(self, key):
+        return FakeSettings.values.get(key)
+
+    def log(self, msg, level=None):
+        pass
+
+    def msg_bar(self, title, msg, level=None, duration=5):
+        pass
+
+
+USER_ROLE = 1000
+
+mock_module("qgis")
+mock_module("qgis.core", {"Qgis": MagicMock(), "QgsMessageLog": MagicMock()})
+mock_module("qgis.PyQt")
+mock_module("qgis.PyQt.QtCore", {"QFileSystemWatcher": MagicMock()})
+mock_module("qgis.PyQt.QtGui", {"QBrush": MagicMock(), "QStandardItem": FakeStandardItem})
+mock_module("src.compat", {"USER_ROLE": USER_ROLE, "COLOR_GRAY": MagicMock(), "FOREGROUND_ROLE": 1001})
+mock_module("src.icon_utils", {"qrave_icon": MagicMock()})
+mock_module(
+    "src.classes.qrave_map_layer",
+    {"ProjectTreeData": ProjectTreeData, "QRaveMapLayer": FakeMapLayer, "QRaveTreeTypes": QRaveTreeTypes},
+)
+mock_module("src.classes.settings", {"CONSTANTS": {"logCategory": "Test", "businessLogicDir": "blXML"}, "Settings": FakeSettings})
+
+from src.classes.business_logic import BusinessLogicRegistry  # noqa: E402
+from src.classes.project import Project  # noqa: E402
+
+BUSINESS_LOGIC = """<?xml version="1.0" encoding="utf-8"?>
+<Project>
+  <Node label="Lazy">
+    <Children>
+      <Node label="Inputs">
+        <Children>
+          <Node label="DEM" id="dem" xpath="Inputs/Raster[@id='DEM']" type="raster" />
+        </Children>
+      </Node>
+      <Repeater label="Realizations" xpath="Realizations/Realization">
+        <Node xpathlabel="Name">
+          <Children>
+            <Node label="Output" id="output" xpath="Outputs/Vector" type="line" />
+          </Children>
+        </Node>
+      </Repeater>
+    </Children>
+  </Node>
+  <Views default="Default">
+    <View name="Default" id="Default"><Layers><Layer id="dem" /></Layers></View>
+  </Views>
+</Project>
+"""
+
+PROJECT = """<?xml version="1.0" encoding="utf-8"?>
+<Project xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+  xsi:noNamespaceSchemaLocation="https://xml.riverscapes.net/Projects/XSD/V2/RiverscapesProject.xsd">
+  <Name>Lazy Test</Name>
+  <ProjectType>LazyTest</ProjectType>
+  <Inputs><Raster id="DEM"><Path>dem.tif</Path></Raster></Inputs>
+  <Realizations>
+    <Realization id="R1"><Name>One</Name><Outputs><Vector id="OUT"><Path>one.shp</Path></Vector></Outputs></Realization>
+    <Realization id="R2"><Name>Two</Name><Outputs><Vector id="OUT"><Path>two.shp</Path></Vector></Outputs></Realization>
+  </Realizations>
+</Project>
+"""
+
+
+def tree_text(item):
+    """Nested (text, [children]) tuples for comparing trees"""
+    return (item.text(), [tree_text(item.child(row)) for row in range(item.rowCount())])
+
+
+class ProjectTestCase(unittest.TestCase):
+    """Writes the test project and its business logic to a temp folder"""
+
+    def setUp(self):
+        BusinessLogicRegistry().invalidate()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.project_path = os.path.join(self.tmp_dir, "project.rs.xml")
+        with open(self.project_path, "w", encoding="utf-8") as f:
+            f.write(PROJECT)
+        with open(os.path.join(self.tmp_dir, "LazyTest.xml"), "w", encoding="utf-8") as f:
+            f.write(BUSINESS_LOGIC)
+
+    def tearDown(self):
+        FakeSettings.values["lazyProjectTree"] = True
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+
+class TestLazyProjectTree(ProjectTestCase):
+    def _load(self, lazy):
+        FakeSettings.values["lazyProjectTree"] = lazy
+        project = Project(self.project_path)
+        project.load()
+        self.assertTrue(project.loadable, project.load_error)
+        return project
+
+    def test_only_top_level_is_built(self):
+        project = self._load(lazy=True)
+        inputs, repeater = project.qproject.child(0), project.qproject.child(1)
+        self.assertEqual(inputs.text(), "Inputs")
+        self.assertEqual(inputs.child(0).data(USER_ROLE).type, QRaveTreeTypes.PROJECT_PLACEHOLDER)
+        self.assertEqual(repeater.child(0).data(USER_ROLE).type, QRaveTreeTypes.PROJECT_PLACEHOLDER)
+
+    def test_populate_builds_children_once(self):
+        project = self._load(lazy=True)
+        repeater = project.qproject.child(1)
+        self.assertTrue(project.populate(repeater))
+        self.assertEqual([repeater.child(row).text() for row in range(repeater.rowCount())], ["One", "Two"])
+        self.assertFalse(project.populate(repeater))
+        self.assertEqual(repeater.rowCount(), 2)
+
+    def test_fully_populated_matches_eager(self):
+        eager = self._load(lazy=False)
+        lazy = self._load(lazy=True)
+        lazy.populate_subtree(lazy.qproject)
+        self.assertEqual(tree_text(lazy.qproject), tree_text(eager.qproject))
+
+    def test_view_ids_only_build_matching_folders(self):
+        project = self._load(lazy=True)
+        project.populate_subtree(project.qproject, ["dem"])
+        inputs, repeater = project.qproject.child(0), project.qproject.child(1)
+        self.assertEqual(inputs.child(0).text(), "DEM")
+        self.assertEqual(repeater.child(0).data(USER_ROLE).type, QRaveTreeTypes.PROJECT_PLACEHOLDER)
+
+
+class TestBackgroundLoad(ProjectTestCase):
+    """load_data builds the tree without any QStandardItems so it can run on a worker thread"""
+
+    def test_split_load_matches_load(self):
+        for lazy in (True, False):
+            FakeSettings.values["lazyProjectTree"] = lazy
+            loaded = Project(self.project_path)
+            loaded.load()
+
+            project = Project(self.project_path)
+            project.load_data()
+            self.assertTrue(project.loadable)
+            self.assertIsNone(project.qproject)
+            self.assertFalse(any(isinstance(value, FakeStandardItem) for value in vars(project).values()))
+            project.build_items()
+            self.assertIsNone(project.tree)
+            self.assertEqual(tree_text(project.qproject), tree_text(loaded.qproject))
+
+    def test_cancelled(self):
+        project = Project(self.project_path)
+        project.load_data(should_stop=lambda: True)
+        self.assertFalse(project.loadable)
+        self.assertIsNone(project.tree)
+        self.assertEqual(project.load_error, "Loading was cancelled")
+
+
+class TestMissingFiles(ProjectTestCase):
+    def _leaves(self, project):
+        project.populate_subtree(project.qproject)
+        inputs, repeater = project.qproject.child(0), project.qproject.child(1)
+        return {"DEM": inputs.child(0), "One": repeater.child(0).child(0), "Two": repeater.child(1).child(0)}
+
+    def test_existing_files_found(self):
+        open(os.path.join(self.tmp_dir, "dem.tif"), "w").close()
+        project = Project(self.project_path)
+        project.load()
+        leaves = self._leaves(project)
+        self.assertTrue(leaves["DEM"].data(USER_ROLE).data.exists)
+        self.assertFalse(leaves["One"].data(USER_ROLE).data.exists)
+        self.assertIsNone(project.snapshot)
+
+    def test_missing_files_are_watched(self):
+        for lazy in (True, False):
+            FakeSettings.values["lazyProjectTree"] = lazy
+            project = Project(self.project_path)
+            project.load()
+            leaves = self._leaves(project)
+            watched = project.file_watcher.missing[self.tmp_dir]
+            self.assertEqual(sorted(os.path.basename(path) for path in watched), ["dem.tif", "one.shp", "two.shp"])
+            self.assertIs(watched[os.path.join(self.tmp_dir, "one.shp")][0], leaves["One"])
+
+
+if __name__ == "__main__":
+    unittest.main()
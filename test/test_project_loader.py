@@ -0,0 +1,164 @@
+"""Unit tests for src/classes/project_loader.py
+
+The QGIS task manager is replaced with one that just holds on to the tasks so each test
+decides when a task runs and finishes (what QGIS does on a worker and the main thread).
+"""
+
+import os
+import sys
+import types
+import unittest
+from unittest.mock import MagicMock
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def mock_module(name, attrs=None):
+    m = types.ModuleType(name)
+    if attrs:
+        for k, v in attrs.items():
+            setattr(m, k, v)
+    sys.modules[name] = m
+    return m
+
+
+class FakeTask:
+    def __init__(self, description, flags):
+        self.description = description
+        self.canceled = False
+
+    def cancel(self):
+        self.canceled = True
+
+    def isCanceled(self):
+        return self.canceled
+
+
+class FakeTaskManager:
+    def __init__(self):
+        self.tasks = []
+
+    def addTask(self, task):
+        self.tasks.append(task)
+
+
+class FakeProject:
+    def __init__(self, project_xml_path):
+        self.project_xml_path = os.path.abspath(project_xml_path)
+        self.loadable = False
+        self.qproject = None
+        self.file_signature = None
+        self.lazy = False
+        self.local_bl_folder = None
+        self.built = False
+
+    def load_data(self, should_stop=None):
+        if should_stop is not None and should_stop():
+            return
+        self.loadable = True
+        self.file_signature = (1, 2, None, None, None)
+
+    def build_items(self):
+        self.built = True
+        self.qproject = MagicMock()
+
+    def get_file_signature(self):
+        return self.file_signature
+
+    def stop_watching(self):
+        pass
+
+
+class FakeSettings:
+    def getValue(self, key):
+        return None
+
+    def log(self, msg, level=None):
+        pass
+
+
+task_manager = FakeTaskManager()
+
+mock_module("qgis")
+mock_module("qgis.core", {"Qgis": MagicMock(), "QgsMessageLog": MagicMock(), "QgsApplication": types.SimpleNamespace(taskManager=lambda: task_manager), "QgsTask": FakeTask})
+mock_module("src.compat", {"QGSTASK_CAN_CANCEL": 1})
+mock_module("src.classes.project", {"Project": FakeProject})
+mock_module("src.classes.settings", {"Settings": FakeSettings})
+
+from src.classes.project_cache import ProjectCache  # noqa: E402
+from src.classes.project_loader import ProjectLoader  # noqa: E402
+
+
+def run(task):
+    """What QGIS does with a task: run() on a worker thread, then finished() on the main thread"""
+    task.finished(task.run())
+
+
+class TestProjectLoader(unittest.TestCase):
+    def setUp(self):
+        task_manager.tasks = []
+        ProjectCache().invalidate()
+        self.loader = ProjectLoader()
+
+    def test_loads_in_a_task(self):
+        loaded = []
+        self.loader.load("a/project.rs.xml", loaded.append)
+        self.assertTrue(self.loader.is_loading("a/project.rs.xml"))
+        self.assertEqual(loaded, [])
+
+        run(task_manager.tasks[0])
+        self.assertFalse(self.loader.is_loading("a/project.rs.xml"))
+        self.assertEqual(len(loaded), 1)
+        self.assertTrue(loaded[0].built)
+        # The next reload_tree finds it in the cache
+        self.assertIs(ProjectCache().lookup("a/project.rs.xml"), loaded[0])
+
+    def test_one_load_per_project(self):
+        first, second = [], []
+        self.loader.load("a/project.rs.xml", first.append)
+        self.loader.load(os.path.abspath("a/project.rs.xml"), second.append)
+        self.loader.load("a/project.rs.xml", first.append)
+        self.assertEqual(len(task_manager.tasks), 1)
+        run(task_manager.tasks[0])
+        self.assertEqual(len(first), 1)
+        self.assertIs(first[0], second[0])
+
+    def test_several_at_once(self):
+        loaded = []
+        for name in ["a", "b", "c"]:
+            self.loader.load(f"{name}/project.rs.xml", loaded.append)
+        self.assertEqual(len(task_manager.tasks), 3)
+        for task in reversed(task_manager.tasks):
+            run(task)
+        self.assertEqual([os.path.basename(os.path.dirname(p.project_xml_path)) for p in loaded], ["c", "b", "a"])
+
+    def test_cancel(self):
+        loaded = []
+        self.loader.load("a/project.rs.xml", loaded.append)
+        self.loader.load("b/project.rs.xml", loaded.append)
+        task_a, task_b = task_manager.tasks
+        self.loader.cancel("a/project.rs.xml")
+        self.assertTrue(task_a.isCanceled())
+        self.assertFalse(task_b.isCanceled())
+        run(task_a)
+        run(task_b)
+        self.assertEqual([p.project_xml_path for p in loaded], [os.path.abspath("b/project.rs.xml")])
+        self.assertIsNone(ProjectCache().lookup("a/project.rs.xml"))
+
+    def test_prune(self):
+        loaded = []
+        self.loader.load("a/project.rs.xml", loaded.append)
+        self.loader.load("b/project.rs.xml", loaded.append)
+        self.loader.prune(["b/project.rs.xml"])
+        self.assertFalse(self.loader.is_loading("a/project.rs.xml"))
+        self.assertTrue(self.loader.is_loading("b/project.rs.xml"))
+        self.loader.cancel()
+        for task in task_manager.tasks:
+            self.assertTrue(task.isCanceled())
+            run(task)
+        self.assertEqual(loaded, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
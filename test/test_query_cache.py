@@ -0,0 +1,316 @@
+"""Unit tests for src/classes/data_exchange/query_cache.py and the cached queries in DataExchangeAPI
+
+Each test gets its own SQLite file in a temp folder. The GraphQL API is replaced with a fake
+that answers straight away and counts the queries it was asked.
+"""
+
+import base64
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import types
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def mock_module(name, attrs=None):
+    m = types.ModuleType(name)
+    if attrs:
+        for k, v in attrs.items():
+            setattr(m, k, v)
+    sys.modules[name] = m
+    return m
+
+
+class FakeTimer:
+    @staticmethod
+    def singleShot(_msec, callback):
+        callback()
+
+
+mock_module("qgis")
+mock_module("qgis.core", {"Qgis": MagicMock(), "QgsApplication": MagicMock(), "QgsMessageLog": MagicMock(), "QgsProject": MagicMock(), "QgsSettings": MagicMock(), "QgsTask": object})
+mock_module("qgis.PyQt")
+mock_module("qgis.PyQt.QtCore", {"QObject": object, "QTimer": FakeTimer, "QUrl": MagicMock(), "QUrlQuery": MagicMock(), "pyqtSignal": MagicMock()})
+mock_module("qgis.PyQt.QtGui", {"QDesktopServices": MagicMock()})
+mock_module("src.compat", {"QGSTASK_CAN_CANCEL": 1, "QGSTASK_SILENT": 2})
+
+from src.classes.data_exchange import DataExchangeAPI as DataExchangeModule  # noqa: E402
+from src.classes.data_exchange.query_cache import DAY, HOUR, QueryCache  # noqa: E402
+
+SCOPE = "https://api.example.com|user1"
+TILES = {"data": {"getLayerTiles": {"state": "SUCCESS", "url": "https://tiles.example.com/vbet/p1/dem/{z}/{x}/{y}.png"}}}
+
+
+def jwt(sub):
+    payload = base64.urlsafe_b64encode(json.dumps({"sub": sub}).encode()).decode().rstrip("=")
+    return f"header.{payload}.signature"
+
+
+class FakeTask:
+    def __init__(self, query, variables, response):
+        self.query = query
+        self.variables = variables
+        self.response = response
+        self.error = None
+        self.success = True
+
+
+class FakeGraphQLAPI:
+    """Answers every query with its variables and how many queries it has answered so far.
+
+    Aliased getLayerTiles batches get an answer for each alias (or fail if ``fail_batches``), and
+    every tile service is in ``state``.
+    With ``defer`` set nothing is answered until ``answer_all()``.
+    """
+
+    def __init__(self):
+        self.uri = "https://api.example.com"
+        self.access_token = jwt("user1")
+        self.queries = []
+        self.texts = []
+        self.defer = False
+        self.fail_batches = False
+        # What getLayerTiles says the tile service is doing
+        self.state = "SUCCESS"
+        self.waiting = []
+
+    def run_query(self, query, variables, callback):
+        self.queries.append(variables)
+        self.texts.append(query)
+        if query.startswith("query getLayerTilesBatch"):
+            aliases = [key for key in variables if key.startswith("x")]
+            if self.fail_batches:
+                task = FakeTask(query, variables, None)
+                task.error = Exception("GraphQL Error")
+                task.success = False
+            else:
+                task = FakeTask(query, variables, {"data": {alias: {"rsXPath": variables[alias], "state": self.state, "n": len(self.queries)} for alias in aliases}})
+        else:
+            root = query.split()[1].split("(")[0]
+            answer = {**variables, "state": self.state} if root == "getLayerTiles" else dict(variables)
+            task = FakeTask(query, variables, {"data": {root: {**answer, "n": len(self.queries)}}})
+        if self.defer:
+            self.waiting.append((task, callback))
+        else:
+            callback(task)
+        return task
+
+    def answer_all(self):
+        waiting, self.waiting = self.waiting, []
+        for task, callback in waiting:
+            callback(task)
+
+
+class TempCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        QueryCache().use_database(os.path.join(self.tmp_dir, "cache", "query_cache.sqlite"))
+        QueryCache().max_bytes = 1024 * 1024
+
+    def tearDown(self):
+        QueryCache().close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+
+class TestQueryCache(TempCacheTestCase):
+    def test_fresh_then_stale_then_gone(self):
+        cache = QueryCache()
+        cache.store(SCOPE, "getLayerTiles", {"projectId": "p1", "rsXPath": "a"}, TILES, "p1", now=0)
+        self.assertTrue(cache.lookup(SCOPE, "getLayerTiles", {"projectId": "p1", "rsXPath": "a"}, now=DAY).fresh)
+        stale = cache.lookup(SCOPE, "getLayerTiles", {"projectId": "p1", "rsXPath": "a"}, now=DAY + 1)
+        self.assertFalse(stale.fresh)
+        self.assertEqual(stale.response, TILES)
+        self.assertIsNone(cache.lookup(SCOPE, "getLayerTiles", {"projectId": "p1", "rsXPath": "a"}, now=30 * DAY + 1))
+
+    def test_key(self):
+        cache = QueryCache()
+        cache.store(SCOPE, "getWebSymbology", {"projectTypeId": "vbet", "name": "x", "isRaster": False}, {"data": 1})
+        # Same variables in another order
+        self.assertIsNotNone(cache.lookup(SCOPE, "getWebSymbology", {"isRaster": False, "name": "x", "projectTypeId": "vbet"}))
+        self.assertIsNone(cache.lookup(SCOPE, "getWebSymbology", {"projectTypeId": "vbet", "name": "x", "isRaster": True}))
+        # Someone else
+        self.assertIsNone(cache.lookup("https://api.example.com|user2", "getWebSymbology", {"projectTypeId": "vbet", "name": "x", "isRaster": False}))
+
+    def test_mutations_are_never_cached(self):
+        QueryCache().store(SCOPE, "requestUploadProject", {"token": "x"}, {"data": 1})
+        self.assertIsNone(QueryCache().lookup(SCOPE, "requestUploadProject", {"token": "x"}))
+
+    def test_least_recently_used_dropped(self):
+        cache = QueryCache()
+        cache.max_bytes = 3000
+        response = {"data": {"getLayerTiles": {"state": "SUCCESS", "url": "x" * 900}}}
+        for idx in range(3):
+            cache.store(SCOPE, "getLayerTiles", {"rsXPath": idx}, response, now=idx)
+        # Using the oldest makes the second one the least recently used
+        self.assertIsNotNone(cache.lookup(SCOPE, "getLayerTiles", {"rsXPath": 0}, now=10))
+        cache.store(SCOPE, "getLayerTiles", {"rsXPath": 3}, response, now=11)
+        found = [idx for idx in range(4) if cache.lookup(SCOPE, "getLayerTiles", {"rsXPath": idx}, now=12) is not None]
+        self.assertEqual(found, [0, 2, 3])
+
+    def test_invalidate_project(self):
+        cache = QueryCache()
+        cache.store(SCOPE, "webRaveProject", {"id": "p1"}, {"data": 1}, "p1")
+        cache.store(SCOPE, "getLayerTiles", {"projectId": "p1"}, TILES, "p1")
+        cache.store(SCOPE, "webRaveProject", {"id": "p2"}, {"data": 1}, "p2")
+        cache.invalidate("p1")
+        self.assertIsNone(cache.lookup(SCOPE, "webRaveProject", {"id": "p1"}))
+        self.assertIsNone(cache.lookup(SCOPE, "getLayerTiles", {"projectId": "p1"}))
+        self.assertIsNotNone(cache.lookup(SCOPE, "webRaveProject", {"id": "p2"}))
+        cache.invalidate()
+        self.assertIsNone(cache.lookup(SCOPE, "webRaveProject", {"id": "p2"}))
+
+    def test_unfinished_tile_services_not_cached(self):
+        cache = QueryCache()
+        variables = {"projectId": "p1", "rsXPath": "a"}
+        cache.store(SCOPE, "getLayerTiles", variables, TILES, "p1", now=0)
+        for state in ["TILING_ERROR", "CREATING", None]:
+            cache.store(SCOPE, "getLayerTiles", variables, {"data": {"getLayerTiles": {"state": state}}}, "p1", now=1)
+            # And the answer from before it started tiling again is gone too
+            self.assertIsNone(cache.lookup(SCOPE, "getLayerTiles", variables, now=2))
+
+    def test_unusable_database_turns_the_cache_off(self):
+        blocker = os.path.join(self.tmp_dir, "not_a_dir")
+        with open(blocker, "w") as f:
+            f.write("")
+        QueryCache().use_database(os.path.join(blocker, "query_cache.sqlite"))
+        QueryCache().store(SCOPE, "webRaveProject", {"id": "p1"}, {"data": 1})
+        self.assertIsNone(QueryCache().lookup(SCOPE, "webRaveProject", {"id": "p1"}))
+        self.assertTrue(QueryCache().disabled)
+
+
+class TestCachedQueries(TempCacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.api = FakeGraphQLAPI()
+        self.dex = DataExchangeModule.DataExchangeAPI.__new__(DataExchangeModule.DataExchangeAPI)
+        self.dex.api = self.api
+        self.dex._revalidating = set()
+        self.dex._in_flight = {}
+
+    def get_layer_tiles(self):
+        results = []
+        self.dex.get_layer_tiles("p1", "vbet", "Project/Realizations/DEM", lambda task, resp: results.append((task, resp)))
+        self.assertEqual(len(results), 1)
+        return results[0][1]
+
+    def test_second_query_comes_from_the_cache(self):
+        first = self.get_layer_tiles()
+        second = self.get_layer_tiles()
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.api.queries), 1)
+
+    def test_stale_answer_used_while_it_is_refreshed(self):
+        self.get_layer_tiles()
+        with patch("src.classes.data_exchange.query_cache.time.time", return_value=time.time() + DAY + HOUR):
+            # The old answer straight away, and a new one fetched for next time
+            self.assertEqual(self.get_layer_tiles()["n"], 1)
+            self.assertEqual(len(self.api.queries), 2)
+            self.assertEqual(self.get_layer_tiles()["n"], 2)
+            self.assertEqual(len(self.api.queries), 2)
+
+    def test_unfinished_tile_service_asked_for_again(self):
+        self.api.state = "TILING_ERROR"
+        self.assertEqual(self.get_layer_tiles()["state"], "TILING_ERROR")
+        self.api.state = "SUCCESS"
+        self.assertEqual(self.get_layer_tiles()["state"], "SUCCESS")
+        self.get_layer_tiles()
+        self.assertEqual(len(self.api.queries), 2)
+
+    def test_users_do_not_share_answers(self):
+        self.get_layer_tiles()
+        self.api.access_token = jwt("user2")
+        self.get_layer_tiles()
+        self.assertEqual(len(self.api.queries), 2)
+        # A token that isn't a JWT still gets its own scope
+        self.api.access_token = "opaque"
+        self.assertNotEqual(self.dex._cache_scope(), "https://api.example.com|user2")
+
+    def test_use_cache_false(self):
+        results = []
+        self.api.run_query = lambda query, variables, callback: callback(FakeTask(query, variables, {"data": {"project": {"id": "p1", "name": "x", "projectFiles": {"total": 0, "items": []}}}}))
+        with patch.object(DataExchangeModule, "DEProject", lambda **kwargs: kwargs):
+            self.dex.get_project("p1", lambda task, project: results.append(project))
+            self.assertEqual(self.api.queries, [])
+            self.api.run_query = MagicMock()
+            self.dex.get_project("p1", lambda task, project: results.append(project))
+            self.api.run_query.assert_not_called()
+            self.dex.get_project("p1", lambda task, project: results.append(project), use_cache=False)
+            self.api.run_query.assert_called_once()
+        self.assertEqual(results[0], results[1])
+
+
+class TestCoalescing(TestCachedQueries):
+    def test_identical_queries_share_one_request(self):
+        self.api.defer = True
+        results = []
+        for _idx in range(3):
+            self.dex.get_web_symbology("vbet", "dem", True, lambda task, resp: results.append((task, resp)))
+        self.dex.get_web_symbology("vbet", "hillshade", True, lambda task, resp: results.append((task, resp)))
+        self.assertEqual(len(self.api.queries), 2)
+        self.api.answer_all()
+        self.assertEqual(len(results), 4)
+        # The first caller gets the task, the others their own copy of its answer
+        first_task = results[0][0]
+        self.assertIn(first_task, [task for task, _resp in results[:3]])
+        same = [resp for task, resp in results if task.variables["name"] == "dem"]
+        self.assertEqual(len(same), 3)
+        self.assertEqual(same[0], same[1])
+        self.assertIsNot(same[0], same[1])
+        # Once it's answered the next one is a new query (or comes from the cache)
+        self.dex.get_web_symbology("vbet", "dem", True, lambda task, resp: results.append((task, resp)))
+        self.assertEqual(len(self.api.queries), 2)
+
+    def test_batches_ask_for_the_same_fields(self):
+        """Batched queries and the .graphql files they repeat must return the same shape: they share cache entries"""
+        self.dex.get_layer_tiles_batch("p1", "vbet", ["a", "b"], lambda task, tiles: None)
+        self.dex.get_download_urls("p1", ["a.tif", "b.tif"], lambda task, urls: None)
+        for query_name, alias, text in [("getLayerTiles", "x1", self.api.texts[0]), ("downloadFile", "f1", self.api.texts[1])]:
+            single = "".join(self.dex._load_query(query_name).split())
+            selection = "".join(self.dex._selection_set(query_name).split())
+            # Everything between the root field's braces in the .graphql file...
+            self.assertTrue(single.endswith(f"{{{selection}}}}}"))
+            # ...is what every alias asks for
+            aliased = "".join(text.split())
+            self.assertIn(f"{alias}:{query_name}(", aliased)
+            self.assertEqual(aliased.count(f"{{{selection}}}"), 2)
+        self.assertIn("originFile{contentTypeetaglocalPathsize}", "".join(self.dex._selection_set("getLayerTiles").split()))
+
+    def test_layer_tiles_batch(self):
+        self.get_layer_tiles()
+        results = {}
+        self.dex.get_layer_tiles_batch("p1", "vbet", ["Project/Realizations/DEM", "a", "b", "a"], lambda task, tiles: results.update(tiles))
+        self.assertEqual(sorted(results), ["Project/Realizations/DEM", "a", "b"])
+        # The DEM came from the cache. a and b went in one request
+        self.assertEqual(len(self.api.queries), 2)
+        self.assertEqual(self.api.queries[1]["x0"], "a")
+        self.assertEqual(self.api.queries[1]["x1"], "b")
+        self.assertEqual(results["b"]["rsXPath"], "b")
+        # Each layer is cached on its own
+        single = []
+        self.dex.get_layer_tiles("p1", "vbet", "b", lambda task, resp: single.append(resp))
+        self.assertEqual(single, [results["b"]])
+        self.assertEqual(len(self.api.queries), 2)
+
+    def test_layer_tiles_batch_only_caches_finished_services(self):
+        self.api.state = "CREATING"
+        self.dex.get_layer_tiles_batch("p1", "vbet", ["a", "b"], lambda task, tiles: None)
+        self.dex.get_layer_tiles_batch("p1", "vbet", ["a", "b"], lambda task, tiles: None)
+        self.assertEqual(len(self.api.queries), 2)
+
+    def test_layer_tiles_batch_split_up_on_failure(self):
+        self.api.fail_batches = True
+        results = {}
+        self.dex.get_layer_tiles_batch("p1", "vbet", ["a", "b", "c"], lambda task, tiles: results.update(tiles))
+        self.assertEqual(len(self.api.queries), 4)
+        self.assertEqual({rs_xpath: tiles["rsXPath"] for rs_xpath, tiles in results.items()}, {"a": "a", "b": "b", "c": "c"})
+
+
+if __name__ == "__main__":
+    unittest.main()
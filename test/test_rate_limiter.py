@@ -0,0 +1,177 @@
+"""Unit tests for src/classes/data_exchange/rate_limiter.py
+
+The token bucket takes a clock and a sleep function. The fake versions here move
+time forward only when the bucket sleeps, so rates can be checked exactly.
+"""
+
+import datetime
+import os
+import sys
+import threading
+import types
+import unittest
+from unittest.mock import MagicMock
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def mock_module(name, attrs=None):
+    m = types.ModuleType(name)
+    if attrs:
+        for k, v in attrs.items():
+            setattr(m, k, v)
+    sys.modules[name] = m
+    return m
+
+
+if "qgis" not in sys.modules:
+    mock_module("qgis")
+    mock_module("qgis.core", {"Qgis": MagicMock(), "QgsMessageLog": MagicMock()})
+
+from src.classes.data_exchange.rate_limiter import TokenBucket, TransferLimits, in_window, parse_hours  # noqa: E402
+
+KB = 1024
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = 0.0
+        self.on_sleep = None
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, secs):
+        self.now += secs
+        self.slept += secs
+        if self.on_sleep:
+            self.on_sleep()
+
+
+class TestTokenBucket(unittest.TestCase):
+    def setUp(self):
+        self.time = FakeTime()
+
+    def _bucket(self, rate):
+        return TokenBucket(rate, clock=self.time.clock, sleep=self.time.sleep)
+
+    def test_unlimited_never_waits(self):
+        bucket = self._bucket(0)
+        for _ in range(100):
+            self.assertTrue(bucket.acquire(1024 * KB))
+        self.assertEqual(self.time.slept, 0)
+        self.assertEqual(bucket.total_bytes, 100 * 1024 * KB)
+
+    def test_sustained_rate(self):
+        bucket = self._bucket(100 * KB)
+        # 1MB in 10KB reads at 100KB/s. The bucket starts empty so it should take ~10s
+        for _ in range(100):
+            bucket.acquire(10 * KB)
+        self.assertAlmostEqual(self.time.now, 10.0, delta=0.01)
+
+    def test_large_reads_go_into_debt(self):
+        bucket = self._bucket(100 * KB)
+        bucket.acquire(500 * KB)
+        self.assertAlmostEqual(self.time.now, 5.0, delta=0.01)
+
+    def test_burst_after_idle(self):
+        bucket = self._bucket(1000 * KB)
+        self.time.now += 60
+        # Idle time only buys BURST_SECS worth of tokens
+        bucket.acquire(500 * KB)
+        self.assertEqual(self.time.slept, 0)
+        bucket.acquire(500 * KB)
+        self.assertAlmostEqual(self.time.slept, 0.5, delta=0.01)
+
+    def test_rate_change_while_waiting(self):
+        bucket = self._bucket(10 * KB)
+        self.time.on_sleep = lambda: bucket.set_rate(0)
+        self.assertTrue(bucket.acquire(1000 * KB))
+        self.assertLess(self.time.slept, 1)
+
+    def test_should_stop(self):
+        bucket = self._bucket(10 * KB)
+        self.assertFalse(bucket.acquire(1000 * KB, should_stop=lambda: self.time.now > 1))
+        self.assertLess(self.time.now, 2)
+
+    def test_throughput(self):
+        bucket = self._bucket(100 * KB)
+        for _ in range(100):
+            bucket.acquire(10 * KB)
+        self.assertAlmostEqual(bucket.throughput, 100 * KB, delta=5 * KB)
+        self.time.now += 60
+        self.assertEqual(bucket.throughput, 0)
+
+    def test_chunk_size(self):
+        self.assertEqual(self._bucket(0).chunk_size(1024 * KB), 1024 * KB)
+        self.assertEqual(self._bucket(100 * KB).chunk_size(1024 * KB), 25 * KB)
+        self.assertEqual(self._bucket(1 * KB).chunk_size(1024 * KB), 16 * KB)
+        self.assertEqual(self._bucket(100 * KB).chunk_size(512), 512)
+
+    def test_threads_share_the_limit(self):
+        # Real time, but short: 4 threads x 32KB at 256KB/s should take about half a second
+        bucket = TokenBucket(256 * KB)
+        started = datetime.datetime.now()
+        threads = [threading.Thread(target=lambda: [bucket.acquire(4 * KB) for _ in range(8)]) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = (datetime.datetime.now() - started).total_seconds()
+        self.assertGreater(elapsed, 0.4)
+        self.assertEqual(bucket.total_bytes, 128 * KB)
+
+
+class TestTransferLimits(unittest.TestCase):
+    def tearDown(self):
+        TransferLimits().configure(0, 0)
+
+    def test_parse_hours(self):
+        self.assertIsNone(parse_hours(""))
+        self.assertIsNone(parse_hours(None))
+        self.assertEqual(parse_hours("08:00-18:30"), (480, 1110))
+        self.assertEqual(parse_hours(" 22:00 - 06:00 "), (1320, 360))
+        for bad in ("8-18", "08:00", "25:00-06:00", "08:00-09:00-10:00", "aa:bb-cc:dd"):
+            with self.assertRaises(ValueError, msg=bad):
+                parse_hours(bad)
+
+    def test_in_window(self):
+        day = parse_hours("08:00-18:00")
+        night = parse_hours("22:00-06:00")
+        self.assertTrue(in_window(day, datetime.datetime(2026, 1, 1, 8, 0)))
+        self.assertFalse(in_window(day, datetime.datetime(2026, 1, 1, 18, 0)))
+        self.assertTrue(in_window(night, datetime.datetime(2026, 1, 1, 23, 30)))
+        self.assertTrue(in_window(night, datetime.datetime(2026, 1, 1, 5, 59)))
+        self.assertFalse(in_window(night, datetime.datetime(2026, 1, 1, 12, 0)))
+        self.assertTrue(in_window(None, datetime.datetime(2026, 1, 1, 12, 0)))
+
+    def test_shared_and_scheduled(self):
+        TransferLimits().configure(100 * KB, 200 * KB, "08:00-18:00")
+        limits = TransferLimits()
+        limits.apply(datetime.datetime(2026, 1, 1, 12, 0))
+        self.assertEqual(limits.upload.rate, 100 * KB)
+        self.assertEqual(limits.download.rate, 200 * KB)
+        limits.apply(datetime.datetime(2026, 1, 1, 20, 0))
+        self.assertFalse(limits.upload.limited)
+        self.assertFalse(limits.download.limited)
+
+    def test_bad_hours_limit_all_day(self):
+        with self.assertRaises(ValueError):
+            TransferLimits().configure(100 * KB, 0, "lunchtime")
+        self.assertIsNone(TransferLimits().window)
+        self.assertEqual(TransferLimits().upload.rate, 100 * KB)
+
+    def test_configure_from_settings(self):
+        values = {"uploadRateLimit": 50, "downloadRateLimit": None, "rateLimitHours": "nope"}
+        settings = MagicMock()
+        settings.getValue.side_effect = values.get
+        TransferLimits().configure_from_settings(settings)
+        self.assertEqual(TransferLimits().upload.rate, 50 * KB)
+        self.assertFalse(TransferLimits().download.limited)
+        settings.log.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+"""Unit tests for src/classes/symbology.py
+
+A temporary resources folder and project folder hold a few QML files. Once the index
+is built, styling layers must not touch the disk again, so ``open`` and ``os.scandir``
+are patched to fail after the first round.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import types
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def mock_module(name, attrs=None):
+    m = types.ModuleType(name)
+    if attrs:
+        for k, v in attrs.items():
+            setattr(m, k, v)
+    sys.modules[name] = m
+    return m
+
+
+class FakeDomDocument:
+    def setContent(self, contents):
+        self.contents = contents
+        return True
+
+
+if "qgis" not in sys.modules:
+    mock_module("qgis")
+    mock_module("qgis.core", {"Qgis": MagicMock(), "QgsMapLayer": MagicMock(), "QgsMessageLog": MagicMock(), "QgsProject": MagicMock(), "QgsSettings": MagicMock()})
+    mock_module("qgis.PyQt")
+mock_module("qgis.PyQt.QtXml", {"QDomDocument": FakeDomDocument})
+
+from src.classes import symbology  # noqa: E402
+from src.classes.symbology import SymbologyIndex  # noqa: E402
+
+
+class TestSymbologyIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.symbology_dir = os.path.join(self.tmp_dir, "symbology")
+        self.project_dir = os.path.join(self.tmp_dir, "project")
+        self.paths = {
+            "vbet_dem": self._write(os.path.join(self.symbology_dir, "VBET", "dem.qml")),
+            "shared_dem": self._write(os.path.join(self.symbology_dir, "Shared", "dem.qml")),
+            "shared_slope": self._write(os.path.join(self.symbology_dir, "Shared", "slope.qml")),
+            "project_slope": self._write(os.path.join(self.project_dir, "slope.qml")),
+        }
+        # Not a QML file so it should be ignored
+        self._write(os.path.join(self.symbology_dir, "Shared", "notes.txt"))
+        SymbologyIndex().use_folder(self.symbology_dir)
+
+    def tearDown(self):
+        SymbologyIndex().use_folder(symbology.SYMBOLOGY_DIR)
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    @staticmethod
+    def _write(path, contents=None):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(contents or f"<qgis><!-- {path} --></qgis>")
+        return os.path.abspath(path)
+
+    def _layer(self, success=True):
+        layer = MagicMock()
+        layer.importNamedStyle.return_value = (success, "" if success else "bad style")
+        return layer
+
+    def test_resolution_order(self):
+        index = SymbologyIndex()
+        self.assertEqual(index.resolve(self.project_dir, "VBET", "dem"), self.paths["vbet_dem"])
+        self.assertEqual(index.resolve(self.project_dir, "Other", "dem"), self.paths["shared_dem"])
+        self.assertEqual(index.resolve(self.project_dir, "VBET", "slope"), self.paths["project_slope"])
+        self.assertEqual(index.resolve(None, "VBET", "slope"), self.paths["shared_slope"])
+        self.assertIsNone(index.resolve(self.project_dir, "VBET", "missing"))
+        self.assertIsNone(index.resolve(self.project_dir, "VBET", "notes"))
+
+    def test_no_disk_hits_once_warm(self):
+        index = SymbologyIndex()
+        first = self._layer()
+        index.apply(first, index.resolve(self.project_dir, "VBET", "dem"))
+
+        with patch("builtins.open", side_effect=AssertionError("open")), patch.object(symbology.os, "scandir", side_effect=AssertionError("scandir")):
+            for _ in range(50):
+                layer = self._layer()
+                self.assertTrue(index.apply(layer, index.resolve(self.project_dir, "VBET", "dem")))
+                doc = layer.importNamedStyle.call_args[0][0]
+                self.assertIn(b"VBET", doc.contents)
+                layer.loadNamedStyle.assert_not_called()
+
+    def test_falls_back_to_load_named_style(self):
+        layer = self._layer(success=False)
+        self.assertFalse(SymbologyIndex().apply(layer, self.paths["shared_dem"]))
+        layer.loadNamedStyle.assert_called_once_with(self.paths["shared_dem"])
+
+    def test_invalidate_changed_files(self):
+        index = SymbologyIndex()
+        index.apply(self._layer(), self.paths["shared_slope"])
+        self.assertEqual(index.resolve(None, "VBET", "slope"), self.paths["shared_slope"])
+
+        # What a resources sync might do: replace one file and add another
+        self._write(self.paths["shared_slope"], "<qgis>new</qgis>")
+        added = self._write(os.path.join(self.symbology_dir, "VBET", "slope.qml"))
+        index.invalidate([self.paths["shared_slope"], added])
+
+        self.assertEqual(index.resolve(None, "VBET", "slope"), added)
+        self.assertEqual(index.get_document(self.paths["shared_slope"]), b"<qgis>new</qgis>")
+
+    def test_forget_project(self):
+        index = SymbologyIndex()
+        self.assertEqual(index.resolve(self.project_dir, "VBET", "dem"), self.paths["vbet_dem"])
+        project_dem = self._write(os.path.join(self.project_dir, "dem.qml"))
+        # Still using what it found the first time
+        self.assertEqual(index.resolve(self.project_dir, "VBET", "dem"), self.paths["vbet_dem"])
+        index.forget_project(self.project_dir)
+        self.assertEqual(index.resolve(self.project_dir, "VBET", "dem"), project_dem)
+
+    def test_missing_folder(self):
+        SymbologyIndex().use_folder(os.path.join(self.tmp_dir, "nope"))
+        self.assertIsNone(SymbologyIndex().resolve(os.path.join(self.tmp_dir, "nope"), "VBET", "dem"))
+
+
+if __name__ == "__main__":
+    unittest.main()
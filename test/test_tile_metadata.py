@@ -0,0 +1,139 @@
+"""Unit tests for src/classes/data_exchange/tile_metadata.py
+
+Tasks handed to the QGIS task manager are kept in a list so each test decides when they finish.
+"""
+
+import os
+import sys
+import types
+import unittest
+from unittest.mock import MagicMock
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def mock_module(name, attrs=None):
+    m = types.ModuleType(name)
+    if attrs:
+        for k, v in attrs.items():
+            setattr(m, k, v)
+    sys.modules[name] = m
+    return m
+
+
+class FakeQgsTask:
+    def __init__(self, *args):
+        pass
+
+
+mock_module("qgis")
+mock_module("qgis.core", {"Qgis": MagicMock(), "QgsApplication": MagicMock(), "QgsMessageLog": MagicMock(), "QgsProject": MagicMock(), "QgsSettings": MagicMock(), "QgsTask": FakeQgsTask})
+mock_module("qgis.PyQt")
+mock_module("qgis.PyQt.QtCore", {"QObject": object, "QTimer": MagicMock(), "QUrl": MagicMock(), "QUrlQuery": MagicMock(), "pyqtSignal": MagicMock()})
+mock_module("qgis.PyQt.QtGui", {"QDesktopServices": MagicMock()})
+mock_module("src.compat", {"QGSTASK_CAN_CANCEL": 1, "QGSTASK_SILENT": 2})
+
+from qgis.core import QgsApplication  # noqa: E402
+
+from src.classes.data_exchange.tile_metadata import RemoteLayerFetch, TileIndexCache  # noqa: E402
+
+URL = "https://tiles.example.com/vbet/p1/layer/index.json"
+
+
+class TestTileIndexCache(unittest.TestCase):
+    def setUp(self):
+        self.tasks = []
+        QgsApplication.taskManager.return_value.addTask.side_effect = self.tasks.append
+        TileIndexCache().entries.clear()
+        TileIndexCache().in_flight.clear()
+        self.answers = []
+
+    def answer(self, index, error):
+        self.answers.append((index, error))
+
+    def finish(self, task, result):
+        task.result = result
+        task.success = result is not None
+        task.error = None if result is not None else ValueError("HTTP 404")
+        task.finished(task.success)
+
+    def test_fetched_once(self):
+        TileIndexCache().fetch(URL, self.answer, "p1")
+        TileIndexCache().fetch(URL, self.answer, "p1")
+        # The second caller waits on the first fetch
+        self.assertEqual(len(self.tasks), 1)
+        self.assertEqual(self.tasks[0].url, URL)
+        self.finish(self.tasks[0], {"minzoom": 4})
+        self.assertEqual(self.answers, [({"minzoom": 4}, None)] * 2)
+
+        # Straight from memory after that, and everyone gets their own copy
+        self.answers[0][0]["bounds"] = [0, 0, 1, 1]
+        TileIndexCache().fetch(URL, self.answer, "p1")
+        self.assertEqual(len(self.tasks), 1)
+        self.assertEqual(self.answers[2], ({"minzoom": 4}, None))
+
+    def test_failures_not_remembered(self):
+        TileIndexCache().fetch(URL, self.answer)
+        self.finish(self.tasks[0], None)
+        self.assertIsNone(self.answers[0][0])
+        self.assertIsInstance(self.answers[0][1], ValueError)
+        TileIndexCache().fetch(URL, self.answer)
+        self.assertEqual(len(self.tasks), 2)
+
+    def test_invalidate(self):
+        other = "https://tiles.example.com/vbet/p2/layer/index.json"
+        for url, project_id in [(URL, "p1"), (other, "p2")]:
+            TileIndexCache().fetch(url, self.answer, project_id)
+            self.finish(self.tasks[-1], {"url": url})
+        TileIndexCache().invalidate("p1")
+        self.assertIsNone(TileIndexCache().get(URL))
+        self.assertEqual(TileIndexCache().get(other), {"url": other})
+        TileIndexCache().invalidate()
+        self.assertIsNone(TileIndexCache().get(other))
+
+    def test_least_recently_used_dropped(self):
+        TileIndexCache().max_entries = 2
+        try:
+            for name in ["a", "b"]:
+                TileIndexCache().fetch(name, self.answer)
+                self.finish(self.tasks[-1], {"name": name})
+            TileIndexCache().get("a")
+            TileIndexCache().fetch("c", self.answer)
+            self.finish(self.tasks[-1], {"name": "c"})
+            self.assertEqual(list(TileIndexCache().entries), ["a", "c"])
+        finally:
+            TileIndexCache().max_entries = 256
+
+
+class TestRemoteLayerFetch(unittest.TestCase):
+    def setUp(self):
+        self.ready = []
+
+    def test_ready_once_every_stage_is_done(self):
+        fetch = RemoteLayerFetch("Channel", ["tiles", "index", "symbology"], self.ready.append)
+        fetch.start("tiles")
+        fetch.start("symbology")
+        # Symbology can come back first
+        fetch.done("symbology", {"mapboxJson": "{}"})
+        fetch.done("tiles", {"url": "x"})
+        fetch.start("index")
+        self.assertEqual(self.ready, [])
+        fetch.done("index", {"minzoom": 4})
+        self.assertEqual(self.ready, [fetch])
+        self.assertEqual(fetch.results, {"symbology": {"mapboxJson": "{}"}, "tiles": {"url": "x"}, "index": {"minzoom": 4}})
+        # A stage reported twice doesn't call on_ready again
+        fetch.done("index", {})
+        self.assertEqual(len(self.ready), 1)
+        self.assertRegex(fetch.timings(), r"^symbology \d+ ms, tiles \d+ ms, index \d+ ms, total \d+ ms$")
+
+    def test_failed(self):
+        fetch = RemoteLayerFetch("Channel", ["tiles", "symbology"], self.ready.append)
+        fetch.fail()
+        fetch.done("tiles", None)
+        fetch.done("symbology", None)
+        self.assertEqual(self.ready, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
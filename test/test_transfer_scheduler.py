@@ -0,0 +1,117 @@
+"""Unit tests for src/classes/data_exchange/transfer_scheduler.py
+
+A fake clock drives the sampling so every test is deterministic. Each ``_run``
+reports one full sample at a given throughput with every slot in use.
+"""
+
+import os
+import sys
+import types
+import unittest
+from unittest.mock import MagicMock
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def mock_module(name, attrs=None):
+    m = types.ModuleType(name)
+    if attrs:
+        for k, v in attrs.items():
+            setattr(m, k, v)
+    sys.modules[name] = m
+    return m
+
+
+if "qgis" not in sys.modules:
+    mock_module("qgis")
+    mock_module("qgis.core", {"Qgis": MagicMock(), "QgsMessageLog": MagicMock()})
+
+from src.classes.data_exchange.transfer_scheduler import HOLD_SAMPLES, AdaptiveConcurrency  # noqa: E402
+
+INTERVAL = 5.0
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestAdaptiveConcurrency(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.total = 0
+
+    def _controller(self, min_streams=2, max_streams=8, initial=4):
+        controller = AdaptiveConcurrency(min_streams, max_streams, initial=initial, sample_interval=INTERVAL, clock=self.clock)
+        # The first call only sets the starting point
+        controller.update(self.total, controller.limit)
+        return controller
+
+    def _run(self, controller, bytes_per_sec, active=None):
+        self.clock.now += INTERVAL
+        self.total += int(bytes_per_sec * INTERVAL)
+        return controller.update(self.total, controller.limit if active is None else active)
+
+    def test_grows_while_throughput_improves(self):
+        controller = self._controller()
+        self.assertEqual(self._run(controller, 100), 5)
+        # Every extra stream buys 20% more so it keeps going up until max
+        rate = 100
+        while controller.limit < 8:
+            rate *= 1.2
+            limit = controller.limit
+            self.assertEqual(self._run(controller, rate), limit)  # probe accepted
+            self.assertEqual(self._run(controller, rate), limit + 1)  # next probe
+        self.assertEqual(self._run(controller, rate * 2), 8)
+
+    def test_reverts_and_holds_when_no_gain(self):
+        controller = self._controller()
+        self.assertEqual(self._run(controller, 100), 5)
+        self.assertEqual(self._run(controller, 102), 4)
+        for _ in range(HOLD_SAMPLES):
+            self.assertEqual(self._run(controller, 102), 4)
+        self.assertEqual(self._run(controller, 102), 5)
+
+    def test_no_change_when_not_saturated(self):
+        controller = self._controller()
+        for _ in range(5):
+            self.assertEqual(self._run(controller, 100, active=2), 4)
+        self.assertEqual(controller.throughput, 100)
+
+    def test_partial_sample_keeps_limit(self):
+        controller = self._controller()
+        self.clock.now += INTERVAL / 2
+        self.assertEqual(controller.update(1000, 4), 4)
+        self.assertEqual(controller.throughput, 0)
+
+    def test_failure_halves_down_to_min(self):
+        controller = self._controller(initial=8)
+        self.assertEqual(controller.record_failure(), 4)
+        self.assertEqual(controller.record_failure(), 2)
+        self.assertEqual(controller.record_failure(), 2)
+        # Backing off also holds off probing for a while
+        for _ in range(HOLD_SAMPLES):
+            self.assertEqual(self._run(controller, 100), 2)
+        self.assertEqual(self._run(controller, 100), 3)
+
+    def test_fixed_limit(self):
+        controller = self._controller(min_streams=3, max_streams=3, initial=10)
+        self.assertEqual(controller.limit, 3)
+        for rate in (100, 200, 400):
+            self.assertEqual(self._run(controller, rate), 3)
+        self.assertEqual(controller.record_failure(), 3)
+
+    def test_bytes_going_backwards(self):
+        controller = self._controller()
+        self.total = 0
+        self.clock.now += INTERVAL
+        self.assertEqual(controller.update(0, 4), 5)
+        self.assertEqual(controller.throughput, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
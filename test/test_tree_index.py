@@ -0,0 +1,264 @@
+"""Unit tests for src/classes/tree_index.py and the tree walking in QRaveMapLayer that uses it
+
+The tree is a tiny in-memory stand-in for QStandardItem. The old, scan-every-sibling
+versions of the helpers are kept here so we can check the new ones give the same answers.
+"""
+
+import os
+import random
+import sys
+import types
+import unittest
+from unittest.mock import MagicMock
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+USER_ROLE = 1000
+
+
+def mock_module(name, attrs=None):
+    m = types.ModuleType(name)
+    if attrs:
+        for k, v in attrs.items():
+            setattr(m, k, v)
+    sys.modules[name] = m
+    return m
+
+
+class FakeItem:
+    def __init__(self, text, data=None):
+        self._text = text
+        self._data = data
+        self._children = []
+        self._parent = None
+
+    def text(self):
+        return self._text
+
+    def data(self, role):
+        return self._data
+
+    def appendRow(self, item):
+        item._parent = self
+        self._children.append(item)
+        return item
+
+    def parent(self):
+        return self._parent
+
+    def rowCount(self):
+        return len(self._children)
+
+    def columnCount(self):
+        return 1
+
+    def child(self, row, column=0):
+        return self._children[row] if row < len(self._children) else None
+
+    def hasChildren(self):
+        return len(self._children) > 0
+
+
+class FakeGroup:
+    def __init__(self, name, children=None):
+        self._name = name
+        self._children = children or []
+
+    def name(self):
+        return self._name
+
+    def children(self):
+        return self._children
+
+    def findGroup(self, name):
+        for child in self._children:
+            if isinstance(child, FakeGroup):
+                if child.name() == name:
+                    return child
+                found = child.findGroup(name)
+                if found is not None:
+                    return found
+        return None
+
+
+qgis_core = MagicMock()
+qgis_core.QgsLayerTreeGroup = FakeGroup
+sys.modules["qgis"] = MagicMock()
+sys.modules["qgis.core"] = qgis_core
+sys.modules["qgis.PyQt"] = MagicMock()
+sys.modules["qgis.PyQt.QtGui"] = MagicMock()
+sys.modules["qgis.PyQt.QtXml"] = MagicMock()
+mock_module("src.compat", {"MAPBOX_GL_SUCCESS": 0, "USER_ROLE": USER_ROLE})
+mock_module("src.classes.settings", {"CONSTANTS": {"logCategory": "test", "settingsCategory": "Test"}, "Settings": MagicMock()})
+
+from src.classes.qrave_map_layer import ProjectTreeData, QRaveMapLayer, QRaveTreeTypes  # noqa: E402
+from src.classes.tree_index import SiblingPositions, TreeIndex, get_expanded_paths, iter_descendants  # noqa: E402
+
+
+def legacy_getlayerposition(item):
+    """_getlayerposition before the tree index"""
+    name = item.text()
+    order = [name]
+    absolute_position = 0
+    parent = item.parent()
+    if parent is not None:
+        child_idx = 0
+        child = parent.child(child_idx)
+        child_data = child.data(USER_ROLE)
+        while child_data is not None:
+            if child.text() == name:
+                return absolute_position, order
+            if isinstance(child_data.data, QRaveMapLayer):
+                if child_data.data.layer_type in ["line", "point", "polygon", "raster"]:
+                    absolute_position += 1
+            else:
+                if child_data.type == QRaveTreeTypes.PROJECT_FOLDER:
+                    absolute_position += 1
+            order.append(child.text())
+            child_idx += 1
+            child = parent.child(child_idx)
+            child_data = child.data(USER_ROLE) if child is not None else None
+    return absolute_position, order
+
+
+def map_layer(layer_type):
+    layer = QRaveMapLayer.__new__(QRaveMapLayer)
+    layer.layer_type = layer_type
+    return layer
+
+
+def build_tree(project, folders, leaves_per_folder, seed=0):
+    """A project root with folders of layers, files and sub folders. Some names repeat on purpose"""
+    rnd = random.Random(seed)
+    root = FakeItem("Project", ProjectTreeData(QRaveTreeTypes.PROJECT_ROOT, project=project))
+    for f in range(folders):
+        folder = root.appendRow(FakeItem(f"Folder {f % (folders // 2 or 1)}", ProjectTreeData(QRaveTreeTypes.PROJECT_FOLDER, project=project)))
+        for _ in range(leaves_per_folder):
+            layer_type = rnd.choice(["raster", "line", "polygon", "point", "file", "report"])
+            folder.appendRow(FakeItem(f"Layer {rnd.randint(0, leaves_per_folder)}", ProjectTreeData(QRaveTreeTypes.LEAF, project=project, data=map_layer(layer_type))))
+        if f % 3 == 0:
+            folder.appendRow(FakeItem("Views", ProjectTreeData(QRaveTreeTypes.PROJECT_VIEW_FOLDER, project=project)))
+    return root
+
+
+def position(item):
+    absolute_position, order = QRaveMapLayer._getlayerposition(item)
+    return absolute_position, list(order)
+
+
+class TestTreeIndex(unittest.TestCase):
+    def test_iter_descendants_breadth_first(self):
+        root = FakeItem("root")
+        a = root.appendRow(FakeItem("a"))
+        b = root.appendRow(FakeItem("b"))
+        a1 = a.appendRow(FakeItem("a1"))
+        b1 = b.appendRow(FakeItem("b1"))
+        a1.appendRow(FakeItem("a11"))
+        self.assertEqual([item.text() for item in iter_descendants(root)], ["a", "b", "a1", "b1", "a11"])
+        self.assertEqual(list(iter_descendants(b1)), [])
+
+    def test_positions_match_legacy(self):
+        for project in (types.SimpleNamespace(tree_index=TreeIndex()), types.SimpleNamespace()):
+            root = build_tree(project, folders=20, leaves_per_folder=30)
+            for item in iter_descendants(root):
+                self.assertEqual(position(item), legacy_getlayerposition(item), item.text())
+            self.assertEqual(position(root), legacy_getlayerposition(root))
+
+    def test_count_in(self):
+        siblings = SiblingPositions()
+        for name in ["A", "B", "A", "C", "D", "B", "E"]:
+            siblings.add(name, True)
+        for name in ["A", "B", "C", "D", "E", "missing"]:
+            _, order = siblings.position(name)
+            for groups in [set(), {"A"}, {"A", "B"}, {"B", "E"}, {"A", "B", "C", "D", "E", "F", "G", "H"}, {name}]:
+                # The old way: one findGroup for every name
+                self.assertEqual(order.count_in(groups), sum(1 for group in list(order) if group in groups), (name, groups))
+
+    def test_each_folder_scanned_once(self):
+        project = types.SimpleNamespace(tree_index=TreeIndex())
+        root = build_tree(project, folders=10, leaves_per_folder=10)
+        compute = MagicMock(side_effect=QRaveMapLayer._sibling_positions)
+        for item in iter_descendants(root):
+            project.tree_index.sibling_positions(item.parent(), compute)
+        # The root plus every folder
+        self.assertEqual(compute.call_count, 11)
+
+    def test_invalidate(self):
+        project = types.SimpleNamespace(tree_index=TreeIndex())
+        root = build_tree(project, folders=2, leaves_per_folder=3)
+        folder = root.child(0)
+        QRaveMapLayer._getlayerposition(folder.child(0))
+        # What Project.populate does: the folder's children change
+        new_leaf = folder.appendRow(FakeItem("New Layer", ProjectTreeData(QRaveTreeTypes.LEAF, project=project, data=map_layer("raster"))))
+        project.tree_index.invalidate(folder)
+        self.assertEqual(position(new_leaf), legacy_getlayerposition(new_leaf))
+        project.tree_index.invalidate()
+        self.assertEqual(project.tree_index.siblings, {})
+
+    def test_group_names_match_find_group(self):
+        tree = FakeGroup("root", [FakeGroup("A", [FakeGroup("A1"), MagicMock()]), FakeGroup("B", [FakeGroup("B1", [FakeGroup("deep")])]), MagicMock()])
+        names = QRaveMapLayer._group_names(tree)
+        self.assertEqual(names, {"A", "A1", "B", "B1", "deep"})
+        for name in ["A", "A1", "B", "B1", "deep", "missing"]:
+            self.assertEqual(name in names, tree.findGroup(name) is not None)
+
+
+class FakeIndex:
+    def __init__(self, item):
+        self.item = item
+
+    def isValid(self):
+        return self.item is not None
+
+
+class FakeModel:
+    def rowCount(self, idx):
+        return idx.item.rowCount()
+
+    def index(self, row, column, idx):
+        return FakeIndex(idx.item.child(row))
+
+    def itemFromIndex(self, idx):
+        return idx.item
+
+
+class FakeView:
+    def __init__(self, expanded):
+        self.expanded = expanded
+        self.checked = []
+
+    def isExpanded(self, idx):
+        self.checked.append(idx.item.text())
+        return idx.item.text() in self.expanded
+
+
+class TestExpandedPaths(unittest.TestCase):
+    def setUp(self):
+        self.root = FakeItem("Project")
+        inputs = self.root.appendRow(FakeItem("Inputs"))
+        inputs.appendRow(FakeItem("DEM"))
+        topo = inputs.appendRow(FakeItem("Topography"))
+        topo.appendRow(FakeItem("Slope"))
+        outputs = self.root.appendRow(FakeItem("Outputs"))
+        hidden = outputs.appendRow(FakeItem("Hidden"))
+        for idx in range(100):
+            hidden.appendRow(FakeItem(f"Layer {idx}"))
+
+    def test_expanded_paths(self):
+        view = FakeView({"Project", "Inputs", "Topography", "Hidden"})
+        paths = get_expanded_paths(view, FakeModel(), FakeIndex(self.root))
+        # "Hidden" is expanded but it's inside a collapsed folder so it isn't visible
+        self.assertEqual(paths, {(), ("Inputs",), ("Inputs", "Topography")})
+        # Nothing under the collapsed folder was looked at
+        self.assertNotIn("Layer 0", view.checked)
+        self.assertNotIn("Hidden", view.checked)
+
+    def test_collapsed_root(self):
+        view = FakeView({"Inputs"})
+        self.assertEqual(get_expanded_paths(view, FakeModel(), FakeIndex(self.root)), set())
+        self.assertEqual(view.checked, ["Project"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+"""Unit tests for src/classes/data_exchange/upload_journal.py"""
+
+import datetime
+import json
+import os
+import shutil
+import sys
+import tempfile
+import types
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def mock_module(name, attrs=None):
+    m = types.ModuleType(name)
+    if attrs:
+        for k, v in attrs.items():
+            setattr(m, k, v)
+    sys.modules[name] = m
+    return m
+
+
+mock_module("qgis")
+mock_module("qgis.core", {"Qgis": MagicMock(), "QgsMessageLog": MagicMock()})
+
+from src.classes.data_exchange.upload_journal import JOURNAL_FILE, PARTS_LOG_SUFFIX, URL_EXPIRY_MARGIN, UploadJournal, url_expiry  # noqa: E402
+
+NOW = datetime.datetime(2026, 3, 1, 12, 0, 0, tzinfo=datetime.timezone.utc).timestamp()
+
+
+def s3_url(part, signed_on="20260301T120000Z", expires=3600):
+    return f"https://bucket.s3.amazonaws.com/dem.tif?partNumber={part}&X-Amz-Date={signed_on}&X-Amz-Expires={expires}&X-Amz-Signature=abc"
+
+
+class FakeUploadFile:
+    def __init__(self, rel_path, urls, op="create", etag="XXXX"):
+        self.rel_path = rel_path
+        self.urls = urls
+        self.op = op
+        self.etag = etag
+
+
+class TestUrlExpiry(unittest.TestCase):
+    def test_signature_v4(self):
+        self.assertEqual(url_expiry(s3_url(1)), NOW + 3600)
+
+    def test_signature_v2(self):
+        self.assertEqual(url_expiry("https://bucket.s3.amazonaws.com/dem.tif?AWSAccessKeyId=x&Expires=1772370000&Signature=y"), 1772370000)
+
+    def test_unknown(self):
+        self.assertIsNone(url_expiry("https://example.com/upload/dem.tif"))
+        self.assertIsNone(url_expiry(s3_url(1, signed_on="yesterday")))
+
+
+class TestUploadJournal(unittest.TestCase):
+    def setUp(self):
+        self.project_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.project_dir, JOURNAL_FILE)
+        for rel_path, size in [("project.rs.xml", 100), ("inputs/dem.tif", 3000)]:
+            abs_path = os.path.join(self.project_dir, rel_path)
+            os.makedirs(os.path.dirname(abs_path), exist_ok=True)
+            with open(abs_path, "wb") as f:
+                f.write(b"x" * size)
+        self.upload_files = [FakeUploadFile("project.rs.xml", [s3_url(1)]), FakeUploadFile("inputs/dem.tif", [s3_url(1), s3_url(2), s3_url(3)], op="update")]
+
+    def tearDown(self):
+        shutil.rmtree(self.project_dir, ignore_errors=True)
+
+    def make_journal(self):
+        journal = UploadJournal.for_upload(self.path, self.project_dir, "TOKEN", "NEWID", "https://api.example.com", self.upload_files)
+        journal.save()
+        return journal
+
+    def test_round_trip(self):
+        journal = self.make_journal()
+        journal.part_done("inputs/dem.tif", 2)
+        journal.part_done("project.rs.xml", 0)
+
+        loaded = UploadJournal.load(self.path)
+        self.assertEqual((loaded.token, loaded.new_project_id, loaded.api_url), ("TOKEN", "NEWID", "https://api.example.com"))
+        self.assertEqual(loaded.files["inputs/dem.tif"].done_parts, {2})
+        self.assertEqual(loaded.files["inputs/dem.tif"].op, "update")
+        self.assertEqual(loaded.files["inputs/dem.tif"].size, 3000)
+        self.assertTrue(loaded.files["project.rs.xml"].done)
+        self.assertEqual([journal_file.rel_path for journal_file in loaded.remaining()], ["inputs/dem.tif"])
+        self.assertEqual(loaded.remaining_bytes(), 3000)
+        self.assertEqual(loaded.changed_files(self.project_dir), [])
+
+    def test_file_done_when_every_part_is(self):
+        journal = self.make_journal()
+        for idx in [0, 2, 1]:
+            self.assertFalse(journal.files["inputs/dem.tif"].done)
+            journal.part_done("inputs/dem.tif", idx)
+        self.assertTrue(UploadJournal.load(self.path).files["inputs/dem.tif"].done)
+
+    def test_finished_parts_only_appended(self):
+        journal = self.make_journal()
+        with open(self.path, encoding="utf-8") as f:
+            saved = f.read()
+        journal.part_done("inputs/dem.tif", 0)
+        journal.part_done("inputs/dem.tif", 1)
+        # The journal (and all its URLs) isn't written again for each part
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), saved)
+        with open(self.path + PARTS_LOG_SUFFIX, encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 2)
+        # Saving folds the log into the journal
+        journal.save()
+        self.assertFalse(os.path.isfile(self.path + PARTS_LOG_SUFFIX))
+        self.assertEqual(UploadJournal.load(self.path).files["inputs/dem.tif"].done_parts, {0, 1})
+
+    def test_half_written_part_ignored(self):
+        journal = self.make_journal()
+        journal.part_done("inputs/dem.tif", 0)
+        with open(self.path + PARTS_LOG_SUFFIX, "a", encoding="utf-8") as f:
+            f.write('["inputs/dem.tif", ')
+        self.assertEqual(UploadJournal.load(self.path).files["inputs/dem.tif"].done_parts, {0})
+
+    def test_unreadable(self):
+        self.assertIsNone(UploadJournal.load(self.path))
+        for content in ["{not json", json.dumps({"version": 999}), json.dumps({"version": 1, "token": "x"})]:
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.write(content)
+            self.assertIsNone(UploadJournal.load(self.path), content)
+
+    def test_changed_files(self):
+        journal = self.make_journal()
+        with open(os.path.join(self.project_dir, "inputs", "dem.tif"), "ab") as f:
+            f.write(b"more")
+        os.remove(os.path.join(self.project_dir, "project.rs.xml"))
+        self.assertEqual(sorted(journal.changed_files(self.project_dir)), ["inputs/dem.tif", "project.rs.xml"])
+
+    def test_expired_files(self):
+        self.upload_files[1].urls = [s3_url(1, expires=60), s3_url(2), s3_url(3)]
+        journal = self.make_journal()
+        # Part 1 of the dem is about to expire
+        self.assertEqual(journal.expired_files(now=NOW), ["inputs/dem.tif"])
+        # ...but it's already uploaded so its URL doesn't matter
+        journal.part_done("inputs/dem.tif", 0)
+        self.assertEqual(journal.expired_files(now=NOW), [])
+        # Everything is close to running out later on
+        self.assertEqual(journal.expired_files(now=NOW + 3600 - URL_EXPIRY_MARGIN + 1), ["project.rs.xml", "inputs/dem.tif"])
+        # URLs that don't say when they expire are always asked for again
+        journal.files["project.rs.xml"].urls = ["https://example.com/upload"]
+        self.assertEqual(journal.expired_files(now=NOW), ["project.rs.xml"])
+
+    def test_new_urls_start_the_file_over(self):
+        journal = self.make_journal()
+        journal.part_done("inputs/dem.tif", 0)
+        journal.set_urls("inputs/dem.tif", [s3_url(1), s3_url(2), s3_url(3)])
+        self.assertEqual(journal.files["inputs/dem.tif"].done_parts, set())
+
+    def test_save_failure_does_not_stop_the_upload(self):
+        journal = self.make_journal()
+        with patch("src.classes.data_exchange.upload_journal.open", side_effect=PermissionError, create=True):
+            journal.part_done("inputs/dem.tif", 0)
+        self.assertEqual(journal.files["inputs/dem.tif"].done_parts, {0})
+
+    def test_remove(self):
+        journal = self.make_journal()
+        journal.part_done("inputs/dem.tif", 0)
+        self.assertTrue(os.path.isfile(self.path))
+        journal.remove()
+        self.assertFalse(os.path.isfile(self.path))
+        self.assertFalse(os.path.isfile(self.path + PARTS_LOG_SUFFIX))
+        journal.remove()
+
+
+if __name__ == "__main__":
+    unittest.main()
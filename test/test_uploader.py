@@ -0,0 +1,412 @@
+"""Unit tests for the multipart uploads in src/classes/data_exchange/uploader.py
+
+Qt's network and event loop classes are replaced with fakes that share one event queue.
+Each fake ``put`` reads its file part a block per event, so several parts interleave the
+way they do on a real connection, and the fake server can be told to fail a part.
+"""
+
+from collections import deque
+import math
+import os
+import shutil
+import sys
+import tempfile
+import types
+from typing import ClassVar
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+NET_NO_ERROR = 0
+NET_OP_CANCELED_ERROR = 5
+NET_SERVER_ERROR = 401
+BLOCK = 64
+
+
+def mock_module(name, attrs=None):
+    m = types.ModuleType(name)
+    if attrs:
+        for k, v in attrs.items():
+            setattr(m, k, v)
+    sys.modules[name] = m
+    return m
+
+
+# Everything the fake event loop has left to do
+events = deque()
+
+
+class FakeSignal:
+    def __init__(self):
+        self.slots = []
+
+    def connect(self, slot):
+        self.slots.append(slot)
+
+    def emit(self, *args):
+        for slot in list(self.slots):
+            slot(*args)
+
+
+class FakeTimer:
+    active: ClassVar[list] = []
+
+    def __init__(self, parent=None):
+        self.timeout = FakeSignal()
+
+    def setInterval(self, ms):
+        pass
+
+    def start(self):
+        FakeTimer.active.append(self)
+
+    def stop(self):
+        if self in FakeTimer.active:
+            FakeTimer.active.remove(self)
+
+    def isActive(self):
+        return self in FakeTimer.active
+
+    @staticmethod
+    def singleShot(ms, fn):
+        events.append(fn)
+
+
+class FakeEventLoop:
+    def __init__(self):
+        self.running = False
+
+    def exec(self):
+        self.running = True
+        while self.running:
+            if len(events) == 0:
+                raise Exception("Event loop is waiting on nothing")
+            events.popleft()()
+            # Time passes between events so the timers get a turn
+            for timer in list(FakeTimer.active):
+                timer.timeout.emit()
+
+    def quit(self):
+        self.running = False
+
+
+class FakeFile:
+    """QFile on top of a Python file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.f = None
+
+    def fileName(self):
+        return self.path
+
+    def open(self, mode):
+        self.f = open(self.path, "rb")
+        return True
+
+    def seek(self, pos):
+        self.f.seek(pos)
+
+    def readData(self, maxlen):
+        return self.f.read(maxlen)
+
+    def isOpen(self):
+        return self.f is not None
+
+    def close(self):
+        if self.f is not None:
+            self.f.close()
+        self.f = None
+
+
+class FakeRequest:
+    def __init__(self, url):
+        self.url = url
+
+    def setHeader(self, header, value):
+        pass
+
+
+class FakeServer:
+    def __init__(self):
+        self.received = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.puts = []
+        # url -> how many more times to refuse it
+        self.fail = {}
+        # Called with the reply after every block is read
+        self.on_block = None
+
+
+server = FakeServer()
+
+
+class FakeReply:
+    def __init__(self, url, device):
+        self.url = url
+        self.device = device
+        self.data = b""
+        self._error = NET_NO_ERROR
+        self.finished = FakeSignal()
+        self.done = False
+        server.in_flight += 1
+        server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        events.append(self.step)
+
+    def step(self):
+        if self.done:
+            return
+        block = self.device.readData(BLOCK)
+        if server.on_block:
+            server.on_block(self)
+        if self.done:
+            return
+        if len(block) > 0:
+            self.data += block
+            events.append(self.step)
+            return
+        if server.fail.get(self.url, 0) > 0:
+            server.fail[self.url] -= 1
+            self._error = NET_SERVER_ERROR
+        else:
+            server.received[self.url] = self.data
+        self.finish()
+
+    def finish(self):
+        self.done = True
+        server.in_flight -= 1
+        self.finished.emit()
+
+    def abort(self):
+        if not self.done:
+            self._error = NET_OP_CANCELED_ERROR
+            self.finish()
+
+    def close(self):
+        pass
+
+    def error(self):
+        return self._error
+
+    def errorString(self):
+        return "Server said no"
+
+
+class FakeNetworkAccessManager:
+    def put(self, request, device):
+        server.puts.append(request.url)
+        return FakeReply(request.url, device)
+
+
+class FakeQgsTask:
+    def __init__(self, description, flags=None):
+        self._canceled = False
+        self.taskCompleted = MagicMock()
+        self.taskTerminated = MagicMock()
+
+    def isCanceled(self):
+        return self._canceled
+
+    def cancel(self):
+        self._canceled = True
+
+    def description(self):
+        return "Upload"
+
+
+mock_module("qgis")
+mock_module("qgis.core", {"Qgis": MagicMock(), "QgsApplication": MagicMock(), "QgsMessageLog": MagicMock(), "QgsTask": FakeQgsTask})
+mock_module("qgis.PyQt")
+mock_module(
+    "qgis.PyQt.QtCore",
+    {
+        "QByteArray": bytes,
+        "QEventLoop": FakeEventLoop,
+        "QFile": FakeFile,
+        "QIODevice": types.SimpleNamespace(OpenMode=int, ReadOnly=1),
+        "QObject": object,
+        "QTimer": FakeTimer,
+        "QUrl": str,
+        "pyqtSignal": MagicMock(),
+    },
+)
+mock_module("qgis.PyQt.QtNetwork", {"QNetworkAccessManager": FakeNetworkAccessManager, "QNetworkRequest": FakeRequest})
+mock_module(
+    "src.compat",
+    {"NET_CONTENT_LENGTH_HEADER": 1, "NET_NO_ERROR": NET_NO_ERROR, "NET_OP_CANCELED_ERROR": NET_OP_CANCELED_ERROR, "QGSTASK_CAN_CANCEL": 1, "QGSTASK_SILENT": 2},
+)
+mock_module("src.classes.util", {"MULTIPART_CHUNK_SIZE": 1000})
+
+from src.classes.data_exchange import uploader  # noqa: E402
+from src.classes.data_exchange.uploader import PartialFile, UploadMultiPartFileTask  # noqa: E402
+
+CHUNK = 1000
+
+
+class TestMultiPartUpload(unittest.TestCase):
+    def setUp(self):
+        global server
+        server = FakeServer()
+        events.clear()
+        FakeTimer.active = []
+        self.tmp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tmp_dir, "dem.tif")
+        self.content = os.urandom(10 * CHUNK + 123)
+        with open(self.file_path, "wb") as f:
+            f.write(self.content)
+        self.urls = [f"https://s3/dem.tif?partNumber={idx + 1}" for idx in range(math.ceil(len(self.content) / CHUNK))]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def make_task(self, **kwargs):
+        self.progress = []
+        task = UploadMultiPartFileTask("inputs/dem.tif", self.file_path, self.urls, **kwargs)
+        task.ext_prog_callback = lambda: self.progress.append(task.uploaded_size)
+        return task
+
+    def assert_uploaded(self):
+        for idx, url in enumerate(self.urls):
+            self.assertEqual(server.received[url], self.content[idx * CHUNK : (idx + 1) * CHUNK], url)
+
+    def test_parts_in_flight(self):
+        task = self.make_task(parts_in_flight=3)
+        self.assertTrue(task.run())
+        self.assert_uploaded()
+        self.assertEqual(server.max_in_flight, 3)
+        self.assertEqual(task.uploaded_size, len(self.content))
+        self.assertEqual(task.retry_count, 0)
+        self.assertEqual(FakeTimer.active, [])
+        self.assertEqual(self.progress, sorted(self.progress))
+
+    def test_one_at_a_time(self):
+        task = self.make_task(parts_in_flight=1)
+        self.assertTrue(task.run())
+        self.assert_uploaded()
+        self.assertEqual(server.max_in_flight, 1)
+        self.assertEqual(server.puts, self.urls)
+
+    def test_failed_part_is_retried_alone(self):
+        server.fail = {self.urls[2]: 2}
+        retries = []
+        task = self.make_task(parts_in_flight=4, retries=5, retry_callback=lambda: retries.append(1))
+        with patch.object(uploader, "RETRY_DELAY", 0):
+            self.assertTrue(task.run())
+        self.assert_uploaded()
+        # Only the failed part went again
+        self.assertEqual(server.puts.count(self.urls[2]), 3)
+        self.assertEqual(len(server.puts), len(self.urls) + 2)
+        self.assertEqual(task.retry_count, 2)
+        self.assertEqual(len(retries), 2)
+        self.assertLessEqual(server.max_in_flight, 4)
+        # Bytes of the failed attempts were taken back off so progress never went past the file size
+        self.assertEqual(task.uploaded_size, len(self.content))
+        self.assertLessEqual(max(self.progress), len(self.content))
+
+    def test_out_of_retries(self):
+        server.fail = {self.urls[5]: 99}
+        task = self.make_task(parts_in_flight=4, retries=3)
+        with patch.object(uploader, "RETRY_DELAY", 0):
+            self.assertFalse(task.run())
+        self.assertIn("Part 6", task.error)
+        self.assertEqual(server.puts.count(self.urls[5]), 3)
+        self.assertEqual(server.in_flight, 0)
+        self.assertTrue(all(part.partial_file is None for part in task.parts))
+
+    def test_cancel(self):
+        task = self.make_task(parts_in_flight=4)
+
+        def cancel_part_way(reply):
+            if len(server.received) == 2:
+                task.cancel()
+
+        server.on_block = cancel_part_way
+        self.assertFalse(task.run())
+        self.assertEqual(task.error, NET_OP_CANCELED_ERROR)
+        self.assertEqual(server.in_flight, 0)
+        self.assertLess(len(server.received), len(self.urls))
+        self.assertEqual(FakeTimer.active, [])
+
+    def test_resume_skips_done_parts(self):
+        done = []
+        task = self.make_task(parts_in_flight=4, done_parts={0, 1, 5, 10}, part_done_callback=done.append)
+        # The parts from before count as uploaded straight away
+        self.assertEqual(task.uploaded_size, 3 * CHUNK + 123)
+        self.assertTrue(task.run())
+        self.assertEqual(sorted(server.puts), sorted(url for idx, url in enumerate(self.urls) if idx not in {0, 1, 5, 10}))
+        self.assertEqual(sorted(done), [2, 3, 4, 6, 7, 8, 9])
+        self.assertEqual(task.uploaded_size, len(self.content))
+
+    def test_resume_nothing_left(self):
+        task = self.make_task(done_parts=set(range(len(self.urls))))
+        self.assertTrue(task.run())
+        self.assertEqual(server.puts, [])
+
+    def test_url_count_mismatch(self):
+        self.urls = self.urls[:-1]
+        task = self.make_task()
+        self.assertFalse(task.run())
+        self.assertIn("does not match", task.error)
+        self.assertEqual(server.puts, [])
+
+
+class TestPartialFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tmp_dir, "dem.tif")
+        self.content = os.urandom(200_000)
+        with open(self.file_path, "wb") as f:
+            f.write(self.content)
+        # Doesn't start on a page boundary
+        self.start, self.end = 70_001, 150_000
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def read_all(self, partial_file, sizes=(1, 16384, 333, 65536)):
+        data = b""
+        idx = 0
+        while True:
+            block = partial_file.readData(sizes[idx % len(sizes)])
+            idx += 1
+            if len(block) == 0:
+                return data
+            data += block
+
+    def check_reads(self):
+        partial_file = PartialFile(self.file_path, self.start, self.end, rate_limiter=MagicMock(limited=False))
+        partial_file.open(1)
+        try:
+            self.assertEqual(self.read_all(partial_file), self.content[self.start : self.end])
+            self.assertEqual(partial_file.bytes_read, self.end - self.start)
+            self.assertEqual(partial_file.unmetered, self.end - self.start)
+            partial_file.rate_limiter.acquire.assert_not_called()
+            # Qt goes back to the start if it has to send the body again
+            partial_file.seek(self.start)
+            self.assertEqual(partial_file.bytes_read, 0)
+            self.assertEqual(self.read_all(partial_file, (5000,)), self.content[self.start : self.end])
+        finally:
+            partial_file.close()
+
+    def test_mmap(self):
+        self.check_reads()
+
+    def test_buffered_when_mmap_fails(self):
+        with patch.object(uploader.mmap, "mmap", side_effect=OSError("Can't map this")):
+            self.check_reads()
+
+    def test_limited(self):
+        limiter = MagicMock(limited=True)
+        partial_file = PartialFile(self.file_path, self.start, self.end, rate_limiter=limiter)
+        partial_file.open(1)
+        self.assertEqual(self.read_all(partial_file, (16384,)), self.content[self.start : self.end])
+        partial_file.close()
+        self.assertEqual(sum(call.args[0] for call in limiter.acquire.call_args_list), self.end - self.start)
+        self.assertEqual(partial_file.unmetered, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
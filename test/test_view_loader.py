@@ -0,0 +1,238 @@
+"""Unit tests for the batched view loading in src/classes/view_loader.py
+
+QRaveMapLayer is replaced with a stand-in whose static methods are mocks so we can
+check what gets called (and how often) without QGIS. Tasks are run synchronously.
+"""
+
+import os
+import sys
+import types
+import unittest
+from unittest.mock import MagicMock
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def mock_module(name, attrs=None):
+    m = types.ModuleType(name)
+    if attrs:
+        for k, v in attrs.items():
+            setattr(m, k, v)
+    sys.modules[name] = m
+    return m
+
+
+class FakeQgsTask:
+    def __init__(self, description, flags=None):
+        self._canceled = False
+
+    def isCanceled(self):
+        return self._canceled
+
+    def cancel(self):
+        self._canceled = True
+
+    def setProgress(self, progress):
+        self.progress = progress
+
+
+class FakeStandardItem:
+    def __init__(self, text, data=None, parent=None, row=0):
+        self._text = text
+        self._data = data
+        self._parent = parent
+        self._row = row
+
+    def text(self):
+        return self._text
+
+    def data(self, role):
+        return self._data
+
+    def parent(self):
+        return self._parent
+
+    def row(self):
+        return self._row
+
+
+class FakeQRaveMapLayer:
+    """Only the static methods ViewLoader uses"""
+
+
+class FakeSettings:
+    def log(self, msg, level=None):
+        FakeSettings.logged.append(msg)
+
+
+USER_ROLE = 1000
+
+mock_module("qgis")
+mock_module(
+    "qgis.core",
+    {
+        "Qgis": MagicMock(),
+        "QgsApplication": MagicMock(),
+        "QgsLayerTreeGroup": MagicMock(),
+        "QgsLayerTreeLayer": MagicMock(side_effect=lambda layer: ("node", layer)),
+        "QgsMapLayer": MagicMock(),
+        "QgsMessageLog": MagicMock(),
+        "QgsProject": MagicMock(),
+        "QgsTask": FakeQgsTask,
+    },
+)
+mock_module("qgis.PyQt")
+mock_module("qgis.PyQt.QtGui", {"QStandardItem": FakeStandardItem})
+mock_module("src.compat", {"QGSTASK_CAN_CANCEL": 1, "USER_ROLE": USER_ROLE})
+mock_module("src.classes.qrave_map_layer", {"QRaveMapLayer": FakeQRaveMapLayer})
+mock_module("src.classes.settings", {"Settings": FakeSettings})
+mock_module("src.classes.layer_registry", {"LayerRegistry": MagicMock()})
+
+from qgis.core import QgsApplication, QgsProject  # noqa: E402
+
+from src.classes.layer_registry import LayerRegistry  # noqa: E402
+from src.classes.view_loader import ViewLoader  # noqa: E402
+
+
+class MapLayer:
+    def __init__(self, label, exists=True, xpath=None):
+        self.label = label
+        self.exists = exists
+        self.xpath = xpath or f"Project/Datasets/{label}"
+
+
+class TreeData:
+    def __init__(self, data):
+        self.data = data
+
+
+class TestViewLoader(unittest.TestCase):
+    def setUp(self):
+        FakeSettings.logged = []
+        QgsProject.reset_mock()
+        QgsApplication.reset_mock()
+        self.groups = {"Inputs": MagicMock(), "Outputs": MagicMock()}
+        FakeQRaveMapLayer._prepare_parent_group = MagicMock(side_effect=lambda item: (self.groups[item.parent().text()], [("Project", 0), (item.parent().text(), 0)]))
+        LayerRegistry.reset_mock()
+        FakeQRaveMapLayer.registry_key = MagicMock(side_effect=lambda item: ("project.rs.xml", item.data(USER_ROLE).data.xpath))
+        FakeQRaveMapLayer.find_existing_layer = MagicMock(return_value=None)
+        FakeQRaveMapLayer.find_layer_symbology = MagicMock(side_effect=lambda item: f"{item.text()}.qml")
+        FakeQRaveMapLayer.create_qgs_layer = MagicMock(side_effect=lambda map_layer: MagicMock(name=map_layer.label))
+        FakeQRaveMapLayer.style_qgs_layer = MagicMock()
+        FakeQRaveMapLayer.apply_filter = MagicMock()
+
+        self.root = FakeStandardItem("Project")
+        self.inputs = FakeStandardItem("Inputs", parent=self.root, row=0)
+        self.outputs = FakeStandardItem("Outputs", parent=self.root, row=1)
+        self.canvas = MagicMock()
+        self.loader = ViewLoader(self.canvas, max_workers=2)
+
+    def _item(self, label, folder, exists=True, xpath=None):
+        return FakeStandardItem(label, TreeData(MapLayer(label, exists, xpath)), parent=folder)
+
+    def _run_all(self):
+        for task in list(self.loader.tasks):
+            task.finished(task.run())
+
+    def test_groups_resolved_once_per_folder(self):
+        items = [self._item(f"In {i}", self.inputs) for i in range(5)] + [self._item(f"Out {i}", self.outputs) for i in range(3)]
+        jobs = self.loader.plan(items)
+        self.assertEqual(len(jobs), 8)
+        self.assertEqual(FakeQRaveMapLayer._prepare_parent_group.call_count, 2)
+        self.assertEqual([job.group for job in jobs], [self.groups["Inputs"]] * 5 + [self.groups["Outputs"]] * 3)
+
+    def test_skips_missing_existing_and_duplicates(self):
+        existing_layer = MagicMock()
+        FakeQRaveMapLayer.find_existing_layer.side_effect = lambda label, ancestry, key: existing_layer if label == "Already There" else None
+        items = [
+            self._item("DEM", self.inputs),
+            self._item("Missing", self.inputs, exists=False),
+            self._item("Already There", self.inputs),
+            # The same project layer shown in another folder
+            self._item("DEM", self.outputs),
+            # Same label but a different project layer
+            self._item("DEM", self.outputs, xpath="Project/Realizations/Realization#2/DEM"),
+        ]
+        jobs = self.loader.plan(items)
+        self.assertEqual([job.map_layer.label for job in jobs], ["DEM", "DEM"])
+        self.assertEqual([job.registry_key[1] for job in jobs], ["Project/Datasets/DEM", "Project/Realizations/Realization#2/DEM"])
+        existing_layer.triggerRepaint.assert_called_once()
+
+    def test_layers_without_registry_key(self):
+        # e.g. basemaps. Same label in the same project counts as already added
+        FakeQRaveMapLayer.registry_key.side_effect = None
+        FakeQRaveMapLayer.registry_key.return_value = None
+        jobs = self.loader.plan([self._item("DEM", self.inputs), self._item("DEM", self.outputs)])
+        self.assertEqual([job.key for job in jobs], [("Project", "DEM")])
+
+    def test_batch_added_in_one_call_with_canvas_frozen(self):
+        items = [self._item(f"Layer {i}", self.inputs) for i in range(6)]
+        done = []
+        self.loader.load(items, done.append)
+        QgsApplication.taskManager().addTask.assert_called_once()
+        self._run_all()
+
+        self.assertEqual(FakeQRaveMapLayer.create_qgs_layer.call_count, 6)
+        add_layers = QgsProject.instance().addMapLayers
+        add_layers.assert_called_once()
+        layers, add_to_legend = add_layers.call_args[0]
+        self.assertFalse(add_to_legend)
+        # Same order as the tree
+        self.assertEqual([layer._mock_name for layer in layers], [f"Layer {i}" for i in range(6)])
+        for layer in layers:
+            layer.moveToThread.assert_called_once()
+        self.assertEqual([c.args[1] for c in LayerRegistry.tag.call_args_list], [("project.rs.xml", f"Project/Datasets/Layer {i}") for i in range(6)])
+        self.assertEqual(FakeQRaveMapLayer.style_qgs_layer.call_count, 6)
+        self.assertEqual(FakeQRaveMapLayer.apply_filter.call_count, 6)
+        self.assertEqual([c.args for c in self.canvas.freeze.call_args_list], [(True,), (False,)])
+        self.canvas.refresh.assert_called_once()
+        self.assertEqual(self.groups["Inputs"].insertChildNode.call_count, 6)
+
+        self.assertEqual(len(done), 1)
+        self.assertEqual(len(done[0]), 6)
+        self.assertTrue(any("Layer 5: open" in line for line in FakeSettings.logged[-1].splitlines()))
+        self.assertEqual(self.loader.pending, set())
+
+    def test_groups_resolved_again_when_the_layers_go_in(self):
+        self.loader.load([self._item(f"Layer {i}", self.inputs) for i in range(3)])
+        # The user deletes the group while the layers are being opened
+        deleted = self.groups["Inputs"]
+        deleted.insertChildNode.side_effect = RuntimeError("wrapped C/C++ object of type QgsLayerTreeGroup has been deleted")
+        self.groups["Inputs"] = MagicMock()
+        self._run_all()
+        deleted.insertChildNode.assert_not_called()
+        self.assertEqual(self.groups["Inputs"].insertChildNode.call_count, 3)
+        # Once when planning and once when adding
+        self.assertEqual(FakeQRaveMapLayer._prepare_parent_group.call_count, 2)
+
+    def test_failed_layer_is_reported(self):
+        def create(map_layer):
+            if map_layer.label == "Bad":
+                raise RuntimeError("bad file")
+            return MagicMock()
+
+        FakeQRaveMapLayer.create_qgs_layer.side_effect = create
+        self.loader.load([self._item("Good", self.inputs), self._item("Bad", self.inputs)])
+        self._run_all()
+        layers = QgsProject.instance().addMapLayers.call_args[0][0]
+        self.assertEqual(len(layers), 1)
+        self.assertIn("Bad: FAILED", FakeSettings.logged[-1])
+        self.assertIn("bad file", FakeSettings.logged[-1])
+
+    def test_second_load_skips_pending_layers(self):
+        self.loader.load([self._item("DEM", self.inputs)])
+        self.loader.load([self._item("DEM", self.inputs), self._item("Slope", self.inputs)])
+        self.assertEqual([[job.map_layer.label for job in task.jobs] for task in self.loader.tasks], [["DEM"], ["Slope"]])
+
+    def test_cancel(self):
+        self.loader.load([self._item("DEM", self.inputs)])
+        task = self.loader.tasks[0]
+        self.loader.cancel()
+        task.finished(task.run())
+        QgsProject.instance().addMapLayers.assert_not_called()
+        self.canvas.freeze.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()